@@ -0,0 +1,458 @@
+"""Benchmark XCP-D on synthetic fMRIPrep derivatives.
+
+A minimal fMRIPrep-like dataset (one subject, with synthetic BOLD runs, confounds,
+masks, and placeholder transforms) is generated for each combination of number of runs and
+number of volumes, and XCP-D is run on it with each combination of number of atlases and
+number of processes.
+XCP-D runs in NIfTI mode with the resource monitor enabled,
+and the total runtime, CPU time, and largest process memory of each run are written to a table,
+along with the per-node resource profile written by XCP-D.
+
+By default, the external tools used in NIfTI mode (antsApplyTransforms and 3dReHo)
+are replaced with lightweight stand-ins, so the benchmark does not need ANTs or AFNI,
+and the timings reflect XCP-D's own processing.
+Any arguments not listed below are passed on to XCP-D.
+"""
+
+import itertools
+import json
+import os
+import resource
+import shutil
+import stat
+import subprocess
+import sys
+import time
+from argparse import ArgumentParser, RawTextHelpFormatter
+from glob import glob
+from pathlib import Path
+
+import pandas as pd
+
+# Built-in atlases that are available in MNI152NLin6Asym space
+VOLUMETRIC_ATLASES = ['Gordon', 'Glasser', 'Tian', 'HCP']
+
+_STUB_ARGS = """
+args = sys.argv[1:]
+
+
+def _get(*flags):
+    for flag in flags:
+        if flag in args:
+            return args[args.index(flag) + 1]
+"""
+
+STUBS = {
+    'antsApplyTransforms': (
+        '"""Resample the input image to the reference image, ignoring the transforms."""\n'
+        'import sys\n'
+        'from nilearn import image\n'
+        + _STUB_ARGS
+        + """
+
+ref_img = image.load_img(_get('--reference-image', '-r'))
+if ref_img.ndim > 3:
+    ref_img = image.index_img(ref_img, 0)
+
+interpolation = _get('--interpolation', '-n') or 'Linear'
+continuous = interpolation.startswith(('Linear', 'BSpline', 'LanczosWindowedSinc'))
+out_img = image.resample_to_img(
+    _get('--input', '-i'),
+    ref_img,
+    interpolation='continuous' if continuous else 'nearest',
+)
+out_img.to_filename(_get('--output', '-o').strip('[]').split(',')[0])
+"""
+    ),
+    '3dReHo': (
+        '"""Write an all-zeros ReHo map with the same grid as the input image."""\n'
+        'import sys\n'
+        'import nibabel as nb\n'
+        'import numpy as np\n'
+        + _STUB_ARGS
+        + """
+
+in_img = nb.load(_get('-inset'))
+out_img = nb.Nifti1Image(np.zeros(in_img.shape[:3], dtype=np.float32), in_img.affine)
+out_img.to_filename(_get('-prefix'))
+"""
+    ),
+}
+
+
+def get_parser():
+    """Build parser object."""
+    parser = ArgumentParser(description=__doc__, formatter_class=RawTextHelpFormatter)
+
+    parser.add_argument(
+        'output_dir',
+        action='store',
+        type=Path,
+        help=(
+            'Directory in which the synthetic datasets, XCP-D outputs and working directories, '
+            'and the benchmark results will be written.'
+        ),
+    )
+    parser.add_argument(
+        '--n-runs',
+        '--n_runs',
+        dest='n_runs',
+        action='store',
+        nargs='+',
+        type=int,
+        default=[1],
+        help='Numbers of BOLD runs in the synthetic dataset.',
+    )
+    parser.add_argument(
+        '--n-volumes',
+        '--n_volumes',
+        dest='n_volumes',
+        action='store',
+        nargs='+',
+        type=int,
+        default=[200],
+        help='Numbers of volumes in each synthetic BOLD run.',
+    )
+    parser.add_argument(
+        '--n-atlases',
+        '--n_atlases',
+        dest='n_atlases',
+        action='store',
+        nargs='+',
+        type=int,
+        choices=range(len(VOLUMETRIC_ATLASES) + 1),
+        default=[1],
+        help=(
+            'Numbers of atlases to parcellate the data with. '
+            f'Atlases are selected in order from {", ".join(VOLUMETRIC_ATLASES)}.'
+        ),
+    )
+    parser.add_argument(
+        '--nprocs',
+        '--n-procs',
+        '--n_procs',
+        dest='nprocs',
+        action='store',
+        nargs='+',
+        type=int,
+        default=[1],
+        help='Numbers of processes XCP-D may use.',
+    )
+    parser.add_argument(
+        '--voxel-size',
+        '--voxel_size',
+        dest='voxel_size',
+        action='store',
+        type=float,
+        default=4,
+        help='Voxel size of the synthetic images, in millimeters.',
+    )
+    parser.add_argument(
+        '--repetition-time',
+        '--repetition_time',
+        dest='repetition_time',
+        action='store',
+        type=float,
+        default=2,
+        help='Repetition time of the synthetic BOLD runs, in seconds.',
+    )
+    parser.add_argument(
+        '--real-tools',
+        '--real_tools',
+        dest='real_tools',
+        action='store_true',
+        default=False,
+        help='Use the installed ANTs and AFNI tools, instead of the stand-ins.',
+    )
+
+    return parser
+
+
+def main(args=None):
+    """Run the benchmark."""
+    from nipype import logging
+
+    opts, xcpd_args = get_parser().parse_known_args(args)
+
+    logger = logging.getLogger('nipype.utils')
+    logger.setLevel('INFO')
+
+    output_dir = opts.output_dir.absolute()
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    env = os.environ.copy()
+    if not opts.real_tools:
+        stub_dir = write_stubs(output_dir / 'stubs')
+        env['PATH'] = os.pathsep.join([stub_dir, env.get('PATH', '')])
+
+    results = []
+    for n_runs, n_volumes in itertools.product(opts.n_runs, opts.n_volumes):
+        bids_dir = output_dir / 'data' / f'runs-{n_runs}_volumes-{n_volumes}'
+        if not bids_dir.exists():
+            make_synthetic_dataset(
+                bids_dir,
+                n_runs=n_runs,
+                n_volumes=n_volumes,
+                voxel_size=opts.voxel_size,
+                repetition_time=opts.repetition_time,
+            )
+
+        for n_atlases, nprocs in itertools.product(opts.n_atlases, opts.nprocs):
+            label = f'runs-{n_runs}_volumes-{n_volumes}_atlases-{n_atlases}_nprocs-{nprocs}'
+            logger.info(f'Running {label}')
+            result = run_xcpd(
+                bids_dir,
+                output_dir / 'runs' / label,
+                atlases=VOLUMETRIC_ATLASES[:n_atlases],
+                nprocs=nprocs,
+                xcpd_args=xcpd_args,
+                env=env,
+            )
+            results.append({'n_runs': n_runs, 'n_volumes': n_volumes, **result})
+
+    results_df = pd.DataFrame(results)
+    results_file = output_dir / 'benchmark.tsv'
+    results_df.to_csv(results_file, sep='\t', index=False, na_rep='n/a')
+    logger.info(
+        f'Benchmark results written to {results_file}:\n{results_df.to_string(index=False)}'
+    )
+
+
+def write_stubs(stub_dir):
+    """Write stand-ins for the external tools used by XCP-D in NIfTI mode.
+
+    Parameters
+    ----------
+    stub_dir : :obj:`pathlib.Path`
+        Directory in which the executables will be written.
+
+    Returns
+    -------
+    stub_dir : :obj:`str`
+        The directory, to be prepended to the ``PATH``.
+    """
+    stub_dir.mkdir(parents=True, exist_ok=True)
+    for name, code in STUBS.items():
+        stub_file = stub_dir / name
+        stub_file.write_text(f'#!{sys.executable}\n{code}')
+        stub_file.chmod(stub_file.stat().st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+
+    return str(stub_dir)
+
+
+def make_synthetic_dataset(bids_dir, n_runs, n_volumes, voxel_size=4, repetition_time=2):
+    """Write a minimal fMRIPrep derivatives dataset with one subject and synthetic BOLD data.
+
+    All images are in MNI152NLin6Asym space, on a grid with the requested voxel size.
+    The transforms are empty placeholder files.
+
+    Parameters
+    ----------
+    bids_dir : :obj:`pathlib.Path`
+        Directory in which the dataset will be written.
+    n_runs : :obj:`int`
+        Number of resting-state BOLD runs.
+    n_volumes : :obj:`int`
+        Number of volumes in each run.
+    voxel_size : :obj:`float`
+        Voxel size in millimeters.
+    repetition_time : :obj:`float`
+        Repetition time in seconds.
+
+    Returns
+    -------
+    bids_dir : :obj:`pathlib.Path`
+        The dataset directory.
+    """
+    import nibabel as nb
+    import numpy as np
+    from nilearn import image
+
+    from xcp_d.data import load as load_data
+
+    rng = np.random.default_rng(0)
+    bids_dir = Path(bids_dir)
+    anat_dir = bids_dir / 'sub-01' / 'anat'
+    func_dir = bids_dir / 'sub-01' / 'func'
+    anat_dir.mkdir(parents=True, exist_ok=True)
+    func_dir.mkdir(parents=True, exist_ok=True)
+
+    (bids_dir / 'dataset_description.json').write_text(
+        json.dumps(
+            {
+                'Name': 'Synthetic fMRIPrep derivatives for benchmarking XCP-D',
+                'BIDSVersion': '1.9.0',
+                'DatasetType': 'derivative',
+                'GeneratedBy': [{'Name': 'fMRIPrep', 'Version': '23.2.0'}],
+            },
+            indent=4,
+        )
+    )
+
+    t1w_img = image.resample_img(
+        str(load_data('MNI152_T1_2mm.nii.gz')),
+        target_affine=np.diag([voxel_size] * 3),
+        interpolation='continuous',
+    )
+    t1w_data = t1w_img.get_fdata()
+    mask = t1w_data > (0.25 * t1w_data.max())
+    mask_img = nb.Nifti1Image(mask.astype(np.uint8), t1w_img.affine)
+
+    t1w_img.to_filename(anat_dir / 'sub-01_desc-preproc_T1w.nii.gz')
+    mask_img.to_filename(anat_dir / 'sub-01_desc-brain_mask.nii.gz')
+    mask_img.to_filename(anat_dir / 'sub-01_space-MNI152NLin6Asym_desc-brain_mask.nii.gz')
+    for prefix in ['from-T1w_to-MNI152NLin6Asym', 'from-MNI152NLin6Asym_to-T1w']:
+        (anat_dir / f'sub-01_{prefix}_mode-image_xfm.h5').touch()
+
+    base_columns = [
+        'trans_x',
+        'trans_y',
+        'trans_z',
+        'rot_x',
+        'rot_y',
+        'rot_z',
+        'global_signal',
+        'csf',
+        'white_matter',
+    ]
+    for run in range(1, n_runs + 1):
+        prefix = f'sub-01_task-rest_run-{run}'
+
+        # Motion parameters are random walks, so some volumes exceed the FD threshold.
+        confounds_df = pd.DataFrame(
+            np.cumsum(rng.normal(scale=0.05, size=(n_volumes, 6)), axis=0),
+            columns=base_columns[:6],
+        )
+        confounds_df[base_columns[6:]] = rng.normal(size=(n_volumes, 3))
+        for column in base_columns:
+            confounds_df[f'{column}_derivative1'] = confounds_df[column].diff()
+            confounds_df[f'{column}_power2'] = confounds_df[column] ** 2
+            confounds_df[f'{column}_derivative1_power2'] = (
+                confounds_df[f'{column}_derivative1'] ** 2
+            )
+
+        confounds_df.to_csv(
+            func_dir / f'{prefix}_desc-confounds_timeseries.tsv',
+            sep='\t',
+            index=False,
+            na_rep='n/a',
+        )
+        (func_dir / f'{prefix}_desc-confounds_timeseries.json').write_text('{}')
+
+        # A shared signal plus noise, scaled by the confounds, inside the brain mask
+        signal = rng.normal(size=n_volumes) + confounds_df['global_signal'].to_numpy()
+        bold_data = np.zeros(mask.shape + (n_volumes,), dtype=np.float32)
+        bold_data[mask] = 1000 + 10 * (
+            signal[None, :] + rng.normal(size=(int(mask.sum()), n_volumes))
+        )
+        bold_img = nb.Nifti1Image(bold_data, t1w_img.affine)
+        bold_img.header.set_xyzt_units('mm', 'sec')
+        bold_img.header['pixdim'][4] = repetition_time
+
+        space_prefix = f'{prefix}_space-MNI152NLin6Asym'
+        bold_img.to_filename(func_dir / f'{space_prefix}_desc-preproc_bold.nii.gz')
+        (func_dir / f'{space_prefix}_desc-preproc_bold.json').write_text(
+            json.dumps({'RepetitionTime': repetition_time, 'TaskName': 'rest'}, indent=4)
+        )
+        nb.Nifti1Image(bold_data.mean(axis=3), t1w_img.affine).to_filename(
+            func_dir / f'{space_prefix}_boldref.nii.gz'
+        )
+        mask_img.to_filename(func_dir / f'{space_prefix}_desc-brain_mask.nii.gz')
+
+    return bids_dir
+
+
+def run_xcpd(bids_dir, run_dir, atlases, nprocs, xcpd_args=None, env=None):
+    """Run XCP-D in a separate process and measure its resource usage.
+
+    Parameters
+    ----------
+    bids_dir : :obj:`pathlib.Path`
+        Synthetic dataset written by :func:`make_synthetic_dataset`.
+    run_dir : :obj:`pathlib.Path`
+        Directory for XCP-D's outputs, working directory, and log.
+        Any existing contents are removed.
+    atlases : :obj:`list` of :obj:`str`
+        Atlases to use. If empty, parcellation is skipped.
+    nprocs : :obj:`int`
+        Number of processes XCP-D may use.
+    xcpd_args : :obj:`list` of :obj:`str` or None
+        Additional command-line arguments for XCP-D.
+    env : :obj:`dict` or None
+        Environment variables for XCP-D.
+
+    Returns
+    -------
+    result : :obj:`dict`
+        Total wall time and CPU time of XCP-D and the processes it started,
+        the largest peak memory of any one of those processes,
+        and the summary of the per-node resource profile.
+    """
+    if run_dir.exists():
+        shutil.rmtree(run_dir)
+
+    run_dir.mkdir(parents=True)
+    output_dir = run_dir / 'xcp_d'
+    cmd = [
+        sys.executable,
+        '-c',
+        'from xcp_d.cli.run import main; main()',
+        str(bids_dir),
+        str(output_dir),
+        'participant',
+        '--participant-label=01',
+        '--mode=linc',
+        '--file-format=nifti',
+        f'--work-dir={run_dir / "work"}',
+        f'--nprocs={nprocs}',
+        '--resource-monitor',
+        '--notrack',
+    ]
+    cmd += ['--atlases', *atlases] if atlases else ['--skip-parcellation']
+    cmd += xcpd_args or []
+
+    usage_before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    start = time.monotonic()
+    with open(run_dir / 'xcp_d.log', 'w') as fo:
+        proc = subprocess.Popen(cmd, env=env, stdout=fo, stderr=subprocess.STDOUT)
+        proc.wait()
+
+    # RUSAGE_CHILDREN covers XCP-D and the processes it started and waited for.
+    # CPU times are totals over all children of the benchmark, so the earlier runs are subtracted.
+    # ru_maxrss is the peak RSS of the largest single process (not the sum of concurrent ones),
+    # and is a maximum over all children of the benchmark,
+    # so it is an upper bound for runs that use less memory than an earlier run.
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    result = {
+        'n_atlases': len(atlases),
+        'nprocs': nprocs,
+        'returncode': proc.returncode,
+        'wall_time_s': time.monotonic() - start,
+        'cpu_time_s': (
+            usage.ru_utime + usage.ru_stime - usage_before.ru_utime - usage_before.ru_stime
+        ),
+        # ru_maxrss is in kilobytes on Linux
+        'max_process_rss_gb': usage.ru_maxrss / (1024**2),
+        'n_nodes': None,
+        'critical_path_s': None,
+        'peak_node_rss_gb': None,
+        'profile': None,
+    }
+    summary_files = sorted(glob(str(output_dir / 'logs' / 'resource_profile_*.json')))
+    if summary_files:
+        with open(summary_files[-1]) as fo:
+            summary = json.load(fo).get('01', {})
+
+        result['n_nodes'] = summary.get('n_nodes')
+        result['critical_path_s'] = summary.get('critical_path_s')
+        result['peak_node_rss_gb'] = summary.get('peak_rss_gb')
+        result['profile'] = summary_files[-1].replace('.json', '.tsv')
+
+    return result
+
+
+if __name__ == '__main__':
+    raise RuntimeError(
+        'xcp_d/cli/benchmark.py should not be run directly;\n'
+        'Please use the `xcp_d-benchmark` command-line interface.'
+    )
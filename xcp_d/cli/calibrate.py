@@ -0,0 +1,86 @@
+"""Calibrate XCP-D's per-node memory estimates from previous runs.
+
+The peak memory of the profiled nodes is collected from the working directories of runs
+performed with ``--resource-monitor``,
+and the resource model's coefficients are fit to them.
+
+Pass the written file to ``xcp_d --resource-model`` in later runs,
+so that memory is requested according to what the nodes actually used on your data and system.
+"""
+
+from argparse import ArgumentParser, RawTextHelpFormatter
+from pathlib import Path
+
+
+def get_parser():
+    """Build parser object."""
+    parser = ArgumentParser(description=__doc__, formatter_class=RawTextHelpFormatter)
+
+    parser.add_argument(
+        'work_dir',
+        action='store',
+        nargs='+',
+        type=Path,
+        help='Working directories of XCP-D runs performed with --resource-monitor.',
+    )
+    parser.add_argument(
+        '-o',
+        '--out-file',
+        '--out_file',
+        dest='out_file',
+        action='store',
+        type=Path,
+        required=True,
+        help='JSON file in which the calibrated resource model will be written.',
+    )
+    parser.add_argument(
+        '--min-samples',
+        '--min_samples',
+        dest='min_samples',
+        action='store',
+        type=int,
+        default=3,
+        help=(
+            'Minimum number of profiled nodes needed to calibrate a task. '
+            'Tasks with fewer profiled nodes keep their default coefficients.'
+        ),
+    )
+
+    return parser
+
+
+def main(args=None):
+    """Calibrate the resource model."""
+    import pandas as pd
+    from nipype import logging
+
+    from xcp_d.utils.resources import calibrate_resource_model, collect_resource_profiles
+
+    opts = get_parser().parse_args(args)
+
+    logger = logging.getLogger('nipype.utils')
+    logger.setLevel('INFO')
+
+    profiles = pd.concat(
+        [collect_resource_profiles(str(work_dir)) for work_dir in opts.work_dir],
+        ignore_index=True,
+    )
+    if profiles.empty:
+        raise ValueError(
+            'No resource profiles were found. '
+            'Were the working directories generated with --resource-monitor?'
+        )
+
+    opts.out_file.parent.mkdir(parents=True, exist_ok=True)
+    calibrate_resource_model(profiles, out_file=opts.out_file, min_samples=opts.min_samples)
+    logger.info(
+        f'Calibrated the resource model from {profiles.shape[0]} profiled nodes. '
+        f'Pass {opts.out_file.absolute()} to --resource-model in later runs.'
+    )
+
+
+if __name__ == '__main__':
+    raise RuntimeError(
+        'xcp_d/cli/calibrate.py should not be run directly;\n'
+        'Please use the `xcp_d-calibrate` command-line interface.'
+    )
@@ -1,12 +1,16 @@
 #!/usr/bin/env python
 """Aggregate qc of all the subjects."""
 
+import json
 import os
 from argparse import ArgumentParser, RawTextHelpFormatter
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import pandas as pd
 
+QC_SUFFIX = '_desc-linc_qc.tsv'
+
 
 def get_parser():
     """Build parser object."""
@@ -24,6 +28,40 @@ def get_parser():
         type=str,
         help='output prefix for group',
     )
+    parser.add_argument(
+        '--nthreads',
+        '--n-threads',
+        dest='nthreads',
+        action='store',
+        type=int,
+        default=8,
+        help=(
+            'Number of threads used to scan the output directory and read QC files.\n'
+            'Reading many small files from network storage is I/O-bound, '
+            'so this may exceed the number of CPUs.'
+        ),
+    )
+    parser.add_argument(
+        '--full-rescan',
+        dest='full_rescan',
+        action='store_true',
+        default=False,
+        help=(
+            'Ignore the manifest from a previous run and read every QC file.\n'
+            'By default, only QC files that are new or changed (by modification time or size) '
+            'since the last run are read.'
+        ),
+    )
+    parser.add_argument(
+        '--parquet',
+        dest='parquet',
+        action='store_true',
+        default=False,
+        help=(
+            'Also write the combined QC table in Parquet format, next to the TSV file.\n'
+            'This requires pyarrow or fastparquet.'
+        ),
+    )
 
     return parser
 
@@ -34,16 +72,170 @@ def main(args=None):
 
     xcpd_dir = os.path.abspath(opts.xcpd_dir)
     outputfile = os.path.join(os.getcwd(), f'{opts.output_prefix}_allsubjects_qc.tsv')
+    manifest_file = os.path.join(os.getcwd(), f'{opts.output_prefix}_allsubjects_qc.json')
 
-    qc_files = []
-    for dirpath, _, filenames in os.walk(xcpd_dir):
-        for filename in filenames:
-            if filename.endswith('_desc-linc_qc.tsv'):
-                qc_files.append(os.path.join(dirpath, filename))
+    qc_files = find_qc_files(xcpd_dir, n_threads=opts.nthreads)
+    manifest = {}
+    if not opts.full_rescan:
+        manifest = load_manifest(manifest_file, outputfile)
 
-    dfs = [pd.read_table(qc_file) for qc_file in qc_files]
-    df = pd.concat(dfs, axis=0)
+    df, manifest = combine_qc_files(qc_files, manifest=manifest, n_threads=opts.nthreads)
     df.to_csv(outputfile, index=False, sep='\t')
+    with open(manifest_file, 'w') as fo:
+        json.dump(manifest, fo, indent=4)
+
+    if opts.parquet:
+        try:
+            df.to_parquet(os.path.splitext(outputfile)[0] + '.parquet', index=False)
+        except ImportError as exc:
+            raise ImportError(
+                "Writing Parquet files with '--parquet' requires pyarrow or fastparquet."
+            ) from exc
+
+
+def find_qc_files(xcpd_dir, n_threads=1):
+    """Find LINC QC files in an XCP-D output directory.
+
+    Each top-level directory (typically one per subject) is walked in a separate thread.
+
+    Parameters
+    ----------
+    xcpd_dir : :obj:`str`
+        Path to the XCP-D output directory.
+    n_threads : :obj:`int`
+        Number of threads to use.
+
+    Returns
+    -------
+    qc_files : :obj:`list` of :obj:`str`
+        Sorted paths to the QC files.
+    """
+
+    def _walk(path):
+        found = []
+        for dirpath, _, filenames in os.walk(path):
+            found += [os.path.join(dirpath, f) for f in filenames if f.endswith(QC_SUFFIX)]
+
+        return found
+
+    qc_files, subdirs = [], []
+    with os.scandir(xcpd_dir) as it:
+        for entry in it:
+            if entry.is_dir():
+                subdirs.append(entry.path)
+            elif entry.name.endswith(QC_SUFFIX):
+                qc_files.append(entry.path)
+
+    with ThreadPoolExecutor(max_workers=max(n_threads, 1)) as executor:
+        for found in executor.map(_walk, subdirs):
+            qc_files += found
+
+    return sorted(qc_files)
+
+
+def load_manifest(manifest_file, combined_file):
+    """Load the QC tables recorded by a previous run.
+
+    Parameters
+    ----------
+    manifest_file : :obj:`str`
+        JSON file with the path, modification time, size, number of rows, and columns
+        (with their data types) of each QC file that went into ``combined_file``, in order.
+    combined_file : :obj:`str`
+        Combined QC TSV file written by a previous run.
+
+    Returns
+    -------
+    manifest : :obj:`dict`
+        Dictionary mapping each QC file to its ``mtime``, ``size``, and ``table``
+        (the rows of ``combined_file`` it contributed).
+        Empty if either file is missing or they do not match.
+    """
+    if not (os.path.isfile(manifest_file) and os.path.isfile(combined_file)):
+        return {}
+
+    with open(manifest_file) as fo:
+        records = json.load(fo)
+
+    if not all('columns' in record for record in records.values()):
+        # The manifest was written by an older version.
+        return {}
+
+    combined_df = pd.read_table(combined_file)
+    n_rows = sum(record['n_rows'] for record in records.values())
+    columns = {column for record in records.values() for column in record['columns']}
+    if n_rows != combined_df.shape[0] or not columns.issubset(combined_df.columns):
+        # The combined file was modified since the manifest was written.
+        return {}
+
+    manifest = {}
+    start = 0
+    for qc_file, record in records.items():
+        stop = start + record['n_rows']
+        # Restore the file's own columns, in order, including any that were all NaN,
+        # and the types of columns that were converted when combined with other files.
+        try:
+            table = combined_df.iloc[start:stop][list(record['columns'])].astype(record['columns'])
+        except (TypeError, ValueError):
+            return {}
+
+        manifest[qc_file] = {
+            'mtime': record['mtime'],
+            'size': record['size'],
+            'table': table.reset_index(drop=True),
+        }
+        start = stop
+
+    return manifest
+
+
+def combine_qc_files(qc_files, manifest=None, n_threads=1):
+    """Combine QC files into a single table, reading only new or changed files.
+
+    Parameters
+    ----------
+    qc_files : :obj:`list` of :obj:`str`
+        Paths to the QC files.
+    manifest : :obj:`dict` or None
+        Output from :func:`load_manifest`.
+    n_threads : :obj:`int`
+        Number of threads to use to read the QC files.
+
+    Returns
+    -------
+    df : :obj:`pandas.DataFrame`
+        The combined QC table.
+    new_manifest : :obj:`dict`
+        Dictionary mapping each QC file to its ``mtime``, ``size``, ``n_rows``,
+        and ``columns`` (a dictionary mapping each column to its data type),
+        in the same order as the rows in ``df``.
+    """
+    manifest = manifest or {}
+
+    stats = {qc_file: os.stat(qc_file) for qc_file in qc_files}
+    to_read = [
+        qc_file
+        for qc_file in qc_files
+        if qc_file not in manifest
+        or manifest[qc_file]['mtime'] != stats[qc_file].st_mtime
+        or manifest[qc_file]['size'] != stats[qc_file].st_size
+    ]
+    with ThreadPoolExecutor(max_workers=max(n_threads, 1)) as executor:
+        tables = dict(zip(to_read, executor.map(pd.read_table, to_read), strict=True))
+
+    dfs, new_manifest = [], {}
+    for qc_file in qc_files:
+        table = tables[qc_file] if qc_file in tables else manifest[qc_file]['table']
+        dfs.append(table)
+        new_manifest[qc_file] = {
+            'mtime': stats[qc_file].st_mtime,
+            'size': stats[qc_file].st_size,
+            'n_rows': table.shape[0],
+            'columns': table.dtypes.astype(str).to_dict(),
+        }
+
+    df = pd.concat(dfs, axis=0) if dfs else pd.DataFrame()
+    return df, new_manifest
 
 
 if __name__ == '__main__':
@@ -0,0 +1,73 @@
+"""Build or update a persistent layout index of a preprocessed dataset.
+
+Each subject is indexed into its own PyBIDS database.
+Running this command again only re-indexes subjects whose folders have changed,
+so it can be re-run cheaply whenever new subjects are added to the dataset.
+
+Pass the index directory to ``xcp_d --bids-database-dir`` in participant-level jobs
+that each process a single subject,
+so that every job reuses its subject's database instead of indexing the dataset.
+"""
+
+from argparse import ArgumentParser, RawTextHelpFormatter
+from pathlib import Path
+
+
+def get_parser():
+    """Build parser object."""
+    parser = ArgumentParser(description=__doc__, formatter_class=RawTextHelpFormatter)
+
+    parser.add_argument(
+        'fmri_dir',
+        action='store',
+        type=Path,
+        help='The root folder of the preprocessed dataset.',
+    )
+    parser.add_argument(
+        'index_dir',
+        action='store',
+        type=Path,
+        help='Folder where the index will be written. Will be created if not present.',
+    )
+    parser.add_argument(
+        '--participant-label',
+        '--participant_label',
+        dest='participant_label',
+        action='store',
+        nargs='+',
+        type=lambda label: label.removeprefix('sub-'),
+        help=(
+            'A space-delimited list of participant identifiers to index or update. '
+            "The 'sub-' prefix can be removed.\n"
+            'By default, every subject is indexed, '
+            'and subjects that were removed from the dataset are dropped from the index.'
+        ),
+    )
+
+    return parser
+
+
+def main(args=None):
+    """Build or update the layout index."""
+    from nipype import logging
+
+    from xcp_d.utils.bids import update_layout_index
+
+    opts = get_parser().parse_args(args)
+
+    logger = logging.getLogger('nipype.utils')
+    logger.setLevel('INFO')
+
+    updated = update_layout_index(
+        opts.fmri_dir,
+        opts.index_dir,
+        participant_label=opts.participant_label,
+    )
+    logger.info(f'Indexed {len(updated)} subject(s) in {opts.index_dir.absolute()}.')
+
+
+if __name__ == '__main__':
+    raise RuntimeError(
+        'xcp_d/cli/index.py should not be run directly;\n'
+        'Please use the `xcp_d-index` command-line interface.'
+    )
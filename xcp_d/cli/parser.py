@@ -146,7 +146,10 @@ def _build_parser():
         help=(
             'Path to a PyBIDS database folder, for faster indexing '
             '(especially useful for large datasets). '
-            'Will be created if not present.'
+            'Will be created if not present. '
+            'This may also be an index built with ``xcp_d-index``, '
+            'in which case the database for the requested participant is reused '
+            'if the participant has not changed since the index was updated.'
         ),
     )
 
@@ -185,6 +188,20 @@ def _build_parser():
         action='store_true',
         help='Attempt to reduce memory usage (will increase disk usage in working directory).',
     )
+    g_perfm.add_argument(
+        '--resource-model',
+        '--resource_model',
+        dest='resource_model',
+        action='store',
+        default=None,
+        type=IsFile,
+        help=(
+            'JSON file with calibrated coefficients for the per-node memory estimates, '
+            'as written by xcp_d-calibrate from the working directories of previous runs '
+            'with --resource-monitor. '
+            'By default, the coefficients distributed with XCP-D are used.'
+        ),
+    )
     g_perfm.add_argument(
         '--use-plugin',
         '--use_plugin',
@@ -308,6 +325,23 @@ def _build_parser():
         action=parser_utils.YesNoAction,
         help='After denoising, concatenate each derivative from each task across runs.',
     )
+    g_param.add_argument(
+        '--combine-runs-mode',
+        '--combine_runs_mode',
+        dest='combine_runs_mode',
+        default='full',
+        choices=['full', 'light'],
+        help=(
+            "How to concatenate runs when '--combine-runs' is used. "
+            "'full' concatenates the dense BOLD derivatives and recomputes QC metrics and plots "
+            'from them. '
+            "'light' only concatenates the parcellated time series, motion parameters, and "
+            'temporal masks, and combines the QC metrics and correlation matrices from '
+            'statistics calculated for each run, so the dense BOLD data are never reloaded. '
+            'Concatenated dense BOLD files and QC plots are not generated in light mode, '
+            'and DVARS is standardized within each run.'
+        ),
+    )
 
     g_motion_filter = parser.add_argument_group(
         title='Motion filtering parameters',
@@ -605,6 +639,21 @@ This will create the DCAN executive summary, including a brainsprite visualizati
 anatomical tissue segmentation, and an HDF5 file containing motion levels at different thresholds.
 """,
     )
+    g_linc.add_argument(
+        '--abcc-qc-layout',
+        '--abcc_qc_layout',
+        dest='abcc_qc_layout',
+        action='store',
+        default='legacy',
+        choices=['legacy', 'compact'],
+        help=(
+            'Layout of the ABCC QC HDF5 file. '
+            "'legacy' writes one group of datasets for each FD threshold. "
+            "'compact' writes the binary masks and summary statistics for all thresholds "
+            'as a small number of chunked, compressed 2D datasets, '
+            'which are much faster to write and to read in group analyses.'
+        ),
+    )
 
     g_other = parser.add_argument_group('Other options')
     g_other.add_argument(
@@ -628,6 +677,22 @@ anatomical tissue segmentation, and an HDF5 file containing motion levels at dif
         default=Path('working_dir'),
         help='Path to working directory, where intermediate results should be stored.',
     )
+    g_other.add_argument(
+        '--result-cache-dir',
+        '--result_cache_dir',
+        dest='result_cache_dir',
+        action='store',
+        type=Path,
+        default=None,
+        help=(
+            'Path to a directory where the results of expensive steps '
+            '(denoising, ALFF, ReHo, parcellation, and correlation) are cached. '
+            'Results are keyed on the contents of their inputs and their parameters, '
+            'so they are reused by later runs with the same inputs, '
+            'even if the working directory is cleared or a new one is used. '
+            'The cache is never pruned automatically.'
+        ),
+    )
     g_other.add_argument(
         '--clean-workdir',
         '--clean_workdir',
@@ -639,13 +704,34 @@ anatomical tissue segmentation, and an HDF5 file containing motion levels at dif
             'Use of this flag is not recommended when running concurrent processes of XCP-D.'
         ),
     )
+    g_other.add_argument(
+        '--work-dir-budget',
+        '--work_dir_budget',
+        dest='work_dir_budget',
+        action='store',
+        type=float,
+        default=None,
+        metavar='GB',
+        help=(
+            'Maximum size, in GB, of the large intermediate files kept in the working directory. '
+            'Once this size is exceeded, large files that are no longer needed by any remaining '
+            'step are deleted, and the steps that wrote them will be re-run if XCP-D is run again '
+            'with the same working directory. '
+            'Only used with the MultiProc plugin. '
+            'By default, no intermediate files are deleted.'
+        ),
+    )
     g_other.add_argument(
         '--resource-monitor',
         '--resource_monitor',
         dest='resource_monitor',
         action='store_true',
         default=False,
-        help="Enable Nipype's resource monitoring to keep track of memory and CPU usage.",
+        help=(
+            "Enable Nipype's resource monitoring to keep track of memory and CPU usage. "
+            'A per-node resource profile is written to the logs folder, '
+            'and a summary is added to the HTML reports.'
+        ),
     )
     g_other.add_argument(
         '--config-file',
@@ -886,6 +972,8 @@ def parse_args(args=None, namespace=None):
     config.execution.log_dir.mkdir(exist_ok=True, parents=True)
     output_dir.mkdir(exist_ok=True, parents=True)
     work_dir.mkdir(exist_ok=True, parents=True)
+    if config.execution.result_cache_dir is not None:
+        config.execution.result_cache_dir.mkdir(exist_ok=True, parents=True)
 
     # Force initialization of the BIDSLayout
     config.execution.init()
@@ -915,6 +1003,8 @@ def _validate_parameters(opts, build_log, parser):
     opts.fmri_dir = opts.fmri_dir.resolve()
     opts.output_dir = opts.output_dir.resolve()
     opts.work_dir = opts.work_dir.resolve()
+    if opts.result_cache_dir is not None:
+        opts.result_cache_dir = opts.result_cache_dir.resolve()
 
     error_messages = []
 
@@ -1119,6 +1209,9 @@ def _validate_parameters(opts, build_log, parser):
         )
         opts.min_time = 0
 
+    if opts.combine_runs_mode == 'light' and not opts.combine_runs:
+        build_log.warning("'--combine-runs-mode light' has no effect without '--combine-runs'.")
+
     opts.output_interpolated = True if opts.output_type == 'interpolated' else False
 
     # Motion filtering parameters
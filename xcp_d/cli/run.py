@@ -17,13 +17,15 @@ def main():
 
     from xcp_d.cli.parser import parse_args
     from xcp_d.cli.workflow import build_workflow
+
+    parse_args(args=sys.argv[1:])
+
+    # Imported after parsing, so --help and --version don't have to load PyBIDS
     from xcp_d.utils.bids import (
         write_atlas_dataset_description,
         write_derivative_description,
     )
 
-    parse_args(args=sys.argv[1:])
-
     if 'pdb' in config.execution.debug:
         from xcp_d.utils.debug import setup_exceptionhook
 
@@ -110,7 +112,7 @@ def main():
     config.loggers.workflow.log(25, 'XCP-D started!')
     errno = 1  # Default is error exit unless otherwise set
     try:
-        xcpd_wf.run(**config.nipype.get_plugin())
+        exec_graph = xcpd_wf.run(**config.nipype.get_plugin())
     except Exception as e:
         if not config.execution.notrack:
             from xcp_d.utils.sentry import process_crashfile
@@ -131,6 +133,18 @@ def main():
 
     else:
         config.loggers.workflow.log(25, 'XCP-D finished successfully!')
+        if config.nipype.resource_monitor:
+            from xcp_d.utils.profiling import write_resource_profile
+
+            try:
+                write_resource_profile(
+                    exec_graph,
+                    output_dir=config.execution.output_dir,
+                    run_uuid=config.execution.run_uuid,
+                )
+            except Exception as e:  # noqa: BLE001
+                config.loggers.workflow.warning(f'Could not write the resource profile: {e}')
+
         if sentry_sdk is not None:
             success_message = 'XCP-D finished without errors'
             sentry_sdk.add_breadcrumb(message=success_message, level='info')
@@ -91,8 +91,6 @@ The :py:mod:`config` is responsible for other conveniency actions.
 import os
 from multiprocessing import set_start_method
 
-from templateflow.conf import TF_LAYOUT
-
 # Disable NiPype etelemetry always
 _disable_et = bool(os.getenv('NO_ET') is not None or os.getenv('NIPYPE_NO_ET') is not None)
 os.environ['NIPYPE_NO_ET'] = '1'
@@ -109,15 +107,16 @@ finally:
     # ignoring the most annoying warnings
     import random
     import sys
+    from importlib.metadata import version
     from pathlib import Path
     from time import strftime
     from uuid import uuid4
 
-    from nipype import __version__ as _nipype_ver
-    from templateflow import __version__ as _tf_ver
-
     from xcp_d import __version__
-    from xcp_d.data import load as load_data
+
+    # Read the versions from the package metadata, to avoid importing the packages.
+    _nipype_ver = version('nipype')
+    _tf_ver = version('templateflow')
 
 if not hasattr(sys, '_is_pytest_session'):
     sys._is_pytest_session = False  # Trick to avoid sklearn's FutureWarnings
@@ -322,10 +321,17 @@ class nipype(_Config):
         'raise_insufficient': False,
     }
     """Settings for NiPype's execution plugin."""
+    resource_model = None
+    """JSON file with calibrated coefficients for :mod:`xcp_d.utils.resources`."""
     resource_monitor = False
     """Enable resource monitor."""
     stop_on_first_crash = True
     """Whether the workflow should stop or continue after the first error."""
+    work_dir_budget = None
+    """Size, in GB, of large intermediate files to keep in the working directory
+    (MultiProc only)."""
+
+    _paths = ('resource_model',)
 
     @classmethod
     def get_plugin(cls):
@@ -338,6 +344,16 @@ class nipype(_Config):
             out['plugin_args']['n_procs'] = int(cls.nprocs)
             if cls.memory_gb:
                 out['plugin_args']['memory_gb'] = float(cls.memory_gb)
+
+        if cls.plugin == 'MultiProc':
+            from xcp_d.utils.plugin import PLUGIN_ARGS, MultiProcPlugin
+
+            if cls.work_dir_budget is not None:
+                out['plugin_args']['work_dir_budget_gb'] = float(cls.work_dir_budget)
+
+            if any(out['plugin_args'].get(arg) is not None for arg in PLUGIN_ARGS):
+                out['plugin'] = MultiProcPlugin(plugin_args=out['plugin_args'])
+
         return out
 
     @classmethod
@@ -412,6 +428,8 @@ class execution(_Config):
     """Do not collect telemetry information for *XCP-D*."""
     reports_only = None
     """Only build the reports, based on the reportlets found in a cached working directory."""
+    result_cache_dir = None
+    """Path to a directory where the results of expensive nodes are cached across runs."""
     output_dir = None
     """Folder where derivatives will be stored."""
     atlases = []
@@ -441,6 +459,7 @@ class execution(_Config):
         'layout',
         'log_dir',
         'output_dir',
+        'result_cache_dir',
         'templateflow_home',
         'work_dir',
         'dataset_links',
@@ -454,42 +473,34 @@ class execution(_Config):
             os.environ['FS_LICENSE'] = str(cls.fs_license_file)
 
         if cls._layout is None:
-            import re
+            from xcp_d.utils.bids import build_layout, get_layout_index_database, is_layout_index
+
+            _db_path = cls.work_dir / cls.run_uuid / 'bids_db'
+            _reset_database = True
+            _participant_label = cls.participant_label
+            if cls.bids_database_dir and is_layout_index(cls.bids_database_dir):
+                # Use the subject's database from a persistent index built by xcp_d-index.
+                # The shared database is only read, by copying it into this run's folder,
+                # so that other jobs and later index updates can't affect this run.
+                _index_db = get_layout_index_database(
+                    cls.bids_database_dir,
+                    cls.fmri_dir,
+                    cls.participant_label,
+                )
+                if _index_db is not None:
+                    import shutil
 
-            from bids.layout import BIDSLayout
-            from bids.layout.index import BIDSLayoutIndexer
+                    shutil.copytree(_index_db, _db_path, dirs_exist_ok=True)
+                    _reset_database, _participant_label = False, None
+            elif cls.bids_database_dir:
+                _db_path, _reset_database, _participant_label = cls.bids_database_dir, False, None
 
-            _db_path = cls.bids_database_dir or (cls.work_dir / cls.run_uuid / 'bids_db')
             _db_path.mkdir(exist_ok=True, parents=True)
-
-            # Recommended after PyBIDS 12.1
-            ignore_patterns = [
-                'code',
-                'stimuli',
-                'models',
-                re.compile(r'\/\.\w+|^\.\w+'),  # hidden files
-                re.compile(
-                    r'sub-[a-zA-Z0-9]+(/ses-[a-zA-Z0-9]+)?/'
-                    r'(beh|dwi|eeg|ieeg|meg|perf|pet|physio)'
-                ),
-            ]
-            if cls.participant_label and cls.bids_database_dir is None:
-                # Ignore any subjects who aren't the requested ones.
-                ignore_patterns.append(
-                    re.compile(r'sub-(?!(' + '|'.join(cls.participant_label) + r')(\b|_))')
-                )
-
-            _indexer = BIDSLayoutIndexer(
-                validate=False,
-                ignore=ignore_patterns,
-            )
-            xcp_d_config = str(load_data('xcp_d_bids_config2.json'))
-            cls._layout = BIDSLayout(
-                str(cls.fmri_dir),
+            cls._layout = build_layout(
+                cls.fmri_dir,
                 database_path=_db_path,
-                reset_database=cls.bids_database_dir is None,
-                indexer=_indexer,
-                config=['bids', 'derivatives', xcp_d_config],
+                reset_database=_reset_database,
+                participant_label=_participant_label,
             )
             cls.bids_database_dir = _db_path
 
@@ -519,6 +530,8 @@ class execution(_Config):
             cls.bids_filters['bold'] = cls.bids_filters.get('bold', {})
             cls.bids_filters['bold']['task'] = cls.task_id
 
+        from templateflow.conf import TF_LAYOUT
+
         dataset_links = {
             'preprocessed': cls.fmri_dir,
             'templateflow': Path(TF_LAYOUT.root),
@@ -564,6 +577,8 @@ class workflow(_Config):
     """Output interpolated data, not censored data."""
     combine_runs = None
     """Combine runs of the same task."""
+    combine_runs_mode = None
+    """How to combine runs: 'full' (concatenate dense data) or 'light' (parcellated data only)."""
     motion_filter_type = None
     """Type of filter to apply to the motion regressors."""
     band_stop_min = None
@@ -596,6 +611,8 @@ class workflow(_Config):
     """Warp fsnative-space surfaces to the MNI space."""
     abcc_qc = None
     """Run DCAN QC."""
+    abcc_qc_layout = 'legacy'
+    """Layout of the ABCC QC HDF5 file. May be "legacy" or "compact"."""
     linc_qc = None
     """Run LINC QC."""
 
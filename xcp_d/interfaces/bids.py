@@ -1,12 +1,17 @@
 """Adapted interfaces from Niworkflows."""
 
+import gzip
 import os
 import shutil
-from json import dump, loads
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import suppress
+from json import dump, dumps, loads
+from pathlib import Path
 
 import nibabel as nb
 import numpy as np
 from bids.layout import Config
+from bids.utils import listify
 from nipype import logging
 from nipype.interfaces.base import (
     BaseInterfaceInputSpec,
@@ -15,13 +20,16 @@ from nipype.interfaces.base import (
     File,
     SimpleInterface,
     TraitedSpec,
+    isdefined,
     traits,
 )
 from nipype.interfaces.io import add_traits
 from niworkflows.interfaces.bids import DerivativesDataSink as BaseDerivativesDataSink
+from niworkflows.interfaces.bids import PrepareDerivative
 
 from xcp_d.data import load as load_data
 from xcp_d.utils.bids import _get_bidsuris, get_entity
+from xcp_d.utils.filemanip import link_or_copy
 
 # NOTE: Modified for xcpd's purposes
 xcp_d_spec = loads(load_data('xcp_d_bids_config.json').read_text())
@@ -38,10 +46,46 @@ config_entities = frozenset({e['name'] for e in merged_entities})
 LOGGER = logging.getLogger('nipype.interface')
 
 
+def _copy_derivative(src, dst):
+    """Copy a derivative whose header and data are unchanged into the output directory.
+
+    niworkflows decompresses and recompresses gzipped files even when they are copied as-is,
+    which is the slowest part of writing most derivatives.
+    Files are only recompressed when the compression actually changes,
+    and are otherwise hardlinked or copied byte-for-byte.
+    """
+    src_isgz = os.fspath(src).endswith('.gz')
+    dst_isgz = os.fspath(dst).endswith('.gz')
+    if src_isgz == dst_isgz:
+        link_or_copy(src, dst)
+        return
+
+    with (gzip.open if src_isgz else open)(src, 'rb') as f_in, open(dst, 'wb') as f_out:
+        if dst_isgz:
+            # Leave the file name out of the gzip header, as niworkflows does
+            with gzip.GzipFile('', 'wb', 9, f_out, 0.0) as gz_out:
+                shutil.copyfileobj(f_in, gz_out)
+        else:
+            shutil.copyfileobj(f_in, f_out)
+
+
+class _PrepareDerivative(PrepareDerivative):
+    """Prepare derivative files, using xcp_d's configuration files."""
+
+    _config_entities = config_entities
+    _config_entities_dict = merged_entities
+    _file_patterns = xcp_d_spec['default_path_patterns']
+
+
 class DerivativesDataSink(BaseDerivativesDataSink):
     """Store derivative files.
 
     A child class of the niworkflows DerivativesDataSink, using xcp_d's configuration files.
+
+    The output paths, and any changes to the files' headers, data types, or compression,
+    are determined by niworkflows' PrepareDerivative.
+    Files that need no changes are then hardlinked or copied byte-for-byte
+    into the output directory, instead of being recompressed.
     """
 
     out_path_base = ''
@@ -50,6 +94,151 @@ class DerivativesDataSink(BaseDerivativesDataSink):
     _config_entities_dict = merged_entities
     _file_patterns = xcp_d_spec['default_path_patterns']
 
+    def _run_interface(self, runtime):
+        base_directory = runtime.cwd
+        if isdefined(self.inputs.base_directory):
+            base_directory = self.inputs.base_directory
+        out_path = Path(base_directory).absolute() / self.out_path_base
+
+        # Empty lists (e.g., compress and dismiss_entities) are left out,
+        # so that PrepareDerivative applies its own defaults
+        inputs = {
+            key: value
+            for key, value in self.inputs.get().items()
+            if key != 'base_directory'
+            and isdefined(value)
+            and not (isinstance(value, list) and not value)
+        }
+        prepared = (
+            _PrepareDerivative(
+                allowed_entities=self._allowed_entities,
+                **{**self._metadata, **inputs},
+            )
+            .run(cwd=runtime.cwd)
+            .outputs
+        )
+
+        self._results['out_file'] = []
+        self._results['compression'] = []
+        self._results['fixed_hdr'] = list(prepared.fixed_hdr)
+        for prepared_file, relative_path in zip(
+            listify(prepared.out_file),
+            listify(prepared.out_path),
+            strict=True,
+        ):
+            out_file = out_path / relative_path
+            out_file.parent.mkdir(exist_ok=True, parents=True)
+            self._results['out_file'].append(str(out_file))
+            self._results['compression'].append(str(out_file).endswith('.gz'))
+
+            # Inputs may already be in the output directory (e.g., precomputed derivatives)
+            with suppress(FileNotFoundError):
+                if os.path.samefile(prepared_file, out_file):
+                    continue
+
+            out_file.unlink(missing_ok=True)
+            _copy_derivative(prepared_file, out_file)
+
+        if len(self._results['out_file']) == 1 and prepared.out_meta:
+            sidecar = out_file.parent / f'{out_file.name.split(".", 1)[0]}.json'
+            sidecar.unlink(missing_ok=True)
+            sidecar.write_text(dumps(prepared.out_meta, sort_keys=True, indent=2))
+            self._results['out_meta'] = str(sidecar)
+
+        return runtime
+
+
+class _BatchDerivativesDataSinkInputSpec(DynamicTraitedSpec):
+    base_directory = Directory(desc='Path to the base directory for storing data.')
+    source_file = traits.Either(
+        File(exists=False),
+        traits.List(File(exists=False)),
+        mandatory=True,
+        desc='The source file(s) to extract entities from.',
+    )
+    n_threads = traits.Int(
+        4,
+        usedefault=True,
+        nohash=True,
+        desc='Number of derivatives to write at the same time.',
+    )
+
+
+class _BatchDerivativesDataSinkOutputSpec(TraitedSpec):
+    out_file = traits.List(traits.Any, desc='Written file paths, one entry per derivative.')
+    out_meta = traits.List(traits.Any, desc='Written JSON sidecar paths, if any.')
+
+
+class BatchDerivativesDataSink(SimpleInterface):
+    """Store several derivative files with one node.
+
+    This behaves like a :class:`DerivativesDataSink` MapNode, but the derivatives are
+    written by a thread pool within a single node,
+    which avoids creating a working directory and result files for each derivative.
+
+    Parameters
+    ----------
+    iterfield : :obj:`list` of :obj:`str`
+        Inputs to iterate over (e.g., ``['segmentation', 'in_file', 'meta_dict']``).
+        These inputs must be lists of the same length.
+    **inputs
+        Inputs, entities, and metadata passed to each :class:`DerivativesDataSink`.
+    """
+
+    input_spec = _BatchDerivativesDataSinkInputSpec
+    output_spec = _BatchDerivativesDataSinkOutputSpec
+    out_path_base = ''
+
+    def __init__(self, iterfield, **inputs):
+        self._iterfield = list(iterfield)
+        static_traits = self.input_spec.class_editable_traits()
+        self._sink_inputs = {
+            key: inputs.pop(key)
+            for key in list(inputs)
+            if key not in static_traits and key not in self._iterfield
+        }
+        iterated_inputs = {key: inputs.pop(key) for key in self._iterfield if key in inputs}
+        super().__init__(**inputs)
+        add_traits(self.inputs, self._iterfield)
+        for key, value in iterated_inputs.items():
+            setattr(self.inputs, key, value)
+
+    def _run_interface(self, runtime):
+        values = {key: getattr(self.inputs, key) for key in self._iterfield}
+        lengths = {key: len(value) for key, value in values.items()}
+        n_derivatives = set(lengths.values())
+        if len(n_derivatives) != 1:
+            raise ValueError(f'Iterated inputs must all have the same length, not {lengths}.')
+
+        def _write_derivative(i_derivative):
+            sink = DerivativesDataSink(
+                out_path_base=self.out_path_base,
+                source_file=self.inputs.source_file,
+                **self._sink_inputs,
+                **{key: value[i_derivative] for key, value in values.items()},
+            )
+            if isdefined(self.inputs.base_directory):
+                sink.inputs.base_directory = self.inputs.base_directory
+
+            # Each sink prepares its files in its own directory
+            sink_dir = os.path.join(runtime.cwd, f'_derivative{i_derivative}')
+            os.makedirs(sink_dir, exist_ok=True)
+            return sink.run(cwd=sink_dir).outputs
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.inputs.n_threads) as executor:
+                results = list(executor.map(_write_derivative, range(n_derivatives.pop())))
+        finally:
+            # Nipype changes the working directory of the whole process while each sink runs
+            os.chdir(runtime.cwd)
+
+        # Match the outputs of a DerivativesDataSink MapNode
+        self._results['out_file'] = [outputs.out_file for outputs in results]
+        self._results['out_meta'] = [
+            outputs.out_meta if isdefined(outputs.out_meta) else None for outputs in results
+        ]
+        return runtime
+
 
 class _CollectRegistrationFilesInputSpec(BaseInterfaceInputSpec):
     software = traits.Enum(
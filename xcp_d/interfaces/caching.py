@@ -0,0 +1,296 @@
+"""Content-addressed caching of interface results.
+
+Results are stored under a cache directory, keyed on the contents of the interface's input files
+and the values of its other inputs, so that re-running XCP-D with a new working directory
+(or after the working directory was cleared) can reuse the outputs of expensive nodes
+whose inputs have not changed.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import stat
+
+from nipype import logging
+from nipype.interfaces.base import BaseInterfaceInputSpec, Directory, traits
+
+LOGGER = logging.getLogger('nipype.interface')
+
+# Files are hashed in chunks of 8 MB
+_CHUNK_SIZE = 8 * 1024 * 1024
+
+
+class _ResultCacheInputSpec(BaseInterfaceInputSpec):
+    cache_dir = traits.Either(
+        None,
+        Directory(exists=False),
+        default=None,
+        usedefault=True,
+        nohash=True,
+        desc=(
+            'Directory in which to cache the results of the interface. '
+            'If None, results are not cached.'
+        ),
+    )
+
+
+def _get_hash_record(path):
+    """Get the name of the record of a file's hash, based on its absolute path."""
+    return hashlib.sha256(os.path.abspath(path).encode()).hexdigest()
+
+
+def get_file_hash(path, cache_dir=None):
+    """Compute the SHA256 checksum of a file's contents.
+
+    Parameters
+    ----------
+    path : :obj:`str`
+        Path to the file.
+    cache_dir : :obj:`str` or None
+        Cache directory.
+        If provided, the checksum is recorded there along with the file's size and modification
+        time, so that other nodes using the same file do not need to read it again.
+
+    Returns
+    -------
+    file_hash : :obj:`str`
+        SHA256 checksum of the file.
+    """
+    stats = os.stat(path)
+    signature = [stats.st_size, stats.st_mtime_ns]
+
+    record_file = None
+    if cache_dir:
+        record = _get_hash_record(path)
+        record_file = os.path.join(cache_dir, 'hashes', record[:2], f'{record}.json')
+        if os.path.isfile(record_file):
+            try:
+                with open(record_file) as fo:
+                    recorded = json.load(fo)
+            except (OSError, ValueError):
+                recorded = {}
+
+            if recorded.get('signature') == signature:
+                return recorded['sha256']
+
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as fo:
+        for chunk in iter(lambda: fo.read(_CHUNK_SIZE), b''):
+            sha256.update(chunk)
+
+    file_hash = sha256.hexdigest()
+    if record_file:
+        _record_file_hash(record_file, signature, file_hash)
+
+    return file_hash
+
+
+def _record_file_hash(record_file, signature, file_hash):
+    """Atomically write a file's hash record."""
+    os.makedirs(os.path.dirname(record_file), exist_ok=True)
+    temp_file = f'{record_file}.{os.getpid()}.tmp'
+    with open(temp_file, 'w') as fo:
+        json.dump({'signature': signature, 'sha256': file_hash}, fo)
+
+    os.replace(temp_file, record_file)
+
+
+def _hash_value(value, cache_dir):
+    """Replace the existing files referenced in an input value with their checksums."""
+    if isinstance(value, str) and os.path.isfile(value):
+        return {'sha256': get_file_hash(value, cache_dir)}
+    elif isinstance(value, list | tuple):
+        return [_hash_value(val, cache_dir) for val in value]
+    elif isinstance(value, dict):
+        return {key: _hash_value(val, cache_dir) for key, val in sorted(value.items())}
+
+    return value
+
+
+def get_cache_key(interface):
+    """Compute the cache key of an interface from its type, inputs, and XCP-D's version.
+
+    Inputs flagged with ``nohash=True`` (e.g., the number of threads) do not affect the results,
+    so they are excluded from the key.
+
+    Parameters
+    ----------
+    interface : :obj:`nipype.interfaces.base.BaseInterface`
+        Interface with all of its inputs set.
+
+    Returns
+    -------
+    key : :obj:`str`
+        SHA256 checksum identifying the interface's results.
+    """
+    from xcp_d import __version__
+
+    cache_dir = interface.inputs.cache_dir
+    inputs = {
+        name: _hash_value(value, cache_dir)
+        for name, value in interface.inputs.get_traitsfree().items()
+        if not interface.inputs.trait(name).nohash
+    }
+    description = {
+        'interface': f'{type(interface).__module__}.{type(interface).__name__}',
+        'version': __version__,
+        'inputs': inputs,
+    }
+    description = json.dumps(description, sort_keys=True, default=str)
+    return hashlib.sha256(description.encode()).hexdigest()
+
+
+def _encode_output(value, name, cwd, files):
+    """Describe an output value, collecting the files it references.
+
+    Files in the working directory are stored at the same relative path,
+    and all other files are stored in a folder named after the output.
+    """
+    if isinstance(value, str) and os.path.isfile(value):
+        path = os.path.abspath(value)
+        relpath = os.path.relpath(path, cwd)
+        if relpath.startswith(os.pardir):
+            relpath = os.path.join(f'_{name}', os.path.basename(path))
+
+        files[relpath] = path
+        return {'file': relpath}
+    elif isinstance(value, list | tuple):
+        return [_encode_output(val, name, cwd, files) for val in value]
+
+    return {'value': value}
+
+
+def _decode_output(value, cwd):
+    """Convert an output description back into an output value."""
+    if isinstance(value, list):
+        return [_decode_output(val, cwd) for val in value]
+    elif 'file' in value:
+        return os.path.join(cwd, value['file'])
+
+    return value['value']
+
+
+def store_results(entry_dir, results, cwd):
+    """Copy an interface's outputs into a cache entry.
+
+    The entry is written to a temporary directory first and then renamed,
+    so that concurrent runs never see a partially-written entry.
+
+    Parameters
+    ----------
+    entry_dir : :obj:`str`
+        Directory of the cache entry.
+    results : :obj:`dict`
+        The interface's outputs.
+    cwd : :obj:`str`
+        The interface's working directory.
+    """
+    files = {}
+    outputs = {name: _encode_output(value, name, cwd, files) for name, value in results.items()}
+
+    temp_dir = f'{entry_dir}.{os.getpid()}.tmp'
+    shutil.rmtree(temp_dir, ignore_errors=True)
+    os.makedirs(temp_dir)
+    for relpath, path in files.items():
+        cached_file = os.path.join(temp_dir, 'files', relpath)
+        os.makedirs(os.path.dirname(cached_file), exist_ok=True)
+        shutil.copyfile(path, cached_file)
+        # Cached files are hardlinked into working directories, so protect them from edits.
+        os.chmod(cached_file, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+
+    with open(os.path.join(temp_dir, 'outputs.json'), 'w') as fo:
+        json.dump(outputs, fo, indent=4, sort_keys=True)
+
+    try:
+        os.replace(temp_dir, entry_dir)
+    except OSError:
+        # Another process stored the same results first
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def restore_results(entry_dir, cwd):
+    """Restore an interface's outputs from a cache entry into its working directory.
+
+    Files are hardlinked when the cache and working directories are on the same filesystem,
+    and copied otherwise.
+
+    Parameters
+    ----------
+    entry_dir : :obj:`str`
+        Directory of the cache entry.
+    cwd : :obj:`str`
+        The interface's working directory.
+
+    Returns
+    -------
+    results : :obj:`dict` or None
+        The interface's outputs, or None if the entry does not exist or is incomplete.
+    """
+    outputs_file = os.path.join(entry_dir, 'outputs.json')
+    if not os.path.isfile(outputs_file):
+        return None
+
+    with open(outputs_file) as fo:
+        outputs = json.load(fo)
+
+    relpaths = []
+
+    def _collect_files(value):
+        if isinstance(value, list):
+            for val in value:
+                _collect_files(val)
+        elif 'file' in value:
+            relpaths.append(value['file'])
+
+    _collect_files(list(outputs.values()))
+    cached_files = [os.path.join(entry_dir, 'files', relpath) for relpath in relpaths]
+    if not all(os.path.isfile(cached_file) for cached_file in cached_files):
+        return None
+
+    for relpath, cached_file in zip(relpaths, cached_files, strict=False):
+        out_file = os.path.join(cwd, relpath)
+        os.makedirs(os.path.dirname(out_file), exist_ok=True)
+        if os.path.lexists(out_file):
+            os.remove(out_file)
+
+        try:
+            os.link(cached_file, out_file)
+        except OSError:
+            shutil.copyfile(cached_file, out_file)
+
+    return {name: _decode_output(value, cwd) for name, value in outputs.items()}
+
+
+class ResultCacheMixin:
+    """Reuse an interface's results from a cache directory when its inputs have not changed.
+
+    Interfaces using this mixin must have a ``cache_dir`` input
+    (e.g., by subclassing :class:`_ResultCacheInputSpec`),
+    implement :meth:`_compute` instead of ``_run_interface``,
+    and store their outputs in ``self._results``,
+    as :class:`~nipype.interfaces.base.SimpleInterface` does.
+    """
+
+    def _compute(self, runtime):
+        """Run the interface when its results are not in the cache."""
+        raise NotImplementedError
+
+    def _run_interface(self, runtime):
+        cache_dir = self.inputs.cache_dir
+        if not cache_dir:
+            return self._compute(runtime) or runtime
+
+        name = type(self).__name__
+        key = get_cache_key(self)
+        entry_dir = os.path.join(cache_dir, name, key[:2], key)
+        results = restore_results(entry_dir, runtime.cwd)
+        if results is not None:
+            LOGGER.info(f'Reusing cached results of {name} from {entry_dir}')
+            self._results.update(results)
+            return runtime
+
+        runtime = self._compute(runtime) or runtime
+        os.makedirs(os.path.dirname(entry_dir), exist_ok=True)
+        store_results(entry_dir, self._results, runtime.cwd)
+        return runtime
@@ -16,9 +16,9 @@ from nipype.interfaces.base import (
     traits,
 )
 
-from xcp_d.utils.confounds import _infer_dummy_scans, _modify_motion_filter, load_motion
+from xcp_d.utils.confounds import _infer_dummy_scans, _modify_motion_filter
 from xcp_d.utils.filemanip import fname_presuffix
-from xcp_d.utils.modified_data import _drop_dummy_scans, compute_fd
+from xcp_d.utils.modified_data import _drop_dummy_scans, precompute_motion
 
 LOGGER = logging.getLogger('nipype.interface')
 
@@ -439,6 +439,16 @@ class _ProcessMotionInputSpec(BaseInterfaceInputSpec):
         mandatory=True,
         desc='Upper frequency for the band-stop motion filter, in breaths-per-minute (bpm).',
     )
+    motion_cache_dir = traits.Either(
+        None,
+        traits.Str,
+        usedefault=True,
+        desc=(
+            'Directory containing filtered motion parameters and framewise displacement '
+            'precomputed with xcp_d.utils.modified_data.precompute_motion. '
+            'If None, nothing will be cached.'
+        ),
+    )
 
 
 class _ProcessMotionOutputSpec(TraitedSpec):
@@ -476,21 +486,19 @@ class ProcessMotion(SimpleInterface):
             TR=self.inputs.TR,
         )
 
-        motion_df = load_motion(
-            self.inputs.motion_file,
-            TR=self.inputs.TR,
+        # Filter motion parameters and calculate framewise displacement,
+        # reusing the results from the workflow-building step if available.
+        motion_df = precompute_motion(
+            motion_files=[self.inputs.motion_file],
+            TRs=[self.inputs.TR],
             motion_filter_type=self.inputs.motion_filter_type,
             motion_filter_order=self.inputs.motion_filter_order,
-            band_stop_min=band_stop_min_adjusted,
-            band_stop_max=band_stop_max_adjusted,
-        )
-
-        # Add in framewise displacement
-        motion_df['framewise_displacement'] = compute_fd(
-            confound=motion_df,
+            band_stop_min=self.inputs.band_stop_min,
+            band_stop_max=self.inputs.band_stop_max,
             head_radius=self.inputs.head_radius,
-            filtered=False,
-        )
+            cache_dir=self.inputs.motion_cache_dir,
+        )[0]
+
         fd_timeseries = motion_df['framewise_displacement'].to_numpy()
         motion_metadata['framewise_displacement'] = {
             'Description': 'Framewise displacement calculated according to Power et al. (2012).',
@@ -498,11 +506,6 @@ class ProcessMotion(SimpleInterface):
             'Units': 'mm',
         }
         if self.inputs.motion_filter_type:
-            motion_df['framewise_displacement_filtered'] = compute_fd(
-                confound=motion_df,
-                head_radius=self.inputs.head_radius,
-                filtered=True,
-            )
             fd_timeseries = motion_df['framewise_displacement_filtered'].to_numpy()
 
         # Compile motion metadata from confounds metadata, adding in filtering info
@@ -522,7 +525,7 @@ class ProcessMotion(SimpleInterface):
                     'cutoff': band_stop_min_adjusted / 60,
                     'order': int(np.floor(self.inputs.motion_filter_order / 2)),
                     'cutoff units': 'Hz',
-                    'function': 'scipy.signal.filtfilt',
+                    'function': 'scipy.signal.sosfiltfilt',
                 }
                 col_metadata['SoftwareFilters'] = filters
 
@@ -535,7 +538,7 @@ class ProcessMotion(SimpleInterface):
                     ],
                     'order': int(np.floor(self.inputs.motion_filter_order / 4)),
                     'cutoff units': 'Hz',
-                    'function': 'scipy.signal.filtfilt',
+                    'function': 'scipy.signal.sosfiltfilt',
                 }
                 col_metadata['SoftwareFilters'] = filters
 
@@ -688,13 +691,11 @@ class GenerateConfounds(SimpleInterface):
     output_spec = _GenerateConfoundsOutputSpec
 
     def _run_interface(self, runtime):
-        import re
-
         import nibabel as nb
         import pandas as pd
 
         from xcp_d.utils.bids import _get_bidsuris
-        from xcp_d.utils.confounds import filter_motion, volterra
+        from xcp_d.utils.confounds import filter_motion, select_confound_columns, volterra
 
         in_img = nb.load(self.inputs.in_file)
         if in_img.ndim == 2:  # CIFTI
@@ -702,7 +703,9 @@ class GenerateConfounds(SimpleInterface):
         else:  # NIfTI
             n_volumes = in_img.shape[3]
 
-        new_confound_df = pd.DataFrame(index=np.arange(n_volumes))
+        # Collect one block of columns per confounds file, then assemble them all at once.
+        confound_blocks = []
+        selected_columns = set()
 
         confounds_images = []
         confounds_metadata = {}
@@ -713,6 +716,11 @@ class GenerateConfounds(SimpleInterface):
             confound_files.append(confound_file)
             confound_metadata = confound_info['metadata']
             confound_params = self.inputs.confounds_config['confounds'][confound_name]
+            sources = _get_bidsuris(
+                in_files=[confound_file],
+                dataset_links=self.inputs.dataset_links,
+                out_dir=self.inputs.out_dir,
+            )
             if 'columns' in confound_params:  # Tabular confounds
                 confound_df = pd.read_table(confound_file)
                 if confound_df.shape[0] != n_volumes:
@@ -721,62 +729,22 @@ class GenerateConfounds(SimpleInterface):
                         f'does not match number of volumes in the fMRI data ({n_volumes}).'
                     )
 
-                available_columns = confound_df.columns.tolist()
-                required_columns = confound_params['columns']
-                for column in required_columns:
-                    if column.startswith('^'):
-                        # Regular expression
-                        found_columns = [
-                            col_name
-                            for col_name in available_columns
-                            if re.match(column, col_name, re.IGNORECASE)
-                        ]
-                        if not found_columns:
-                            raise ValueError(
-                                f"No columns found matching regular expression '{column}'"
-                            )
-
-                        for found_column in found_columns:
-                            if found_column in new_confound_df:
-                                raise ValueError(
-                                    f'Duplicate column name ({found_column}) in confounds '
-                                    'configuration.'
-                                )
-
-                            new_confound_df[found_column] = confound_df[found_column]
-
-                            # Replace NaNs in new column with zeros
-                            new_confound_df.fillna({found_column: 0}, inplace=True)
-
-                            confounds_metadata[found_column] = confounds_metadata.get(
-                                found_column, {}
-                            )
-                            confounds_metadata[found_column]['Sources'] = _get_bidsuris(
-                                in_files=[confound_file],
-                                dataset_links=self.inputs.dataset_links,
-                                out_dir=self.inputs.out_dir,
-                            )
-                    else:
-                        if column not in confound_df.columns:
-                            raise ValueError(f"Column '{column}' not found in confounds file.")
-
-                        if column in new_confound_df:
-                            raise ValueError(
-                                f'Duplicate column name ({column}) in confounds configuration.'
-                            )
-
-                        new_confound_df[column] = confound_df[column]
-
-                        # Replace NaNs in new column with zeros
-                        new_confound_df.fillna({column: 0}, inplace=True)
-
-                        confounds_metadata[column] = confounds_metadata.get(column, {})
-                        confounds_metadata[column]['Sources'] = _get_bidsuris(
-                            in_files=[confound_file],
-                            dataset_links=self.inputs.dataset_links,
-                            out_dir=self.inputs.out_dir,
+                found_columns = select_confound_columns(
+                    available_columns=tuple(confound_df.columns),
+                    required_columns=tuple(confound_params['columns']),
+                )
+                for found_column in found_columns:
+                    if found_column in selected_columns:
+                        raise ValueError(
+                            f'Duplicate column name ({found_column}) in confounds configuration.'
                         )
 
+                    selected_columns.add(found_column)
+                    confounds_metadata[found_column] = {'Sources': list(sources)}
+
+                # Replace NaNs in new columns with zeros
+                confound_blocks.append(confound_df[list(found_columns)].fillna(0))
+
             else:  # Voxelwise confounds
                 confound_img = nb.load(confound_file)
                 if confound_img.ndim == 2:  # CIFTI
@@ -793,19 +761,29 @@ class GenerateConfounds(SimpleInterface):
                 confounds_images.append(confound_file)
                 confounds_image_names.append(confound_name)
 
+                # Fill with NaNs as a placeholder
+                if confound_name in selected_columns:
+                    raise ValueError(
+                        f'Duplicate column name ({confound_name}) in confounds configuration.'
+                    )
+
+                selected_columns.add(confound_name)
+                confound_blocks.append(
+                    pd.DataFrame(np.nan, index=np.arange(n_volumes), columns=[confound_name])
+                )
+
                 # Collect image metadata
-                new_confound_df.loc[:, confound_name] = np.nan  # fill with NaNs as a placeholder
                 confounds_metadata[confound_name] = confound_metadata
-                confounds_metadata[confound_name]['Sources'] = _get_bidsuris(
-                    in_files=[confound_file],
-                    dataset_links=self.inputs.dataset_links,
-                    out_dir=self.inputs.out_dir,
-                )
+                confounds_metadata[confound_name]['Sources'] = sources
                 confounds_metadata[confound_name]['Description'] = (
                     'A placeholder column representing a voxel-wise confound. '
                     'The actual confound data are stored in an imaging file.'
                 )
 
+        new_confound_df = pd.DataFrame(index=np.arange(n_volumes))
+        if confound_blocks:
+            new_confound_df = pd.concat(confound_blocks, axis=1)
+
         # This actually gets overwritten in init_postproc_derivatives_wf.
         confounds_metadata['Sources'] = _get_bidsuris(
             in_files=confound_files,
@@ -878,7 +856,7 @@ class GenerateConfounds(SimpleInterface):
                             'cutoff': band_stop_min_adjusted / 60,
                             'order': int(np.floor(self.inputs.motion_filter_order / 2)),
                             'cutoff units': 'Hz',
-                            'function': 'scipy.signal.filtfilt',
+                            'function': 'scipy.signal.sosfiltfilt',
                         }
                         col_metadata['SoftwareFilters'] = filters
 
@@ -891,7 +869,7 @@ class GenerateConfounds(SimpleInterface):
                             ],
                             'order': int(np.floor(self.inputs.motion_filter_order / 4)),
                             'cutoff units': 'Hz',
-                            'function': 'scipy.signal.filtfilt',
+                            'function': 'scipy.signal.sosfiltfilt',
                         }
                         col_metadata['SoftwareFilters'] = filters
 
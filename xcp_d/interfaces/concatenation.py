@@ -1,9 +1,11 @@
 """Interfaces for the concatenation workflow."""
 
 import itertools
+import json
 import os
 import re
 
+import numpy as np
 import pandas as pd
 from nipype import logging
 from nipype.interfaces.base import (
@@ -17,6 +19,8 @@ from nipype.interfaces.base import (
 )
 
 from xcp_d.utils.concatenation import concatenate_niimgs, concatenate_tsvs
+from xcp_d.utils.filemanip import fname_presuffix
+from xcp_d.utils.qcmetrics import combine_moments, correlation_from_moments
 
 LOGGER = logging.getLogger('nipype.interface')
 
@@ -130,6 +134,16 @@ class _FilterOutFailedRunsInputSpec(BaseInterfaceInputSpec):
             'Only defined for CIFTI processing.'
         ),
     )
+    qc_file = traits.Either(
+        traits.List(traits.Either(File(exists=True), Undefined)),
+        Undefined,
+        desc='LINC QC TSV files. Only used for light concatenation.',
+    )
+    qc_stats = traits.Either(
+        traits.List(traits.Either(File(exists=True), Undefined)),
+        Undefined,
+        desc='LINC QC statistics JSON files. Only used for light concatenation.',
+    )
 
 
 class _FilterOutFailedRunsOutputSpec(TraitedSpec):
@@ -198,6 +212,20 @@ class _FilterOutFailedRunsOutputSpec(TraitedSpec):
             'Only defined for CIFTI processing.'
         ),
     )
+    qc_file = traits.List(
+        traits.Either(
+            File(exists=True),
+            Undefined,
+        ),
+        desc='LINC QC TSV files.',
+    )
+    qc_stats = traits.List(
+        traits.Either(
+            File(exists=True),
+            Undefined,
+        ),
+        desc='LINC QC statistics JSON files.',
+    )
 
 
 class FilterOutFailedRuns(SimpleInterface):
@@ -219,6 +247,8 @@ class FilterOutFailedRuns(SimpleInterface):
             'boldref': self.inputs.boldref,
             'timeseries': self.inputs.timeseries,
             'timeseries_ciftis': self.inputs.timeseries_ciftis,
+            'qc_file': self.inputs.qc_file,
+            'qc_stats': self.inputs.qc_stats,
         }
 
         n_runs = len(denoised_bold)
@@ -230,7 +260,9 @@ class FilterOutFailedRuns(SimpleInterface):
         self._results['denoised_bold'] = [denoised_bold[i] for i in successful_runs]
 
         for input_name, input_list in inputs_to_filter.items():
-            if len(input_list) != n_runs:
+            if not isdefined(input_list):
+                input_list = [Undefined for _ in range(n_runs)]
+            elif len(input_list) != n_runs:
                 LOGGER.warning(
                     f'{input_name} has {len(input_list)} elements, not {n_runs}. Ignoring.'
                 )
@@ -244,8 +276,10 @@ class FilterOutFailedRuns(SimpleInterface):
 class _ConcatenateInputsInputSpec(BaseInterfaceInputSpec):
     preprocessed_bold = traits.List(
         File(exists=True),
-        mandatory=True,
-        desc='Preprocessed BOLD files, after dummy volume removal.',
+        desc=(
+            'Preprocessed BOLD files, after dummy volume removal. '
+            'Not used for light concatenation.'
+        ),
     )
     motion_file = traits.List(
         File(exists=True),
@@ -261,18 +295,15 @@ class _ConcatenateInputsInputSpec(BaseInterfaceInputSpec):
     )
     denoised_bold = traits.List(
         File(exists=True),
-        mandatory=True,
-        desc='Denoised BOLD data.',
+        desc='Denoised BOLD data. Not used for light concatenation.',
     )
     denoised_interpolated_bold = traits.List(
         File(exists=True),
-        mandatory=True,
-        desc='Denoised BOLD data.',
+        desc='Denoised BOLD data. Not used for light concatenation.',
     )
     censored_denoised_bold = traits.List(
         File(exists=True),
-        mandatory=True,
-        desc='Denoised BOLD data.',
+        desc='Denoised BOLD data. Not used for light concatenation.',
     )
     smoothed_denoised_bold = traits.List(
         traits.Either(
@@ -377,7 +408,11 @@ class ConcatenateInputs(SimpleInterface):
 
         for name, run_files in merge_inputs.items():
             LOGGER.info(f'Concatenating {name}')
-            if len(run_files) == 0 or any(not isdefined(f) for f in run_files):
+            if (
+                not isdefined(run_files)
+                or len(run_files) == 0
+                or any(not isdefined(f) for f in run_files)
+            ):
                 LOGGER.warning(f'No {name} files found')
                 self._results[name] = Undefined
                 continue
@@ -418,3 +453,105 @@ class ConcatenateInputs(SimpleInterface):
                 self._results[name] = out_file
 
         return runtime
+
+
+class _ConcatenateQCInputSpec(BaseInterfaceInputSpec):
+    name_source = File(
+        exists=False,
+        mandatory=True,
+        desc='Name source for the concatenated data (i.e., without the run entity).',
+    )
+    qc_file = traits.List(
+        File(exists=True),
+        mandatory=True,
+        desc='LINC QC TSV files from the individual runs.',
+    )
+    qc_stats = traits.List(
+        File(exists=True),
+        mandatory=True,
+        desc='LINC QC statistics JSON files from the individual runs.',
+    )
+
+
+class _ConcatenateQCOutputSpec(TraitedSpec):
+    qc_file = File(exists=True, desc='LINC QC TSV file for the concatenated runs.')
+
+
+class ConcatenateQC(SimpleInterface):
+    """Combine the LINC QC metrics of individual runs into metrics for the concatenated runs.
+
+    The FD and DVARS summaries are computed from the sums stored in each run's statistics file,
+    so the BOLD data do not need to be concatenated or reloaded.
+    As in the full concatenation workflow, the concatenated runs have no dummy volumes,
+    so ``num_dummy_volumes`` is always 0.
+    Registration and normalization metrics are taken from the first run,
+    which is the run whose BOLD mask the full concatenation workflow uses.
+
+    Notes
+    -----
+    The DVARS metrics differ from those of the full concatenation workflow in two ways:
+
+    1.  DVARS is not calculated between the last volume of one run and the first volume
+        of the next.
+    2.  DVARS is standardized with each run's own estimate of the temporal difference's
+        standard deviation, rather than with one estimate from the concatenated data.
+        This estimate relies on medians and percentiles,
+        which cannot be combined across runs from the stored sums.
+    """
+
+    input_spec = _ConcatenateQCInputSpec
+    output_spec = _ConcatenateQCOutputSpec
+
+    def _run_interface(self, runtime):
+        qc_stats = []
+        for qc_stats_file in self.inputs.qc_stats:
+            with open(qc_stats_file) as fo:
+                qc_stats.append(json.load(fo))
+
+        initial = combine_moments([stats['fd_dvars_initial'] for stats in qc_stats])
+        final = combine_moments([stats['fd_dvars_final'] for stats in qc_stats])
+        n_rms = sum(stats['relative_rms']['n'] for stats in qc_stats)
+        combined_values = {
+            'mean_fd': initial['sum_x'] / initial['n'],
+            'mean_fd_post_censoring': final['sum_x'] / final['n'],
+            'mean_relative_rms': (
+                sum(stats['relative_rms']['sum'] for stats in qc_stats) / n_rms
+                if n_rms
+                else np.nan
+            ),
+            'max_relative_rms': np.nanmax([stats['relative_rms']['max'] for stats in qc_stats]),
+            'mean_dvars_initial': initial['sum_y'] / initial['n'],
+            'mean_dvars_final': final['sum_y'] / final['n'],
+            # Dummy volumes are removed before concatenation
+            'num_dummy_volumes': 0,
+            'num_censored_volumes': sum(stats['num_censored_volumes'] for stats in qc_stats),
+            'num_retained_volumes': sum(stats['num_retained_volumes'] for stats in qc_stats),
+            'fd_dvars_correlation_initial': correlation_from_moments(initial),
+            'fd_dvars_correlation_final': correlation_from_moments(final),
+        }
+
+        # Entities come from the concatenated name source, as in LINCQC
+        bold_file_name_components = os.path.basename(self.inputs.name_source).split('_')
+        qc_values_dict = {}
+        for entity in bold_file_name_components[:-1]:
+            qc_values_dict[entity.split('-')[0]] = entity.split('-')[1]
+
+        # The run-level files start with their own entities, followed by the metrics
+        first_qc_df = pd.read_table(self.inputs.qc_file[0])
+        metric_columns = first_qc_df.columns[first_qc_df.columns.get_loc('mean_fd') :]
+        for column in metric_columns:
+            qc_values_dict[column] = [combined_values.get(column, first_qc_df[column].iloc[0])]
+
+        self._results['qc_file'] = fname_presuffix(
+            self.inputs.name_source,
+            suffix='qc_bold.tsv',
+            newpath=runtime.cwd,
+            use_ext=False,
+        )
+        pd.DataFrame(qc_values_dict).to_csv(
+            self._results['qc_file'],
+            index=False,
+            header=True,
+            sep='\t',
+        )
+        return runtime
@@ -3,12 +3,12 @@
 """Handling functional connectivity."""
 
 import gc
+import os
+from functools import lru_cache
 
-import matplotlib.pyplot as plt
 import nibabel as nb
 import numpy as np
 import pandas as pd
-from nilearn.maskers import NiftiLabelsMasker
 from nipype import logging
 from nipype.interfaces.base import (
     BaseInterfaceInputSpec,
@@ -16,17 +16,19 @@ from nipype.interfaces.base import (
     InputMultiObject,
     SimpleInterface,
     TraitedSpec,
+    Undefined,
     isdefined,
     traits,
 )
 
+from xcp_d.interfaces.caching import ResultCacheMixin, _ResultCacheInputSpec
 from xcp_d.utils.filemanip import fname_presuffix
 from xcp_d.utils.write_save import write_ndata
 
 LOGGER = logging.getLogger('nipype.interface')
 
 
-class _NiftiParcellateInputSpec(BaseInterfaceInputSpec):
+class _NiftiParcellateInputSpec(_ResultCacheInputSpec):
     filtered_file = File(exists=True, mandatory=True, desc='filtered file')
     mask = File(exists=True, mandatory=True, desc='brain mask file')
     atlas = File(exists=True, mandatory=True, desc='atlas file')
@@ -48,7 +50,7 @@ class _NiftiParcellateOutputSpec(TraitedSpec):
     timeseries = File(exists=True, desc='Parcellated time series file.')
 
 
-class NiftiParcellate(SimpleInterface):
+class NiftiParcellate(ResultCacheMixin, SimpleInterface):
     """Extract timeseries and compute connectivity matrices.
 
     Write out time series using Nilearn's NiftiLabelMasker
@@ -59,7 +61,9 @@ class NiftiParcellate(SimpleInterface):
     input_spec = _NiftiParcellateInputSpec
     output_spec = _NiftiParcellateOutputSpec
 
-    def _run_interface(self, runtime):
+    def _compute(self, runtime):
+        from nilearn.maskers import NiftiLabelsMasker
+
         mask = self.inputs.mask
         atlas = self.inputs.atlas
         min_coverage = self.inputs.min_coverage
@@ -211,7 +215,7 @@ class NiftiParcellate(SimpleInterface):
         return runtime
 
 
-class _TSVConnectInputSpec(BaseInterfaceInputSpec):
+class _TSVConnectInputSpec(_ResultCacheInputSpec):
     timeseries = File(exists=True, desc='Parcellated time series TSV file.')
     temporal_mask = File(
         exists=True,
@@ -257,7 +261,7 @@ def correlate_timeseries(timeseries, temporal_mask):
     return correlations_df, correlations_exact
 
 
-class TSVConnect(SimpleInterface):
+class TSVConnect(ResultCacheMixin, SimpleInterface):
     """Extract timeseries and compute connectivity matrices.
 
     Write out time series using Nilearn's NiftiLabelMasker
@@ -268,7 +272,7 @@ class TSVConnect(SimpleInterface):
     input_spec = _TSVConnectInputSpec
     output_spec = _TSVConnectOutputSpec
 
-    def _run_interface(self, runtime):
+    def _compute(self, runtime):
         correlations_df, correlations_exact = correlate_timeseries(
             self.inputs.timeseries,
             temporal_mask=self.inputs.temporal_mask,
@@ -407,6 +411,8 @@ class ConnectPlot(SimpleInterface):
         return ax
 
     def _run_interface(self, runtime):
+        import matplotlib.pyplot as plt
+
         priority_list = [
             'MIDB',
             'MyersLabonte',
@@ -546,115 +552,300 @@ class _CiftiToTSVOutputSpec(TraitedSpec):
     out_file = File(exists=True, desc='Parcellated data TSV file.')
 
 
-class CiftiToTSV(SimpleInterface):
-    """Extract data from a parcellated CIFTI file into a TSV file."""
+def get_correlation_statistics(timeseries_df):
+    """Compute the sums needed to correlate parcellated time series across runs.
 
-    input_spec = _CiftiToTSVInputSpec
-    output_spec = _CiftiToTSVOutputSpec
+    Like :meth:`pandas.DataFrame.corr`, each pair of parcels is correlated using
+    only the volumes in which both parcels have data.
 
-    def _run_interface(self, runtime):
-        in_file = self.inputs.in_file
-        atlas_labels = self.inputs.atlas_labels
+    Parameters
+    ----------
+    timeseries_df : :obj:`pandas.DataFrame` of shape (T, P)
+        Parcellated time series, possibly with NaNs.
 
-        assert in_file.endswith(('.ptseries.nii', '.pscalar.nii', '.pconn.nii')), in_file
+    Returns
+    -------
+    stats : :obj:`dict` of :obj:`numpy.ndarray` of shape (P, P)
+        The number of volumes in which each pair of parcels has data (``n``),
+        and, over those volumes, the sum of the first parcel's values (``sum_x``),
+        of their squares (``sum_xx``), and of the products of the two parcels' values
+        (``sum_xy``).
+        Statistics from different runs can be added together.
+    """
+    data = timeseries_df.to_numpy(dtype=np.float64)
+    valid = np.isfinite(data)
+    data = np.where(valid, data, 0)
+    valid = valid.astype(np.float64)
+    return {
+        'n': valid.T @ valid,
+        'sum_x': data.T @ valid,
+        'sum_xx': (data**2).T @ valid,
+        'sum_xy': data.T @ data,
+    }
+
+
+def correlation_from_statistics(stats):
+    """Calculate a correlation matrix from the output of :func:`get_correlation_statistics`.
+
+    Parameters
+    ----------
+    stats : :obj:`dict` of :obj:`numpy.ndarray` of shape (P, P)
+        Statistics from :func:`get_correlation_statistics`, possibly summed across runs.
+
+    Returns
+    -------
+    corr : :obj:`numpy.ndarray` of shape (P, P)
+        Pearson correlation matrix.
+        Pairs of parcels with fewer than two shared volumes, or with no variance, are NaN.
+    """
+    n, sum_x, sum_xx = stats['n'], stats['sum_x'], stats['sum_xx']
+    covariance = n * stats['sum_xy'] - sum_x * sum_x.T
+    variance_x = n * sum_xx - sum_x**2
+    variance_y = variance_x.T
+    with np.errstate(divide='ignore', invalid='ignore'):
+        corr = covariance / np.sqrt(variance_x * variance_y)
+
+    corr[(n < 2) | (variance_x <= 0) | (variance_y <= 0)] = np.nan
+    corr = np.clip(corr, -1, 1)
+    diagonal = np.diag_indices_from(corr)
+    corr[diagonal] = np.where(np.isfinite(corr[diagonal]), 1, np.nan)
+    return corr
+
+
+class _TSVConnectRunsInputSpec(BaseInterfaceInputSpec):
+    timeseries = traits.List(
+        File(exists=True),
+        mandatory=True,
+        desc='Parcellated time series TSV files from each run, for a single atlas.',
+    )
+    temporal_mask = traits.List(
+        traits.Either(File(exists=True), Undefined),
+        mandatory=True,
+        desc='Temporal mask from each run, after dummy scan removal. May be Undefined.',
+    )
 
-        img = nb.load(in_file)
-        node_labels_df = pd.read_table(atlas_labels, index_col='index')
-        node_labels_df.sort_index(inplace=True)  # ensure index is in order
 
-        # Explicitly remove label corresponding to background (index=0), if present.
-        if 0 in node_labels_df.index:
-            LOGGER.warning(
-                'Index value of 0 found in atlas labels file. '
-                'Will assume this describes the background and ignore it.'
-            )
-            node_labels_df = node_labels_df.drop(index=[0])
+class _TSVConnectRunsOutputSpec(TraitedSpec):
+    correlations = File(exists=True, desc='Correlation matrix file.')
 
-        if 'cifti_label' in node_labels_df.columns:
-            parcel_label_mapper = dict(
-                zip(node_labels_df['cifti_label'], node_labels_df['label'], strict=False)
-            )
-        elif 'label_7network' in node_labels_df.columns:
-            node_labels_df['cifti_label'] = node_labels_df['label_7network'].fillna(
-                node_labels_df['label']
-            )
-            parcel_label_mapper = dict(
-                zip(node_labels_df['cifti_label'], node_labels_df['label'], strict=False)
-            )
-        else:
-            LOGGER.warning(
-                "No 'cifti_label' column found in atlas labels file. "
-                'Assuming labels in TSV exactly match node names in CIFTI atlas.'
-            )
-            parcel_label_mapper = dict(
-                zip(node_labels_df['label'], node_labels_df['label'], strict=False)
+
+class TSVConnectRuns(SimpleInterface):
+    """Correlate parcellated time series across concatenated runs.
+
+    Each run's low-motion volumes are summarized with :func:`get_correlation_statistics`,
+    and the summed statistics produce the same correlation matrix as
+    :class:`TSVConnect` would for the concatenated time series,
+    without concatenating the time series first.
+    """
+
+    input_spec = _TSVConnectRunsInputSpec
+    output_spec = _TSVConnectRunsOutputSpec
+
+    def _run_interface(self, runtime):
+        if len(self.inputs.timeseries) != len(self.inputs.temporal_mask):
+            raise ValueError(
+                f'Number of time series files ({len(self.inputs.timeseries)}) does not match '
+                f'number of temporal masks ({len(self.inputs.temporal_mask)}).'
             )
 
-        if in_file.endswith('.pconn.nii'):
-            ax0 = img.header.get_axis(0)
-            ax1 = img.header.get_axis(1)
-            ax0_labels = ax0.name
-            ax1_labels = ax1.name
-            df = pd.DataFrame(columns=ax1_labels, index=ax0_labels, data=img.get_fdata())
-            check_axes = [0, 1]
-        else:
-            # Second axis is the parcels
-            ax1 = img.header.get_axis(1)
-            assert isinstance(ax1, nb.cifti2.ParcelsAxis), type(ax1)
-            df = pd.DataFrame(columns=ax1.name, data=img.get_fdata())
-            check_axes = [1]
-
-        # Check that all node labels in the CIFTI are present in the TSV, and vice versa.
-        if 0 in check_axes:
-            # Replace values in index, which should match the keys in the parcel_label_mapper
-            # dictionary, with the corresponding values in the dictionary.
-            # If any index values are not in the dictionary, raise an error with a list of the
-            # missing index values.
-            # If any dictionary keys are not in the index, raise an error with a list of the
-            # missing dictionary keys.
-            missing_index_values = []
-            missing_dict_values = []
-            for index_value in df.index:
-                if index_value not in parcel_label_mapper:
-                    missing_index_values.append(index_value)
-
-                for dict_value in parcel_label_mapper.keys():
-                    if dict_value not in df.index:
-                        missing_dict_values.append(dict_value)
-
-                if missing_index_values:
-                    raise ValueError(
-                        f'Missing CIFTI labels in atlas labels DataFrame: {missing_index_values}'
-                    )
+        stats, columns = None, None
+        for timeseries, temporal_mask in zip(
+            self.inputs.timeseries,
+            self.inputs.temporal_mask,
+            strict=False,
+        ):
+            timeseries_df = pd.read_table(timeseries)
+            if columns is None:
+                columns = timeseries_df.columns
+            elif not timeseries_df.columns.equals(columns):
+                raise ValueError(f'Parcels in {timeseries} do not match the first run.')
+
+            if isdefined(temporal_mask):
+                censoring_df = pd.read_table(temporal_mask)
+                # Only censor the time series if it has not been censored already
+                if censoring_df.shape[0] == timeseries_df.shape[0]:
+                    timeseries_df = timeseries_df.loc[
+                        censoring_df['framewise_displacement'].to_numpy() == 0
+                    ]
+
+            run_stats = get_correlation_statistics(timeseries_df)
+            if stats is None:
+                stats = run_stats
+            else:
+                stats = {key: stats[key] + value for key, value in run_stats.items()}
+
+        correlations_df = pd.DataFrame(
+            correlation_from_statistics(stats),
+            index=columns,
+            columns=columns,
+        )
+        self._results['correlations'] = fname_presuffix(
+            'correlations.tsv',
+            newpath=runtime.cwd,
+            use_ext=True,
+        )
+        correlations_df.to_csv(
+            self._results['correlations'],
+            sep='\t',
+            na_rep='n/a',
+            index_label='Node',
+        )
+        return runtime
 
-                if missing_dict_values:
-                    raise ValueError(f'Missing atlas labels in CIFTI file: {missing_dict_values}')
 
-            # Replace the index values with the corresponding dictionary values.
-            df.index = [parcel_label_mapper[i] for i in df.index]
+def _get_parcel_label_mapper(atlas_labels):
+    """Map the parcel names used in CIFTI atlases to the labels in an atlas labels file.
 
-        if 1 in check_axes:
-            # Repeat with columns
-            missing_columns = []
-            missing_dict_values = []
-            for column_value in df.columns:
-                if column_value not in parcel_label_mapper:
-                    missing_columns.append(column_value)
+    Returns
+    -------
+    parcel_label_mapper : :obj:`pandas.Series`
+        The atlas labels, indexed by the corresponding CIFTI parcel names.
+    """
+    node_labels_df = pd.read_table(atlas_labels, index_col='index')
+    node_labels_df.sort_index(inplace=True)  # ensure index is in order
+
+    # Explicitly remove label corresponding to background (index=0), if present.
+    if 0 in node_labels_df.index:
+        LOGGER.warning(
+            'Index value of 0 found in atlas labels file. '
+            'Will assume this describes the background and ignore it.'
+        )
+        node_labels_df = node_labels_df.drop(index=[0])
+
+    if 'cifti_label' in node_labels_df.columns:
+        cifti_labels = node_labels_df['cifti_label']
+    elif 'label_7network' in node_labels_df.columns:
+        cifti_labels = node_labels_df['label_7network'].fillna(node_labels_df['label'])
+    else:
+        LOGGER.warning(
+            "No 'cifti_label' column found in atlas labels file. "
+            'Assuming labels in TSV exactly match node names in CIFTI atlas.'
+        )
+        cifti_labels = node_labels_df['label']
 
-                for dict_value in parcel_label_mapper.keys():
-                    if dict_value not in df.columns:
-                        missing_dict_values.append(dict_value)
+    parcel_label_mapper = pd.Series(
+        node_labels_df['label'].to_numpy(),
+        index=pd.Index(cifti_labels.to_numpy()),
+    )
+    # Later rows take precedence over earlier ones with the same CIFTI label
+    return parcel_label_mapper[~parcel_label_mapper.index.duplicated(keep='last')]
+
+
+@lru_cache(maxsize=128)
+def _reconcile_parcel_labels(atlas_labels, mtime_ns, parcel_names):
+    """Match parcel names to atlas labels.
+
+    The result is cached, since the reconciliation is the same for every file
+    parcellated with an atlas.
+    The atlas labels file's modification time is part of the key,
+    so that changes to the file are picked up.
+
+    Parameters
+    ----------
+    atlas_labels : :obj:`str`
+        Absolute path to the atlas labels TSV file.
+    mtime_ns : :obj:`int`
+        Modification time of the atlas labels file, in nanoseconds.
+    parcel_names : :obj:`tuple` of :obj:`str`
+        Names of the parcels in the CIFTI file.
+
+    Returns
+    -------
+    labels : :obj:`numpy.ndarray`
+        The atlas label of each parcel. This array is shared and must not be modified.
+    missing_cifti_labels : :obj:`list` of :obj:`str`
+        Parcels that are missing from the atlas labels file.
+    missing_atlas_labels : :obj:`list` of :obj:`str`
+        Labels in the atlas labels file that are missing from the parcels.
+    """
+    parcel_label_mapper = _get_parcel_label_mapper(atlas_labels)
+    parcel_index = pd.Index(parcel_names)
+    indexer = parcel_label_mapper.index.get_indexer(parcel_index)
+    missing_cifti_labels = parcel_index[indexer < 0].unique().tolist()
+    missing_atlas_labels = parcel_label_mapper.index.difference(parcel_index, sort=False).tolist()
+    labels = parcel_label_mapper.to_numpy()[indexer]
+    return labels, missing_cifti_labels, missing_atlas_labels
+
+
+def reconcile_parcel_labels(atlas_labels, parcel_names):
+    """Find the atlas label of each parcel in a CIFTI file.
+
+    Parameters
+    ----------
+    atlas_labels : :obj:`str`
+        Path to the atlas labels TSV file.
+    parcel_names : :obj:`list` of :obj:`str`
+        Names of the parcels in the CIFTI file (e.g., from a ParcelsAxis).
+
+    Returns
+    -------
+    labels : :obj:`numpy.ndarray`
+        The atlas label of each parcel.
+
+    Raises
+    ------
+    ValueError
+        If any parcels are missing from the atlas labels file,
+        or any labels in the atlas labels file are missing from the parcels.
+    """
+    labels, missing_cifti_labels, missing_atlas_labels = _reconcile_parcel_labels(
+        os.path.abspath(atlas_labels),
+        os.stat(atlas_labels).st_mtime_ns,
+        tuple(str(name) for name in parcel_names),
+    )
+    if missing_cifti_labels:
+        raise ValueError(f'Missing CIFTI labels in atlas labels DataFrame: {missing_cifti_labels}')
+
+    if missing_atlas_labels:
+        raise ValueError(f'Missing atlas labels in CIFTI file: {missing_atlas_labels}')
+
+    return labels.copy()
 
-                if missing_columns:
-                    raise ValueError(
-                        f'Missing CIFTI labels in atlas labels DataFrame: {missing_columns}'
-                    )
 
-                if missing_dict_values:
-                    raise ValueError(f'Missing atlas labels in CIFTI file: {missing_dict_values}')
+def cifti_to_df(img, atlas_labels):
+    """Convert a parcellated CIFTI image to a DataFrame with the atlas's parcel labels.
 
-            # Replace the column names with the corresponding dictionary values.
-            df.columns = [parcel_label_mapper[i] for i in df.columns]
+    Parameters
+    ----------
+    img : :obj:`nibabel.cifti2.Cifti2Image`
+        Parcellated (ptseries, pscalar, or pconn) CIFTI image.
+    atlas_labels : :obj:`str`
+        Path to the atlas labels TSV file.
+
+    Returns
+    -------
+    df : :obj:`pandas.DataFrame`
+        The CIFTI's data, with the parcels in the columns (and in the index, for pconn files)
+        named after the ``label`` column of the atlas labels file.
+    """
+    ax0 = img.header.get_axis(0)
+    ax1 = img.header.get_axis(1)
+    # Second axis is the parcels
+    assert isinstance(ax1, nb.cifti2.ParcelsAxis), type(ax1)
+
+    # Check that all node labels in the CIFTI are present in the TSV, and vice versa,
+    # and replace the CIFTI's parcel names with the corresponding labels.
+    columns = reconcile_parcel_labels(atlas_labels, ax1.name)
+    index = None
+    if isinstance(ax0, nb.cifti2.ParcelsAxis):
+        # Parcel-by-parcel data (e.g., pconn)
+        index = reconcile_parcel_labels(atlas_labels, ax0.name)
+
+    return pd.DataFrame(columns=columns, index=index, data=img.get_fdata())
+
+
+class CiftiToTSV(SimpleInterface):
+    """Extract data from a parcellated CIFTI file into a TSV file."""
+
+    input_spec = _CiftiToTSVInputSpec
+    output_spec = _CiftiToTSVOutputSpec
+
+    def _run_interface(self, runtime):
+        in_file = self.inputs.in_file
+
+        assert in_file.endswith(('.ptseries.nii', '.pscalar.nii', '.pconn.nii')), in_file
+
+        df = cifti_to_df(nb.load(in_file), self.inputs.atlas_labels)
 
         # Save out the TSV
         self._results['out_file'] = fname_presuffix(
@@ -776,3 +967,297 @@ class CiftiVertexMask(SimpleInterface):
         write_ndata(vertex_weights_arr, template=data_file, filename=self._results['mask_file'])
 
         return runtime
+
+
+def _get_grayordinates(brain_models):
+    """Identify each grayordinate of a BrainModelAxis by its structure and vertex, or its voxel.
+
+    Voxels are identified by their indices alone, so that they match across volumetric structures.
+    """
+    structures = np.where(brain_models.surface_mask, brain_models.name, '')
+    return pd.MultiIndex.from_arrays(
+        [structures, brain_models.vertex, *brain_models.voxel.T],
+    )
+
+
+def get_parcel_membership(atlas_file, brain_models):
+    """Map the grayordinates of a CIFTI file to the parcels of a CIFTI atlas.
+
+    Grayordinates are matched between the files by structure and vertex index, or by voxel indices,
+    so the atlas may cover more (or fewer) structures than the file.
+
+    Parameters
+    ----------
+    atlas_file : :obj:`str`
+        Path to a dlabel CIFTI atlas.
+    brain_models : :obj:`nibabel.cifti2.BrainModelAxis`
+        Grayordinates of the file to parcellate.
+
+    Returns
+    -------
+    membership : :obj:`scipy.sparse.csr_matrix` of shape (n_grayordinates, n_parcels)
+        Binary matrix indicating the parcel each grayordinate belongs to.
+    parcels : :obj:`nibabel.cifti2.ParcelsAxis`
+        The atlas's parcels, in order of their keys,
+        excluding the unlabeled key (0) and labels without any grayordinates in the atlas.
+    parcel_sizes : :obj:`numpy.ndarray` of shape (n_parcels,)
+        The number of grayordinates in each parcel of the atlas.
+    """
+    from scipy import sparse
+
+    atlas_img = nb.load(atlas_file)
+    label_table = atlas_img.header.get_axis(0).label[0]
+    atlas_models = atlas_img.header.get_axis(1)
+    atlas_keys = np.asanyarray(atlas_img.dataobj)[0, :].astype(int)
+
+    parcel_keys = np.array(
+        [key for key in np.unique(atlas_keys) if key != 0 and key in label_table],
+        dtype=int,
+    )
+    if not parcel_keys.size:
+        raise ValueError(f'No labeled grayordinates found in {atlas_file}.')
+
+    parcels = nb.cifti2.ParcelsAxis.from_brain_models(
+        [(label_table[key][0], atlas_models[atlas_keys == key]) for key in parcel_keys],
+    )
+    parcel_idx = np.searchsorted(parcel_keys, atlas_keys)
+    in_parcel = (parcel_idx < parcel_keys.size) & (
+        parcel_keys[np.minimum(parcel_idx, parcel_keys.size - 1)] == atlas_keys
+    )
+    parcel_sizes = np.bincount(parcel_idx[in_parcel], minlength=parcel_keys.size)
+
+    # Find each grayordinate of the file in the atlas
+    atlas_idx = _get_grayordinates(atlas_models).get_indexer(_get_grayordinates(brain_models))
+    found = atlas_idx >= 0
+    found[found] = in_parcel[atlas_idx[found]]
+    rows = np.where(found)[0]
+    cols = parcel_idx[atlas_idx[found]]
+    membership = sparse.csr_matrix(
+        (np.ones(rows.size, dtype=np.float32), (rows, cols)),
+        shape=(len(brain_models), parcel_keys.size),
+    )
+    return membership, parcels, parcel_sizes
+
+
+def parcellate_cifti_data(data, membership, weights):
+    """Compute the weighted mean of each parcel, ignoring non-finite values.
+
+    Parameters
+    ----------
+    data : :obj:`numpy.ndarray` of shape (n_maps, n_grayordinates)
+        Data to parcellate.
+    membership : :obj:`scipy.sparse.csr_matrix` of shape (n_grayordinates, n_parcels)
+        Output from :func:`get_parcel_membership`.
+    weights : :obj:`numpy.ndarray` of shape (n_grayordinates,)
+        Weight of each grayordinate.
+
+    Returns
+    -------
+    parcellated_data : :obj:`numpy.ndarray` of shape (n_maps, n_parcels)
+        Weighted mean of each parcel. Parcels without any finite, nonzero-weighted values are NaN.
+    """
+    from scipy import sparse
+
+    weighted_membership = sparse.csr_matrix(membership.multiply(weights[:, None]))
+    finite = np.isfinite(data)
+    if finite.all():
+        numerator = data @ weighted_membership
+        denominator = np.broadcast_to(
+            np.asarray(weighted_membership.sum(axis=0)),
+            numerator.shape,
+        )
+    else:
+        numerator = np.where(finite, data, 0) @ weighted_membership
+        denominator = finite.astype(data.dtype) @ weighted_membership
+
+    parcellated_data = np.full(numerator.shape, np.nan, dtype=data.dtype)
+    np.divide(numerator, denominator, out=parcellated_data, where=denominator > 0)
+    return parcellated_data
+
+
+def _write_parcellated_cifti(data, axis0, parcels, filename):
+    """Write out a ptseries or pscalar CIFTI file."""
+    from xcp_d.utils.write_save import get_cifti_intents
+
+    img = nb.Cifti2Image(data, header=(axis0, parcels))
+    extension = '.ptseries.nii' if isinstance(axis0, nb.cifti2.SeriesAxis) else '.pscalar.nii'
+    img.nifti_header.set_intent(get_cifti_intents()[extension])
+    filename = f'{filename}{extension}'
+    img.to_filename(filename)
+    return img, filename
+
+
+class _CiftiParcellateInputSpec(_ResultCacheInputSpec):
+    in_file = File(
+        exists=True,
+        mandatory=True,
+        desc='Dense (dtseries or dscalar) CIFTI file to parcellate.',
+    )
+    atlas_files = InputMultiObject(
+        File(exists=True),
+        mandatory=True,
+        desc='dlabel CIFTI atlases.',
+    )
+    atlas_labels_files = InputMultiObject(
+        File(exists=True),
+        mandatory=True,
+        desc='Atlas labels TSV files. One for each atlas.',
+    )
+    min_coverage = traits.Float(
+        mandatory=True,
+        desc=(
+            'Coverage threshold to apply to parcels. '
+            'Any parcels with coverage at or below the threshold will be replaced with NaNs.'
+        ),
+    )
+    vertexwise_coverage = File(
+        exists=True,
+        mandatory=False,
+        desc=(
+            'Vertex-wise coverage mask (dscalar) to use as weights. '
+            'If not provided, one is computed from in_file, and the parcel-wise coverage is '
+            'computed from it.'
+        ),
+    )
+    coverage_cifti = InputMultiObject(
+        File(exists=True),
+        mandatory=False,
+        desc=(
+            'Parcel-wise coverage (pscalar) files. One for each atlas. '
+            'Required if vertexwise_coverage is provided.'
+        ),
+    )
+
+
+class _CiftiParcellateOutputSpec(TraitedSpec):
+    parcellated_cifti = traits.List(
+        File(exists=True),
+        desc='Parcellated CIFTI files. One for each atlas.',
+    )
+    parcellated_tsv = traits.List(
+        File(exists=True),
+        desc='Parcellated TSV files. One for each atlas.',
+    )
+    vertexwise_coverage = File(
+        exists=True,
+        desc='Vertex-wise coverage mask. Only output if computed from in_file.',
+    )
+    coverage_cifti = traits.List(
+        File(exists=True),
+        desc='Parcel-wise coverage CIFTI files. Only output if computed from in_file.',
+    )
+    coverage_tsv = traits.List(
+        File(exists=True),
+        desc='Parcel-wise coverage TSV files. Only output if computed from in_file.',
+    )
+
+
+class CiftiParcellate(ResultCacheMixin, SimpleInterface):
+    """Parcellate a CIFTI file with a set of atlases.
+
+    This does the work of ``wb_command -cifti-parcellate`` (for both the coverage and the data),
+    ``wb_command -cifti-math``, :class:`CiftiMask`, and :class:`CiftiToTSV` in one pass,
+    keeping the data in memory.
+    Each atlas's parcels are represented as a sparse grayordinate-by-parcel matrix,
+    so parcellating the data is a single sparse matrix product.
+
+    If a vertex-wise coverage mask is not provided, any vertex with a time series of all zeros or
+    NaNs, or with any NaNs, is excluded, as in :class:`CiftiVertexMask`,
+    and each parcel's coverage is the fraction of its grayordinates that are retained.
+    The parcellated data are the coverage-weighted means of each parcel,
+    and parcels with coverage at or below ``min_coverage`` are set to NaN.
+    """
+
+    input_spec = _CiftiParcellateInputSpec
+    output_spec = _CiftiParcellateOutputSpec
+
+    def _compute(self, runtime):
+        in_file = self.inputs.in_file
+        compute_mask = not isdefined(self.inputs.vertexwise_coverage)
+        if not compute_mask and not isdefined(self.inputs.coverage_cifti):
+            raise ValueError("'coverage_cifti' is required if 'vertexwise_coverage' is provided.")
+
+        img = nb.load(in_file)
+        data = img.get_fdata(dtype=np.float32)
+        axis0, brain_models = img.header.get_axis(0), img.header.get_axis(1)
+
+        if compute_mask:
+            bad_vertices = np.all((data == 0) | np.isnan(data), axis=0)
+            weights = (~bad_vertices & ~np.any(np.isnan(data), axis=0)).astype(np.float32)
+            self._results['vertexwise_coverage'] = fname_presuffix(
+                in_file,
+                suffix='.dscalar.nii',
+                newpath=runtime.cwd,
+                use_ext=False,
+            )
+            write_ndata(
+                weights.astype(int),
+                template=in_file,
+                filename=self._results['vertexwise_coverage'],
+            )
+        else:
+            weights = nb.load(self.inputs.vertexwise_coverage).get_fdata(dtype=np.float32)[0, :]
+            if weights.size != data.shape[1]:
+                raise ValueError(
+                    f'Vertex-wise coverage ({weights.size} grayordinates) does not match '
+                    f'{in_file} ({data.shape[1]} grayordinates).'
+                )
+
+        coverage_files = self.inputs.coverage_cifti if not compute_mask else None
+        for key in ('parcellated_cifti', 'parcellated_tsv', 'coverage_cifti', 'coverage_tsv'):
+            self._results[key] = []
+
+        for i_atlas, (atlas_file, atlas_labels) in enumerate(
+            zip(self.inputs.atlas_files, self.inputs.atlas_labels_files, strict=True)
+        ):
+            membership, parcels, parcel_sizes = get_parcel_membership(atlas_file, brain_models)
+
+            if compute_mask:
+                coverage = (weights @ membership) / np.maximum(parcel_sizes, 1)
+                coverage_img, coverage_file = _write_parcellated_cifti(
+                    coverage[None, :].astype(np.float32),
+                    nb.cifti2.ScalarAxis(['coverage']),
+                    parcels,
+                    os.path.join(runtime.cwd, f'coverage_{i_atlas}'),
+                )
+                coverage_tsv = os.path.join(runtime.cwd, f'coverage_{i_atlas}.tsv')
+                cifti_to_df(coverage_img, atlas_labels).to_csv(
+                    coverage_tsv,
+                    sep='\t',
+                    na_rep='n/a',
+                    index=False,
+                )
+                self._results['coverage_cifti'].append(coverage_file)
+                self._results['coverage_tsv'].append(coverage_tsv)
+            else:
+                coverage = nb.load(coverage_files[i_atlas]).get_fdata()[0, :]
+                if coverage.size != len(parcels):
+                    raise ValueError(
+                        f'Coverage file {coverage_files[i_atlas]} has {coverage.size} parcels, '
+                        f'but {atlas_file} has {len(parcels)}.'
+                    )
+
+            parcellated_data = parcellate_cifti_data(data, membership, weights)
+            parcellated_data[:, coverage <= self.inputs.min_coverage] = np.nan
+
+            parcellated_img, parcellated_file = _write_parcellated_cifti(
+                parcellated_data,
+                axis0,
+                parcels,
+                os.path.join(runtime.cwd, f'parcellated_{i_atlas}'),
+            )
+            parcellated_tsv = os.path.join(runtime.cwd, f'parcellated_{i_atlas}.tsv')
+            cifti_to_df(parcellated_img, atlas_labels).to_csv(
+                parcellated_tsv,
+                sep='\t',
+                na_rep='n/a',
+                index=False,
+            )
+            self._results['parcellated_cifti'].append(parcellated_file)
+            self._results['parcellated_tsv'].append(parcellated_tsv)
+
+        if not compute_mask:
+            # Only report the coverage files that were computed here
+            del self._results['coverage_cifti'], self._results['coverage_tsv']
+
+        return runtime
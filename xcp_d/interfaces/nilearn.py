@@ -3,7 +3,6 @@
 import os
 
 import pandas as pd
-from nilearn import masking
 from nipype.interfaces.base import (
     BaseInterfaceInputSpec,
     File,
@@ -14,6 +13,7 @@ from nipype.interfaces.base import (
 )
 from nipype.interfaces.nilearn import NilearnBaseInterface
 
+from xcp_d.interfaces.caching import ResultCacheMixin, _ResultCacheInputSpec
 from xcp_d.utils.utils import denoise_with_nilearn
 from xcp_d.utils.write_save import read_ndata, write_ndata
 
@@ -234,7 +234,7 @@ class ResampleToImage(NilearnBaseInterface, SimpleInterface):
         resampled_img.to_filename(self._results['out_file'])
 
 
-class _DenoiseImageInputSpec(BaseInterfaceInputSpec):
+class _DenoiseImageInputSpec(_ResultCacheInputSpec):
     """Used directly by the CIFTI interface, and modified slightly for the NIFTI one."""
 
     preprocessed_bold = File(
@@ -278,7 +278,7 @@ class _DenoiseImageOutputSpec(TraitedSpec):
     )
 
 
-class DenoiseCifti(NilearnBaseInterface, SimpleInterface):
+class DenoiseCifti(ResultCacheMixin, NilearnBaseInterface, SimpleInterface):
     """Denoise a CIFTI BOLD file with Nilearn.
 
     For more information about the exact steps,
@@ -288,7 +288,7 @@ class DenoiseCifti(NilearnBaseInterface, SimpleInterface):
     input_spec = _DenoiseImageInputSpec
     output_spec = _DenoiseImageOutputSpec
 
-    def _run_interface(self, runtime):
+    def _compute(self, runtime):
         if not self.inputs.bandpass_filter:
             low_pass, high_pass = None, None
         else:
@@ -361,7 +361,7 @@ class _DenoiseNiftiInputSpec(_DenoiseImageInputSpec):
     )
 
 
-class DenoiseNifti(NilearnBaseInterface, SimpleInterface):
+class DenoiseNifti(ResultCacheMixin, NilearnBaseInterface, SimpleInterface):
     """Denoise a NIfTI BOLD file with Nilearn.
 
     For more information about the exact steps,
@@ -371,7 +371,9 @@ class DenoiseNifti(NilearnBaseInterface, SimpleInterface):
     input_spec = _DenoiseNiftiInputSpec
     output_spec = _DenoiseImageOutputSpec
 
-    def _run_interface(self, runtime):
+    def _compute(self, runtime):
+        from nilearn import masking
+
         if not self.inputs.bandpass_filter:
             low_pass, high_pass = None, None
         else:
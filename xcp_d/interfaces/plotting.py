@@ -4,15 +4,9 @@
 
 import os
 
-import matplotlib.pyplot as plt
 import nibabel as nb
 import numpy as np
 import pandas as pd
-import seaborn as sns
-from matplotlib.cm import ScalarMappable
-from matplotlib.colors import Normalize
-from matplotlib.gridspec import GridSpec, GridSpecFromSubplotSpec
-from nilearn.plotting import plot_anat, plot_stat_map, plot_surf_stat_map
 from nipype import logging
 from nipype.interfaces.base import (
     BaseInterfaceInputSpec,
@@ -67,6 +61,9 @@ class CensoringPlot(SimpleInterface):
     output_spec = _CensoringPlotOutputSpec
 
     def _run_interface(self, runtime):
+        import matplotlib.pyplot as plt
+        import seaborn as sns
+
         # Load confound matrix and load motion with motion filtering
         motion_df = pd.read_table(self.inputs.motion_file)
         preproc_fd_timeseries = motion_df['framewise_displacement'].values
@@ -255,6 +252,8 @@ class QCPlots(SimpleInterface):
     output_spec = _QCPlotsOutputSpec
 
     def _run_interface(self, runtime):
+        import matplotlib.pyplot as plt
+
         # Load confound matrix and load motion without motion filtering
         motion_df = pd.read_table(self.inputs.motion_file)
         if 'framewise_displacement_filtered' in motion_df.columns:
@@ -472,6 +471,9 @@ class AnatomicalPlot(SimpleInterface):
     output_spec = _AnatomicalPlotOutputSpec
 
     def _run_interface(self, runtime):
+        import matplotlib.pyplot as plt
+        from nilearn.plotting import plot_anat
+
         self._results['out_file'] = fname_presuffix(
             self.inputs.in_file, suffix='_file.svg', newpath=runtime.cwd, use_ext=False
         )
@@ -718,6 +720,12 @@ class PlotCiftiParcellation(SimpleInterface):
     output_spec = _PlotCiftiParcellationOutputSpec
 
     def _run_interface(self, runtime):
+        import matplotlib.pyplot as plt
+        from matplotlib.cm import ScalarMappable
+        from matplotlib.colors import Normalize
+        from matplotlib.gridspec import GridSpec, GridSpecFromSubplotSpec
+        from nilearn.plotting import plot_surf_stat_map
+
         assert len(self.inputs.in_files) == len(self.inputs.labels)
         assert len(self.inputs.cortical_atlases) > 0
 
@@ -939,6 +947,12 @@ class PlotDenseCifti(SimpleInterface):
     output_spec = _PlotDenseCiftiOutputSpec
 
     def _run_interface(self, runtime):
+        import matplotlib.pyplot as plt
+        from matplotlib.cm import ScalarMappable
+        from matplotlib.colors import Normalize
+        from matplotlib.gridspec import GridSpec, GridSpecFromSubplotSpec
+        from nilearn.plotting import plot_surf_stat_map
+
         if not (isdefined(self.inputs.lh_underlay) and isdefined(self.inputs.rh_underlay)):
             self._results['desc'] = f'{self.inputs.base_desc}SurfaceStandard'
             rh = str(
@@ -1108,6 +1122,7 @@ class PlotNifti(SimpleInterface):
 
     def _run_interface(self, runtime):
         from bids.layout import parse_file_entities
+        from nilearn.plotting import plot_stat_map
 
         ENTITIES_TO_USE = ['cohort', 'den', 'res']
 
@@ -14,7 +14,6 @@ from nipype import logging
 from nipype.interfaces.afni.preprocess import Despike, DespikeInputSpec
 from nipype.interfaces.afni.utils import ReHoInputSpec, ReHoOutputSpec
 from nipype.interfaces.base import (
-    BaseInterfaceInputSpec,
     File,
     SimpleInterface,
     TraitedSpec,
@@ -23,6 +22,7 @@ from nipype.interfaces.base import (
     traits_extension,
 )
 
+from xcp_d.interfaces.caching import ResultCacheMixin, _ResultCacheInputSpec
 from xcp_d.utils.filemanip import fname_presuffix
 from xcp_d.utils.restingstate import compute_2d_reho, mesh_adjacency
 from xcp_d.utils.write_save import read_gii, read_ndata, write_gii, write_ndata
@@ -31,7 +31,7 @@ LOGGER = logging.getLogger('nipype.interface')
 
 
 # compute 2D reho
-class _SurfaceReHoInputSpec(BaseInterfaceInputSpec):
+class _SurfaceReHoInputSpec(_ResultCacheInputSpec):
     surf_bold = File(exists=True, mandatory=True, desc='left or right hemisphere gii ')
     # TODO: Change to Enum
     surf_hemi = traits.Str(mandatory=True, desc='L or R ')
@@ -41,7 +41,7 @@ class _SurfaceReHoOutputSpec(TraitedSpec):
     surf_gii = File(exists=True, mandatory=True, desc=' lh hemisphere reho')
 
 
-class SurfaceReHo(SimpleInterface):
+class SurfaceReHo(ResultCacheMixin, SimpleInterface):
     """Calculate regional homogeneity (ReHo) on a surface file.
 
     Examples
@@ -62,7 +62,7 @@ class SurfaceReHo(SimpleInterface):
     input_spec = _SurfaceReHoInputSpec
     output_spec = _SurfaceReHoOutputSpec
 
-    def _run_interface(self, runtime):
+    def _compute(self, runtime):
         # Read the gifti data
         data_matrix = read_gii(self.inputs.surf_bold)
 
@@ -86,7 +86,7 @@ class SurfaceReHo(SimpleInterface):
         return runtime
 
 
-class _ComputeALFFInputSpec(BaseInterfaceInputSpec):
+class _ComputeALFFInputSpec(_ResultCacheInputSpec):
     in_file = File(exists=True, mandatory=True, desc='nifti, cifti or gifti')
     TR = traits.Float(mandatory=True, desc='repetition time')
     low_pass = traits.Float(
@@ -120,7 +120,7 @@ class _ComputeALFFOutputSpec(TraitedSpec):
     alff = File(exists=True, mandatory=True, desc=' alff')
 
 
-class ComputeALFF(SimpleInterface):
+class ComputeALFF(ResultCacheMixin, SimpleInterface):
     """Compute amplitude of low-frequency fluctuation (ALFF).
 
     Notes
@@ -140,7 +140,7 @@ class ComputeALFF(SimpleInterface):
     input_spec = _ComputeALFFInputSpec
     output_spec = _ComputeALFFOutputSpec
 
-    def _run_interface(self, runtime):
+    def _compute(self, runtime):
         import gc
         from multiprocessing import Pool
 
@@ -208,7 +208,11 @@ class ComputeALFF(SimpleInterface):
         return runtime
 
 
-class ReHoNamePatch(SimpleInterface):
+class _ReHoNamePatchInputSpec(ReHoInputSpec, _ResultCacheInputSpec):
+    pass
+
+
+class ReHoNamePatch(ResultCacheMixin, SimpleInterface):
     """Compute ReHo for a given neighbourhood, based on a local neighborhood of that voxel.
 
     For complete details, see the `3dReHo Documentation.
@@ -227,10 +231,10 @@ class ReHoNamePatch(SimpleInterface):
     """
 
     _cmd = '3dReHo'
-    input_spec = ReHoInputSpec
+    input_spec = _ReHoNamePatchInputSpec
     output_spec = ReHoOutputSpec
 
-    def _run_interface(self, runtime):
+    def _compute(self, runtime):
         out_file = os.path.join(runtime.cwd, 'reho.nii.gz')
 
         in_file = os.path.join(runtime.cwd, 'inset.nii.gz')
@@ -284,3 +288,96 @@ class DespikePatch(Despike):
         outputs = self.output_spec().get()
         outputs['out_file'] = os.path.abspath(self._gen_filename('out_file'))
         return outputs
+
+
+class _DespikeImageInputSpec(_ResultCacheInputSpec):
+    in_file = File(exists=True, mandatory=True, desc='NIfTI or CIFTI BOLD file to despike.')
+    mask = File(
+        exists=True,
+        mandatory=False,
+        desc=(
+            'Brain mask for NIfTI files. '
+            'Only voxels in the mask are despiked. '
+            'If not provided, all voxels are despiked.'
+        ),
+    )
+    corder = traits.Either(
+        None,
+        traits.Int,
+        default=None,
+        usedefault=True,
+        desc='Number of sine/cosine pairs in the fitted curve. If None, uses T // 30.',
+    )
+    cut = traits.Tuple(
+        (2.5, 4.0),
+        traits.Float,
+        traits.Float,
+        usedefault=True,
+        desc='Spike thresholds (c1, c2), in units of the residuals standard deviation.',
+    )
+    n_threads = traits.Int(
+        1,
+        usedefault=True,
+        desc='number of threads to use',
+        nohash=True,
+    )
+
+
+class _DespikeImageOutputSpec(TraitedSpec):
+    out_file = File(exists=True, desc='Despiked BOLD file.')
+
+
+class DespikeImage(ResultCacheMixin, SimpleInterface):
+    """Remove spikes from a NIfTI or CIFTI BOLD file.
+
+    This is a Python implementation of AFNI's ``3dDespike -NEW``,
+    which works on the data matrix directly, so CIFTI files do not need to be converted to
+    NIfTI and back.
+    For more information about the exact steps,
+    please see :py:func:`~xcp_d.utils.utils.despike_data`.
+    """
+
+    input_spec = _DespikeImageInputSpec
+    output_spec = _DespikeImageOutputSpec
+
+    def _compute(self, runtime):
+        import nibabel as nb
+        import numpy as np
+
+        from xcp_d.utils.utils import despike_data
+
+        img = nb.load(self.inputs.in_file)
+        data = img.get_fdata(dtype=np.float32)
+
+        kwargs = {
+            'corder': self.inputs.corder,
+            'cut': self.inputs.cut,
+            'n_threads': self.inputs.n_threads,
+        }
+        if isinstance(img, nb.Cifti2Image):
+            # CIFTI data are time points by vertices
+            data_matrix, n_spikes = despike_data(np.ascontiguousarray(data.T), **kwargs)
+            out_img = nb.Cifti2Image(
+                data_matrix.T,
+                header=img.header,
+                nifti_header=img.nifti_header,
+            )
+        else:
+            if traits_extension.isdefined(self.inputs.mask):
+                mask = np.asanyarray(nb.load(self.inputs.mask).dataobj).astype(bool)
+            else:
+                mask = np.ones(data.shape[:3], dtype=bool)
+
+            data[mask], n_spikes = despike_data(data[mask], **kwargs)
+            out_img = nb.Nifti1Image(data, img.affine, img.header)
+            out_img.set_data_dtype(np.float32)
+
+        LOGGER.info(f'Despiking squashed {n_spikes} values in {self.inputs.in_file}.')
+        self._results['out_file'] = fname_presuffix(
+            self.inputs.in_file,
+            suffix='_despiked',
+            newpath=runtime.cwd,
+        )
+        out_img.to_filename(self._results['out_file'])
+
+        return runtime
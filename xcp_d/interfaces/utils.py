@@ -9,6 +9,7 @@ import pandas as pd
 from nipype import logging
 from nipype.interfaces.base import (
     BaseInterfaceInputSpec,
+    DynamicTraitedSpec,
     File,
     OutputMultiObject,
     SimpleInterface,
@@ -18,10 +19,17 @@ from nipype.interfaces.base import (
     traits,
     traits_extension,
 )
+from nipype.interfaces.io import add_traits
 
+from xcp_d.utils.checkpoints import write_checkpoint
 from xcp_d.utils.filemanip import fname_presuffix
 from xcp_d.utils.modified_data import downcast_to_32
-from xcp_d.utils.qcmetrics import compute_dvars, compute_registration_qc
+from xcp_d.utils.qcmetrics import (
+    compute_abcc_qc_table,
+    compute_dvars,
+    compute_moments,
+    compute_registration_qc,
+)
 from xcp_d.utils.write_save import read_ndata
 
 LOGGER = logging.getLogger('nipype.interface')
@@ -149,6 +157,55 @@ class FilterUndefined(SimpleInterface):
         return runtime
 
 
+class _WriteCheckpointInputSpec(DynamicTraitedSpec):
+    checkpoint_file = traits.Str(mandatory=True, desc='Path to the checkpoint file.')
+    signature = traits.Str(mandatory=True, desc="Signature of the run's settings and inputs.")
+    derivatives = traits.List(
+        traits.Any,
+        mandatory=True,
+        desc='Derivatives written out for the run. Possibly nested.',
+    )
+
+
+class _WriteCheckpointOutputSpec(TraitedSpec):
+    checkpoint_file = File(exists=True, desc='Checkpoint file.')
+
+
+class WriteCheckpoint(SimpleInterface):
+    """Record that all of a BOLD run's derivatives have been written out.
+
+    The run's workflow outputs are recorded as well,
+    so that later workflows (e.g., concatenation) can use them without rebuilding the run.
+    """
+
+    input_spec = _WriteCheckpointInputSpec
+    output_spec = _WriteCheckpointOutputSpec
+
+    def __init__(self, output_names=(), **inputs):
+        super().__init__(**inputs)
+        self._output_names = list(output_names)
+        add_traits(self.inputs, self._output_names)
+
+    def _run_interface(self, runtime):
+        def _replace_undefined(value):
+            if isinstance(value, list | tuple):
+                return [_replace_undefined(val) for val in value]
+            return value if isdefined(value) else None
+
+        outputs = {
+            output_name: _replace_undefined(getattr(self.inputs, output_name))
+            for output_name in self._output_names
+        }
+        write_checkpoint(
+            checkpoint_file=self.inputs.checkpoint_file,
+            signature=self.inputs.signature,
+            derivatives=self.inputs.derivatives,
+            outputs=outputs,
+        )
+        self._results['checkpoint_file'] = self.inputs.checkpoint_file
+        return runtime
+
+
 class _LINCQCInputSpec(BaseInterfaceInputSpec):
     name_source = File(
         exists=False,
@@ -234,6 +291,13 @@ class _LINCQCInputSpec(BaseInterfaceInputSpec):
 class _LINCQCOutputSpec(TraitedSpec):
     qc_file = File(exists=True, desc='QC TSV file.')
     qc_metadata = File(exists=True, desc='Sidecar JSON for QC TSV file.')
+    qc_stats = File(
+        exists=True,
+        desc=(
+            'JSON file with the sums needed to combine the QC metrics across runs, '
+            'without reloading the BOLD data.'
+        ),
+    )
 
 
 class LINCQC(SimpleInterface):
@@ -441,6 +505,29 @@ class LINCQC(SimpleInterface):
         with open(self._results['qc_metadata'], 'w') as fo:
             json.dump(qc_metadata, fo, indent=4, sort_keys=True)
 
+        # Write out the sums needed to compute these metrics across concatenated runs
+        rmsd_retained = rmsd_censored[np.isfinite(rmsd_censored)]
+        qc_stats = {
+            'num_dummy_volumes': int(dummy_scans),
+            'num_censored_volumes': num_censored_volumes,
+            'num_retained_volumes': num_retained_volumes,
+            'fd_dvars_initial': compute_moments(preproc_fd, dvars_before_processing),
+            'fd_dvars_final': compute_moments(postproc_fd, dvars_after_processing),
+            'relative_rms': {
+                'n': int(rmsd_retained.size),
+                'sum': float(rmsd_retained.sum()),
+                'max': float(rmsd_max_value),
+            },
+        }
+        self._results['qc_stats'] = fname_presuffix(
+            self.inputs.cleaned_file,
+            suffix='qc_stats.json',
+            newpath=runtime.cwd,
+            use_ext=False,
+        )
+        with open(self._results['qc_stats'], 'w') as fo:
+            json.dump(qc_stats, fo, indent=4, sort_keys=True)
+
         return runtime
 
 
@@ -451,6 +538,16 @@ class _ABCCQCInputSpec(BaseInterfaceInputSpec):
         desc='',
     )
     TR = traits.Float(mandatory=True, desc='Repetition Time')
+    layout = traits.Enum(
+        'legacy',
+        'compact',
+        usedefault=True,
+        desc=(
+            'Layout of the HDF5 file. '
+            "'legacy' writes one group per FD threshold. "
+            "'compact' writes a small number of chunked, compressed 2D datasets."
+        ),
+    )
 
 
 class _ABCCQCOutputSpec(TraitedSpec):
@@ -478,6 +575,13 @@ class ABCCQC(SimpleInterface):
         after thresholding
     -   ``remaining_frame_mean_FD``: a number >= 0 that represents the mean FD of the
         remaining frames
+
+    In the ``compact`` layout, the same values are stored in three datasets:
+
+    -   ``/dcan_motion/thresholds``: the FD thresholds (n_thresholds,).
+    -   ``/dcan_motion/binary_mask``: the binary masks (n_thresholds, n_frames).
+    -   ``/dcan_motion/summary``: the summary statistics (n_thresholds, n_statistics).
+        The column names are stored in the dataset's ``columns`` attribute.
     """
 
     input_spec = _ABCCQCInputSpec
@@ -500,44 +604,41 @@ class ABCCQC(SimpleInterface):
         else:
             fd = motion_df['framewise_displacement'].values
 
-        with h5py.File(self._results['qc_file'], 'w') as dcan:
-            for thresh in np.linspace(0, 1, 101):
-                thresh = np.around(thresh, 2)
+        thresholds, binary_masks, summary = compute_abcc_qc_table(fd=fd, TR=TR)
 
+        with h5py.File(self._results['qc_file'], 'w') as dcan:
+            if self.inputs.layout == 'compact':
+                dcan.create_dataset('/dcan_motion/thresholds', data=thresholds, dtype='float')
                 dcan.create_dataset(
-                    f'/dcan_motion/fd_{thresh}/skip',
-                    data=0,
-                    dtype='float',
-                )
-                dcan.create_dataset(
-                    f'/dcan_motion/fd_{thresh}/binary_mask',
-                    data=(fd > thresh).astype(int),
-                    dtype='float',
-                )
-                dcan.create_dataset(
-                    f'/dcan_motion/fd_{thresh}/threshold',
-                    data=thresh,
-                    dtype='float',
-                )
-                dcan.create_dataset(
-                    f'/dcan_motion/fd_{thresh}/total_frame_count',
-                    data=len(fd),
-                    dtype='float',
-                )
-                dcan.create_dataset(
-                    f'/dcan_motion/fd_{thresh}/remaining_total_frame_count',
-                    data=len(fd[fd <= thresh]),
-                    dtype='float',
+                    '/dcan_motion/binary_mask',
+                    data=binary_masks,
+                    dtype='uint8',
+                    chunks=True,
+                    compression='gzip',
                 )
-                dcan.create_dataset(
-                    f'/dcan_motion/fd_{thresh}/remaining_seconds',
-                    data=len(fd[fd <= thresh]) * TR,
+                summary_dset = dcan.create_dataset(
+                    '/dcan_motion/summary',
+                    data=summary.to_numpy(),
                     dtype='float',
+                    chunks=True,
+                    compression='gzip',
                 )
+                summary_dset.attrs['columns'] = list(summary.columns)
+                return runtime
+
+            for i_thresh, thresh in enumerate(thresholds):
+                group = f'/dcan_motion/fd_{thresh}'
+                dcan.create_dataset(f'{group}/skip', data=0, dtype='float')
                 dcan.create_dataset(
-                    f'/dcan_motion/fd_{thresh}/remaining_frame_mean_FD',
-                    data=(fd[fd <= thresh]).mean(),
+                    f'{group}/binary_mask',
+                    data=binary_masks[i_thresh, :],
                     dtype='float',
                 )
+                for column in summary.columns:
+                    dcan.create_dataset(
+                        f'{group}/{column}',
+                        data=summary.loc[i_thresh, column],
+                        dtype='float',
+                    )
 
         return runtime
@@ -3,10 +3,12 @@
 import os
 
 import nibabel as nb
+import numpy as np
 from nipype import logging
 from nipype.interfaces.base import (
     BaseInterfaceInputSpec,
     CommandLineInputSpec,
+    Directory,
     File,
     SimpleInterface,
     TraitedSpec,
@@ -15,6 +17,7 @@ from nipype.interfaces.base import (
 )
 from nipype.interfaces.workbench.base import WBCommand as WBCommandBase
 
+from xcp_d.interfaces.caching import ResultCacheMixin, _ResultCacheInputSpec
 from xcp_d.utils.filemanip import fname_presuffix, split_filename
 from xcp_d.utils.write_save import get_cifti_intents
 
@@ -103,6 +106,86 @@ class FixCiftiIntent(SimpleInterface):
         return runtime
 
 
+class _SmoothCiftiInputSpec(_ResultCacheInputSpec):
+    in_file = File(
+        exists=True,
+        mandatory=True,
+        desc='CIFTI file to smooth, with grayordinates along the columns.',
+    )
+    sigma_surf = traits.Float(
+        mandatory=True,
+        desc='the sigma for the gaussian surface smoothing kernel, in mm',
+    )
+    sigma_vol = traits.Float(
+        mandatory=True,
+        desc='the sigma for the gaussian volume smoothing kernel, in mm',
+    )
+    left_surf = File(exists=True, mandatory=True, desc='Specify the left surface to use')
+    right_surf = File(exists=True, mandatory=True, desc='Specify the right surface to use')
+    kernel_dir = traits.Either(
+        None,
+        Directory(exists=False),
+        default=None,
+        usedefault=True,
+        nohash=True,
+        desc=(
+            'Directory in which to store smoothing kernels, so that they can be reused by other '
+            'nodes and later runs. If None, kernels are only reused within the same process.'
+        ),
+    )
+
+
+class _SmoothCiftiOutputSpec(TraitedSpec):
+    out_file = File(exists=True, desc='output CIFTI file')
+
+
+class SmoothCifti(ResultCacheMixin, SimpleInterface):
+    """Smooth a CIFTI file with a precomputed, sparse Gaussian kernel.
+
+    This is not technically a Connectome Workbench interface, but it replaces
+    :class:`CiftiSmooth` (followed by :class:`FixCiftiIntent`) along the COLUMN direction.
+    The kernel only depends on the surfaces, the grayordinates, and the kernel widths,
+    so it is built once and applied to each file with a single sparse matrix multiplication.
+    The output file keeps the input file's header, including its intent code.
+    """
+
+    input_spec = _SmoothCiftiInputSpec
+    output_spec = _SmoothCiftiOutputSpec
+
+    def _compute(self, runtime):
+        from xcp_d.utils.smoothing import load_cifti_kernel
+
+        img = nb.load(self.inputs.in_file)
+        brain_models = img.header.get_axis(1)
+        if not isinstance(brain_models, nb.cifti2.BrainModelAxis):
+            raise ValueError(f'Grayordinates not found along the columns of {self.inputs.in_file}')
+
+        kernel = load_cifti_kernel(
+            brain_models,
+            left_surf=self.inputs.left_surf,
+            right_surf=self.inputs.right_surf,
+            sigma_surf=self.inputs.sigma_surf,
+            sigma_vol=self.inputs.sigma_vol,
+            kernel_dir=self.inputs.kernel_dir,
+        )
+        data = img.get_fdata(dtype=np.float32)
+        smoothed_data = np.asarray(kernel @ data.T).T.astype(np.float32)
+
+        self._results['out_file'] = fname_presuffix(
+            self.inputs.in_file,
+            prefix='smoothed_',
+            newpath=runtime.cwd,
+            use_ext=True,
+        )
+        smoothed_img = nb.Cifti2Image(
+            smoothed_data,
+            header=img.header,
+            nifti_header=img.nifti_header,
+        )
+        smoothed_img.to_filename(self._results['out_file'])
+        return runtime
+
+
 class _ConvertAffineInputSpec(_WBCommandInputSpec):
     """Input specification for ConvertAffine."""
 
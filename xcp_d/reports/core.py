@@ -5,6 +5,8 @@
 This is adapted from fMRIPost-AROMA.
 """
 
+import html
+import json
 from pathlib import Path
 
 from nireports.assembler.report import Report
@@ -12,6 +14,101 @@ from nireports.assembler.report import Report
 from xcp_d import config, data
 from xcp_d.interfaces.execsummary import ExecutiveSummary
 
+PERFORMANCE_TEMPLATE = """\t<ul class="elem-desc">
+\t\t<li>Nodes run: {n_nodes}</li>
+\t\t<li>Total wall time: {total_wall_time}</li>
+\t\t<li>Total CPU time: {total_cpu_time}</li>
+\t\t<li>Critical path: {critical_path_time}</li>
+\t\t<li>Peak memory of any node: {peak_rss}</li>
+\t</ul>
+{tables}
+"""
+
+
+def _format_seconds(seconds):
+    if seconds is None:
+        return 'n/a'
+
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f'{hours:d}:{minutes:02d}:{seconds:02d}'
+
+
+def _format_gb(gb):
+    return 'n/a' if gb is None else f'{gb:.2f} GB'
+
+
+def write_performance_reportlet(output_dir, subject_label, run_uuid):
+    """Write a reportlet summarizing the resources used to process a subject.
+
+    The summary is read from the resource profile written by
+    :func:`~xcp_d.utils.profiling.write_resource_profile`,
+    which is only available when the resource monitor is enabled.
+
+    Parameters
+    ----------
+    output_dir : :obj:`str`
+        XCP-D output directory.
+    subject_label : :obj:`str`
+        Subject ID.
+    run_uuid : :obj:`str`
+        Unique identifier of the run.
+
+    Returns
+    -------
+    reportlet : :obj:`pathlib.Path` or None
+        The reportlet, or None if there is no resource profile for this subject.
+    """
+    summary_file = Path(output_dir) / 'logs' / f'resource_profile_{run_uuid}.json'
+    if not summary_file.is_file():
+        return None
+
+    subject_label = subject_label.removeprefix('sub-')
+    summary = json.loads(summary_file.read_text()).get(subject_label)
+    if summary is None:
+        return None
+
+    tables = []
+    for key, title in [
+        ('critical_path', 'Critical path'),
+        ('slowest_nodes', 'Longest-running nodes'),
+        ('largest_nodes', 'Nodes with the highest peak memory'),
+    ]:
+        rows = [
+            f'<tr><td>{html.escape(node["node"])}</td><td>{html.escape(node["interface"])}</td>'
+            f'<td>{_format_seconds(node["wall_time_s"])}</td>'
+            f'<td>{_format_seconds(node["cpu_time_s"])}</td>'
+            f'<td>{_format_gb(node["peak_rss_gb"])}</td></tr>'
+            for node in summary[key]
+        ]
+        if not rows:
+            continue
+
+        tables.append(
+            f'<h4>{title}</h4>\n<table class="table table-sm">\n'
+            '<tr><th>Node</th><th>Interface</th><th>Wall time</th><th>CPU time</th>'
+            '<th>Peak memory</th></tr>\n' + '\n'.join(rows) + '\n</table>'
+        )
+
+    reportlet = (
+        Path(output_dir)
+        / f'sub-{subject_label}'
+        / 'figures'
+        / f'sub-{subject_label}_desc-performance_bold.html'
+    )
+    reportlet.parent.mkdir(exist_ok=True, parents=True)
+    reportlet.write_text(
+        PERFORMANCE_TEMPLATE.format(
+            n_nodes=summary['n_nodes'],
+            total_wall_time=_format_seconds(summary['total_wall_time_s']),
+            total_cpu_time=_format_seconds(summary['total_cpu_time_s']),
+            critical_path_time=_format_seconds(summary['critical_path_s']),
+            peak_rss=_format_gb(summary['peak_rss_gb']),
+            tables='\n'.join(tables),
+        )
+    )
+    return reportlet
+
 
 def run_reports(
     output_dir,
@@ -73,6 +170,7 @@ def generate_reports(
         # on the total number of sessions, because I want the final derivatives
         # folder to be the same whether sessions were run one at a time or all-together.
         n_ses = len(config.execution.layout.get_sessions(subject=subject_label))
+        write_performance_reportlet(output_dir, subject_label, run_uuid)
 
         if bootstrap_file is not None:
             # If a config file is precised, we do not override it
@@ -30,6 +30,27 @@ def pytest_addoption(parser):
             'run_pytests/out'
         ),
     )
+    parser.addoption(
+        '--bench_n_voxels',
+        action='store',
+        type=int,
+        default=5000,
+        help='Number of voxels (or vertices) in the synthetic data used by the benchmarks.',
+    )
+    parser.addoption(
+        '--bench_n_volumes',
+        action='store',
+        type=int,
+        default=200,
+        help='Number of volumes in the synthetic data used by the benchmarks.',
+    )
+    parser.addoption(
+        '--bench_censoring',
+        action='store',
+        type=float,
+        default=0.2,
+        help='Fraction of volumes flagged as high-motion in the benchmarks.',
+    )
 
 
 # Set up the commandline options as fixtures
@@ -55,6 +76,16 @@ def output_dir(request):
     return outdir
 
 
+@pytest.fixture(scope='session')
+def benchmark_size(request):
+    """Grab the size of the synthetic data used by the benchmarks."""
+    return {
+        'n_voxels': request.config.getoption('--bench_n_voxels'),
+        'n_volumes': request.config.getoption('--bench_n_volumes'),
+        'censoring': request.config.getoption('--bench_censoring'),
+    }
+
+
 @pytest.fixture(scope='session')
 def datasets(data_dir):
     """Locate downloaded datasets."""
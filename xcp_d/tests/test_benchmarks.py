@@ -0,0 +1,285 @@
+"""Benchmarks for XCP-D's numerical hot paths.
+
+These benchmarks run on synthetic data generated locally,
+so they do not require any test datasets, network access, or external tools.
+They are deselected by default and require pytest-benchmark.
+
+Run them with::
+
+    pytest -m performance xcp_d/tests/test_benchmarks.py --benchmark-autosave
+
+and compare against a previous run with ``--benchmark-compare``.
+The size of the synthetic data is controlled with the ``--bench_n_voxels``,
+``--bench_n_volumes``, and ``--bench_censoring`` options.
+Each benchmark records the wall time of the function and,
+in the ``extra_info`` field, its peak memory usage as traced by :mod:`tracemalloc`.
+"""
+
+import os
+import tracemalloc
+
+import nibabel as nb
+import numpy as np
+import pandas as pd
+import pytest
+
+from xcp_d.interfaces.connectivity import NiftiParcellate, correlate_timeseries
+from xcp_d.tests.utils import chdir
+from xcp_d.utils.qcmetrics import compute_dvars
+from xcp_d.utils.restingstate import compute_2d_reho, compute_alff
+from xcp_d.utils.utils import denoise_with_nilearn
+from xcp_d.utils.write_save import write_ndata
+
+pytest.importorskip('pytest_benchmark')
+
+pytestmark = pytest.mark.performance
+
+TR = 2.0
+N_ROUNDS = 3
+
+
+def _copy_arrays(kwargs):
+    """Copy array arguments, so functions that work in place get the same input every round."""
+    return {
+        key: (val.copy() if isinstance(val, np.ndarray) else val) for key, val in kwargs.items()
+    }
+
+
+def _run_benchmark(benchmark, func, **kwargs):
+    """Time a function and record its peak memory usage."""
+    result = benchmark.pedantic(
+        func,
+        setup=lambda: ((), _copy_arrays(kwargs)),
+        rounds=N_ROUNDS,
+        iterations=1,
+    )
+
+    # Measure memory in a separate call, since tracing allocations slows the function down.
+    traced_kwargs = _copy_arrays(kwargs)
+    tracemalloc.start()
+    try:
+        func(**traced_kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    benchmark.extra_info['peak_memory_mb'] = peak / (1024**2)
+    return result
+
+
+@pytest.fixture(autouse=True)
+def _record_benchmark_size(benchmark, benchmark_size):
+    """Store the size of the synthetic data with each benchmark's results."""
+    benchmark.extra_info.update(benchmark_size)
+
+
+@pytest.fixture(scope='module')
+def synthetic_data(benchmark_size, tmp_path_factory):
+    """Generate synthetic NIfTI and CIFTI data of the requested size."""
+    n_voxels = benchmark_size['n_voxels']
+    n_volumes = benchmark_size['n_volumes']
+
+    tmpdir = tmp_path_factory.mktemp('benchmarks')
+    rng = np.random.default_rng(0)
+
+    # A shared signal gives the parcels nontrivial correlations.
+    signal = rng.standard_normal(n_volumes)
+    data_matrix = rng.standard_normal((n_voxels, n_volumes)) + signal[None, :] + 100
+    data_matrix = data_matrix.astype(np.float32)
+
+    sample_mask = rng.random(n_volumes) >= benchmark_size['censoring']
+    # Keep the first and last volumes, so there is always something to interpolate from.
+    sample_mask[[0, -1]] = True
+
+    confounds = pd.DataFrame(
+        rng.standard_normal((n_volumes, 36)),
+        columns=[f'confound{i}' for i in range(36)],
+    )
+
+    # NIfTI files: the mask covers the first n_voxels voxels of a cube.
+    side = int(np.ceil(n_voxels ** (1 / 3)))
+    shape = (side, side, side)
+    affine = np.diag([2, 2, 2, 1])
+    mask_arr = np.zeros(side**3, dtype=np.uint8)
+    mask_arr[:n_voxels] = 1
+    mask_arr = mask_arr.reshape(shape)
+    bold_arr = np.zeros(shape + (n_volumes,), dtype=np.float32)
+    bold_arr[mask_arr.astype(bool)] = data_matrix
+
+    mask_file = str(tmpdir / 'mask.nii.gz')
+    nb.Nifti1Image(mask_arr, affine).to_filename(mask_file)
+    bold_img = nb.Nifti1Image(bold_arr, affine)
+    bold_img.header.set_xyzt_units('mm', 'sec')
+    bold_img.header['pixdim'][4] = TR
+    nifti_file = str(tmpdir / 'bold.nii.gz')
+    bold_img.to_filename(nifti_file)
+
+    n_parcels = min(100, n_voxels)
+    atlas_arr = (np.arange(side**3) * n_parcels // side**3 + 1).reshape(shape).astype(np.int16)
+    atlas_file = str(tmpdir / 'atlas.nii.gz')
+    nb.Nifti1Image(atlas_arr, affine).to_filename(atlas_file)
+    atlas_labels_file = str(tmpdir / 'atlas_labels.tsv')
+    pd.DataFrame(
+        {
+            'index': np.arange(1, n_parcels + 1),
+            'label': [f'parcel{i}' for i in range(1, n_parcels + 1)],
+        }
+    ).to_csv(atlas_labels_file, sep='\t', index=False)
+
+    # CIFTI file: all vertices on the left cortical surface.
+    brain_models = nb.cifti2.BrainModelAxis.from_mask(
+        np.ones(n_voxels, dtype=bool),
+        name='CortexLeft',
+    )
+    series = nb.cifti2.SeriesAxis(start=0, step=TR, size=n_volumes)
+    cifti_img = nb.Cifti2Image(
+        data_matrix.T,
+        header=nb.cifti2.Cifti2Header.from_axes((series, brain_models)),
+    )
+    cifti_file = str(tmpdir / 'bold.dtseries.nii')
+    cifti_img.to_filename(cifti_file)
+
+    # Surface-like adjacency: each vertex is connected to its six nearest neighbors in a ring.
+    adjacency_matrix = np.zeros((n_voxels, n_voxels), dtype=bool)
+    for offset in (1, 2, 3):
+        idx = np.arange(n_voxels)
+        adjacency_matrix[idx, (idx + offset) % n_voxels] = True
+        adjacency_matrix[(idx + offset) % n_voxels, idx] = True
+
+    # Parcellated time series and a temporal mask with an "exact" column.
+    timeseries_file = str(tmpdir / 'timeseries.tsv')
+    parcel_data = data_matrix[: n_parcels * (n_voxels // n_parcels)].reshape(
+        n_parcels, -1, n_volumes
+    )
+    pd.DataFrame(
+        parcel_data.mean(axis=1).T,
+        columns=[f'parcel{i}' for i in range(1, n_parcels + 1)],
+    ).to_csv(timeseries_file, sep='\t', index=False)
+
+    temporal_mask_df = pd.DataFrame({'framewise_displacement': (~sample_mask).astype(int)})
+    low_motion_idx = np.where(sample_mask)[0]
+    exact_scan = low_motion_idx.size // 2
+    column_name = f'exact_{exact_scan}'
+    temporal_mask_df[column_name] = 0
+    temporal_mask_df.loc[low_motion_idx, column_name] = 1
+    temporal_mask_df.loc[rng.choice(low_motion_idx, exact_scan, replace=False), column_name] = 0
+    temporal_mask_file = str(tmpdir / 'temporal_mask.tsv')
+    temporal_mask_df.to_csv(temporal_mask_file, sep='\t', index=False)
+
+    return {
+        'tmpdir': tmpdir,
+        'data_matrix': data_matrix,
+        'sample_mask': sample_mask,
+        'confounds': confounds,
+        'adjacency_matrix': adjacency_matrix,
+        'nifti_file': nifti_file,
+        'mask_file': mask_file,
+        'atlas_file': atlas_file,
+        'atlas_labels_file': atlas_labels_file,
+        'cifti_file': cifti_file,
+        'timeseries_file': timeseries_file,
+        'temporal_mask_file': temporal_mask_file,
+    }
+
+
+def test_benchmark_denoise_with_nilearn(benchmark, synthetic_data):
+    """Benchmark xcp_d.utils.utils.denoise_with_nilearn."""
+    denoised = _run_benchmark(
+        benchmark,
+        denoise_with_nilearn,
+        preprocessed_bold=synthetic_data['data_matrix'].T,
+        confounds=synthetic_data['confounds'],
+        voxelwise_confounds=None,
+        sample_mask=synthetic_data['sample_mask'],
+        low_pass=0.08,
+        high_pass=0.01,
+        filter_order=2,
+        TR=TR,
+    )
+    assert denoised.shape == synthetic_data['data_matrix'].T.shape
+
+
+def test_benchmark_compute_alff(benchmark, synthetic_data):
+    """Benchmark xcp_d.utils.restingstate.compute_alff with censoring."""
+    alff = _run_benchmark(
+        benchmark,
+        compute_alff,
+        data_matrix=synthetic_data['data_matrix'],
+        low_pass=0.08,
+        high_pass=0.01,
+        TR=TR,
+        sample_mask=synthetic_data['sample_mask'],
+    )
+    assert alff.shape == (synthetic_data['data_matrix'].shape[0],)
+
+
+def test_benchmark_compute_2d_reho(benchmark, synthetic_data):
+    """Benchmark xcp_d.utils.restingstate.compute_2d_reho."""
+    reho = _run_benchmark(
+        benchmark,
+        compute_2d_reho,
+        datat=synthetic_data['data_matrix'],
+        adjacency_matrix=synthetic_data['adjacency_matrix'],
+    )
+    assert reho.shape == (synthetic_data['data_matrix'].shape[0],)
+
+
+def test_benchmark_compute_dvars(benchmark, synthetic_data):
+    """Benchmark xcp_d.utils.qcmetrics.compute_dvars."""
+    dvars, _ = _run_benchmark(
+        benchmark,
+        compute_dvars,
+        datat=synthetic_data['data_matrix'],
+    )
+    assert dvars.shape == (synthetic_data['data_matrix'].shape[1],)
+
+
+def test_benchmark_nifti_parcellate(benchmark, synthetic_data):
+    """Benchmark xcp_d.interfaces.connectivity.NiftiParcellate."""
+
+    def _parcellate():
+        return NiftiParcellate(
+            filtered_file=synthetic_data['nifti_file'],
+            mask=synthetic_data['mask_file'],
+            atlas=synthetic_data['atlas_file'],
+            atlas_labels=synthetic_data['atlas_labels_file'],
+        ).run()
+
+    with chdir(synthetic_data['tmpdir']):
+        results = _run_benchmark(benchmark, _parcellate)
+
+    assert os.path.isfile(results.outputs.timeseries)
+
+
+def test_benchmark_correlate_timeseries(benchmark, synthetic_data):
+    """Benchmark xcp_d.interfaces.connectivity.correlate_timeseries."""
+    correlations_df, correlations_exact = _run_benchmark(
+        benchmark,
+        correlate_timeseries,
+        timeseries=synthetic_data['timeseries_file'],
+        temporal_mask=synthetic_data['temporal_mask_file'],
+    )
+    assert correlations_df.shape[0] == correlations_df.shape[1]
+    assert len(correlations_exact) == 1
+
+
+@pytest.mark.parametrize('file_format', ['nifti', 'cifti'])
+def test_benchmark_write_ndata(benchmark, synthetic_data, file_format):
+    """Benchmark xcp_d.utils.write_save.write_ndata."""
+    if file_format == 'nifti':
+        template = synthetic_data['nifti_file']
+        filename = str(synthetic_data['tmpdir'] / 'out.nii.gz')
+    else:
+        template = synthetic_data['cifti_file']
+        filename = str(synthetic_data['tmpdir'] / 'out.dtseries.nii')
+
+    out_file = _run_benchmark(
+        benchmark,
+        write_ndata,
+        data_matrix=synthetic_data['data_matrix'],
+        template=template,
+        filename=filename,
+        mask=synthetic_data['mask_file'] if file_format == 'nifti' else None,
+        TR=TR,
+    )
+    assert os.path.isfile(out_file)
@@ -0,0 +1,55 @@
+"""Tests for the xcp_d.cli.benchmark module."""
+
+import subprocess
+
+import nibabel as nb
+import numpy as np
+import pandas as pd
+
+from xcp_d.cli import benchmark
+
+
+def test_make_synthetic_dataset(tmp_path):
+    """Check the synthetic dataset and the antsApplyTransforms stand-in."""
+    bids_dir = benchmark.make_synthetic_dataset(
+        tmp_path / 'data',
+        n_runs=2,
+        n_volumes=20,
+        voxel_size=8,
+        repetition_time=1.5,
+    )
+    func_dir = bids_dir / 'sub-01' / 'func'
+    bold_files = sorted(func_dir.glob('*_desc-preproc_bold.nii.gz'))
+    assert len(bold_files) == 2
+
+    bold_img = nb.load(bold_files[0])
+    assert bold_img.shape[3] == 20
+    assert np.allclose(bold_img.affine[:3, :3], np.diag([8, 8, 8]))
+
+    confounds_df = pd.read_table(
+        func_dir / 'sub-01_task-rest_run-1_desc-confounds_timeseries.tsv',
+    )
+    assert confounds_df.shape == (20, 36)
+    anat_dir = bids_dir / 'sub-01' / 'anat'
+    assert (anat_dir / 'sub-01_from-T1w_to-MNI152NLin6Asym_mode-image_xfm.h5').is_file()
+
+    stub_dir = benchmark.write_stubs(tmp_path / 'stubs')
+    t1w_file = anat_dir / 'sub-01_desc-preproc_T1w.nii.gz'
+    out_file = tmp_path / 'out.nii.gz'
+    subprocess.run(
+        [
+            f'{stub_dir}/antsApplyTransforms',
+            '--input',
+            str(t1w_file),
+            '--reference-image',
+            str(bold_files[0]),
+            '--interpolation',
+            'NearestNeighbor',
+            '--output',
+            str(out_file),
+            '--transform',
+            'identity',
+        ],
+        check=True,
+    )
+    assert nb.load(out_file).shape == bold_img.shape[:3]
@@ -0,0 +1,41 @@
+"""Tests for the xcp_d.cli.calibrate module."""
+
+import json
+
+import nibabel as nb
+import numpy as np
+import pytest
+from nipype.interfaces.base import Bunch
+from nipype.utils.filemanip import savepkl
+
+from xcp_d.cli import calibrate
+from xcp_d.utils import resources
+
+
+def test_calibrate(tmp_path):
+    """Check that a resource model is written from profiled working directories."""
+    bold_file = str(tmp_path / 'bold.nii.gz')
+    nb.Nifti1Image(np.zeros((4, 4, 4, 8), dtype=np.float32), np.eye(4)).to_filename(bold_file)
+
+    out_file = tmp_path / 'model' / 'resource_model.json'
+    with pytest.raises(ValueError, match='No resource profiles were found'):
+        calibrate.main([str(tmp_path), '-o', str(out_file)])
+
+    for i_run in range(3):
+        node_dir = tmp_path / 'work' / f'postprocess_{i_run}_wf' / 'regress_and_filter_bold'
+        node_dir.mkdir(parents=True)
+        savepkl(
+            str(node_dir / 'result_regress_and_filter_bold.pklz'),
+            Bunch(
+                runtime=Bunch(mem_peak_gb=1.0 + i_run, nthreads_max=1),
+                inputs={'preprocessed_bold': bold_file},
+            ),
+        )
+
+    calibrate.main([str(tmp_path / 'work'), '-o', str(out_file)])
+    with open(out_file) as fo:
+        model = json.load(fo)
+
+    # The calibrated model bounds the highest recorded peak
+    data_gb = resources.get_data_gb(bold_file)
+    assert resources.predict_mem_gb('denoise', data_gb, 1, model) >= 3.0 - 1e-6
@@ -0,0 +1,101 @@
+"""Tests for the xcp_d.cli.combineqc module."""
+
+import os
+
+import pandas as pd
+
+from xcp_d.cli import combineqc
+
+
+def _write_qc_file(out_dir, subject, mean_fd):
+    func_dir = os.path.join(out_dir, f'sub-{subject}', 'func')
+    os.makedirs(func_dir, exist_ok=True)
+    qc_file = os.path.join(func_dir, f'sub-{subject}_task-rest_desc-linc_qc.tsv')
+    pd.DataFrame({'sub': [subject], 'task': ['rest'], 'mean_fd': [mean_fd]}).to_csv(
+        qc_file,
+        sep='\t',
+        index=False,
+    )
+    return qc_file
+
+
+def test_combineqc(tmp_path, monkeypatch):
+    """Check that combineqc only rereads new or changed QC files."""
+    out_dir = tmp_path / 'xcp_d'
+    for i_subject, subject in enumerate(['01', '02', '03']):
+        _write_qc_file(out_dir, subject, mean_fd=i_subject / 10)
+
+    # Files that should be ignored
+    (out_dir / 'dataset_description.json').write_text('{}')
+    (out_dir / 'sub-01' / 'func' / 'sub-01_task-rest_motion.tsv').write_text('a\n1\n')
+
+    qc_files = combineqc.find_qc_files(str(out_dir), n_threads=2)
+    assert len(qc_files) == 3
+    assert all(f.endswith('_desc-linc_qc.tsv') for f in qc_files)
+
+    monkeypatch.chdir(tmp_path)
+    combineqc.main([str(out_dir), 'group', '--nthreads', '2'])
+    df = pd.read_table(tmp_path / 'group_allsubjects_qc.tsv')
+    assert df.shape == (3, 3)
+    assert (tmp_path / 'group_allsubjects_qc.json').is_file()
+
+    # Add a subject and modify another one
+    _write_qc_file(out_dir, '04', mean_fd=0.5)
+    changed_file = _write_qc_file(out_dir, '02', mean_fd=0.123456)
+    os.utime(changed_file, (0, 0))
+
+    read_files = []
+    read_table = pd.read_table
+
+    def _read_table(f, *args, **kwargs):
+        read_files.append(os.path.basename(f))
+        return read_table(f, *args, **kwargs)
+
+    monkeypatch.setattr(combineqc.pd, 'read_table', _read_table)
+    combineqc.main([str(out_dir), 'group'])
+    monkeypatch.setattr(combineqc.pd, 'read_table', read_table)
+
+    assert sorted(read_files) == [
+        'group_allsubjects_qc.tsv',
+        'sub-02_task-rest_desc-linc_qc.tsv',
+        'sub-04_task-rest_desc-linc_qc.tsv',
+    ]
+    df = pd.read_table(tmp_path / 'group_allsubjects_qc.tsv')
+    assert df.shape == (4, 3)
+    assert df['sub'].tolist() == [1, 2, 3, 4]
+    assert df['mean_fd'].tolist() == [0.0, 0.123456, 0.2, 0.5]
+
+    # A full rescan should give the same result
+    combineqc.main([str(out_dir), 'group', '--full-rescan'])
+    df2 = pd.read_table(tmp_path / 'group_allsubjects_qc.tsv')
+    pd.testing.assert_frame_equal(df, df2)
+
+
+def test_combineqc_cached_columns(tmp_path, monkeypatch):
+    """Check that cached QC tables keep their own columns and types."""
+    out_dir = tmp_path / 'xcp_d'
+    qc_file = _write_qc_file(out_dir, '01', mean_fd=0.1)
+    # An integer column, and a column with no values
+    pd.DataFrame(
+        {'sub': ['01'], 'task': ['rest'], 'n_dummy_scans': [2], 'mean_fd': [0.1], 'notes': [None]}
+    ).to_csv(qc_file, sep='\t', index=False)
+    other_file = _write_qc_file(out_dir, '02', mean_fd=0.2)
+
+    monkeypatch.chdir(tmp_path)
+    combineqc.main([str(out_dir), 'group'])
+
+    # The remaining file is restored from the combined table
+    os.remove(other_file)
+    combineqc.main([str(out_dir), 'group'])
+    incremental = (tmp_path / 'group_allsubjects_qc.tsv').read_text()
+
+    combineqc.main([str(out_dir), 'group', '--full-rescan'])
+    full = (tmp_path / 'group_allsubjects_qc.tsv').read_text()
+    assert incremental == full
+    assert full.splitlines()[0].split('\t') == [
+        'sub',
+        'task',
+        'n_dummy_scans',
+        'mean_fd',
+        'notes',
+    ]
@@ -28,6 +28,7 @@ def base_opts():
         'fmri_dir': Path('dset'),
         'output_dir': Path('out'),
         'work_dir': Path('work'),
+        'result_cache_dir': None,
         'analysis_level': 'participant',
         'datasets': {},
         'mode': 'linc',
@@ -52,6 +53,7 @@ def base_opts():
         'linc_qc': 'auto',
         'smoothing': 'auto',
         'combine_runs': 'auto',
+        'combine_runs_mode': 'full',
         'output_type': 'auto',
         'fs_license_file': None,
     }
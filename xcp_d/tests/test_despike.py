@@ -138,3 +138,58 @@ def test_cifti_despike(ds001419_data, tmp_path_factory):
     despiked_intent = nb.load(despiked_file).nifti_header.get_intent()
     original_intent = nb.load(boldfile).nifti_header.get_intent()
     assert despiked_intent[0] == original_intent[0]
+
+
+def test_despike_image(ds001419_data, tmp_path_factory):
+    """Test the Python despiking interface on NIfTI and CIFTI files.
+
+    Confirm that the spikes are reduced and that the headers are retained.
+    """
+    from xcp_d.interfaces.restingstate import DespikeImage
+
+    tempdir = tmp_path_factory.mktemp('test_despike_image')
+    TR = 0.8
+
+    for boldfile, maskfile in (
+        (ds001419_data['nifti_file'], ds001419_data['brain_mask_file']),
+        (ds001419_data['cifti_file'], None),
+    ):
+        file_data = read_ndata(boldfile, maskfile)
+        voxel_data = file_data[2, :]
+        voxel_data_mean = np.mean(voxel_data)
+        voxel_data_std = np.std(voxel_data)
+        voxel_data[2] = voxel_data_mean + 10 * voxel_data_std
+        voxel_data[3] = voxel_data_mean - 10 * voxel_data_std
+        spiked_max, spiked_min = np.max(voxel_data), np.min(voxel_data)
+        file_data[2, :] = voxel_data
+
+        extension = '.dtseries.nii' if maskfile is None else '.nii.gz'
+        spikedfile = os.path.join(tempdir, f'spiked{extension}')
+        write_ndata(
+            data_matrix=file_data,
+            mask=maskfile,
+            template=boldfile,
+            TR=TR,
+            filename=spikedfile,
+        )
+
+        despike = DespikeImage(in_file=spikedfile, n_threads=2)
+        if maskfile is not None:
+            despike.inputs.mask = maskfile
+
+        results = despike.run(cwd=tempdir)
+        despiked_file = results.outputs.out_file
+        assert os.path.isfile(despiked_file)
+        assert despiked_file.endswith(f'_despiked{extension}')
+
+        despiked_data = read_ndata(despiked_file, maskfile)
+        assert despiked_data.shape == file_data.shape
+        assert spiked_min < np.min(despiked_data[2, :])
+        assert spiked_max > np.max(despiked_data[2, :])
+
+        if maskfile is None:
+            despiked_intent = nb.load(despiked_file).nifti_header.get_intent()
+            original_intent = nb.load(boldfile).nifti_header.get_intent()
+            assert despiked_intent[0] == original_intent[0]
+        else:
+            assert np.array_equal(nb.load(despiked_file).affine, nb.load(boldfile).affine)
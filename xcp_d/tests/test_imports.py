@@ -0,0 +1,59 @@
+"""Tests for the modules imported by XCP-D's command-line interface and workflows.
+
+Plotting and Nilearn modules are slow to import, so they should only be imported by the
+interfaces and functions that use them, rather than when the CLI starts or the workflow is built.
+"""
+
+import subprocess
+import sys
+
+# Modules that should not be imported until a node that uses them runs
+HEAVY_MODULES = ['matplotlib.pyplot', 'seaborn', 'nilearn.maskers', 'nilearn.plotting']
+
+
+def _get_imported_modules(code):
+    """Run Python code with -X importtime and collect the cumulative import time of each module.
+
+    Returns
+    -------
+    result : :obj:`subprocess.CompletedProcess`
+        The completed process.
+    import_times : :obj:`dict`
+        Cumulative import time, in microseconds, of each imported module.
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        capture_output=True,
+        text=True,
+    )
+    import_times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+
+        _, cumulative, module = line.split('|')
+        if cumulative.strip().isdigit():
+            import_times[module.strip()] = int(cumulative)
+
+    return result, import_times
+
+
+def test_version_importtime():
+    """Check that `xcp_d --version` does not import PyBIDS or plotting modules."""
+    result, import_times = _get_imported_modules(
+        'import sys; sys.argv = ["xcp_d", "--version"]; from xcp_d.cli.run import main; main()'
+    )
+    assert result.returncode == 0, result.stderr
+    assert 'XCP-D v' in result.stdout
+
+    imported = set(import_times).intersection(HEAVY_MODULES + ['bids', 'nilearn'])
+    assert not imported, f'Imported by `xcp_d --version`: {sorted(imported)}'
+
+
+def test_workflow_importtime():
+    """Check that the workflow modules do not import plotting or Nilearn masker modules."""
+    result, import_times = _get_imported_modules('import xcp_d.workflows.base')
+    assert result.returncode == 0, result.stderr
+
+    imported = set(import_times).intersection(HEAVY_MODULES)
+    assert not imported, f'Imported by xcp_d.workflows.base: {sorted(imported)}'
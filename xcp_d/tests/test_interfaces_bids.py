@@ -1,5 +1,6 @@
 """Tests for xcp_d.interfaces.bids."""
 
+import json
 import os
 
 import pytest
@@ -100,3 +101,165 @@ def test_copy_atlas(tmp_path_factory):
     # The file should not be overwritten, so the contents shouldn't be "fake"
     with open(result.outputs.out_file) as fo:
         assert fo.read() != 'fake'
+
+
+def test_copy_derivative(tmp_path):
+    """Check that unchanged files are linked or copied without being recompressed."""
+    import gzip
+
+    in_file = str(tmp_path / 'in.nii.gz')
+    with gzip.open(in_file, 'wb', compresslevel=1) as fo:
+        fo.write(b'0' * 1000)
+
+    with open(in_file, 'rb') as fo:
+        in_bytes = fo.read()
+
+    # Writable files are hardlinked
+    out_file = str(tmp_path / 'out.nii.gz')
+    bids._copy_derivative(in_file, out_file)
+    assert os.path.samefile(in_file, out_file)
+
+    # Read-only files (e.g., from the result cache) are copied byte-for-byte
+    os.chmod(in_file, 0o444)
+    bids._copy_derivative(in_file, out_file)
+    assert not os.path.samefile(in_file, out_file)
+    with open(out_file, 'rb') as fo:
+        assert fo.read() == in_bytes
+
+    # Files are only decompressed when the compression changes
+    out_file = str(tmp_path / 'out.nii')
+    bids._copy_derivative(in_file, out_file)
+    with open(out_file, 'rb') as fo:
+        assert fo.read() == b'0' * 1000
+
+
+def test_derivatives_datasink(tmp_path):
+    """Check that unchanged NIfTIs are linked, while headers are still fixed when needed."""
+    import nibabel as nb
+    import numpy as np
+
+    source_file = str(
+        tmp_path
+        / 'sub-01'
+        / 'func'
+        / 'sub-01_task-rest_space-MNI152NLin6Asym_desc-preproc_bold.nii.gz'
+    )
+    img = nb.Nifti1Image(np.ones((2, 2, 2), dtype=np.float32), np.eye(4))
+    img.set_qform(np.eye(4), 1)
+    img.set_sform(np.eye(4), 1)
+    img.header.set_xyzt_units('mm')
+    in_file = str(tmp_path / 'alff.nii.gz')
+    img.to_filename(in_file)
+
+    def _sink(in_file, **kwargs):
+        return bids.DerivativesDataSink(
+            base_directory=str(tmp_path / 'out'),
+            source_file=source_file,
+            in_file=in_file,
+            dismiss_entities=['desc'],
+            statistic='alff',
+            suffix='boldmap',
+            Units='a.u.',
+            **kwargs,
+        ).run(cwd=tmp_path)
+
+    results = _sink(in_file)
+    assert results.outputs.out_file == str(
+        tmp_path
+        / 'out'
+        / 'sub-01'
+        / 'func'
+        / 'sub-01_task-rest_space-MNI152NLin6Asym_stat-alff_boldmap.nii.gz'
+    )
+    assert results.outputs.compression
+    assert results.outputs.fixed_hdr == [False]
+    assert os.path.samefile(in_file, results.outputs.out_file)
+    with open(results.outputs.out_meta) as fo:
+        assert json.load(fo) == {'Units': 'a.u.'}
+
+    # The first input was linked into the output directory, so write the next one elsewhere
+    img.set_sform(np.eye(4), 0)
+    in_file = str(tmp_path / 'alff_unaligned.nii.gz')
+    img.to_filename(in_file)
+    results = _sink(in_file)
+    assert results.outputs.fixed_hdr == [True]
+    assert not os.path.samefile(in_file, results.outputs.out_file)
+    assert int(nb.load(results.outputs.out_file).header['sform_code']) == 1
+
+    # Compression is only changed when requested
+    results = _sink(in_file, compress=False)
+    assert results.outputs.out_file.endswith('_stat-alff_boldmap.nii')
+    assert not results.outputs.compression
+    with open(results.outputs.out_file, 'rb') as fo:
+        assert fo.read(2) != b'\x1f\x8b'
+
+    assert int(nb.load(results.outputs.out_file).header['sform_code']) == 1
+
+
+def test_batch_derivatives_datasink(tmp_path):
+    """Check that BatchDerivativesDataSink writes one derivative per atlas, like a MapNode."""
+    in_files = []
+    for atlas in ['A', 'B']:
+        in_files.append(str(tmp_path / f'{atlas}.tsv'))
+        with open(in_files[-1], 'w') as fo:
+            fo.write(f'{atlas}\n1\n')
+
+    source_file = str(
+        tmp_path
+        / 'sub-01'
+        / 'func'
+        / 'sub-01_task-rest_space-MNI152NLin6Asym_desc-preproc_bold.nii.gz'
+    )
+    out_dir = tmp_path / 'out'
+    datasink = bids.BatchDerivativesDataSink(
+        iterfield=['segmentation', 'in_file', 'meta_dict'],
+        base_directory=str(out_dir),
+        source_file=source_file,
+        dismiss_entities=['desc'],
+        statistic='mean',
+        suffix='timeseries',
+        extension='.tsv',
+        segmentation=['A', 'B'],
+        in_file=in_files,
+        meta_dict=[{'Atlas': 'A'}, {'Atlas': 'B'}],
+        # Metadata
+        SamplingFrequency='TR',
+    )
+    results = datasink.run(cwd=tmp_path)
+
+    assert results.outputs.out_file == [
+        str(
+            out_dir
+            / 'sub-01'
+            / 'func'
+            / f'sub-01_task-rest_space-MNI152NLin6Asym_seg-{atlas}_stat-mean_timeseries.tsv'
+        )
+        for atlas in ['A', 'B']
+    ]
+    # Each derivative is prepared in its own directory
+    assert sorted(p.name for p in tmp_path.glob('_derivative*')) == [
+        '_derivative0',
+        '_derivative1',
+    ]
+    for atlas, out_file, out_meta in zip(
+        ['A', 'B'],
+        results.outputs.out_file,
+        results.outputs.out_meta,
+        strict=True,
+    ):
+        with open(out_file) as fo:
+            assert fo.read() == f'{atlas}\n1\n'
+
+        with open(out_meta) as fo:
+            metadata = json.load(fo)
+
+        assert metadata == {'Atlas': atlas, 'SamplingFrequency': 'TR'}
+
+    with pytest.raises(ValueError, match='same length'):
+        bids.BatchDerivativesDataSink(
+            iterfield=['segmentation', 'in_file'],
+            base_directory=str(out_dir),
+            source_file=source_file,
+            segmentation=['A'],
+            in_file=in_files,
+        ).run(cwd=tmp_path)
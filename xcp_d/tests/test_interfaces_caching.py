@@ -0,0 +1,108 @@
+"""Tests for xcp_d.interfaces.caching module."""
+
+import os
+
+from nipype.interfaces.base import File, SimpleInterface, TraitedSpec, traits
+
+from xcp_d.interfaces.caching import ResultCacheMixin, _ResultCacheInputSpec, get_file_hash
+from xcp_d.tests.utils import chdir
+
+
+class _ScaleInputSpec(_ResultCacheInputSpec):
+    in_file = File(exists=True, mandatory=True)
+    factor = traits.Int(mandatory=True)
+    n_threads = traits.Int(1, usedefault=True, nohash=True)
+
+
+class _ScaleOutputSpec(TraitedSpec):
+    out_file = File(exists=True)
+    factor = traits.Int()
+
+
+class _Scale(ResultCacheMixin, SimpleInterface):
+    """Multiply the number in a text file, counting how many times it actually runs."""
+
+    input_spec = _ScaleInputSpec
+    output_spec = _ScaleOutputSpec
+    n_runs = 0
+
+    def _compute(self, runtime):
+        type(self).n_runs += 1
+        with open(self.inputs.in_file) as fo:
+            value = int(fo.read())
+
+        self._results['out_file'] = os.path.join(runtime.cwd, 'scaled.txt')
+        with open(self._results['out_file'], 'w') as fo:
+            fo.write(str(value * self.inputs.factor))
+
+        self._results['factor'] = self.inputs.factor
+        return runtime
+
+
+def _run_scale(tmp_path, name, in_file, **kwargs):
+    run_dir = tmp_path / name
+    run_dir.mkdir()
+    with chdir(run_dir):
+        results = _Scale(in_file=in_file, **kwargs).run()
+
+    with open(results.outputs.out_file) as fo:
+        return results.outputs, fo.read()
+
+
+def test_result_cache(tmp_path):
+    """Check that results are reused only when the inputs' contents and parameters match."""
+    cache_dir = str(tmp_path / 'cache')
+    in_file = str(tmp_path / 'in.txt')
+    with open(in_file, 'w') as fo:
+        fo.write('2')
+
+    _Scale.n_runs = 0
+    outputs, value = _run_scale(tmp_path, 'run1', in_file, factor=3, cache_dir=cache_dir)
+    assert value == '6'
+    assert _Scale.n_runs == 1
+
+    # Same inputs in a new working directory, with a parameter that isn't hashed
+    outputs, value = _run_scale(
+        tmp_path, 'run2', in_file, factor=3, n_threads=4, cache_dir=cache_dir
+    )
+    assert value == '6'
+    assert outputs.factor == 3
+    assert outputs.out_file == str(tmp_path / 'run2' / 'scaled.txt')
+    assert _Scale.n_runs == 1
+
+    # A different parameter
+    _, value = _run_scale(tmp_path, 'run3', in_file, factor=4, cache_dir=cache_dir)
+    assert value == '8'
+    assert _Scale.n_runs == 2
+
+    # Different file contents
+    os.remove(in_file)
+    with open(in_file, 'w') as fo:
+        fo.write('5')
+
+    _, value = _run_scale(tmp_path, 'run4', in_file, factor=3, cache_dir=cache_dir)
+    assert value == '15'
+    assert _Scale.n_runs == 3
+
+    # No cache
+    _, value = _run_scale(tmp_path, 'run5', in_file, factor=3)
+    assert value == '15'
+    assert _Scale.n_runs == 4
+
+
+def test_get_file_hash(tmp_path):
+    """Check that recorded hashes are only used while the file is unchanged."""
+    cache_dir = str(tmp_path / 'cache')
+    in_file = str(tmp_path / 'in.txt')
+    with open(in_file, 'w') as fo:
+        fo.write('a')
+
+    first_hash = get_file_hash(in_file, cache_dir)
+    assert get_file_hash(in_file) == first_hash
+    assert os.path.isdir(os.path.join(cache_dir, 'hashes'))
+    assert get_file_hash(in_file, cache_dir) == first_hash
+
+    with open(in_file, 'w') as fo:
+        fo.write('bb')
+
+    assert get_file_hash(in_file, cache_dir) != first_hash
@@ -1,7 +1,10 @@
 """Tests for the xcp_d.interfaces.concatenation module."""
 
+import json
 import os
 
+import numpy as np
+import pandas as pd
 from nipype.interfaces.base import Undefined, isdefined
 
 from xcp_d.interfaces import concatenation
@@ -130,3 +133,60 @@ def test_concatenateinputs(ds001419_data, tmp_path_factory):
     assert os.path.isfile(out.temporal_mask)
     assert len(out.timeseries) == n_atlases
     assert all(os.path.isfile(f) for f in out.timeseries)
+
+
+def test_concatenateqc(tmp_path_factory):
+    """Test xcp_d.interfaces.concatenation.ConcatenateQC."""
+    from xcp_d.utils.qcmetrics import compute_moments
+
+    tmpdir = tmp_path_factory.mktemp('test_concatenateqc')
+    rng = np.random.default_rng(0)
+    qc_files, qc_stats_files, fds, dvars = [], [], [], []
+    for i_run in range(2):
+        fd = rng.random(20)
+        run_dvars = rng.random(20)
+        fds.append(fd)
+        dvars.append(run_dvars)
+
+        qc_file = str(tmpdir / f'sub-01_task-rest_run-{i_run + 1}_qc_bold.tsv')
+        pd.DataFrame(
+            {
+                'sub': ['01'],
+                'task': ['rest'],
+                'run': [i_run + 1],
+                'mean_fd': [fd.mean()],
+                'num_dummy_volumes': [2],
+                'coreg_dice': [0.9 + i_run / 100],
+            }
+        ).to_csv(qc_file, sep='\t', index=False)
+        qc_files.append(qc_file)
+
+        qc_stats_file = str(tmpdir / f'sub-01_task-rest_run-{i_run + 1}_qc_stats.json')
+        with open(qc_stats_file, 'w') as fo:
+            json.dump(
+                {
+                    'num_dummy_volumes': 2,
+                    'num_censored_volumes': 3,
+                    'num_retained_volumes': 17,
+                    'fd_dvars_initial': compute_moments(fd, run_dvars),
+                    'fd_dvars_final': compute_moments(fd, run_dvars),
+                    'relative_rms': {'n': 20, 'sum': 10.0, 'max': 1.0},
+                },
+                fo,
+            )
+        qc_stats_files.append(qc_stats_file)
+
+    interface = concatenation.ConcatenateQC(
+        name_source=str(tmpdir / 'sub-01_task-rest_desc-preproc_bold.nii.gz'),
+        qc_file=qc_files,
+        qc_stats=qc_stats_files,
+    )
+    results = interface.run(cwd=tmpdir)
+    qc_df = pd.read_table(results.outputs.qc_file)
+    assert qc_df.shape[0] == 1
+    assert 'run' not in qc_df.columns
+    assert np.isclose(qc_df.loc[0, 'mean_fd'], np.concatenate(fds).mean())
+    # Dummy volumes are removed before concatenation, as in the full workflow
+    assert qc_df.loc[0, 'num_dummy_volumes'] == 0
+    # Registration metrics come from the first run
+    assert np.isclose(qc_df.loc[0, 'coreg_dice'], 0.9)
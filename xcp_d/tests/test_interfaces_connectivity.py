@@ -0,0 +1,173 @@
+"""Tests for xcp_d.interfaces.connectivity module."""
+
+import os
+
+import nibabel as nb
+import numpy as np
+import pandas as pd
+import pytest
+
+from xcp_d.interfaces import connectivity
+from xcp_d.interfaces.connectivity import CiftiParcellate, reconcile_parcel_labels
+
+
+def _make_cifti_files(tmpdir, n_volumes=10):
+    """Write a small dtseries file and a dlabel atlas with three parcels."""
+    n_vertices = 12
+    brain_models = nb.cifti2.BrainModelAxis.from_mask(
+        np.ones(n_vertices, dtype=bool),
+        name='CortexLeft',
+    )
+    rng = np.random.default_rng(0)
+    data = rng.standard_normal((n_volumes, n_vertices)).astype(np.float32) + 10
+    # Vertices 8-11 (parcel 3) are mostly empty, and vertex 0 (parcel 1) has a NaN.
+    data[:, 8:11] = 0
+    data[3, 0] = np.nan
+
+    series = nb.cifti2.SeriesAxis(start=0, step=2, size=n_volumes)
+    bold_img = nb.Cifti2Image(data, header=(series, brain_models))
+    bold_img.nifti_header.set_intent('ConnDenseSeries')
+    bold_file = os.path.join(tmpdir, 'bold.dtseries.nii')
+    bold_img.to_filename(bold_file)
+
+    keys = np.repeat([1, 2, 3], 4)
+    label_table = {
+        0: ('???', (0, 0, 0, 0)),
+        1: ('parcel_a', (1, 0, 0, 1)),
+        2: ('parcel_b', (0, 1, 0, 1)),
+        3: ('parcel_c', (0, 0, 1, 1)),
+        4: ('parcel_unused', (1, 1, 1, 1)),
+    }
+    labels = nb.cifti2.LabelAxis(['atlas'], [label_table])
+    atlas_img = nb.Cifti2Image(keys[None, :].astype(np.float32), header=(labels, brain_models))
+    atlas_img.nifti_header.set_intent('ConnDenseLabel')
+    atlas_file = os.path.join(tmpdir, 'atlas.dlabel.nii')
+    atlas_img.to_filename(atlas_file)
+
+    atlas_labels_file = os.path.join(tmpdir, 'atlas.tsv')
+    pd.DataFrame(
+        {
+            'index': [1, 2, 3],
+            'label': ['A', 'B', 'C'],
+            'cifti_label': ['parcel_a', 'parcel_b', 'parcel_c'],
+        }
+    ).to_csv(atlas_labels_file, sep='\t', index=False)
+    return data, bold_file, atlas_file, atlas_labels_file
+
+
+def test_cifti_parcellate(tmp_path_factory):
+    """Check coverage, masking, and weighted means against values computed by hand."""
+    tmpdir = tmp_path_factory.mktemp('test_cifti_parcellate')
+    data, bold_file, atlas_file, atlas_labels_file = _make_cifti_files(tmpdir)
+
+    results = CiftiParcellate(
+        in_file=bold_file,
+        atlas_files=[atlas_file],
+        atlas_labels_files=[atlas_labels_file],
+        min_coverage=0.5,
+    ).run(cwd=tmpdir)
+
+    # Vertex 0 has a NaN, and vertices 8-10 are all zeros
+    mask = nb.load(results.outputs.vertexwise_coverage).get_fdata()[0, :]
+    expected_mask = np.ones(12)
+    expected_mask[[0, 8, 9, 10]] = 0
+    np.testing.assert_array_equal(mask, expected_mask)
+
+    coverage_df = pd.read_table(results.outputs.coverage_tsv[0])
+    assert list(coverage_df.columns) == ['A', 'B', 'C']
+    np.testing.assert_allclose(coverage_df.to_numpy()[0], [0.75, 1, 0.25])
+
+    parcellated_img = nb.load(results.outputs.parcellated_cifti[0])
+    assert results.outputs.parcellated_cifti[0].endswith('.ptseries.nii')
+    assert parcellated_img.shape == (data.shape[0], 3)
+
+    timeseries_df = pd.read_table(results.outputs.parcellated_tsv[0])
+    np.testing.assert_allclose(timeseries_df['A'], data[:, 1:4].mean(axis=1), rtol=1e-5)
+    np.testing.assert_allclose(timeseries_df['B'], data[:, 4:8].mean(axis=1), rtol=1e-5)
+    # Parcel C's coverage is below the threshold
+    assert timeseries_df['C'].isna().all()
+
+    # Parcellate a scalar map with the BOLD file's coverage
+    scalar_img = nb.Cifti2Image(
+        data[:1],
+        header=(nb.cifti2.ScalarAxis(['reho']), nb.load(bold_file).header.get_axis(1)),
+    )
+    scalar_file = os.path.join(tmpdir, 'reho.dscalar.nii')
+    scalar_img.to_filename(scalar_file)
+    scalar_dir = tmpdir / 'scalar'
+    scalar_dir.mkdir()
+    scalar_results = CiftiParcellate(
+        in_file=scalar_file,
+        atlas_files=[atlas_file],
+        atlas_labels_files=[atlas_labels_file],
+        min_coverage=0.5,
+        vertexwise_coverage=results.outputs.vertexwise_coverage,
+        coverage_cifti=results.outputs.coverage_cifti,
+    ).run(cwd=scalar_dir)
+    assert scalar_results.outputs.parcellated_cifti[0].endswith('.pscalar.nii')
+    scalar_df = pd.read_table(scalar_results.outputs.parcellated_tsv[0])
+    np.testing.assert_allclose(scalar_df['A'], data[0, 1:4].mean(), rtol=1e-5)
+
+
+def test_reconcile_parcel_labels(tmp_path, monkeypatch):
+    """Check label matching, missing-label errors, and reuse of cached reconciliations."""
+    atlas_labels_file = str(tmp_path / 'atlas.tsv')
+    pd.DataFrame(
+        {
+            'index': [0, 2, 1, 3],
+            'label': ['background', 'B', 'A', 'C'],
+            'cifti_label': ['???', 'parcel_b', 'parcel_a', 'parcel_c'],
+        }
+    ).to_csv(atlas_labels_file, sep='\t', index=False)
+
+    labels = reconcile_parcel_labels(atlas_labels_file, ['parcel_c', 'parcel_a', 'parcel_b'])
+    assert labels.tolist() == ['C', 'A', 'B']
+
+    # The same atlas and parcels are reconciled from the cache
+    def _fail(atlas_labels):
+        raise AssertionError('Atlas labels file was read again')
+
+    with monkeypatch.context() as m:
+        m.setattr(connectivity, '_get_parcel_label_mapper', _fail)
+        labels = reconcile_parcel_labels(atlas_labels_file, ['parcel_c', 'parcel_a', 'parcel_b'])
+        assert labels.tolist() == ['C', 'A', 'B']
+
+    with pytest.raises(ValueError, match="Missing CIFTI labels.*'parcel_d'"):
+        reconcile_parcel_labels(atlas_labels_file, ['parcel_a', 'parcel_b', 'parcel_d'])
+
+    with pytest.raises(ValueError, match="Missing atlas labels.*'parcel_c'"):
+        reconcile_parcel_labels(atlas_labels_file, ['parcel_a', 'parcel_b'])
+
+
+def test_tsv_connect_runs(tmp_path):
+    """Check that pooled run statistics reproduce the correlations of the concatenated runs."""
+    rng = np.random.default_rng(0)
+    columns = ['A', 'B', 'C', 'D']
+    timeseries_files, temporal_mask_files, retained = [], [], []
+    for i_run, n_volumes in enumerate((30, 25)):
+        timeseries_df = pd.DataFrame(rng.standard_normal((n_volumes, 4)), columns=columns)
+        # Parcels without data in some volumes, and a parcel with no data at all
+        timeseries_df.iloc[::4, 1] = np.nan
+        timeseries_df['D'] = np.nan
+        timeseries_files.append(str(tmp_path / f'run-{i_run}_timeseries.tsv'))
+        timeseries_df.to_csv(timeseries_files[-1], sep='\t', index=False, na_rep='n/a')
+
+        censored = np.zeros(n_volumes, dtype=int)
+        censored[rng.choice(n_volumes, 5, replace=False)] = 1
+        temporal_mask_files.append(str(tmp_path / f'run-{i_run}_outliers.tsv'))
+        pd.DataFrame({'framewise_displacement': censored}).to_csv(
+            temporal_mask_files[-1],
+            sep='\t',
+            index=False,
+        )
+        retained.append(timeseries_df.loc[censored == 0])
+
+    results = connectivity.TSVConnectRuns(
+        timeseries=timeseries_files,
+        temporal_mask=temporal_mask_files,
+    ).run(cwd=tmp_path)
+
+    correlations_df = pd.read_table(results.outputs.correlations, index_col='Node')
+    expected = pd.concat(retained, ignore_index=True).corr()
+    np.testing.assert_allclose(correlations_df.to_numpy(), expected.to_numpy(), atol=1e-10)
+    assert correlations_df['D'].isna().all()
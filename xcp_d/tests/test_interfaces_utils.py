@@ -2,10 +2,12 @@
 
 import os
 
+import h5py
 import nibabel as nb
 import numpy as np
+import pandas as pd
 
-from xcp_d.interfaces.utils import ConvertTo32
+from xcp_d.interfaces.utils import ABCCQC, ConvertTo32
 
 
 def test_conversion_to_32bit_nifti(ds001419_data, tmp_path_factory):
@@ -108,3 +110,54 @@ def test_conversion_to_32bit_cifti(ds001419_data, tmp_path_factory):
     assert float32_img.dataobj.dtype == np.float32
     int32_img = nb.load(int32_file)
     assert int32_img.dataobj.dtype == np.int32
+
+
+def test_abccqc_layouts(tmp_path_factory):
+    """Check that the compact ABCC QC layout stores the same values as the legacy layout."""
+    tmpdir = tmp_path_factory.mktemp('test_abccqc_layouts')
+    TR = 0.8
+    fd = np.random.default_rng(0).uniform(0, 1.2, size=50)
+    fd[0] = 0
+    motion_file = os.path.join(tmpdir, 'sub-01_task-rest_motion.tsv')
+    pd.DataFrame({'framewise_displacement': fd}).to_csv(motion_file, sep='\t', index=False)
+
+    qc_files = {}
+    for layout in ['legacy', 'compact']:
+        layout_dir = tmpdir / layout
+        layout_dir.mkdir()
+        results = ABCCQC(motion_file=motion_file, TR=TR, layout=layout).run(cwd=layout_dir)
+        qc_files[layout] = results.outputs.qc_file
+
+    statistics = [
+        'threshold',
+        'total_frame_count',
+        'remaining_total_frame_count',
+        'remaining_seconds',
+        'remaining_frame_mean_FD',
+    ]
+    thresholds = np.around(np.linspace(0, 1, 101), 2)
+    with (
+        h5py.File(qc_files['legacy'], 'r') as legacy,
+        h5py.File(qc_files['compact'], 'r') as compact,
+    ):
+        assert sorted(compact['dcan_motion'].keys()) == ['binary_mask', 'summary', 'thresholds']
+        assert compact['dcan_motion/thresholds'].shape == (101,)
+        assert compact['dcan_motion/binary_mask'].shape == (101, fd.size)
+        assert compact['dcan_motion/summary'].shape == (101, len(statistics))
+        assert list(compact['dcan_motion/summary'].attrs['columns']) == statistics
+        assert np.array_equal(compact['dcan_motion/thresholds'][()], thresholds)
+
+        binary_masks = compact['dcan_motion/binary_mask'][()]
+        summary = compact['dcan_motion/summary'][()]
+        for i_thresh, thresh in enumerate(thresholds):
+            group = legacy[f'dcan_motion/fd_{thresh}']
+            assert sorted(group.keys()) == sorted(['skip', 'binary_mask', *statistics])
+            assert group['skip'][()] == 0
+            assert np.array_equal(group['binary_mask'][()], (fd > thresh).astype(float))
+            assert np.array_equal(binary_masks[i_thresh], group['binary_mask'][()])
+            assert group['total_frame_count'][()] == fd.size
+            assert group['remaining_total_frame_count'][()] == np.sum(fd <= thresh)
+            assert np.isclose(group['remaining_seconds'][()], np.sum(fd <= thresh) * TR)
+            assert np.isclose(group['remaining_frame_mean_FD'][()], fd[fd <= thresh].mean())
+            for i_stat, statistic in enumerate(statistics):
+                assert np.isclose(summary[i_thresh, i_stat], group[statistic][()])
@@ -4,12 +4,14 @@ import os
 import re
 import tempfile
 
+import nibabel as nb
 import numpy as np
 from nipype.pipeline import engine as pe
 from templateflow.api import get as get_template
 
 from xcp_d.interfaces.nilearn import Smooth
-from xcp_d.interfaces.workbench import CiftiSmooth
+from xcp_d.interfaces.workbench import CiftiSmooth, SmoothCifti
+from xcp_d.utils import smoothing
 from xcp_d.utils.utils import fwhm2sigma
 
 
@@ -149,3 +151,96 @@ def test_smoothing_cifti(ds001419_data, tmp_path_factory, sigma_lx=None):
     out_file_smoothness = np.sum(out_file_smoothness)
 
     assert in_file_smoothness < out_file_smoothness
+
+
+def _write_grid_surface(filename, n_side=10, spacing=2.0):
+    """Write a flat, triangulated square grid as a GIFTI surface."""
+    x, y = np.meshgrid(np.arange(n_side), np.arange(n_side), indexing='ij')
+    coords = np.column_stack((x.ravel(), y.ravel(), np.zeros(x.size))) * spacing
+    idx = np.arange(x.size).reshape(n_side, n_side)
+    lower_left = idx[:-1, :-1].ravel()
+    lower_right = idx[1:, :-1].ravel()
+    upper_left = idx[:-1, 1:].ravel()
+    upper_right = idx[1:, 1:].ravel()
+    faces = np.vstack(
+        (
+            np.column_stack((lower_left, lower_right, upper_left)),
+            np.column_stack((lower_right, upper_right, upper_left)),
+        )
+    )
+    surf_img = nb.gifti.GiftiImage(
+        darrays=[
+            nb.gifti.GiftiDataArray(
+                coords.astype(np.float32),
+                intent='NIFTI_INTENT_POINTSET',
+            ),
+            nb.gifti.GiftiDataArray(faces.astype(np.int32), intent='NIFTI_INTENT_TRIANGLE'),
+        ]
+    )
+    surf_img.to_filename(filename)
+    return x.size
+
+
+def test_smooth_cifti(tmp_path, monkeypatch):
+    """Check the sparse CIFTI smoothing kernel on synthetic surfaces and volumes."""
+    surf_file = str(tmp_path / 'grid.surf.gii')
+    n_vertices = _write_grid_surface(surf_file)
+
+    # Leave out a few vertices, as if they were in the medial wall
+    vertex_mask = np.ones(n_vertices, dtype=bool)
+    vertex_mask[:5] = False
+    volume_mask = np.zeros((6, 6, 6), dtype=bool)
+    volume_mask[1:5, 1:5, 1:5] = True
+    brain_models = (
+        nb.cifti2.BrainModelAxis.from_mask(vertex_mask, name='CortexLeft')
+        + nb.cifti2.BrainModelAxis.from_mask(vertex_mask, name='CortexRight')
+        + nb.cifti2.BrainModelAxis.from_mask(volume_mask, name='thalamus_left', affine=np.eye(4))
+    )
+    n_grayordinates = len(brain_models)
+
+    # An impulse on each structure, on top of a constant
+    data = np.full((2, n_grayordinates), 10, dtype=np.float32)
+    impulses = [50, vertex_mask.sum() + 50, 2 * vertex_mask.sum() + 30]
+    data[1, impulses] = 20
+    scalar_img = nb.Cifti2Image(data, header=(nb.cifti2.ScalarAxis(['a', 'b']), brain_models))
+    scalar_img.nifti_header.set_intent('ConnDenseScalar')
+    in_file = str(tmp_path / 'alff.dscalar.nii')
+    scalar_img.to_filename(in_file)
+
+    kernel_dir = str(tmp_path / 'kernels')
+    results = SmoothCifti(
+        in_file=in_file,
+        sigma_surf=2.0,
+        sigma_vol=2.0,
+        left_surf=surf_file,
+        right_surf=surf_file,
+        kernel_dir=kernel_dir,
+    ).run(cwd=str(tmp_path))
+
+    smoothed_img = nb.load(results.outputs.out_file)
+    assert smoothed_img.nifti_header.get_intent()[0] == 'ConnDenseScalar'
+    smoothed_data = smoothed_img.get_fdata()
+    # Constant data are unchanged, and each impulse is spread over its neighbors
+    np.testing.assert_allclose(smoothed_data[0], 10, rtol=1e-5)
+    assert np.all(smoothed_data[1, impulses] < 20)
+    assert np.all(smoothed_data[1, impulses] > 10)
+    assert np.sum(smoothed_data[1] > 10 + 1e-4) > len(impulses)
+
+    # The kernel is reused from disk in a new process, instead of being rebuilt
+    assert len(os.listdir(os.path.join(kernel_dir, 'kernels'))) == 1
+    monkeypatch.setattr(smoothing, '_KERNEL_CACHE', {})
+
+    def _fail(*args, **kwargs):
+        raise AssertionError('Smoothing kernel was rebuilt')
+
+    monkeypatch.setattr(smoothing, 'get_cifti_kernel', _fail)
+    kernel = smoothing.load_cifti_kernel(
+        brain_models,
+        left_surf=surf_file,
+        right_surf=surf_file,
+        sigma_surf=2.0,
+        sigma_vol=2.0,
+        kernel_dir=kernel_dir,
+    )
+    assert kernel.shape == (n_grayordinates, n_grayordinates)
+    np.testing.assert_allclose(np.asarray(kernel.sum(axis=1)).ravel(), 1, rtol=1e-5)
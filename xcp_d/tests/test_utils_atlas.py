@@ -16,6 +16,16 @@ def test_get_atlas_names():
     assert len(selected_atlases) == 2
 
 
+def test_collect_atlases_missing_dataset(tmp_path):
+    """Check that a missing atlas dataset raises the same error as BIDSLayout."""
+    with pytest.raises(ValueError, match='BIDS root does not exist'):
+        atlas.collect_atlases(
+            datasets={'missing': str(tmp_path / 'missing')},
+            atlases=['Gordon'],
+            file_format='nifti',
+        )
+
+
 def test_collect_atlases(datasets, caplog, tmp_path_factory):
     """Test xcp_d.utils.atlas.collect_atlases."""
     schaefer_dset = datasets['schaefer100']
@@ -121,3 +131,29 @@ def test_collect_atlases(datasets, caplog, tmp_path_factory):
         bids_filters={},
     )
     assert 'TEST' in atlas_cache
+
+
+def test_collect_atlases_cache(tmp_path_factory):
+    """Test that collect_atlases reuses atlas dataset indices."""
+    tmpdir = tmp_path_factory.mktemp('test_collect_atlases_cache')
+    atlas_datasets = {'xcpdatlases': str(load_data('atlases'))}
+
+    kwargs = {
+        'datasets': atlas_datasets,
+        'atlases': ['Gordon'],
+        'file_format': 'nifti',
+        'bids_filters': {},
+        'database_dir': tmpdir,
+    }
+    atlas_cache = atlas.collect_atlases(**kwargs)
+    n_misses = atlas._get_atlas_layout.cache_info().misses
+    assert len(list(tmpdir.glob('atlas_*'))) == 1
+
+    # The dataset hasn't changed, so it isn't indexed again.
+    assert atlas.collect_atlases(**kwargs) == atlas_cache
+    assert atlas._get_atlas_layout.cache_info().misses == n_misses
+
+    # The persistent database is reused after the in-memory cache is cleared.
+    atlas._get_atlas_layout.cache_clear()
+    assert atlas.collect_atlases(**kwargs) == atlas_cache
+    assert len(list(tmpdir.glob('atlas_*'))) == 1
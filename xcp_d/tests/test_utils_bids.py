@@ -477,3 +477,234 @@ def test_group_across_runs():
         '/path/sub-01_task-rest_dir-LR_run-2_bold.nii.gz',
         '/path/sub-01_task-rest_dir-RL_run-2_bold.nii.gz',
     ]
+
+
+def test_update_layout_index(tmp_path_factory):
+    """Test update_layout_index and get_layout_index_database."""
+    tmpdir = tmp_path_factory.mktemp('test_update_layout_index')
+    bids_dir = tmpdir / 'dset'
+    index_dir = tmpdir / 'index'
+    bids_dir.mkdir()
+    description = {
+        'Name': 'Test',
+        'BIDSVersion': '1.9.0',
+        'DatasetType': 'derivative',
+        'GeneratedBy': [{'Name': 'fMRIPrep'}],
+    }
+    (bids_dir / 'dataset_description.json').write_text(json.dumps(description))
+    for subject in ['01', '02']:
+        func_dir = bids_dir / f'sub-{subject}' / 'func'
+        func_dir.mkdir(parents=True)
+        (func_dir / f'sub-{subject}_task-rest_desc-preproc_bold.nii.gz').touch()
+
+    assert not xbids.is_layout_index(index_dir)
+    assert xbids.update_layout_index(bids_dir, index_dir) == ['01', '02']
+    assert xbids.is_layout_index(index_dir)
+    # Nothing changed, so nothing is re-indexed.
+    assert xbids.update_layout_index(bids_dir, index_dir) == []
+
+    database = xbids.get_layout_index_database(index_dir, bids_dir, ['01'])
+    layout = BIDSLayout(str(bids_dir), database_path=database, reset_database=False)
+    assert layout.get_subjects() == ['01']
+
+    # The index can only be used for one subject at a time.
+    assert xbids.get_layout_index_database(index_dir, bids_dir, ['01', '02']) is None
+
+    # Adding a file to one subject only re-indexes that subject.
+    func_dir = bids_dir / 'sub-02' / 'func'
+    (func_dir / 'sub-02_task-rest_run-2_desc-preproc_bold.nii.gz').touch()
+    mtime = os.stat(func_dir).st_mtime + 10
+    os.utime(func_dir, (mtime, mtime))
+    old_database = [p for p in index_dir.iterdir() if p.name.startswith('sub-02')][0]
+    assert xbids.get_layout_index_database(index_dir, bids_dir, ['02']) is None
+    assert xbids.update_layout_index(bids_dir, index_dir) == ['02']
+    assert xbids.get_layout_index_database(index_dir, bids_dir, ['02']) is not None
+
+    # Replaced databases are only deleted by the next update,
+    # since running jobs may have read the old manifest.
+    assert old_database.is_dir()
+    assert xbids.update_layout_index(bids_dir, index_dir) == []
+    assert not old_database.exists()
+
+    # Updating one subject leaves the others in the index,
+    # but a change to the top-level files means they must be re-indexed before they are used.
+    (bids_dir / 'dataset_description.json').write_text(json.dumps({**description, 'Name': 'A'}))
+    mtime = os.stat(bids_dir / 'dataset_description.json').st_mtime + 10
+    os.utime(bids_dir / 'dataset_description.json', (mtime, mtime))
+    assert xbids.update_layout_index(bids_dir, index_dir, participant_label=['01']) == ['01']
+    assert xbids.get_layout_index_database(index_dir, bids_dir, ['01']) is not None
+    assert xbids.get_layout_index_database(index_dir, bids_dir, ['02']) is None
+    assert len([p for p in index_dir.iterdir() if p.name.startswith('sub-02')]) == 1
+
+    # Removed subjects are dropped from the index.
+    shutil.rmtree(bids_dir / 'sub-01')
+    assert xbids.update_layout_index(bids_dir, index_dir) == ['02']
+    assert xbids.get_layout_index_database(index_dir, bids_dir, ['01']) is None
+    assert xbids.update_layout_index(bids_dir, index_dir) == []
+    assert [p.name.split('_')[0] for p in index_dir.iterdir() if p.name.startswith('sub-')] == [
+        'sub-02'
+    ]
+
+
+def test_subject_file_index(datasets):
+    """Test that SubjectFileIndex collects the same files as the BIDSLayout."""
+    bids_dir = datasets['ds001419']
+    layout = BIDSLayout(bids_dir, validate=False)
+    subject_layout = xbids.SubjectFileIndex(layout, '01')
+
+    query = {'datatype': 'func', 'desc': ['preproc', None], 'suffix': 'bold'}
+    assert subject_layout.get(return_type='file', **query) == layout.get(
+        return_type='file', subject='01', **query
+    )
+    assert subject_layout.get_res(**query) == layout.get_res(subject='01', **query)
+
+    for file_format in ['nifti', 'cifti']:
+        subj_data = xbids.collect_data(
+            layout=layout,
+            input_type='fmriprep',
+            participant_label='01',
+            bids_filters=None,
+            file_format=file_format,
+        )
+        assert subj_data == xbids.collect_data(
+            layout=subject_layout,
+            input_type='fmriprep',
+            participant_label='01',
+            bids_filters=None,
+            file_format=file_format,
+        )
+
+        target_space = 'MNI152NLin6Asym'
+        for bold_file in subj_data['bold']:
+            run_data = xbids.collect_run_data(layout, bold_file, file_format, target_space)
+            assert run_data == xbids.collect_run_data(
+                subject_layout, bold_file, file_format, target_space
+            )
+
+    assert xbids.collect_morphometry_data(layout, '01', None) == (
+        xbids.collect_morphometry_data(subject_layout, '01', None)
+    )
+
+
+def test_subject_file_index_synthetic(tmp_path):
+    """Test that SubjectFileIndex queries match the BIDSLayout's on a small dataset."""
+    from bids.layout import Query
+
+    bids_dir = tmp_path / 'dset'
+    bids_dir.mkdir()
+    (bids_dir / 'dataset_description.json').write_text(
+        json.dumps({'Name': 'Test', 'BIDSVersion': '1.9.0', 'DatasetType': 'derivative'})
+    )
+    for subject in ['01', '02']:
+        anat_dir = bids_dir / f'sub-{subject}' / 'anat'
+        anat_dir.mkdir(parents=True)
+        (anat_dir / f'sub-{subject}_desc-preproc_T1w.nii.gz').touch()
+        func_dir = bids_dir / f'sub-{subject}' / 'func'
+        func_dir.mkdir(parents=True)
+        for run, res in [('1', '2'), ('2', '1')]:
+            prefix = f'sub-{subject}_task-rest_run-{run}'
+            (
+                func_dir / f'{prefix}_space-MNI152NLin6Asym_res-{res}_desc-preproc_bold.nii.gz'
+            ).touch()
+            (func_dir / f'{prefix}_desc-confounds_timeseries.tsv').touch()
+            (func_dir / f'{prefix}_boldref.nii.gz').touch()
+
+    layout = BIDSLayout(
+        str(bids_dir),
+        validate=False,
+        config=['bids', 'derivatives', str(load_data('xcp_d_bids_config2.json'))],
+    )
+    subject_layout = xbids.SubjectFileIndex(layout, '01')
+
+    queries = [
+        {'suffix': 'bold'},
+        {'suffix': 'bold', 'run': '01'},
+        {'suffix': 'bold', 'run': [1, '2']},
+        {'suffix': 'bold', 'res': 2},
+        {'desc': ['preproc', None], 'extension': 'nii.gz'},
+        {'datatype': 'func', 'space': Query.NONE},
+        {'datatype': 'func', 'space': Query.ANY, 'extension': '.nii.gz'},
+        {'suffix': 'boldref', 'desc': Query.OPTIONAL},
+        {'suffix': 'timeseries', 'run': 3},
+    ]
+    for query in queries:
+        assert subject_layout.get(return_type='file', **query) == layout.get(
+            return_type='file', subject='01', **query
+        )
+        assert sorted(subject_layout.get_res(**query)) == sorted(
+            layout.get_res(subject='01', **query)
+        )
+
+    # Filters that aren't entities
+    with pytest.raises(ValueError, match='not a recognized entity'):
+        subject_layout.get(suffix='bold', foo='bar')
+
+    with pytest.raises(ValueError, match='not a recognized entity'):
+        layout.get(subject='01', suffix='bold', foo='bar')
+
+    for invalid_filters in ['drop', 'allow']:
+        assert subject_layout.get(
+            return_type='file', suffix='bold', foo='bar', invalid_filters=invalid_filters
+        ) == layout.get(
+            return_type='file',
+            subject='01',
+            suffix='bold',
+            foo='bar',
+            invalid_filters=invalid_filters,
+        )
+
+    bold_files = subject_layout.get(return_type='file', suffix='bold')
+    nearest_queries = [
+        {'suffix': 'boldref'},
+        {'suffix': 'timeseries', 'desc': 'confounds', 'extension': '.tsv'},
+        {'suffix': 'T1w', 'strict': False},
+        {'suffix': 'T1w', 'full_search': True},
+        {'suffix': 'boldref', 'run': 2, 'strict': False, 'all_': True},
+    ]
+    for bold_file in bold_files:
+        for query in nearest_queries:
+            assert subject_layout.get_nearest(bold_file, **query) == layout.get_nearest(
+                bold_file, **query
+            )
+
+
+def test_subject_file_index_get_nearest(tmp_path):
+    """Check that SubjectFileIndex.get_nearest searches folders as PyBIDS does."""
+    bids_dir = tmp_path / 'bids'
+    (bids_dir / 'sub-01' / 'func').mkdir(parents=True)
+    (bids_dir / 'dataset_description.json').write_text(
+        json.dumps(
+            {
+                'Name': 'Test',
+                'BIDSVersion': '1.9.0',
+                'DatasetType': 'derivative',
+                'GeneratedBy': [{'Name': 'fMRIPrep'}],
+            }
+        )
+    )
+    bold_file = bids_dir / 'sub-01' / 'func' / 'sub-01_task-rest_run-1_bold.nii.gz'
+    for path in [
+        bold_file,
+        # The only boldref in the BOLD file's folder is from another run
+        bids_dir / 'sub-01' / 'func' / 'sub-01_task-rest_run-2_boldref.nii.gz',
+        # A parent folder has a boldref that would match strictly
+        bids_dir / 'sub-01' / 'sub-01_task-rest_boldref.nii.gz',
+    ]:
+        path.touch()
+
+    layout = BIDSLayout(bids_dir, validate=False, config=['bids', 'derivatives'])
+    subject_layout = xbids.SubjectFileIndex(layout, '01')
+    run_boldref = str(bids_dir / 'sub-01' / 'func' / 'sub-01_task-rest_run-2_boldref.nii.gz')
+    subject_boldref = str(bids_dir / 'sub-01' / 'sub-01_task-rest_boldref.nii.gz')
+
+    # Only the closest folder with candidates is searched, so there's no strict match
+    query = {'suffix': 'boldref', 'ignore_strict_entities': ['suffix', 'extension']}
+    assert subject_layout.get_nearest(bold_file, **query) is None
+    assert subject_layout.get_nearest(bold_file, strict=False, **query) == run_boldref
+
+    # All folders are searched, from the closest to the root
+    assert subject_layout.get_nearest(bold_file, all_=True, **query) == [subject_boldref]
+    assert subject_layout.get_nearest(bold_file, strict=False, all_=True, **query) == [
+        run_boldref,
+        subject_boldref,
+    ]
@@ -0,0 +1,57 @@
+"""Tests for the xcp_d.utils.checkpoints module."""
+
+import os
+
+from nipype.interfaces import utility as niu
+from nipype.pipeline import engine as pe
+
+from xcp_d.interfaces.bids import DerivativesDataSink
+from xcp_d.utils import checkpoints
+
+
+def test_checkpoints(tmp_path):
+    """Check that checkpoints are only valid while the signature and recorded files match."""
+    derivative = tmp_path / 'sub-01_task-rest_desc-denoised_bold.nii.gz'
+    derivative.write_text('')
+    work_file = tmp_path / 'denoised.nii.gz'
+    work_file.write_text('')
+
+    bold_file = str(tmp_path / 'sub-01_task-rest_space-MNI_desc-preproc_bold.nii.gz')
+    checkpoint_file = checkpoints.get_checkpoint_file(bold_file, tmp_path / 'out')
+    assert checkpoint_file == os.path.join(
+        str(tmp_path / 'out'),
+        'sub-01',
+        'log',
+        'checkpoints',
+        'sub-01_task-rest_space-MNI_desc-preproc_bold.json',
+    )
+    assert checkpoints.load_checkpoint(checkpoint_file, 'abc') is None
+
+    outputs = {'denoised_bold': str(work_file), 'timeseries': [None]}
+    checkpoints.write_checkpoint(checkpoint_file, 'abc', [[str(derivative)]], outputs)
+    assert checkpoints.load_checkpoint(checkpoint_file, 'abc') == outputs
+    assert checkpoints.load_checkpoint(checkpoint_file, 'def') is None
+
+    # Outputs in the working directory are only needed for concatenation
+    work_file.unlink()
+    assert checkpoints.load_checkpoint(checkpoint_file, 'abc') == outputs
+    assert checkpoints.load_checkpoint(checkpoint_file, 'abc', require_outputs=True) is None
+
+    derivative.unlink()
+    assert checkpoints.load_checkpoint(checkpoint_file, 'abc') is None
+
+
+def test_list_datasinks():
+    """Check that datasinks in nested workflows are found."""
+    inner_wf = pe.Workflow(name='inner_wf')
+    inner_wf.add_nodes([pe.Node(DerivativesDataSink(), name='ds_inner')])
+
+    outer_wf = pe.Workflow(name='outer_wf')
+    outer_wf.add_nodes(
+        [
+            inner_wf,
+            pe.Node(DerivativesDataSink(), name='ds_outer'),
+            pe.Node(niu.IdentityInterface(fields=['a']), name='outputnode'),
+        ]
+    )
+    assert checkpoints.list_datasinks(outer_wf) == ['ds_outer', 'inner_wf.ds_inner']
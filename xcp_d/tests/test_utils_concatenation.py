@@ -5,6 +5,7 @@ import os
 import nibabel as nb
 import numpy as np
 import pandas as pd
+import pytest
 
 from xcp_d.utils import concatenation
 
@@ -79,3 +80,52 @@ def test_concatenate_niimgs(ds001419_data, tmp_path_factory):
     concat_cifti_img = nb.load(concat_cifti_file)
     assert concat_cifti_img.shape[0] == cifti_img.shape[0] * n_repeats
     assert concat_cifti_img.shape[1] == cifti_img.shape[1]
+
+
+def test_stream_concatenate_niftis(tmp_path):
+    """Check that streamed concatenation matches concatenating the data in memory."""
+    rng = np.random.default_rng(0)
+    affine = np.diag([2, 2, 2, 1])
+    runs = [
+        rng.standard_normal((4, 5, 6, 7)).astype(np.float32),
+        rng.standard_normal((4, 5, 6, 3)).astype(np.float32),
+        # A single-volume image
+        rng.standard_normal((4, 5, 6)).astype(np.float32),
+    ]
+    files = []
+    for i_run, run_data in enumerate(runs):
+        files.append(str(tmp_path / f'run{i_run}.nii.gz'))
+        nb.Nifti1Image(run_data, affine).to_filename(files[-1])
+
+    expected = np.concatenate([run.reshape(4, 5, 6, -1) for run in runs], axis=3)
+    for extension in ('.nii', '.nii.gz'):
+        out_file = str(tmp_path / f'concat{extension}')
+        # Use a tiny chunk size, so that each volume is written separately
+        concatenation.stream_concatenate_niftis(files, out_file, chunk_mb=0.0001)
+        concat_img = nb.load(out_file)
+        assert concat_img.shape == (4, 5, 6, 11)
+        assert concat_img.get_data_dtype() == np.float32
+        np.testing.assert_array_equal(concat_img.affine, affine)
+        np.testing.assert_array_equal(concat_img.get_fdata(dtype=np.float32), expected)
+
+    # Integer runs with different scaling factors are stored as floats
+    int_files = []
+    for i_run, value in enumerate([1.5, 6.0]):
+        int_data = np.zeros((4, 5, 6, 2), dtype=np.float32)
+        int_data[0, 0, 0] = value
+        int_files.append(str(tmp_path / f'int{i_run}.nii'))
+        nb.Nifti1Image(int_data, affine, dtype=np.int16).to_filename(int_files[-1])
+
+    out_file = str(tmp_path / 'concat_int.nii')
+    concatenation.stream_concatenate_niftis(int_files, out_file)
+    concat_img = nb.load(out_file)
+    assert concat_img.get_data_dtype() == np.float32
+    np.testing.assert_allclose(concat_img.get_fdata()[0, 0, 0], [1.5, 1.5, 6, 6], rtol=1e-3)
+
+    # Images must be aligned
+    nb.Nifti1Image(runs[0], np.eye(4)).to_filename(str(tmp_path / 'misaligned.nii.gz'))
+    with pytest.raises(ValueError, match='same shape and affine'):
+        concatenation.stream_concatenate_niftis(
+            [files[0], str(tmp_path / 'misaligned.nii.gz')],
+            str(tmp_path / 'bad.nii'),
+        )
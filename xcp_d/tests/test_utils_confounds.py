@@ -134,7 +134,7 @@ def test_motion_filtering_notch():
     lowcut, highcut = band_stop_min / 60, band_stop_max / 60
     stopband_hz_adjusted = [lowcut, highcut]
     freq_to_remove = np.mean(stopband_hz_adjusted)
-    bandwidth = np.abs(np.diff(stopband_hz_adjusted))
+    bandwidth = np.abs(np.diff(stopband_hz_adjusted))[0]
 
     # Create filter coefficients.
     b, a = signal.iirnotch(freq_to_remove, freq_to_remove / bandwidth, fs=1 / TR)
@@ -158,3 +158,85 @@ def test_motion_filtering_notch():
     )
     notch_data_test = np.squeeze(notch_data_test)
     assert np.allclose(notch_data_test, notch_data_true)
+
+
+def test_motion_filtering_notch_cascade():
+    """Check that repeated notch filters are cascaded and that the design is cached."""
+    band_stop_min, band_stop_max = 12, 20
+    TR = 0.8
+    raw_data = np.random.random((500, 6))
+
+    confounds._design_motion_filter.cache_clear()
+    kwargs = {
+        'TR': TR,
+        'motion_filter_type': 'notch',
+        'band_stop_min': band_stop_min,
+        'band_stop_max': band_stop_max,
+        'motion_filter_order': 12,
+    }
+    filtered_data = confounds.filter_motion(raw_data, **kwargs)
+    assert filtered_data.shape == raw_data.shape
+    filtered_data2 = confounds.filter_motion(raw_data, **kwargs)
+    assert np.array_equal(filtered_data, filtered_data2)
+
+    cache_info = confounds._design_motion_filter.cache_info()
+    assert cache_info.misses == 1
+    assert cache_info.hits == 1
+
+    # Three notch filters should be combined into one cascade with the same frequency response
+    sos = confounds._design_motion_filter(
+        motion_filter_type='notch',
+        TR=TR,
+        band_stop_min=band_stop_min,
+        band_stop_max=band_stop_max,
+        motion_filter_order=12,
+    )
+    assert sos.shape == (3, 6)
+    stopband_hz = np.array([band_stop_min, band_stop_max]) / 60
+    freq_to_remove = np.mean(stopband_hz)
+    b, a = signal.iirnotch(
+        freq_to_remove,
+        freq_to_remove / np.diff(stopband_hz)[0],
+        fs=1 / TR,
+    )
+    _, h_single = signal.freqz(b, a, worN=256, fs=1 / TR)
+    _, h_cascade = signal.sosfreqz(sos, worN=256, fs=1 / TR)
+    assert np.allclose(h_cascade, h_single**3)
+
+    # Filters that would be applied zero times leave the data unchanged
+    unfiltered_data = confounds.filter_motion(raw_data, **{**kwargs, 'motion_filter_order': 2})
+    assert np.array_equal(unfiltered_data, raw_data)
+
+
+def test_select_confound_columns():
+    """Test xcp_d.utils.confounds.select_confound_columns."""
+    available_columns = ('trans_x', 'trans_y', 'a_comp_cor_00', 'a_comp_cor_01', 'csf')
+
+    confounds.select_confound_columns.cache_clear()
+    selected = confounds.select_confound_columns(
+        available_columns=available_columns,
+        required_columns=('csf', '^A_COMP_COR_'),
+    )
+    assert selected == ('csf', 'a_comp_cor_00', 'a_comp_cor_01')
+
+    # The same header and configuration should hit the cache
+    confounds.select_confound_columns(
+        available_columns=available_columns,
+        required_columns=('csf', '^A_COMP_COR_'),
+    )
+    assert confounds.select_confound_columns.cache_info().hits == 1
+
+    with pytest.raises(
+        ValueError,
+        match=re.escape("No columns found matching regular expression '^t_'"),
+    ):
+        confounds.select_confound_columns(
+            available_columns=available_columns,
+            required_columns=('^t_',),
+        )
+
+    with pytest.raises(ValueError, match="Column 'white_matter' not found in confounds file."):
+        confounds.select_confound_columns(
+            available_columns=available_columns,
+            required_columns=('white_matter',),
+        )
@@ -0,0 +1,86 @@
+"""Tests for the xcp_d.utils.modified_data module."""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from xcp_d.utils import modified_data
+from xcp_d.utils.confounds import load_motion
+
+
+def _write_motion_file(out_file, n_volumes, seed):
+    rng = np.random.default_rng(seed)
+    columns = ['trans_x', 'trans_y', 'trans_z', 'rot_x', 'rot_y', 'rot_z']
+    df = pd.DataFrame(rng.normal(scale=0.1, size=(n_volumes, 6)), columns=columns)
+    df['rmsd'] = rng.random(n_volumes)
+    df.to_csv(out_file, sep='\t', index=False)
+    return str(out_file)
+
+
+def test_precompute_motion(tmp_path):
+    """Check that batched motion filtering matches filtering each run separately."""
+    motion_files = [
+        _write_motion_file(tmp_path / 'run-1_motion.tsv', 100, seed=1),
+        _write_motion_file(tmp_path / 'run-2_motion.tsv', 100, seed=2),
+        _write_motion_file(tmp_path / 'run-3_motion.tsv', 80, seed=3),
+    ]
+    TRs = [0.8, 0.8, 0.8]
+    kwargs = {
+        'motion_filter_type': 'notch',
+        'motion_filter_order': 4,
+        'band_stop_min': 12,
+        'band_stop_max': 20,
+        'head_radius': 50,
+    }
+    cache_dir = tmp_path / 'cache'
+
+    motion_dfs = modified_data.precompute_motion(
+        motion_files=motion_files,
+        TRs=TRs,
+        cache_dir=cache_dir,
+        **kwargs,
+    )
+    assert len(motion_dfs) == 3
+    assert len(os.listdir(cache_dir)) == 3
+
+    for motion_file, motion_df in zip(motion_files, motion_dfs, strict=True):
+        single_df = load_motion(
+            motion_file,
+            TR=0.8,
+            motion_filter_type='notch',
+            motion_filter_order=4,
+            band_stop_min=12,
+            band_stop_max=20,
+        )
+        assert motion_df.columns.tolist() == single_df.columns.tolist() + [
+            'framewise_displacement',
+            'framewise_displacement_filtered',
+        ]
+        assert np.allclose(motion_df[single_df.columns].to_numpy(), single_df.to_numpy())
+        assert np.allclose(
+            motion_df['framewise_displacement_filtered'],
+            modified_data.compute_fd(single_df, head_radius=50, filtered=True),
+        )
+
+    # The cached files should be reused
+    cached_dfs = modified_data.precompute_motion(
+        motion_files=motion_files,
+        TRs=TRs,
+        cache_dir=cache_dir,
+        **kwargs,
+    )
+    for motion_df, cached_df in zip(motion_dfs, cached_dfs, strict=True):
+        pd.testing.assert_frame_equal(motion_df, cached_df)
+
+    # The run-level filter should match the temporal mask used for censoring
+    duration = modified_data.flag_bad_run(
+        motion_file=motion_files[0],
+        dummy_scans=2,
+        TR=0.8,
+        fd_thresh=0.3,
+        motion_df=motion_dfs[0],
+        **kwargs,
+    )
+    fd = motion_dfs[0]['framewise_displacement_filtered'].to_numpy()[2:]
+    assert duration == np.sum(fd <= 0.3) * 0.8
@@ -0,0 +1,134 @@
+"""Tests for the xcp_d.utils.plugin module."""
+
+from nipype.interfaces import utility as niu
+from nipype.pipeline import engine as pe
+
+from xcp_d.utils.plugin import MultiProcPlugin, find_large_files, prune_node_dir
+
+
+def _write_file(size):
+    import os
+
+    out_file = os.path.abspath('data.bin')
+    with open(out_file, 'wb') as fo:
+        fo.write(b'0' * size)
+
+    return out_file
+
+
+def _get_size(in_file):
+    import os
+
+    out_file = os.path.abspath('size.txt')
+    with open(out_file, 'w') as fo:
+        fo.write(str(os.path.getsize(in_file)))
+
+    return out_file
+
+
+def _init_workflow(base_dir):
+    workflow = pe.Workflow(name='workflow', base_dir=str(base_dir))
+    producer = pe.Node(
+        niu.Function(function=_write_file, input_names=['size'], output_names=['out_file']),
+        name='producer',
+    )
+    producer.inputs.size = 2048
+    # Select passes the producer's file on, so it must be kept until get_size has run
+    select = pe.Node(niu.Select(index=0), name='select')
+    get_size = pe.Node(
+        niu.Function(function=_get_size, input_names=['in_file'], output_names=['out_file']),
+        name='get_size',
+    )
+    workflow.connect([
+        (producer, select, [('out_file', 'inlist')]),
+        (select, get_size, [('out', 'in_file')]),
+    ])  # fmt:skip
+    return workflow
+
+
+def test_find_large_files(tmp_path):
+    """Check that Nipype's own files and hardlinked files are not tracked."""
+    (tmp_path / 'large.bin').write_bytes(b'0' * 100)
+    (tmp_path / 'small.bin').write_bytes(b'0' * 10)
+    (tmp_path / 'result_node.pklz').write_bytes(b'0' * 100)
+    (tmp_path / '_report').mkdir()
+    (tmp_path / '_report' / 'report.rst').write_bytes(b'0' * 100)
+    (tmp_path / 'linked.bin').write_bytes(b'0' * 100)
+    (tmp_path / 'link.bin').hardlink_to(tmp_path / 'linked.bin')
+
+    large_files = find_large_files(str(tmp_path), 50)
+    assert large_files == {str(tmp_path / 'large.bin'): 100}
+
+
+def test_prune_node_dir(tmp_path):
+    """Check that files linked elsewhere after they were found are kept."""
+    (tmp_path / 'result_node.pklz').write_bytes(b'')
+    (tmp_path / 'large.bin').write_bytes(b'0' * 100)
+    (tmp_path / 'linked.bin').write_bytes(b'0' * 100)
+    (tmp_path / 'missing.bin').write_bytes(b'0' * 100)
+    large_files = find_large_files(str(tmp_path), 50)
+    assert len(large_files) == 3
+
+    (tmp_path / 'derivative.bin').hardlink_to(tmp_path / 'linked.bin')
+    (tmp_path / 'missing.bin').unlink()
+
+    assert prune_node_dir(str(tmp_path), large_files) == 200
+    assert not (tmp_path / 'result_node.pklz').exists()
+    assert not (tmp_path / 'large.bin').exists()
+    assert (tmp_path / 'linked.bin').exists()
+
+
+def test_work_dir_budget(tmp_path):
+    """Check that consumed intermediate files are deleted and their nodes are re-run."""
+    plugin_args = {'n_procs': 2, 'work_dir_budget_gb': 0, 'min_prune_mb': 0.001}
+    _init_workflow(tmp_path).run(plugin=MultiProcPlugin(plugin_args=plugin_args))
+
+    producer_dir = tmp_path / 'workflow' / 'producer'
+    assert not (producer_dir / 'data.bin').exists()
+    assert not (producer_dir / 'result_producer.pklz').exists()
+    assert (tmp_path / 'workflow' / 'get_size' / 'size.txt').read_text() == '2048'
+
+    # Without a budget, nothing is deleted and the pruned node is run again
+    _init_workflow(tmp_path).run(plugin=MultiProcPlugin(plugin_args={'n_procs': 2}))
+    assert (producer_dir / 'data.bin').exists()
+    assert (tmp_path / 'workflow' / 'get_size' / 'size.txt').read_text() == '2048'
+
+
+def test_sort_jobs(tmp_path):
+    """Check that jobs are interleaved and held back according to the plugin's limits."""
+    large_file = tmp_path / 'large.bin'
+    large_file.write_bytes(b'0' * 3000)
+    small_file = tmp_path / 'small.bin'
+    small_file.write_bytes(b'0' * 10)
+
+    def _make_node(name, subject, in_file, mem_gb):
+        node = pe.Node(niu.IdentityInterface(fields=['in_file']), name=name, mem_gb=mem_gb)
+        node.inputs.in_file = str(in_file)
+        node._hierarchy = f'xcp_d_wf.sub_{subject}_wf'
+        return node
+
+    plugin_args = {
+        'n_procs': 4,
+        'memory_gb': 8,
+        'io_budget_gb': 5000 / 1024**3,
+        'io_heavy_mb': 1000 / 1024**2,
+        'max_large_mem_per_subject': 1,
+    }
+    plugin = MultiProcPlugin(plugin_args=plugin_args)
+    plugin.procs = [
+        _make_node('load_01', '01', large_file, 1),
+        _make_node('load_02', '02', large_file, 1),
+        _make_node('denoise_01_run1', '01', small_file, 4),
+        _make_node('denoise_01_run2', '01', small_file, 4),
+        _make_node('denoise_02_run1', '02', small_file, 4),
+    ]
+    plugin.mapnodesubids = {}
+    plugin.pending_tasks = []
+
+    # The second load would exceed the I/O budget,
+    # and only one memory-intensive node may run for each subject
+    assert plugin._sort_jobs([0, 1, 2, 3, 4]) == [0, 2, 4]
+
+    plugin.pending_tasks = [(1, 0), (2, 4)]
+    assert plugin._sort_jobs([1, 3]) == [3]
+    plugin.pool.shutdown()
@@ -0,0 +1,50 @@
+"""Tests for the xcp_d.utils.profiling module."""
+
+from types import SimpleNamespace
+
+import networkx as nx
+import numpy as np
+
+from xcp_d.utils import profiling
+
+
+def test_find_critical_path():
+    """Check that xcp_d.utils.profiling.find_critical_path follows the slowest chain."""
+    graph = nx.DiGraph()
+    graph.add_edges_from([('a', 'b'), ('a', 'c'), ('b', 'd'), ('c', 'd'), ('e', 'd')])
+    durations = {'a': 1, 'b': 5, 'c': 2, 'd': 1, 'e': 3}
+
+    assert profiling.find_critical_path(graph, durations) == ['a', 'b', 'd']
+    assert profiling.find_critical_path(nx.DiGraph(), durations) == []
+
+
+def test_summarize_runtime():
+    """Check that xcp_d.utils.profiling._summarize_runtime combines MapNode runtimes."""
+    runtimes = [
+        SimpleNamespace(
+            startTime='2024-01-01T00:00:00',
+            endTime='2024-01-01T00:00:10',
+            duration=10,
+            mem_peak_gb=1.5,
+            prof_dict={'time': [0, 5, 10], 'cpus': [100, 100, 100]},
+        ),
+        SimpleNamespace(
+            startTime='2024-01-01T00:00:10',
+            endTime='2024-01-01T00:00:14',
+            duration=4,
+            mem_peak_gb=2.0,
+            prof_dict={'time': [0, 4], 'cpus': [200, 200]},
+        ),
+    ]
+    summary = profiling._summarize_runtime(runtimes)
+    assert summary['start'] == '2024-01-01T00:00:00'
+    assert summary['finish'] == '2024-01-01T00:00:14'
+    assert summary['wall_time_s'] == 14
+    assert np.isclose(summary['cpu_time_s'], 18)
+    assert summary['peak_rss_gb'] == 2.0
+
+    # Without the resource monitor, only the timing is available.
+    summary = profiling._summarize_runtime(SimpleNamespace(duration=3))
+    assert summary['wall_time_s'] == 3
+    assert np.isnan(summary['cpu_time_s'])
+    assert np.isnan(summary['peak_rss_gb'])
@@ -13,3 +13,42 @@ def test_compute_dvars():
     dvars, std_dvars = qcmetrics.compute_dvars(datat=data)
     assert dvars.shape == (n_volumes,)
     assert std_dvars.shape == (n_volumes,)
+
+
+def test_compute_abcc_qc_table():
+    """Check xcp_d.utils.qcmetrics.compute_abcc_qc_table against a per-threshold loop."""
+    TR = 0.8
+    fd = np.random.default_rng(0).random(200) * 0.5
+
+    thresholds, binary_masks, summary = qcmetrics.compute_abcc_qc_table(fd=fd, TR=TR)
+    assert thresholds.shape == (101,)
+    assert binary_masks.shape == (101, 200)
+    assert summary.shape == (101, 5)
+
+    for i_thresh, thresh in enumerate(thresholds):
+        retained = fd[fd <= thresh]
+        assert np.array_equal(binary_masks[i_thresh], (fd > thresh).astype(int))
+        assert summary.loc[i_thresh, 'threshold'] == thresh
+        assert summary.loc[i_thresh, 'total_frame_count'] == fd.size
+        assert summary.loc[i_thresh, 'remaining_total_frame_count'] == retained.size
+        assert np.isclose(summary.loc[i_thresh, 'remaining_seconds'], retained.size * TR)
+        if retained.size:
+            assert np.isclose(summary.loc[i_thresh, 'remaining_frame_mean_FD'], retained.mean())
+        else:
+            assert np.isnan(summary.loc[i_thresh, 'remaining_frame_mean_FD'])
+
+
+def test_correlation_from_moments():
+    """Check that correlations from combined moments match those of concatenated runs."""
+    rng = np.random.default_rng(0)
+    runs = [rng.standard_normal((2, n_volumes)) for n_volumes in (20, 35, 8)]
+    moments = qcmetrics.combine_moments([qcmetrics.compute_moments(x, y) for x, y in runs])
+    concatenated = np.hstack(runs)
+    assert moments['n'] == concatenated.shape[1]
+    np.testing.assert_allclose(
+        qcmetrics.correlation_from_moments(moments),
+        np.corrcoef(concatenated)[0, 1],
+    )
+
+    constant = qcmetrics.compute_moments(np.ones(10), np.arange(10))
+    assert np.isnan(qcmetrics.correlation_from_moments(constant))
@@ -0,0 +1,160 @@
+"""Tests for the xcp_d.utils.resources module."""
+
+import json
+
+import numpy as np
+import pandas as pd
+
+from xcp_d.utils import resources
+
+
+def test_estimate_mem_gb(ds001419_data):
+    """Check that estimates scale with the size of the data."""
+    bold_file = ds001419_data['nifti_file']
+    mem_gb = resources.estimate_mem_gb(bold_file)
+    assert sorted(mem_gb) == sorted(resources.RESOURCE_TASKS)
+
+    data_gb = resources.get_data_gb(bold_file)
+    min_mem_gb = resources.get_minimum_mem_gb(bold_file)
+    model = resources.load_resource_model()
+    for task, coefs in model.items():
+        predicted = coefs['intercept_gb'] + coefs['data_factor'] * data_gb
+        if task in resources.MULTITHREADED_TASKS:
+            predicted += coefs['thread_gb']
+
+        assert np.isclose(mem_gb[task], max(predicted, min_mem_gb[task]))
+
+    # More threads never need less memory, and only change multithreaded tasks
+    mem_gb_threaded = resources.estimate_mem_gb(bold_file, n_threads=8)
+    assert all(mem_gb_threaded[task] >= mem_gb[task] for task in mem_gb)
+    assert all(
+        mem_gb_threaded[task] == mem_gb[task]
+        for task in mem_gb
+        if task not in resources.MULTITHREADED_TASKS
+    )
+
+
+def test_estimate_mem_gb_minimum(tmp_path):
+    """Check that small runs keep the fixed estimates and that data size follows the dtype."""
+    import nibabel as nb
+
+    data = np.zeros((10, 10, 10, 50))
+    float_file = str(tmp_path / 'float.nii.gz')
+    nb.Nifti1Image(data.astype(np.float32), np.eye(4)).to_filename(float_file)
+    int_file = str(tmp_path / 'int.nii.gz')
+    nb.Nifti1Image(data.astype(np.int16), np.eye(4)).to_filename(int_file)
+
+    assert np.isclose(resources.get_data_gb(float_file), 50000 * 4 / (1024**3))
+    assert np.isclose(resources.get_data_gb(int_file), 50000 * 2 / (1024**3))
+
+    # Scaled integer data are worked on as floats
+    img = nb.load(int_file)
+    img.header.set_slope_inter(2, 0)
+    scaled_file = str(tmp_path / 'scaled.nii.gz')
+    img.to_filename(scaled_file)
+    assert np.isclose(resources.get_data_gb(scaled_file), 50000 * 4 / (1024**3))
+
+    mem_gb = resources.estimate_mem_gb(float_file, n_threads=4)
+    assert mem_gb['timeseries'] == 6
+    assert mem_gb['denoise'] == 6
+    assert mem_gb['resampled'] == 2
+    assert mem_gb['despike'] == 4
+    assert mem_gb['qc_plot'] == 2
+
+
+def test_calibrate_resource_model(tmp_path_factory):
+    """Check that the calibrated model bounds the recorded peaks."""
+    tmpdir = tmp_path_factory.mktemp('test_calibrate_resource_model')
+    rng = np.random.default_rng(0)
+    data_gb = rng.uniform(0.1, 4, size=20)
+    n_threads = rng.integers(1, 8, size=20)
+    noise = rng.uniform(0, 0.2, size=20)
+    profiles = pd.concat(
+        [
+            pd.DataFrame(
+                {
+                    'task': 'despike',
+                    'data_gb': data_gb,
+                    'n_threads': n_threads,
+                    'mem_peak_gb': 0.3 + 3 * data_gb + 0.1 * n_threads + noise,
+                }
+            ),
+            pd.DataFrame(
+                {
+                    'task': 'denoise',
+                    'data_gb': data_gb,
+                    'n_threads': n_threads,
+                    'mem_peak_gb': 0.5 + 2 * data_gb + noise,
+                }
+            ),
+        ],
+        ignore_index=True,
+    )
+    # Too few profiles to calibrate ALFF
+    profiles.loc[profiles.shape[0]] = ['alff', 1.0, 1, 100.0]
+
+    out_file = tmpdir / 'resource_model.json'
+    model = resources.calibrate_resource_model(profiles, out_file=out_file)
+    assert np.isclose(model['despike']['data_factor'], 3, atol=0.1)
+    assert np.isclose(model['despike']['thread_gb'], 0.1, atol=0.05)
+    # Single-threaded tasks have no thread term
+    assert np.isclose(model['denoise']['data_factor'], 2, atol=0.1)
+    assert model['denoise']['thread_gb'] == 0
+    assert model['alff'] == resources.load_resource_model()['alff']
+
+    for task in ['despike', 'denoise']:
+        task_df = profiles.loc[profiles['task'] == task]
+        predicted = [
+            resources.predict_mem_gb(task, row.data_gb, row.n_threads, model)
+            for row in task_df.itertuples()
+        ]
+        assert np.all(np.array(predicted) >= task_df['mem_peak_gb'].to_numpy() - 1e-6)
+
+    with open(out_file) as fo:
+        assert json.load(fo) == model
+
+    assert resources.load_resource_model(out_file) == model
+
+
+def test_collect_resource_profiles(tmp_path):
+    """Check that profiles are collected from nodes and from map nodes' sub-nodes."""
+    import nibabel as nb
+    from nipype.interfaces.base import Bunch
+    from nipype.utils.filemanip import savepkl
+
+    bold_file = str(tmp_path / 'bold.nii.gz')
+    nb.Nifti1Image(np.zeros((4, 4, 4, 8), dtype=np.float32), np.eye(4)).to_filename(bold_file)
+
+    def _write_result(node_dir, name, runtime, inputs):
+        node_dir.mkdir(parents=True)
+        savepkl(str(node_dir / f'result_{name}.pklz'), Bunch(runtime=runtime, inputs=inputs))
+
+    work_dir = tmp_path / 'work'
+    _write_result(
+        work_dir / 'denoise_bold_wf' / 'regress_and_filter_bold',
+        'regress_and_filter_bold',
+        Bunch(mem_peak_gb=2.0, nthreads_max=2),
+        {'preprocessed_bold': bold_file},
+    )
+    # Map nodes record a list of runtimes, and their sub-nodes record their own
+    parcellate_dir = work_dir / 'connectivity_wf' / 'parcellate_data'
+    _write_result(
+        parcellate_dir,
+        'parcellate_data',
+        [Bunch(mem_peak_gb=1.0), Bunch(mem_peak_gb=1.5)],
+        {'filtered_file': bold_file},
+    )
+    for i_atlas, mem_peak_gb in enumerate([1.0, 1.5]):
+        _write_result(
+            parcellate_dir / 'mapflow' / f'_parcellate_data{i_atlas}',
+            f'_parcellate_data{i_atlas}',
+            Bunch(mem_peak_gb=mem_peak_gb, nthreads_max=1),
+            {'filtered_file': bold_file},
+        )
+
+    profiles = resources.collect_resource_profiles(str(work_dir))
+    profiles = profiles.sort_values(['task', 'mem_peak_gb']).reset_index(drop=True)
+    assert profiles['task'].tolist() == ['denoise', 'parcellation', 'parcellation']
+    assert profiles['mem_peak_gb'].tolist() == [2.0, 1.0, 1.5]
+    assert profiles['n_threads'].tolist() == [2, 1, 1]
+    assert np.allclose(profiles['data_gb'], resources.get_data_gb(bold_file))
@@ -322,6 +322,42 @@ def _check_signal(data, signals, sample_mask, atol=0.001):
     assert np.allclose(signal_betas, 1.0, atol=atol)
 
 
+def test_despike_data():
+    """Test xcp_d.utils.utils.despike_data."""
+    rng = np.random.default_rng(0)
+    n_series, n_volumes = 50, 300
+    time = np.arange(n_volumes)
+    # Slow drifts plus noise
+    data = (
+        100
+        + np.sin(2 * np.pi * time / n_volumes)[None, :]
+        + rng.standard_normal((n_series, n_volumes))
+    ).astype(np.float32)
+    # A constant time series should be left alone
+    data[-1, :] = 5
+
+    spiked = data.copy()
+    spiked[0, 100] += 50
+    spiked[1, 200] -= 50
+
+    despiked, n_spikes = utils.despike_data(spiked.copy(), n_threads=2, block_size=7)
+    assert despiked.shape == data.shape
+    assert despiked.dtype == np.float32
+    assert n_spikes > 0
+
+    # The spikes are squashed to less than c2 (4) standard deviations from the curve
+    assert np.abs(despiked[0, 100] - data[0, 100]) < 10
+    assert np.abs(despiked[1, 200] - data[1, 200]) < 10
+    np.testing.assert_array_equal(despiked[-1], data[-1])
+
+    # Most values are unchanged
+    assert np.mean(despiked == spiked) > 0.9
+
+    # Blocks and threads do not affect the results
+    despiked_serial, _ = utils.despike_data(spiked.copy(), n_threads=1)
+    np.testing.assert_allclose(despiked, despiked_serial, rtol=1e-5)
+
+
 def test_list_to_str():
     """Test the list_to_str function."""
     string = utils.list_to_str(['a'])
@@ -0,0 +1,36 @@
+"""Tests for the xcp_d.workflows.base module."""
+
+import shutil
+
+from xcp_d import config
+from xcp_d.tests.tests import mock_config
+from xcp_d.workflows import base
+
+
+def test_build_single_subject_wfs():
+    """Check that subjects' workflows built in parallel match those built serially."""
+    with mock_config():
+        # Copy the example subject to make a second one
+        fmri_dir = config.execution.fmri_dir
+        for path in sorted((fmri_dir / 'sub-01').rglob('*')):
+            if path.is_file():
+                new_path = fmri_dir / str(path.relative_to(fmri_dir)).replace('sub-01', 'sub-02')
+                new_path.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copyfile(path, new_path)
+
+        config.execution._layout = None
+        config.execution.init()
+        subject_ids = ['01', '02']
+
+        config.nipype.nprocs = 1
+        serial_wfs = base._build_single_subject_wfs(subject_ids)
+        config.nipype.nprocs = 2
+        parallel_wfs = base._build_single_subject_wfs(subject_ids)
+
+    assert [wf.name for wf in parallel_wfs] == ['sub_01_wf', 'sub_02_wf']
+    assert [wf.name for wf in parallel_wfs] == [wf.name for wf in serial_wfs]
+    for parallel_wf, serial_wf in zip(parallel_wfs, serial_wfs, strict=True):
+        assert len(parallel_wf._get_all_nodes()) == len(serial_wf._get_all_nodes())
+        assert sorted(node.fullname for node in parallel_wf._get_all_nodes()) == sorted(
+            node.fullname for node in serial_wf._get_all_nodes()
+        )
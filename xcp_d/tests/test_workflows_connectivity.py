@@ -329,25 +329,18 @@ def test_init_functional_connectivity_cifti_wf(ds001419_data, tmp_path_factory):
         nodes = get_nodes(connectivity_wf_res)
 
         # Let's find the cifti files
-        pscalar = nodes['connectivity_wf.parcellate_bold_wf.parcellate_coverage'].get_output(
-            'out_file'
-        )[0]
+        parcellate_node = nodes['connectivity_wf.parcellate_bold_wf.parcellate_data']
+        pscalar = parcellate_node.get_output('coverage_cifti')[0]
         assert os.path.isfile(pscalar)
-        timeseries_ciftis = nodes[
-            'connectivity_wf.parcellate_bold_wf.mask_parcellated_data'
-        ].get_output('out_file')[0]
+        timeseries_ciftis = parcellate_node.get_output('parcellated_cifti')[0]
         assert os.path.isfile(timeseries_ciftis)
         correlation_ciftis = nodes['connectivity_wf.correlate_bold'].get_output('out_file')[0]
         assert os.path.isfile(correlation_ciftis)
 
         # Let's find the tsv files
-        coverage = nodes['connectivity_wf.parcellate_bold_wf.coverage_to_tsv'].get_output(
-            'out_file'
-        )[0]
+        coverage = parcellate_node.get_output('coverage_tsv')[0]
         assert os.path.isfile(coverage)
-        timeseries = nodes['connectivity_wf.parcellate_bold_wf.cifti_to_tsv'].get_output(
-            'out_file'
-        )[0]
+        timeseries = parcellate_node.get_output('parcellated_tsv')[0]
         assert os.path.isfile(timeseries)
         correlations = nodes['connectivity_wf.dconn_to_tsv'].get_output('out_file')[0]
         assert os.path.isfile(correlations)
@@ -1,24 +1,13 @@
 # emacs: -*- mode: python; py-indent-offset: 4; indent-tabs-mode: nil -*-
 # vi: set ft=python sts=4 ts=4 sw=4 et:
-"""A range of utility functions for xcp_d interfaces and workflows."""
+"""A range of utility functions for xcp_d interfaces and workflows.
 
-from xcp_d.utils import (
-    atlas,
-    bids,
-    boilerplate,
-    concatenation,
-    confounds,
-    doc,
-    execsummary,
-    filemanip,
-    modified_data,
-    plotting,
-    qcmetrics,
-    restingstate,
-    sentry,
-    utils,
-    write_save,
-)
+The submodules are imported when they are first accessed,
+so that importing one of them (e.g., from the command-line parser)
+does not import the heavy dependencies of the others.
+"""
+
+from importlib import import_module
 
 __all__ = [
     'atlas',
@@ -37,3 +26,10 @@ __all__ = [
     'utils',
     'write_save',
 ]
+
+
+def __getattr__(name):
+    if name in __all__:
+        return import_module(f'{__name__}.{name}')
+
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
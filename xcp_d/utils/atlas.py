@@ -1,5 +1,7 @@
 """Functions for working with atlases."""
 
+from functools import cache
+
 from nipype import logging
 
 LOGGER = logging.getLogger('nipype.utils')
@@ -59,7 +61,7 @@ def select_atlases(atlases, subset):
     return selected_atlases
 
 
-def collect_atlases(datasets, atlases, file_format, bids_filters=None):
+def collect_atlases(datasets, atlases, file_format, bids_filters=None, database_dir=None):
     """Collect atlases from a list of BIDS-Atlas datasets.
 
     Selection of labels files and metadata does not leverage the inheritance principle.
@@ -76,6 +78,11 @@ def collect_atlases(datasets, atlases, file_format, bids_filters=None):
     bids_filters : dict
         Additional filters to apply to the BIDS query.
         Only the "atlas" key is used.
+    database_dir : None or :obj:`str`
+        Folder in which to store PyBIDS databases for the atlas datasets,
+        so they can be reused across invocations.
+        If None, the datasets are indexed in memory.
+        In either case, datasets are only re-indexed within a process when their folders change.
 
     Returns
     -------
@@ -92,14 +99,13 @@ def collect_atlases(datasets, atlases, file_format, bids_filters=None):
         - "metadata" : dict
             Metadata associated with the atlas.
     """
-    import json
+    import os
+    from copy import deepcopy
 
-    import pandas as pd
     from bids.layout import BIDSLayout
 
-    from xcp_d.data import load as load_data
+    from xcp_d.utils.bids import _get_mtime_signature
 
-    atlas_cfg = load_data('atlas_bids_config.json')
     bids_filters = bids_filters or {}
 
     atlas_filter = bids_filters.get('atlas', {})
@@ -119,7 +125,16 @@ def collect_atlases(datasets, atlases, file_format, bids_filters=None):
     atlas_cache = {}
     for dataset_name, dataset_path in datasets.items():
         if not isinstance(dataset_path, BIDSLayout):
-            layout = BIDSLayout(dataset_path, config=[atlas_cfg], validate=False)
+            dataset_path = os.path.abspath(dataset_path)
+            if not os.path.isdir(dataset_path):
+                # Raise the same error as BIDSLayout, before the signature is computed
+                raise ValueError(f'BIDS root does not exist: {dataset_path}')
+
+            layout = _get_atlas_layout(
+                dataset_path,
+                _get_mtime_signature(dataset_path),
+                None if database_dir is None else str(database_dir),
+            )
         else:
             layout = dataset_path
 
@@ -153,8 +168,10 @@ def collect_atlases(datasets, atlases, file_format, bids_filters=None):
 
             atlas_metadata = None
             if atlas_metadata_file:
-                with open(atlas_metadata_file) as fo:
-                    atlas_metadata = json.load(fo)
+                stat = os.stat(atlas_metadata_file)
+                atlas_metadata = deepcopy(
+                    _load_atlas_metadata(atlas_metadata_file, stat.st_mtime_ns, stat.st_size)
+                )
 
             atlas_cache[atlas] = {
                 'dataset': dataset_name,
@@ -172,11 +189,69 @@ def collect_atlases(datasets, atlases, file_format, bids_filters=None):
             raise FileNotFoundError(f'No TSV file found for {atlas_info["image"]}')
 
         # Check the contents of the labels file
-        df = pd.read_table(atlas_info['labels'])
-        if 'label' not in df.columns:
-            raise ValueError(f"'label' column not found in {atlas_info['labels']}")
-
-        if 'index' not in df.columns:
-            raise ValueError(f"'index' column not found in {atlas_info['labels']}")
+        stat = os.stat(atlas_info['labels'])
+        _validate_atlas_labels(atlas_info['labels'], stat.st_mtime_ns, stat.st_size)
 
     return atlas_cache
+
+
+@cache
+def _get_atlas_layout(dataset_path, signature, database_dir):
+    """Index an atlas dataset.
+
+    Layouts are memoized on the dataset's path and modification-time signature,
+    so each atlas dataset is only indexed once per process unless it changes.
+    If ``database_dir`` is provided, the index is also stored there,
+    in a database specific to the dataset's path and signature.
+    """
+    import hashlib
+    import os
+
+    from bids.layout import BIDSLayout
+
+    from xcp_d.data import load as load_data
+
+    atlas_cfg = load_data('atlas_bids_config.json')
+
+    database_path = None
+    if database_dir is not None:
+        dataset_hash = hashlib.sha256(f'{dataset_path}:{signature}'.encode()).hexdigest()
+        database_path = os.path.join(database_dir, f'atlas_{dataset_hash[:16]}')
+
+    return BIDSLayout(
+        dataset_path,
+        config=[atlas_cfg],
+        validate=False,
+        database_path=database_path,
+        reset_database=False,
+    )
+
+
+@cache
+def _load_atlas_metadata(metadata_file, mtime, size):
+    """Load an atlas metadata file.
+
+    ``mtime`` and ``size`` are only used to invalidate the cache when the file changes.
+    Callers must copy the returned dictionary before modifying it.
+    """
+    import json
+
+    with open(metadata_file) as fo:
+        return json.load(fo)
+
+
+@cache
+def _validate_atlas_labels(labels_file, mtime, size):
+    """Check that an atlas labels file has "index" and "label" columns.
+
+    ``mtime`` and ``size`` are only used to invalidate the cache when the file changes.
+    Files that fail validation raise an exception, so they are not cached.
+    """
+    import pandas as pd
+
+    df = pd.read_table(labels_file, nrows=0)
+    if 'label' not in df.columns:
+        raise ValueError(f"'label' column not found in {labels_file}")
+
+    if 'index' not in df.columns:
+        raise ValueError(f"'index' column not found in {labels_file}")
@@ -25,6 +25,8 @@ from xcp_d.utils.filemanip import ensure_list
 
 LOGGER = logging.getLogger('nipype.utils')
 
+LAYOUT_INDEX_FILE = 'xcp_d_layout_index.json'
+
 # TODO: Add and test fsaverage.
 DEFAULT_ALLOWED_SPACES = {
     'cifti': ['fsLR'],
@@ -146,6 +148,528 @@ def collect_participants(layout, participant_label=None, strict=False):
     return found_label
 
 
+def get_layout_ignore_patterns(participant_label=None):
+    """Get the patterns PyBIDS should ignore when indexing a preprocessed dataset.
+
+    Parameters
+    ----------
+    participant_label : None or :obj:`list` of :obj:`str`
+        If provided, subjects that aren't in this list will be ignored as well.
+
+    Returns
+    -------
+    ignore_patterns : :obj:`list`
+        Strings and compiled regular expressions to pass to
+        :class:`~bids.layout.index.BIDSLayoutIndexer`.
+    """
+    import re
+
+    # Recommended after PyBIDS 12.1
+    ignore_patterns = [
+        'code',
+        'stimuli',
+        'models',
+        re.compile(r'\/\.\w+|^\.\w+'),  # hidden files
+        re.compile(r'sub-[a-zA-Z0-9]+(/ses-[a-zA-Z0-9]+)?/(beh|dwi|eeg|ieeg|meg|perf|pet|physio)'),
+    ]
+    if participant_label:
+        # Ignore any subjects who aren't the requested ones.
+        ignore_patterns.append(re.compile(r'sub-(?!(' + '|'.join(participant_label) + r')(\b|_))'))
+
+    return ignore_patterns
+
+
+def build_layout(bids_dir, database_path, reset_database=True, participant_label=None):
+    """Create a :class:`~bids.layout.BIDSLayout` for a preprocessed dataset.
+
+    Parameters
+    ----------
+    bids_dir : :obj:`str` or :obj:`~pathlib.Path`
+        The preprocessed dataset.
+    database_path : :obj:`str` or :obj:`~pathlib.Path`
+        Folder where the SQLite database of the layout is (or will be) stored.
+    reset_database : :obj:`bool`
+        If False and ``database_path`` already contains a database, the dataset is not
+        re-indexed and the existing database is used as-is.
+    participant_label : None or :obj:`list` of :obj:`str`
+        If provided, only these subjects are indexed.
+
+    Returns
+    -------
+    layout : :class:`~bids.layout.BIDSLayout`
+    """
+    from bids.layout.index import BIDSLayoutIndexer
+
+    indexer = BIDSLayoutIndexer(
+        validate=False,
+        ignore=get_layout_ignore_patterns(participant_label),
+    )
+    return BIDSLayout(
+        str(bids_dir),
+        database_path=database_path,
+        reset_database=reset_database,
+        indexer=indexer,
+        config=['bids', 'derivatives', str(load_data('xcp_d_bids_config2.json'))],
+    )
+
+
+def _get_mtime_signature(path, recursive=True):
+    """Get the latest modification time of a folder and the folders within it.
+
+    Adding, removing, or renaming a file updates the modification time of its parent folder,
+    so this changes whenever the set of files under ``path`` changes,
+    without having to stat every file.
+
+    If ``recursive`` is False, the latest modification time of the files directly within
+    ``path`` is returned instead.
+    """
+    if not recursive:
+        with os.scandir(path) as it:
+            return max(
+                (
+                    entry.stat().st_mtime
+                    for entry in it
+                    if entry.is_file() and not entry.name.startswith('.')
+                ),
+                default=0.0,
+            )
+
+    signature = os.stat(path).st_mtime
+    for dirpath, dirnames, _ in os.walk(path):
+        dirnames[:] = [d for d in dirnames if not d.startswith('.')]
+        for dirname in dirnames:
+            signature = max(signature, os.stat(os.path.join(dirpath, dirname)).st_mtime)
+
+    return signature
+
+
+def _load_layout_index(index_dir):
+    import json
+
+    index_file = Path(index_dir) / LAYOUT_INDEX_FILE
+    if not index_file.is_file():
+        return None
+
+    with open(index_file) as fo:
+        return json.load(fo)
+
+
+def update_layout_index(bids_dir, index_dir, participant_label=None):
+    """Build or update a persistent, per-subject index of a preprocessed dataset.
+
+    Each subject is indexed into its own PyBIDS database within ``index_dir``,
+    and a manifest records the modification-time signatures of each subject's folder
+    and of the dataset's top-level files when the subject was indexed.
+    When the index is updated, only subjects that are new or whose signatures have changed
+    are re-indexed, and subjects that no longer exist are removed from the index.
+
+    Databases are built in a temporary folder and renamed into place,
+    and then swapped in by replacing the manifest,
+    so participant-level jobs reading the index never see a partially-written database.
+    Databases that are replaced or removed are only deleted by the following update,
+    since jobs that read the manifest before this update may still be about to use them.
+
+    Participant-level jobs can pass ``index_dir`` to ``--bids-database-dir``
+    to reuse the database for their subject without indexing the dataset.
+
+    Parameters
+    ----------
+    bids_dir : :obj:`str` or :obj:`~pathlib.Path`
+        The preprocessed dataset.
+    index_dir : :obj:`str` or :obj:`~pathlib.Path`
+        Folder where the index is stored.
+    participant_label : None or :obj:`list` of :obj:`str`
+        If provided, only these subjects are indexed or updated.
+        Other subjects already in the index are left untouched.
+
+    Returns
+    -------
+    updated : :obj:`list` of :obj:`str`
+        The subjects that were (re-)indexed.
+    """
+    import json
+    import shutil
+    from uuid import uuid4
+
+    bids_dir = Path(bids_dir).absolute()
+    index_dir = Path(index_dir).absolute()
+    index_dir.mkdir(exist_ok=True, parents=True)
+
+    top_level = _get_mtime_signature(bids_dir, recursive=False)
+    manifest = _load_layout_index(index_dir)
+    if manifest is None:
+        manifest = {'bids_dir': str(bids_dir), 'subjects': {}, 'obsolete': []}
+    elif manifest['bids_dir'] != str(bids_dir):
+        # The index belonged to another dataset, so none of its databases can be reused
+        old_databases = [record['database'] for record in manifest['subjects'].values()]
+        manifest = {
+            'bids_dir': str(bids_dir),
+            'subjects': {},
+            'obsolete': manifest.get('obsolete', []) + old_databases,
+        }
+
+    with os.scandir(bids_dir) as it:
+        subjects = sorted(
+            entry.name[4:] for entry in it if entry.is_dir() and entry.name.startswith('sub-')
+        )
+
+    if participant_label:
+        subjects = [subject for subject in subjects if subject in participant_label]
+        stale = []
+    else:
+        stale = sorted(set(manifest['subjects']) - set(subjects))
+
+    deletable = manifest.get('obsolete', [])
+    obsolete = []
+    updated = []
+    for subject in subjects:
+        signature = _get_mtime_signature(bids_dir / f'sub-{subject}')
+        record = manifest['subjects'].get(subject)
+        if (
+            record is not None
+            and record['mtime'] == signature
+            and record.get('top_level') == top_level
+        ):
+            continue
+
+        LOGGER.info(f'Indexing sub-{subject}')
+        database = f'sub-{subject}_{uuid4().hex[:8]}'
+        tmp_dir = index_dir / f'.{database}.tmp'
+        build_layout(bids_dir, tmp_dir, participant_label=[subject])
+        os.replace(tmp_dir, index_dir / database)
+        if record is not None:
+            obsolete.append(record['database'])
+
+        manifest['subjects'][subject] = {
+            'mtime': signature,
+            'top_level': top_level,
+            'database': database,
+        }
+        updated.append(subject)
+
+    for subject in stale:
+        obsolete.append(manifest['subjects'].pop(subject)['database'])
+
+    manifest['obsolete'] = obsolete
+    tmp_file = index_dir / f'.{LAYOUT_INDEX_FILE}.{uuid4().hex[:8]}'
+    with open(tmp_file, 'w') as fo:
+        json.dump(manifest, fo, indent=4, sort_keys=True)
+
+    os.replace(tmp_file, index_dir / LAYOUT_INDEX_FILE)
+
+    for database in deletable:
+        shutil.rmtree(index_dir / database, ignore_errors=True)
+
+    return updated
+
+
+def is_layout_index(index_dir):
+    """Check if a folder contains an index written by :func:`update_layout_index`."""
+    return (Path(index_dir) / LAYOUT_INDEX_FILE).is_file()
+
+
+def get_layout_index_database(index_dir, bids_dir, participant_label):
+    """Find an up-to-date database for a single subject in a persistent layout index.
+
+    Parameters
+    ----------
+    index_dir : :obj:`str` or :obj:`~pathlib.Path`
+        Folder containing an index written by :func:`update_layout_index`.
+    bids_dir : :obj:`str` or :obj:`~pathlib.Path`
+        The preprocessed dataset.
+    participant_label : None or :obj:`list` of :obj:`str`
+        The subjects to process.
+
+    Returns
+    -------
+    database_path : :obj:`~pathlib.Path` or None
+        The subject's database, or None if the index can't be used,
+        because it doesn't match the dataset, more than one subject was requested,
+        or the subject's folder changed since it was indexed.
+    """
+    bids_dir = Path(bids_dir).absolute()
+    manifest = _load_layout_index(index_dir)
+    if manifest is None or manifest['bids_dir'] != str(bids_dir):
+        LOGGER.warning(f'The layout index in {index_dir} does not match {bids_dir}.')
+        return None
+
+    if not participant_label or len(participant_label) != 1:
+        LOGGER.warning(
+            'The layout index can only be used when a single participant label is requested.'
+        )
+        return None
+
+    subject = participant_label[0]
+    record = manifest['subjects'].get(subject)
+    if record is None:
+        LOGGER.warning(f'sub-{subject} is not in the layout index in {index_dir}.')
+        return None
+
+    top_level_changed = record.get('top_level') != _get_mtime_signature(bids_dir, recursive=False)
+    subject_changed = record['mtime'] != _get_mtime_signature(bids_dir / f'sub-{subject}')
+    if top_level_changed or subject_changed:
+        LOGGER.warning(
+            f'sub-{subject} has changed since the layout index in {index_dir} was updated.'
+        )
+        return None
+
+    return Path(index_dir).absolute() / record['database']
+
+
+@fill_doc
+class SubjectFileIndex:
+    """An in-memory index of a single subject's files in a :class:`~bids.layout.BIDSLayout`.
+
+    The entities of all of the subject's files are loaded with a single database query.
+    The :meth:`get`, :meth:`get_nearest`, :meth:`get_res`, and :meth:`get_den` methods
+    mirror the corresponding :class:`~bids.layout.BIDSLayout` methods,
+    but are resolved against the in-memory table,
+    so collecting a subject's data doesn't require a database query per file type and run.
+    It can be passed in place of the layout to :func:`collect_data`, :func:`collect_mesh_data`,
+    :func:`collect_morphometry_data`, and :func:`collect_run_data`.
+
+    Parameters
+    ----------
+    %(layout)s
+    participant_label : :obj:`str`
+        Subject ID.
+    """
+
+    def __init__(self, layout, participant_label):
+        from bids.layout.models import Tag
+
+        self.layout = layout
+        self.participant_label = participant_label
+
+        session = layout.connection_manager.session
+        subject_files = session.query(Tag.file_path).filter(
+            Tag.entity_name == 'subject',
+            Tag._value == participant_label,
+        )
+        tags = session.query(Tag).filter(
+            Tag.file_path.in_(subject_files),
+            Tag.is_metadata.is_(False),
+        )
+        self.entities = {}
+        for tag in tags:
+            self.entities.setdefault(tag.file_path, {})[tag.entity_name] = tag.value
+
+        # The types of the layout's entities, used to convert query values as PyBIDS does
+        self.dtypes = {name: entity.dtype for name, entity in layout.get_entities().items()}
+
+    def __repr__(self):
+        return f'SubjectFileIndex(sub-{self.participant_label}, {len(self.entities)} files)'
+
+    def get(self, return_type='object', target=None, invalid_filters='error', **filters):
+        """Select files from the index, like :meth:`bids.layout.BIDSLayout.get`.
+
+        ``return_type='object'`` returns :class:`IndexedFile` objects
+        instead of :class:`~bids.layout.BIDSFile` objects.
+        As in PyBIDS, filter values are converted to their entities' types
+        (e.g., ``run='01'`` matches ``run-1``),
+        and ``invalid_filters`` controls how filters that aren't entities are handled.
+        """
+        from bids.layout import Query
+        from bids.utils import natural_sort
+
+        bad_filters = sorted(set(filters) - set(self.dtypes))
+        if bad_filters and invalid_filters == 'drop':
+            filters = {name: value for name, value in filters.items() if name in self.dtypes}
+        elif bad_filters and invalid_filters == 'error':
+            raise ValueError(
+                f"'{bad_filters[0]}' is not a recognized entity. "
+                "If you're sure you want to impose this constraint, set invalid_filters='allow'."
+            )
+
+        def _astype(name, value):
+            if value is None or isinstance(value, Query) or name not in self.dtypes:
+                return value
+
+            # Values that can't be converted are compared as they are, as in PyBIDS
+            try:
+                return self.dtypes[name](value)
+            except (TypeError, ValueError):
+                return value
+
+        filters = {
+            name: [_astype(name, val) for val in value]
+            if isinstance(value, list | tuple)
+            else _astype(name, value)
+            for name, value in filters.items()
+        }
+        matches = [
+            path for path, entities in self.entities.items() if _match_filters(entities, filters)
+        ]
+        if return_type == 'id':
+            return natural_sort(
+                {self.entities[path][target] for path in matches if target in self.entities[path]}
+            )
+        elif return_type == 'file':
+            return natural_sort(matches)
+
+        return [IndexedFile(path, self.entities[path]) for path in natural_sort(matches)]
+
+    def get_res(self, **filters):
+        """Get the resolutions of the selected files."""
+        return self.get(return_type='id', target='res', **filters)
+
+    def get_den(self, **filters):
+        """Get the densities of the selected files."""
+        return self.get(return_type='id', target='den', **filters)
+
+    def get_file(self, filename):
+        """Get the :class:`IndexedFile` for a path in the index."""
+        filename = str(Path(filename).absolute())
+        if filename not in self.entities:
+            return self.layout.get_file(filename)
+
+        return IndexedFile(filename, self.entities[filename])
+
+    def get_metadata(self, path, **kwargs):
+        """Get the metadata for a file from the layout."""
+        return self.layout.get_metadata(path, **kwargs)
+
+    def get_nearest(
+        self,
+        path,
+        return_type='filename',
+        strict=True,
+        all_=False,
+        ignore_strict_entities='extension',
+        full_search=False,
+        **filters,
+    ):
+        """Find the file nearest to ``path``, like :meth:`bids.layout.BIDSLayout.get_nearest`.
+
+        As in PyBIDS, candidates are searched from the folder of ``path`` up to the root,
+        and candidates in each folder are ranked by the number of entities they share with
+        ``path``.
+        Unless ``all_`` is True, only the closest folder with any candidates is searched,
+        so if none of its candidates match with ``strict``, None is returned,
+        even if a file in a parent folder would match.
+        """
+        path = Path(path).absolute()
+        bids_file = self.get_file(path)
+        if bids_file is not None:
+            entities = dict(bids_file.entities)
+        else:
+            entities = self.layout.parse_file_entities(str(path))
+
+        if not filters.get('suffix'):
+            if 'suffix' not in entities:
+                raise BIDSError(f'File {path} does not have a valid suffix.', self.layout.root)
+
+            filters['suffix'] = entities['suffix']
+
+        if strict and ignore_strict_entities is not None:
+            for entity in listify(ignore_strict_entities):
+                entities.pop(entity, None)
+
+        folders = {}
+        for candidate in self.get(**filters):
+            folders.setdefault(Path(candidate.dirname), []).append(candidate)
+
+        search_paths = [folder for folder in [path, *path.parents] if folder in folders]
+        if full_search:
+            search_paths += [folder for folder in folders if folder not in search_paths]
+
+        matches = []
+        for folder in search_paths:
+            ranked = []
+            for candidate in folders[folder]:
+                shared = set(entities) & set(candidate.entities)
+                n_matched = sum(entities[k] == candidate.entities[k] for k in shared)
+                if strict and n_matched != len(shared):
+                    continue
+
+                ranked.append((n_matched, candidate))
+
+            ranked.sort(key=lambda x: x[0], reverse=True)
+            matches += [candidate for _, candidate in ranked]
+            if not all_:
+                break
+
+        if return_type.startswith('file'):
+            matches = [match.path for match in matches]
+
+        if all_:
+            return matches
+
+        return matches[0] if matches else None
+
+
+class IndexedFile:
+    """A lightweight stand-in for :class:`~bids.layout.BIDSFile` in a :class:`SubjectFileIndex`.
+
+    Parameters
+    ----------
+    path : :obj:`str`
+        Absolute path to the file.
+    entities : :obj:`dict`
+        The file's entities.
+    """
+
+    def __init__(self, path, entities):
+        self.path = path
+        self.entities = entities
+
+    def __repr__(self):
+        return f"<IndexedFile filename='{self.path}'>"
+
+    @property
+    def filename(self):
+        """The file's name."""
+        return os.path.basename(self.path)
+
+    @property
+    def dirname(self):
+        """The file's folder."""
+        return os.path.dirname(self.path)
+
+    def get_entities(self, metadata=False):
+        """Get the file's entities."""
+        return dict(self.entities)
+
+
+def _match_filters(entities, filters):
+    """Check if a file's entities match a set of :meth:`~bids.layout.BIDSLayout.get` filters.
+
+    As in PyBIDS, None matches files without the entity, and a list matches any of its values.
+    """
+    from bids.layout import Query
+
+    def _normalize(name, value):
+        if name == 'extension' and isinstance(value, str):
+            return value.lstrip('.')
+        elif isinstance(value, int):
+            return int(value)
+
+        return str(value)
+
+    for name, value in filters.items():
+        values = listify(value)
+        if any(val is getattr(Query, 'OPTIONAL', None) for val in values):
+            continue
+
+        if name not in entities:
+            if not any(val is None or val is Query.NONE for val in values):
+                return False
+
+            continue
+
+        if any(val is Query.ANY for val in values):
+            continue
+
+        file_value = _normalize(name, entities[name])
+        if not any(
+            val is not None and val is not Query.NONE and _normalize(name, val) == file_value
+            for val in values
+        ):
+            return False
+
+    return True
+
+
 @fill_doc
 def collect_data(
     layout,
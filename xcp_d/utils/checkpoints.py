@@ -0,0 +1,218 @@
+# emacs: -*- mode: python; py-indent-offset: 4; indent-tabs-mode: nil -*-
+# vi: set ft=python sts=4 ts=4 sw=4 et:
+"""Run-level checkpoints for resuming interrupted subjects.
+
+Once all of a BOLD run's derivatives have been written to the output directory,
+a small JSON marker is written to the subject's log directory.
+When XCP-D is run again, runs whose markers are still valid are not rebuilt,
+so resuming a subject after a crash only processes the runs that did not finish.
+"""
+
+import hashlib
+import json
+import os
+
+from nipype import logging
+
+LOGGER = logging.getLogger('nipype.utils')
+
+
+def get_checkpoint_file(bold_file, output_dir):
+    """Get the path to a BOLD run's checkpoint file.
+
+    Parameters
+    ----------
+    bold_file : :obj:`str`
+        Preprocessed BOLD file.
+    output_dir : :obj:`str`
+        XCP-D output directory.
+
+    Returns
+    -------
+    checkpoint_file : :obj:`str`
+        Path to the checkpoint file, in the subject's log directory.
+    """
+    from xcp_d.utils.bids import get_entity
+
+    subject_id = get_entity(bold_file, 'sub')
+    run_name = os.path.basename(bold_file).split('.')[0]
+    return os.path.join(
+        str(output_dir),
+        f'sub-{subject_id}',
+        'log',
+        'checkpoints',
+        f'{run_name}.json',
+    )
+
+
+def _describe_files(value):
+    """Replace the existing files referenced in a value with their sizes and modification times.
+
+    Input files are identified by their stats rather than their contents,
+    so that checking a run's checkpoint is cheap.
+    """
+    if isinstance(value, str) and os.path.isfile(value):
+        stats = os.stat(value)
+        return {'path': os.path.abspath(value), 'signature': [stats.st_size, stats.st_mtime_ns]}
+    elif isinstance(value, list | tuple):
+        return [_describe_files(val) for val in value]
+    elif isinstance(value, dict):
+        return {str(key): _describe_files(val) for key, val in sorted(value.items())}
+
+    return value
+
+
+def get_run_signature(bold_file, run_data, exact_scans):
+    """Identify the settings and inputs used to postprocess a BOLD run.
+
+    A checkpoint is only valid if it was written with the same signature.
+
+    Parameters
+    ----------
+    bold_file : :obj:`str`
+        Preprocessed BOLD file.
+    run_data : :obj:`dict`
+        The run's associated files and metadata, from
+        :func:`~xcp_d.utils.bids.collect_run_data`.
+    exact_scans : :obj:`list`
+        Numbers of volumes for the exact-time correlation matrices.
+
+    Returns
+    -------
+    signature : :obj:`str`
+        SHA256 checksum of the run's settings and inputs.
+    """
+    from pathlib import Path
+
+    from xcp_d import config
+    from xcp_d.__about__ import __version__
+
+    confounds_config = config.execution.confounds_config
+    if isinstance(confounds_config, Path):
+        confounds_config = confounds_config.read_text()
+
+    description = {
+        'version': __version__,
+        'workflow': config.workflow.get(),
+        'atlases': config.execution.atlases,
+        'confounds_config': confounds_config,
+        'bold_file': _describe_files(bold_file),
+        'run_data': _describe_files(run_data),
+        'exact_scans': exact_scans,
+    }
+    description = json.dumps(description, sort_keys=True, default=str)
+    return hashlib.sha256(description.encode()).hexdigest()
+
+
+def _list_files(value):
+    """Collect the files referenced in a (possibly nested) list of values."""
+    if isinstance(value, str):
+        return [value]
+    elif isinstance(value, list | tuple):
+        return [path for val in value for path in _list_files(val)]
+
+    return []
+
+
+def load_checkpoint(checkpoint_file, signature, require_outputs=False):
+    """Load a BOLD run's checkpoint, if it is still valid.
+
+    Parameters
+    ----------
+    checkpoint_file : :obj:`str`
+        Path to the checkpoint file.
+    signature : :obj:`str`
+        The run's current signature, from :func:`get_run_signature`.
+    require_outputs : :obj:`bool`
+        If True, the checkpoint is only valid if the files passed on from the run's workflow
+        (e.g., to the concatenation workflow) still exist in the working directory.
+
+    Returns
+    -------
+    outputs : :obj:`dict` or None
+        The outputs of the run's workflow, or None if the run needs to be processed again.
+    """
+    if not os.path.isfile(checkpoint_file):
+        return None
+
+    try:
+        with open(checkpoint_file) as fo:
+            checkpoint = json.load(fo)
+    except (OSError, ValueError):
+        return None
+
+    if checkpoint.get('signature') != signature:
+        LOGGER.info(f'Settings or inputs have changed since {checkpoint_file} was written.')
+        return None
+
+    missing = [path for path in checkpoint['derivatives'] if not os.path.isfile(path)]
+    if require_outputs:
+        missing += [
+            path
+            for path in _list_files(list(checkpoint['outputs'].values()))
+            if not os.path.isfile(path)
+        ]
+
+    if missing:
+        LOGGER.info(f'{len(missing)} files recorded in {checkpoint_file} no longer exist.')
+        return None
+
+    return checkpoint['outputs']
+
+
+def write_checkpoint(checkpoint_file, signature, derivatives, outputs):
+    """Atomically write a BOLD run's checkpoint.
+
+    Parameters
+    ----------
+    checkpoint_file : :obj:`str`
+        Path to the checkpoint file.
+    signature : :obj:`str`
+        The run's signature, from :func:`get_run_signature`.
+    derivatives : :obj:`list`
+        The derivatives written out for the run. May be nested (e.g., from MapNodes).
+    outputs : :obj:`dict`
+        The outputs of the run's workflow.
+    """
+    derivatives = [os.path.abspath(path) for path in _list_files(derivatives)]
+    os.makedirs(os.path.dirname(checkpoint_file), exist_ok=True)
+    temp_file = f'{checkpoint_file}.{os.getpid()}.tmp'
+    with open(temp_file, 'w') as fo:
+        json.dump(
+            {'signature': signature, 'derivatives': derivatives, 'outputs': outputs},
+            fo,
+            indent=4,
+            sort_keys=True,
+        )
+
+    os.replace(temp_file, checkpoint_file)
+
+
+def list_datasinks(workflow, prefix=''):
+    """List the datasink nodes in a workflow, including those in sub-workflows.
+
+    Parameters
+    ----------
+    workflow : :obj:`nipype.pipeline.engine.Workflow`
+        The workflow to search.
+    prefix : :obj:`str`
+        Prefix to add to the nodes' names.
+
+    Returns
+    -------
+    datasinks : :obj:`list` of :obj:`str`
+        Names of the datasink nodes, relative to the workflow
+        (e.g., ``outputs_wf.ds_denoised_bold``), which can be used to connect their outputs.
+    """
+    from nipype.pipeline import engine as pe
+
+    from xcp_d.interfaces.bids import BatchDerivativesDataSink, DerivativesDataSink
+
+    datasinks = []
+    for node in workflow._graph.nodes():
+        if isinstance(node, pe.Workflow):
+            datasinks += list_datasinks(node, prefix=f'{prefix}{node.name}.')
+        elif isinstance(node.interface, DerivativesDataSink | BatchDerivativesDataSink):
+            datasinks.append(f'{prefix}{node.name}')
+
+    return sorted(datasinks)
@@ -8,7 +8,7 @@ from contextlib import suppress
 import nibabel as nb
 import numpy as np
 import pandas as pd
-from nilearn.image import concat_imgs
+from nibabel.openers import ImageOpener
 from nipype import logging
 
 LOGGER = logging.getLogger('nipype.interface')
@@ -44,6 +44,10 @@ def concatenate_tsvs(tsv_files, out_file):
 def concatenate_niimgs(files, out_file):
     """Concatenate niimgs.
 
+    NIfTI files are streamed into the output file one run at a time,
+    so memory use is bounded by the size of a single run rather than the sum of all runs.
+    CIFTI files are merged with ``wb_command -cifti-merge``.
+
     Parameters
     ----------
     files : :obj:`list` of :obj:`str`
@@ -56,7 +60,82 @@ def concatenate_niimgs(files, out_file):
         is_nifti = isinstance(nb.load(files[0]), nb.Nifti1Image)
 
     if is_nifti:
-        concat_preproc_img = concat_imgs(files)
-        concat_preproc_img.to_filename(out_file)
+        stream_concatenate_niftis(files, out_file)
     else:
         os.system(f'wb_command -cifti-merge {out_file} -cifti {" -cifti ".join(files)}')  # noqa: S605
+
+
+def _get_concatenated_dtype(imgs):
+    """Select the data type of concatenated NIfTI images.
+
+    The shared on-disk data type is kept if none of the images are scaled.
+    Otherwise, the images' scaled values are stored as float32.
+    """
+    dtypes = {img.get_data_dtype() for img in imgs}
+    # nibabel moves the scaling factors from the header to the data proxy when loading images
+    is_scaled = any(
+        getattr(img.dataobj, 'slope', 1) != 1 or getattr(img.dataobj, 'inter', 0) != 0
+        for img in imgs
+    )
+
+    if len(dtypes) == 1 and not is_scaled:
+        return dtypes.pop()
+
+    return np.dtype(np.float32)
+
+
+def stream_concatenate_niftis(files, out_file, chunk_mb=256):
+    """Concatenate NIfTI files along the time axis, writing one run at a time.
+
+    NIfTI data are stored in Fortran order, so each run's volumes are contiguous on disk.
+    The output header is written first, with the total number of volumes,
+    and then each run's data are appended in chunks of volumes.
+
+    Parameters
+    ----------
+    files : :obj:`list` of :obj:`str`
+        List of 3D or 4D NIfTI files to concatenate over the time dimension.
+        All files must have the same spatial dimensions and affine.
+    out_file : :obj:`str`
+        The concatenated file to write out.
+    chunk_mb : :obj:`float`, optional
+        Maximum size of the blocks of data that are converted and written at once, in MB.
+        Default is 256.
+    """
+    imgs = [nb.load(f) for f in files]
+    ref_img = imgs[0]
+    for img, f in zip(imgs, files, strict=False):
+        if img.shape[:3] != ref_img.shape[:3] or not np.allclose(img.affine, ref_img.affine):
+            raise ValueError(
+                f'{f} does not have the same shape and affine as {files[0]}: '
+                f'{img.shape[:3]} vs. {ref_img.shape[:3]}'
+            )
+
+    n_volumes = [img.shape[3] if img.ndim == 4 else 1 for img in imgs]
+
+    header = ref_img.header.copy()
+    header['magic'] = header.single_magic
+    header.set_data_shape(ref_img.shape[:3] + (sum(n_volumes),))
+    header.set_data_dtype(_get_concatenated_dtype(imgs))
+    header.set_slope_inter(None)
+    # Let the header compute the smallest data offset that fits its extensions
+    header['vox_offset'] = 0
+    out_dtype = header.get_data_dtype()
+
+    volume_bytes = int(np.prod(ref_img.shape[:3])) * out_dtype.itemsize
+    chunk_size = max(1, int(chunk_mb * 1024 * 1024) // volume_bytes)
+
+    with ImageOpener(out_file, 'wb') as fobj:
+        header.write_to(fobj)
+        data_offset = header.get_data_offset()
+        fobj.write(bytes(data_offset - fobj.tell()))
+
+        for img, f, img_volumes in zip(imgs, files, n_volumes, strict=False):
+            LOGGER.debug(f'Appending {img_volumes} volumes from {f}')
+            # Load the whole run at once, since compressed files can't be sliced efficiently.
+            data = np.asanyarray(img.dataobj).reshape(ref_img.shape[:3] + (img_volumes,))
+            for start in range(0, img_volumes, chunk_size):
+                chunk = data[..., start : start + chunk_size]
+                fobj.write(chunk.astype(out_dtype, copy=False).tobytes(order='F'))
+
+            del data
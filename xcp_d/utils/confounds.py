@@ -3,13 +3,15 @@
 """Confound matrix selection based on Ciric et al. 2007."""
 
 import os
+import re
 import warnings
+from functools import lru_cache
 from pathlib import Path
 
 import numpy as np
 import pandas as pd
 from nipype import logging
-from scipy.signal import butter, filtfilt, iirnotch
+from scipy.signal import butter, iirnotch, sosfiltfilt, tf2sos
 
 from xcp_d.utils.doc import fill_doc
 
@@ -33,6 +35,45 @@ def volterra(df):
     return df
 
 
+@lru_cache(maxsize=128)
+def select_confound_columns(available_columns, required_columns):
+    """Resolve the columns requested by a confounds configuration against a confounds file.
+
+    The result is cached, since the same confounds configuration is typically applied to
+    many files with the same columns.
+
+    Parameters
+    ----------
+    available_columns : :obj:`tuple` of :obj:`str`
+        The columns in the confounds file.
+    required_columns : :obj:`tuple` of :obj:`str`
+        The columns requested in the confounds configuration.
+        Columns starting with "^" are treated as case-insensitive regular expressions.
+
+    Returns
+    -------
+    selected_columns : :obj:`tuple` of :obj:`str`
+        The selected columns, in the order they were requested.
+    """
+    selected_columns = []
+    for column in required_columns:
+        if column.startswith('^'):
+            # Regular expression
+            pattern = re.compile(column, re.IGNORECASE)
+            found_columns = [col_name for col_name in available_columns if pattern.match(col_name)]
+            if not found_columns:
+                raise ValueError(f"No columns found matching regular expression '{column}'")
+
+            selected_columns += found_columns
+        else:
+            if column not in available_columns:
+                raise ValueError(f"Column '{column}' not found in confounds file.")
+
+            selected_columns.append(column)
+
+    return tuple(selected_columns)
+
+
 @fill_doc
 def load_motion(
     confounds_df,
@@ -140,20 +181,24 @@ def filter_motion(
     as in :footcite:t:`gratton2020removal`.
     The order of the Butterworth filter is determined by ``motion_filter_order``,
     although the original paper used a first-order filter.
-    Since filtfilt applies the filter twice, motion_filter_order is divided by 2 before applying
-    the filter.
+    Since sosfiltfilt applies the filter twice, motion_filter_order is divided by 2 before
+    applying the filter.
     The original paper also used zero-padding with a padding size of 100.
-    We use constant-padding, with the default padding size determined by
-    :func:`scipy.signal.filtfilt`.
+    We use constant-padding, with a padding size of one less than the number of volumes.
 
     Band-stop filtering (``motion_filter_type = "notch"``) is performed with a notch filter,
     as in :footcite:t:`fair2020correction`.
     This filter uses the mean of the stopband frequencies as the target frequency,
     and the range between the two frequencies as the bandwidth.
-    Because iirnotch is a second-order filter and filtfilt applies the filter twice,
-    motion_filter_order is divided by 4 before applying the filter.
-    The filter is applied with constant-padding, using the default padding size determined by
-    :func:`scipy.signal.filtfilt`.
+    Because iirnotch is a second-order filter and sosfiltfilt applies the filter twice,
+    motion_filter_order is divided by 4 to determine the number of times the notch filter is
+    applied.
+    The repeated notch filters are combined into a single cascade of second-order sections,
+    which is applied once with :func:`scipy.signal.sosfiltfilt`,
+    using constant-padding with a padding size of one less than the number of volumes.
+
+    The filter coefficients are cached, so they are only designed once for a given set of
+    parameters.
 
     References
     ----------
@@ -162,46 +207,72 @@ def filter_motion(
     if motion_filter_type not in ('lp', 'notch'):
         raise ValueError(f"Motion filter type '{motion_filter_type}' not supported.")
 
+    sos = _design_motion_filter(
+        motion_filter_type=motion_filter_type,
+        TR=float(TR),
+        band_stop_min=float(band_stop_min),
+        band_stop_max=None if band_stop_max is None else float(band_stop_max),
+        motion_filter_order=int(motion_filter_order),
+    )
+    if sos is None:
+        return data.copy()
+
+    # Pass a copy, so the cached filter can't be modified
+    return sosfiltfilt(sos.copy(), data, axis=0, padtype='constant', padlen=data.shape[0] - 1)
+
+
+@lru_cache(maxsize=32)
+def _design_motion_filter(
+    motion_filter_type,
+    TR,
+    band_stop_min,
+    band_stop_max,
+    motion_filter_order,
+):
+    """Design the motion filter as second-order sections.
+
+    The arguments are the same as in :func:`filter_motion`.
+
+    Returns
+    -------
+    sos : (S, 6) numpy.ndarray or None
+        Second-order sections of the filter.
+        The array is shared by all calls with the same arguments, so it must not be modified.
+        None if the notch filter would be applied zero times.
+    """
     lowpass_hz = band_stop_min / 60
 
     sampling_frequency = 1 / TR
 
     if motion_filter_type == 'lp':  # low-pass filter
         n_filter_applications = int(np.floor(motion_filter_order / 2))
-        b, a = butter(
+        sos = butter(
             n_filter_applications,
             lowpass_hz,
             btype='lowpass',
-            output='ba',
+            output='sos',
             fs=sampling_frequency,
         )
-        filtered_data = filtfilt(b, a, data, axis=0, padtype='constant', padlen=data.shape[0] - 1)
 
     else:  # notch filter
         highpass_hz = band_stop_max / 60
         stopband_hz = np.array([lowpass_hz, highpass_hz])
         # Convert stopband to a single notch frequency.
         freq_to_remove = np.mean(stopband_hz)
-        bandwidth = np.abs(np.diff(stopband_hz))
+        bandwidth = np.abs(np.diff(stopband_hz))[0]
 
         # Create filter coefficients.
         b, a = iirnotch(freq_to_remove, freq_to_remove / bandwidth, fs=sampling_frequency)
-        # Both iirnotch and filtfilt are second-order,
+        # iirnotch is second-order and sosfiltfilt applies the filter twice,
         # so we need to divide the motion_filter_order by 4.
         n_filter_applications = int(np.floor(motion_filter_order / 4))
+        if n_filter_applications == 0:
+            return None
 
-        filtered_data = data.copy()
-        for _ in range(n_filter_applications):
-            filtered_data = filtfilt(
-                b,
-                a,
-                filtered_data,
-                axis=0,
-                padtype='constant',
-                padlen=data.shape[0] - 1,
-            )
+        # Cascade the repeated notch filters into a single higher-order filter.
+        sos = np.tile(tf2sos(b, a), (n_filter_applications, 1))
 
-    return filtered_data
+    return sos
 
 
 def _modify_motion_filter(motion_filter_type, band_stop_min, band_stop_max, TR):
@@ -2,7 +2,10 @@
 # vi: set ft=python sts=4 ts=4 sw=4 et:
 """Miscellaneous file manipulation functions."""
 
+import os
 import os.path as op
+import shutil
+import stat
 
 import numpy as np
 from nipype import logging
@@ -146,3 +149,47 @@ def ensure_list(filename):
         return list(filename)
     else:
         return None
+
+
+def link_or_copy(src, dst):
+    """Hardlink a file, or copy it if it cannot be linked.
+
+    Read-only files (e.g., files restored from the result cache) are always copied,
+    so that the new file does not share their permissions.
+    Copies use :func:`os.copy_file_range` where possible, which lets filesystems that support it
+    create reflinks (e.g., Btrfs and XFS) or copy the file on the server (e.g., NFS 4.2)
+    instead of reading and writing its contents.
+
+    Parameters
+    ----------
+    src : :obj:`str`
+        File to link or copy.
+    dst : :obj:`str`
+        Path of the new file. Any existing file at this path is replaced.
+    """
+    if op.lexists(dst):
+        os.remove(dst)
+
+    if os.stat(src).st_mode & stat.S_IWUSR:
+        try:
+            os.link(src, dst)
+            return
+        except OSError:
+            pass
+
+    with open(src, 'rb') as f_in, open(dst, 'wb') as f_out:
+        size = os.fstat(f_in.fileno()).st_size
+        try:
+            copied = 0
+            while copied < size:
+                n_bytes = os.copy_file_range(f_in.fileno(), f_out.fileno(), size - copied)
+                if n_bytes == 0:
+                    break
+
+                copied += n_bytes
+        except (AttributeError, OSError):
+            # copy_file_range is not available on this platform or filesystem
+            f_in.seek(0)
+            f_out.seek(0)
+            f_out.truncate()
+            shutil.copyfileobj(f_in, f_out)
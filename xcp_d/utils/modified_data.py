@@ -2,6 +2,8 @@
 # vi: set ft=python sts=4 ts=4 sw=4 et:
 """Functions for interpolating over high-motion volumes."""
 
+import hashlib
+import json
 import os
 
 import nibabel as nb
@@ -9,7 +11,12 @@ import numpy as np
 import pandas as pd
 from nipype import logging
 
-from xcp_d.utils.confounds import _infer_dummy_scans, _modify_motion_filter, load_motion
+from xcp_d.utils.confounds import (
+    _infer_dummy_scans,
+    _modify_motion_filter,
+    filter_motion,
+    load_motion,
+)
 from xcp_d.utils.doc import fill_doc
 from xcp_d.utils.filemanip import fname_presuffix
 
@@ -140,6 +147,146 @@ def downcast_to_32(in_file):
     return out_file
 
 
+@fill_doc
+def precompute_motion(
+    motion_files,
+    TRs,
+    motion_filter_type,
+    motion_filter_order,
+    band_stop_min,
+    band_stop_max,
+    head_radius,
+    cache_dir=None,
+):
+    """Filter motion parameters and calculate framewise displacement for a set of runs.
+
+    Runs with the same TR and number of volumes are filtered together,
+    with one call to :func:`~xcp_d.utils.confounds.filter_motion`.
+    If ``cache_dir`` is provided, each run's result is written to a TSV file named after a hash
+    of the motion file's content and the motion parameters,
+    and existing files are loaded instead of being recomputed.
+    This allows the run-level filter in :func:`~xcp_d.workflows.base.init_single_subject_wf`
+    and :class:`~xcp_d.interfaces.censoring.ProcessMotion` to share the same results.
+
+    Parameters
+    ----------
+    motion_files : :obj:`list` of :obj:`str`
+        Tabular confounds files containing motion parameters.
+        Dummy scans should *not* be removed from these files.
+    TRs : :obj:`list` of :obj:`float`
+        Repetition time of each run, in seconds.
+    %(motion_filter_type)s
+    %(motion_filter_order)s
+    %(band_stop_min)s
+    %(band_stop_max)s
+    %(head_radius)s
+    cache_dir : :obj:`str` or None
+        Directory in which to cache the results.
+        If None, results will not be cached.
+
+    Returns
+    -------
+    motion_dfs : :obj:`list` of :obj:`pandas.DataFrame`
+        The six motion parameters, the filtered motion parameters (if a filter is requested),
+        rmsd, and framewise displacement (``framewise_displacement`` and, if a filter is
+        requested, ``framewise_displacement_filtered``) for each run.
+    """
+    motion_columns = ['rot_x', 'rot_y', 'rot_z', 'trans_x', 'trans_y', 'trans_z']
+    n_runs = len(motion_files)
+    motion_dfs = [None] * n_runs
+
+    cache_files = [None] * n_runs
+    if cache_dir is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        cache_files = [
+            _get_motion_cache_file(
+                cache_dir=cache_dir,
+                motion_file=motion_file,
+                TR=TR,
+                motion_filter_type=motion_filter_type,
+                motion_filter_order=motion_filter_order,
+                band_stop_min=band_stop_min,
+                band_stop_max=band_stop_max,
+                head_radius=head_radius,
+            )
+            for motion_file, TR in zip(motion_files, TRs, strict=True)
+        ]
+        for i_run, cache_file in enumerate(cache_files):
+            if os.path.isfile(cache_file):
+                motion_dfs[i_run] = pd.read_table(cache_file)
+
+    # Group the remaining runs by TR and number of volumes, so they can be filtered together
+    groups = {}
+    for i_run, (motion_file, TR) in enumerate(zip(motion_files, TRs, strict=True)):
+        if motion_dfs[i_run] is not None:
+            continue
+
+        motion_dfs[i_run] = load_motion(motion_file, TR=TR)
+        groups.setdefault((TR, motion_dfs[i_run].shape[0]), []).append(i_run)
+
+    for (TR, _), run_idx in groups.items():
+        if motion_filter_type:
+            band_stop_min_adjusted, band_stop_max_adjusted, _ = _modify_motion_filter(
+                motion_filter_type=motion_filter_type,
+                band_stop_min=band_stop_min,
+                band_stop_max=band_stop_max,
+                TR=TR,
+            )
+            motion_arr = np.hstack(
+                [motion_dfs[i_run][motion_columns].to_numpy() for i_run in run_idx]
+            )
+            filtered_motion = filter_motion(
+                data=motion_arr,
+                TR=TR,
+                motion_filter_type=motion_filter_type,
+                band_stop_min=band_stop_min_adjusted,
+                band_stop_max=band_stop_max_adjusted,
+                motion_filter_order=motion_filter_order,
+            )
+            filtered_motion = np.split(filtered_motion, len(run_idx), axis=1)
+
+        for j_run, i_run in enumerate(run_idx):
+            motion_df = motion_dfs[i_run]
+            if motion_filter_type:
+                filtered_df = pd.DataFrame(
+                    data=filtered_motion[j_run],
+                    columns=[f'{c}_filtered' for c in motion_columns],
+                )
+                motion_df = pd.concat(
+                    [motion_df[motion_columns], filtered_df, motion_df[['rmsd']]],
+                    axis=1,
+                )
+
+            motion_df['framewise_displacement'] = compute_fd(
+                confound=motion_df,
+                head_radius=head_radius,
+                filtered=False,
+            )
+            if motion_filter_type:
+                motion_df['framewise_displacement_filtered'] = compute_fd(
+                    confound=motion_df,
+                    head_radius=head_radius,
+                    filtered=True,
+                )
+
+            if cache_files[i_run] is not None:
+                motion_df.to_csv(cache_files[i_run], sep='\t', index=False)
+
+            motion_dfs[i_run] = motion_df
+
+    return motion_dfs
+
+
+def _get_motion_cache_file(cache_dir, motion_file, **kwargs):
+    """Build the path to a cached motion file from the file's content and the parameters."""
+    hasher = hashlib.sha256()
+    with open(motion_file, 'rb') as fo:
+        hasher.update(fo.read())
+
+    hasher.update(json.dumps(kwargs, sort_keys=True, default=str).encode())
+    return os.path.join(cache_dir, f'motion_{hasher.hexdigest()[:32]}.tsv')
+
+
 @fill_doc
 def flag_bad_run(
     motion_file,
@@ -151,6 +298,7 @@ def flag_bad_run(
     band_stop_max,
     head_radius,
     fd_thresh,
+    motion_df=None,
 ):
     """Determine if a run has too many high-motion volumes to continue processing.
 
@@ -166,12 +314,20 @@ def flag_bad_run(
     %(band_stop_max)s
     %(head_radius)s
     %(fd_thresh)s
-    brain_mask
+    motion_df : :obj:`pandas.DataFrame` or None
+        Output from :func:`precompute_motion` for this run.
+        If None, it will be computed from ``motion_file``.
 
     Returns
     -------
     post_scrubbing_duration : :obj:`float`
         Amount of time remaining in the run after dummy scan removal, in seconds.
+
+    Notes
+    -----
+    Motion parameters are filtered before dummy scans are removed,
+    as in :class:`~xcp_d.interfaces.censoring.ProcessMotion`,
+    so the remaining time matches the temporal mask used for censoring.
     """
     if fd_thresh <= 0:
         # No scrubbing will be performed, so there's no point is calculating amount of "good time".
@@ -182,32 +338,22 @@ def flag_bad_run(
         confounds_file=motion_file,
     )
 
-    # Read in fmriprep confounds tsv to calculate FD
-    fmriprep_confounds_df = pd.read_table(motion_file)
-
-    # Remove dummy volumes
-    fmriprep_confounds_df = fmriprep_confounds_df.drop(np.arange(dummy_scans))
-
-    # Calculate filtered FD
-    band_stop_min_adjusted, band_stop_max_adjusted, _ = _modify_motion_filter(
-        motion_filter_type=motion_filter_type,
-        band_stop_min=band_stop_min,
-        band_stop_max=band_stop_max,
-        TR=TR,
-    )
-    motion_df = load_motion(
-        fmriprep_confounds_df,
-        TR=TR,
-        motion_filter_type=motion_filter_type,
-        motion_filter_order=motion_filter_order,
-        band_stop_min=band_stop_min_adjusted,
-        band_stop_max=band_stop_max_adjusted,
-    )
-    fd_arr = compute_fd(
-        confound=motion_df,
-        head_radius=head_radius,
-        filtered=bool(motion_filter_type),
-    )
+    if motion_df is None:
+        motion_df = precompute_motion(
+            motion_files=[motion_file],
+            TRs=[TR],
+            motion_filter_type=motion_filter_type,
+            motion_filter_order=motion_filter_order,
+            band_stop_min=band_stop_min,
+            band_stop_max=band_stop_max,
+            head_radius=head_radius,
+        )[0]
+
+    fd_column = 'framewise_displacement'
+    if motion_filter_type:
+        fd_column = 'framewise_displacement_filtered'
+
+    fd_arr = motion_df[fd_column].to_numpy()[dummy_scans:]
     return np.sum(fd_arr <= fd_thresh) * TR
 
 
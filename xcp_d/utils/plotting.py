@@ -4,16 +4,9 @@
 
 import os
 
-import matplotlib.pyplot as plt
 import nibabel as nb
 import numpy as np
 import pandas as pd
-import seaborn as sns
-from matplotlib import gridspec as mgs
-from matplotlib.colors import ListedColormap
-from nilearn._utils import check_niimg_4d
-from nilearn._utils.niimg import safe_get_data
-from nilearn.signal import clean
 
 from xcp_d.utils.bids import _get_tr
 from xcp_d.utils.doc import fill_doc
@@ -85,6 +78,10 @@ def plot_confounds(
     time_series_axis
     grid_specification
     """
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    from matplotlib import gridspec as mgs
+
     # Define TR and number of frames
     no_repetition_time = False
     if TR is None:  # Set default Repetition Time
@@ -255,6 +252,8 @@ def plot_confounds(
 
 def plot_dvars_es(time_series, ax, run_index=None):
     """Create DVARS plot for the executive summary."""
+    import seaborn as sns
+
     ax.grid(False)
 
     ntsteps = time_series.shape[0]
@@ -308,6 +307,8 @@ def plot_dvars_es(time_series, ax, run_index=None):
 
 def plot_global_signal_es(time_series, ax, run_index=None):
     """Create global signal plot for the executive summary."""
+    import seaborn as sns
+
     ntsteps = time_series.shape[0]
 
     ax.grid(False)
@@ -384,6 +385,8 @@ def plot_framewise_displacement_es(
     run_index=None,
 ):
     """Create framewise displacement plot for the executive summary."""
+    import seaborn as sns
+
     ntsteps = time_series.shape[0]
     ax.grid(axis='y')
 
@@ -527,6 +530,10 @@ def plot_fmri_es(
         An index indicating splits between runs, for concatenated data.
         If not None, this should be an array/list of integers, indicating the volumes.
     """
+    import matplotlib.pyplot as plt
+    from matplotlib import gridspec as mgs
+    from nilearn.signal import clean
+
     # Compute dvars correctly if not already done
     preprocessed_arr = read_ndata(datafile=preprocessed_bold, maskfile=mask)
     denoised_interpolated_arr = read_ndata(datafile=denoised_interpolated_bold, maskfile=mask)
@@ -760,6 +767,10 @@ class FMRIPlot:
 
     def plot(self, labelsize, figure=None):
         """Perform main plotting step."""
+        import matplotlib.pyplot as plt
+        import seaborn as sns
+        from matplotlib import gridspec as mgs
+
         # Layout settings
         sns.set_context('paper', font_scale=1)
 
@@ -863,6 +874,13 @@ def plot_carpet(
     colorbar : bool, optional
         Default is False.
     """
+    import matplotlib.pyplot as plt
+    from matplotlib import gridspec as mgs
+    from matplotlib.colors import ListedColormap
+    from nilearn._utils import check_niimg_4d
+    from nilearn._utils.niimg import safe_get_data
+    from nilearn.signal import clean
+
     img = nb.load(func)
 
     if isinstance(img, nb.Cifti2Image):  # CIFTI
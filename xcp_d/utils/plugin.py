@@ -0,0 +1,350 @@
+# emacs: -*- mode: python; py-indent-offset: 4; indent-tabs-mode: nil -*-
+# vi: set ft=python sts=4 ts=4 sw=4 et:
+"""A Nipype execution plugin that manages XCP-D's disk and memory use.
+
+Nipype already counts, for each node, how many of the nodes that use its outputs are yet to run.
+Once all of a node's consumers (including its datasinks) have finished,
+its large output files are no longer needed for the current run,
+so they can be deleted whenever the working directory exceeds its budget.
+
+A pruned node's result file is deleted along with its outputs,
+so that Nipype's hashing treats the node as not having been run,
+and a later call to XCP-D with the same working directory re-runs it instead of passing
+the deleted files to any nodes that need to be re-run.
+
+The plugin can also limit the data that running nodes read and write at the same time,
+alternating I/O-heavy nodes (e.g., loading or writing out BOLD data) with lighter ones,
+and limit how many memory-intensive nodes run at once for each subject.
+"""
+
+import os
+import re
+from collections import Counter
+from itertools import chain, zip_longest
+
+import numpy as np
+from nipype import logging
+from nipype.pipeline.plugins import MultiProcPlugin as BaseMultiProcPlugin
+
+LOGGER = logging.getLogger('nipype.workflow')
+
+# Files smaller than this are never pruned, since they do not affect the working directory's size
+_DEFAULT_MIN_PRUNE_MB = 32
+# Nodes that read or write at least this much data are treated as I/O-heavy
+_DEFAULT_IO_HEAVY_MB = 64
+_SUBJECT_PATTERN = re.compile(r'(?:^|\.)sub_([^.]+)_wf(?:\.|$)')
+PLUGIN_ARGS = ('work_dir_budget_gb', 'io_budget_gb', 'max_large_mem_per_subject')
+"""The ``plugin_args`` that require :class:`MultiProcPlugin`."""
+
+
+def find_large_files(node_dir, min_size):
+    """Find the large output files in a node's working directory.
+
+    Nipype's own files (e.g., results, hashes, and reports) are never included,
+    nor are files with other hardlinks (e.g., files that were hardlinked into the output
+    directory or restored from the result cache), since deleting them does not free any space.
+
+    Parameters
+    ----------
+    node_dir : :obj:`str`
+        The node's working directory.
+    min_size : :obj:`int`
+        Minimum file size, in bytes.
+
+    Returns
+    -------
+    large_files : :obj:`dict`
+        Dictionary mapping the large files to their sizes, in bytes.
+    """
+    large_files = {}
+    for root, dirs, files in os.walk(node_dir):
+        dirs[:] = [dir_ for dir_ in dirs if dir_ != '_report']
+        for file_ in files:
+            if file_.startswith(('_', 'result_')):
+                continue
+
+            path = os.path.join(root, file_)
+            try:
+                stats = os.lstat(path)
+            except OSError:
+                continue
+
+            if stats.st_size >= min_size and stats.st_nlink == 1:
+                large_files[path] = stats.st_size
+
+    return large_files
+
+
+def prune_node_dir(node_dir, large_files):
+    """Delete a node's large output files, along with its results.
+
+    Files that have gained other hardlinks since they were found
+    (e.g., files that datasinks linked into the output directory) are kept,
+    since deleting them would not free any space.
+
+    Parameters
+    ----------
+    node_dir : :obj:`str`
+        The node's working directory.
+    large_files : :obj:`dict`
+        The files to delete, from :func:`find_large_files`.
+
+    Returns
+    -------
+    n_bytes : :obj:`int`
+        Number of bytes freed, including files that had already been deleted.
+    """
+    # Delete the results first, so an interrupted prune never leaves a cached node behind
+    # whose outputs are missing.
+    for root, _, files in os.walk(node_dir):
+        for file_ in files:
+            if file_.startswith('result_') and file_.endswith('.pklz'):
+                os.remove(os.path.join(root, file_))
+
+    n_bytes = 0
+    for path, size in large_files.items():
+        try:
+            if os.lstat(path).st_nlink > 1:
+                continue
+
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+        n_bytes += size
+
+    return n_bytes
+
+
+def _list_paths(value):
+    """Collect the strings in a (possibly nested) output value."""
+    if isinstance(value, str):
+        return [value]
+    elif isinstance(value, list | tuple):
+        return [path for val in value for path in _list_paths(val)]
+    elif isinstance(value, dict):
+        return [path for val in value.values() for path in _list_paths(val)]
+
+    return []
+
+
+def estimate_io_bytes(node):
+    """Estimate the number of bytes a node will read and write.
+
+    Nodes are assumed to read all of their input files,
+    and datasinks to write out a copy of each of them.
+
+    Parameters
+    ----------
+    node : :obj:`nipype.pipeline.engine.Node`
+        A node whose upstream nodes have all finished.
+
+    Returns
+    -------
+    n_bytes : :obj:`int`
+    """
+    from xcp_d.interfaces.bids import BatchDerivativesDataSink, DerivativesDataSink
+
+    try:
+        # Collect the outputs of upstream nodes, as Nipype does before checking the node's hash
+        node._get_inputs()
+        inputs = node.inputs.get()
+    except Exception:  # noqa: BLE001
+        return 0
+
+    paths = {path for path in _list_paths(inputs) if os.path.isabs(path)}
+    n_bytes = sum(os.path.getsize(path) for path in paths if os.path.isfile(path))
+    if isinstance(node.interface, DerivativesDataSink | BatchDerivativesDataSink):
+        n_bytes *= 2
+
+    return n_bytes
+
+
+def interleave(*queues):
+    """Alternate between the items of several lists, preserving each list's order.
+
+    Examples
+    --------
+    >>> interleave([1, 2, 3], ['a'])
+    [1, 'a', 2, 3]
+    """
+    missing = object()
+    return [
+        item
+        for item in chain.from_iterable(zip_longest(*queues, fillvalue=missing))
+        if item is not missing
+    ]
+
+
+class MultiProcPlugin(BaseMultiProcPlugin):
+    """Execute a workflow with Nipype's MultiProc plugin, limiting disk and memory use.
+
+    In addition to the options of :class:`nipype.pipeline.plugins.MultiProcPlugin`,
+    the following ``plugin_args`` are supported:
+
+    - work_dir_budget_gb: once the large files written by finished nodes exceed this size,
+      the largest files that are no longer needed are deleted until the total
+      is within the budget. If None (default), files are never deleted.
+    - min_prune_mb: minimum size of the files to track and delete (default is 32 MB).
+    - io_budget_gb: maximum estimated data (see :func:`estimate_io_bytes`) that running nodes
+      may read and write. Nodes that would exceed the budget wait until others finish,
+      and I/O-heavy nodes (reading or writing at least ``io_heavy_mb``, default 64 MB)
+      are submitted alternately with lighter ones.
+      If None (default), data transfer is not limited.
+    - max_large_mem_per_subject: maximum number of memory-intensive nodes that may run at once
+      for each subject. Nodes are memory-intensive if they request more than ``large_mem_gb``,
+      which defaults to an even share of ``memory_gb`` across ``n_procs``.
+      If None (default), these nodes are not limited.
+
+    A file is no longer needed once the node that wrote it,
+    and every node that passed it on in its outputs (e.g., Select or Merge nodes),
+    have had all of their consumers finish successfully.
+    Files used by nodes that crashed are therefore kept.
+    """
+
+    def __init__(self, plugin_args=None):
+        super().__init__(plugin_args=plugin_args)
+        budget = self.plugin_args.get('work_dir_budget_gb')
+        self._work_dir_budget = None if budget is None else float(budget) * 1024**3
+        self._min_prune_size = (
+            float(self.plugin_args.get('min_prune_mb', _DEFAULT_MIN_PRUNE_MB)) * 1024**2
+        )
+        io_budget = self.plugin_args.get('io_budget_gb')
+        self._io_budget = None if io_budget is None else float(io_budget) * 1024**3
+        self._io_heavy_size = (
+            float(self.plugin_args.get('io_heavy_mb', _DEFAULT_IO_HEAVY_MB)) * 1024**2
+        )
+        self._max_large_mem_jobs = self.plugin_args.get('max_large_mem_per_subject')
+        self._large_mem_gb = float(
+            self.plugin_args.get('large_mem_gb', self.memory_gb / self.processors)
+        )
+        self._io_bytes = {}
+        self._work_dir_usage = 0
+        # Large files written by each node, and the nodes that refer to each file
+        self._large_files = {}
+        self._holders = {}
+        self._released = set()
+
+    def _task_finished_cb(self, jobid, cached=False):
+        super()._task_finished_cb(jobid, cached=cached)
+        # Map node sub-nodes' directories are included in their map node's directory
+        if self._work_dir_budget is None or jobid in self.mapnodesubids:
+            return
+
+        node = self.procs[jobid]
+        large_files = find_large_files(node.output_dir(), self._min_prune_size)
+        if large_files:
+            self._large_files[jobid] = large_files
+            self._work_dir_usage += sum(large_files.values())
+            for path in large_files:
+                self._holders[path] = {jobid}
+
+        if not self._holders:
+            return
+
+        try:
+            outputs = node.result.outputs.get()
+        except Exception:  # noqa: BLE001
+            # Without the outputs, the node's inputs can't be safely deleted
+            outputs = {'unknown': list(self._holders)}
+
+        for path in _list_paths(outputs):
+            if path in self._holders:
+                self._holders[path].add(jobid)
+
+    def _remove_node_dirs(self):
+        if self._work_dir_budget is None:
+            return super()._remove_node_dirs()
+
+        # Nodes whose consumers have all finished, as in Nipype's remove_node_directories
+        for idx in np.nonzero((self.refidx.sum(axis=1) == 0).__array__())[0]:
+            if idx in self.mapnodesubids or not self.proc_done[idx] or self.proc_pending[idx]:
+                continue
+
+            self.refidx[idx, idx] = -1
+            self._released.add(idx)
+
+        if self._work_dir_usage <= self._work_dir_budget:
+            return
+
+        prunable = [
+            idx
+            for idx, large_files in self._large_files.items()
+            if all(self._holders[path] <= self._released for path in large_files)
+        ]
+        # Delete the largest files first, to invalidate as few nodes as possible
+        prunable.sort(key=lambda idx: sum(self._large_files[idx].values()), reverse=True)
+        for idx in prunable:
+            if self._work_dir_usage <= self._work_dir_budget:
+                break
+
+            large_files = self._large_files.pop(idx)
+            for path in large_files:
+                del self._holders[path]
+
+            node_dir = self.procs[idx].output_dir()
+            n_bytes = prune_node_dir(node_dir, large_files)
+            self._work_dir_usage -= n_bytes
+            LOGGER.info(
+                f'[Work directory budget] Freed {n_bytes / 1024**3:.2f} GB from {node_dir}.'
+            )
+
+    def _get_io_bytes(self, jobid):
+        if jobid not in self._io_bytes:
+            self._io_bytes[jobid] = estimate_io_bytes(self.procs[jobid])
+
+        return self._io_bytes[jobid]
+
+    def _get_subject(self, jobid):
+        # Map node sub-nodes belong to the same subject as their map node
+        match = _SUBJECT_PATTERN.search(self.procs[self.mapnodesubids.get(jobid, jobid)].fullname)
+        return match.group(1) if match else None
+
+    def _is_large_mem(self, jobid):
+        return self._max_large_mem_jobs is not None and (
+            self.procs[jobid].mem_gb > self._large_mem_gb
+        )
+
+    def _sort_jobs(self, jobids, scheduler='tsort'):
+        """Order the jobs that are ready to run, holding back those that exceed the limits.
+
+        Held-back jobs are considered again the next time jobs are submitted.
+        A job is only held back while other jobs are running,
+        so jobs that exceed the limits on their own still run.
+        """
+        jobids = super()._sort_jobs(jobids, scheduler=scheduler)
+        if self._io_budget is None and self._max_large_mem_jobs is None:
+            return jobids
+
+        running = [jobid for _, jobid in self.pending_tasks]
+        io_bytes = 0
+        if self._io_budget is not None:
+            io_bytes = sum(self._get_io_bytes(jobid) for jobid in running)
+            is_heavy = {
+                jobid: self._get_io_bytes(jobid) >= self._io_heavy_size for jobid in jobids
+            }
+            jobids = interleave(
+                [jobid for jobid in jobids if is_heavy[jobid]],
+                [jobid for jobid in jobids if not is_heavy[jobid]],
+            )
+
+        large_mem_jobs = Counter(
+            self._get_subject(jobid) for jobid in running if self._is_large_mem(jobid)
+        )
+        selected = []
+        for jobid in jobids:
+            n_bytes = self._get_io_bytes(jobid) if self._io_budget is not None else 0
+            if io_bytes and io_bytes + n_bytes > self._io_budget:
+                continue
+
+            if self._is_large_mem(jobid):
+                subject = self._get_subject(jobid)
+                if large_mem_jobs[subject] >= max(self._max_large_mem_jobs, 1):
+                    continue
+
+                large_mem_jobs[subject] += 1
+
+            io_bytes += n_bytes
+            selected.append(jobid)
+
+        return selected
@@ -0,0 +1,251 @@
+"""Summarize the resources used by each node of an executed workflow."""
+
+import json
+import os
+import re
+
+import numpy as np
+import pandas as pd
+from nipype import logging
+
+LOGGER = logging.getLogger('nipype.utils')
+
+PROFILE_COLUMNS = [
+    'subject',
+    'node',
+    'interface',
+    'start',
+    'finish',
+    'wall_time_s',
+    'cpu_time_s',
+    'peak_rss_gb',
+    'estimated_mem_gb',
+    'n_procs',
+    'input_bytes',
+    'output_bytes',
+    'critical_path',
+]
+
+
+def _get_file_bytes(value):
+    """Sum the sizes of the existing files referenced in an input value."""
+    if isinstance(value, str):
+        return os.path.getsize(value) if os.path.isfile(value) else 0
+    elif isinstance(value, list | tuple):
+        return sum(_get_file_bytes(val) for val in value)
+    elif isinstance(value, dict):
+        return sum(_get_file_bytes(val) for val in value.values())
+
+    return 0
+
+
+def _get_directory_bytes(path):
+    """Sum the sizes of the files in a directory, except Nipype's own bookkeeping files."""
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for filename in filenames:
+            if filename.startswith(('_', 'result_')) or filename.endswith('.pklz'):
+                continue
+
+            filepath = os.path.join(dirpath, filename)
+            if os.path.isfile(filepath):
+                total += os.path.getsize(filepath)
+
+    return total
+
+
+def _replace_nans(obj):
+    """Replace NaNs with None, since NaNs aren't valid JSON."""
+    if isinstance(obj, dict):
+        return {key: _replace_nans(val) for key, val in obj.items()}
+    elif isinstance(obj, list):
+        return [_replace_nans(val) for val in obj]
+    elif isinstance(obj, float) and np.isnan(obj):
+        return None
+
+    return obj
+
+
+def _summarize_runtime(runtime):
+    """Get the timing and resource usage from a node's runtime.
+
+    MapNodes have a list of runtimes, one per iteration, which are combined.
+    """
+    runtimes = runtime if isinstance(runtime, list) else [runtime]
+    runtimes = [rt for rt in runtimes if rt is not None]
+
+    starts = [getattr(rt, 'startTime', None) for rt in runtimes]
+    finishes = [getattr(rt, 'endTime', None) for rt in runtimes]
+    starts = [pd.Timestamp(val) for val in starts if val]
+    finishes = [pd.Timestamp(val) for val in finishes if val]
+
+    cpu_time = np.nan
+    peaks = [getattr(rt, 'mem_peak_gb', None) for rt in runtimes]
+    peaks = [peak for peak in peaks if peak is not None]
+    profiles = [getattr(rt, 'prof_dict', None) for rt in runtimes]
+    profiles = [prof for prof in profiles if prof and len(prof.get('time', [])) > 1]
+    if profiles:
+        # Integrate the sampled CPU usage (in percent of one core) over time.
+        cpu_time = 0
+        for prof in profiles:
+            times, cpus = np.array(prof['time']), np.array(prof['cpus']) / 100
+            cpu_time += np.sum(np.diff(times) * (cpus[1:] + cpus[:-1]) / 2)
+
+    return {
+        'start': min(starts).isoformat() if starts else None,
+        'finish': max(finishes).isoformat() if finishes else None,
+        'wall_time_s': sum(getattr(rt, 'duration', 0) or 0 for rt in runtimes),
+        'cpu_time_s': cpu_time,
+        'peak_rss_gb': max(peaks) if peaks else np.nan,
+    }
+
+
+def find_critical_path(graph, durations):
+    """Find the chain of dependent nodes with the longest total duration.
+
+    Parameters
+    ----------
+    graph : :obj:`networkx.DiGraph`
+        Graph of nodes.
+    durations : :obj:`dict`
+        Duration of each node in ``graph``.
+        Nodes that are missing are assumed to take no time.
+
+    Returns
+    -------
+    critical_path : :obj:`list`
+        Nodes on the critical path, in execution order.
+    """
+    import networkx as nx
+
+    finish, previous = {}, {}
+    for node in nx.topological_sort(graph):
+        predecessors = list(graph.predecessors(node))
+        best = max(predecessors, key=lambda pred: finish[pred], default=None)
+        finish[node] = durations.get(node, 0) + (finish[best] if best is not None else 0)
+        previous[node] = best
+
+    if not finish:
+        return []
+
+    node = max(finish, key=finish.get)
+    critical_path = []
+    while node is not None:
+        critical_path.append(node)
+        node = previous[node]
+
+    return critical_path[::-1]
+
+
+def summarize_execution_graph(graph):
+    """Collect the resources used by each node of an executed workflow.
+
+    Peak memory and CPU time are only available if Nipype's resource monitor was enabled.
+    Input and output sizes are the total sizes of the files passed to each node
+    and of the files in each node's working directory, respectively.
+
+    Parameters
+    ----------
+    graph : :obj:`networkx.DiGraph`
+        Execution graph returned by :meth:`nipype.pipeline.engine.Workflow.run`.
+
+    Returns
+    -------
+    profile : :obj:`pandas.DataFrame`
+        One row per node, with the columns in :data:`PROFILE_COLUMNS`.
+    """
+    rows, durations = {}, {}
+    for node in graph.nodes():
+        try:
+            result = node.result
+        except Exception as e:  # noqa: BLE001
+            # The node crashed or its results were removed
+            LOGGER.debug(f'No results found for {node.fullname}: {e}')
+            continue
+
+        if result is None or getattr(result, 'runtime', None) is None:
+            continue
+
+        # Drop the top-level workflow from the node's name
+        name = node.fullname.split('.', 1)[-1]
+        match = re.search(r'(?:^|\.)sub_([a-zA-Z0-9]+)_wf(?:\.|$)', node.fullname)
+        row = {
+            'subject': match.group(1) if match else None,
+            'node': name,
+            'interface': type(node.interface).__name__,
+            'estimated_mem_gb': node.mem_gb,
+            'n_procs': node.n_procs,
+            'input_bytes': _get_file_bytes(result.inputs or {}),
+            'output_bytes': _get_directory_bytes(node.output_dir()),
+            'critical_path': False,
+        }
+        row.update(_summarize_runtime(result.runtime))
+        rows[node] = row
+        durations[node] = row['wall_time_s']
+
+    for subject in {row['subject'] for row in rows.values()}:
+        subject_nodes = [node for node, row in rows.items() if row['subject'] == subject]
+        for node in find_critical_path(graph.subgraph(subject_nodes), durations):
+            rows[node]['critical_path'] = True
+
+    return pd.DataFrame(list(rows.values()), columns=PROFILE_COLUMNS)
+
+
+def write_resource_profile(graph, output_dir, run_uuid, n_hotspots=10):
+    """Write a per-node resource profile and a per-subject summary to the logs folder.
+
+    Parameters
+    ----------
+    graph : :obj:`networkx.DiGraph`
+        Execution graph returned by :meth:`nipype.pipeline.engine.Workflow.run`.
+    output_dir : :obj:`str`
+        XCP-D output directory.
+    run_uuid : :obj:`str`
+        Unique identifier of the run.
+    n_hotspots : :obj:`int`
+        Number of nodes with the longest wall time and highest peak memory to list
+        in each subject's summary.
+
+    Returns
+    -------
+    profile_file : :obj:`str`
+        TSV file with one row per node.
+    summary_file : :obj:`str`
+        JSON file with the critical path and hotspots of each subject.
+    """
+    log_dir = os.path.join(output_dir, 'logs')
+    os.makedirs(log_dir, exist_ok=True)
+
+    profile = summarize_execution_graph(graph)
+    profile_file = os.path.join(log_dir, f'resource_profile_{run_uuid}.tsv')
+    profile.to_csv(profile_file, sep='\t', index=False, na_rep='n/a')
+
+    hotspot_columns = ['node', 'interface', 'wall_time_s', 'cpu_time_s', 'peak_rss_gb']
+    summary = {}
+    for subject, subject_df in profile.groupby('subject'):
+        critical_path = subject_df.loc[subject_df['critical_path']].sort_values('start')
+        summary[subject] = {
+            'n_nodes': int(subject_df.shape[0]),
+            'total_wall_time_s': float(subject_df['wall_time_s'].sum()),
+            'total_cpu_time_s': float(subject_df['cpu_time_s'].sum()),
+            'critical_path_s': float(critical_path['wall_time_s'].sum()),
+            'peak_rss_gb': float(subject_df['peak_rss_gb'].max()),
+            'critical_path': critical_path[hotspot_columns].to_dict(orient='records'),
+            'slowest_nodes': (
+                subject_df.nlargest(n_hotspots, 'wall_time_s')[hotspot_columns].to_dict(
+                    orient='records'
+                )
+            ),
+            'largest_nodes': (
+                subject_df.dropna(subset=['peak_rss_gb'])
+                .nlargest(n_hotspots, 'peak_rss_gb')[hotspot_columns]
+                .to_dict(orient='records')
+            ),
+        }
+
+    summary_file = os.path.join(log_dir, f'resource_profile_{run_uuid}.json')
+    with open(summary_file, 'w') as fo:
+        json.dump(_replace_nans(summary), fo, indent=4)
+
+    LOGGER.info(f'Resource profile written to {profile_file}')
+    return profile_file, summary_file
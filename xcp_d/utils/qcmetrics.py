@@ -2,6 +2,7 @@
 
 import nibabel as nb
 import numpy as np
+import pandas as pd
 from nipype import logging
 
 LOGGER = logging.getLogger('nipype.utils')
@@ -291,3 +292,99 @@ def compute_dvars(
     dvars_stdz = np.insert(dvars_stdz, 0, 0)
 
     return dvars_nstd, dvars_stdz
+
+
+def compute_moments(x, y):
+    """Compute the sums needed to combine the means and correlation of two series across runs.
+
+    Parameters
+    ----------
+    x, y : :obj:`numpy.ndarray` of shape (T,)
+        The two series.
+
+    Returns
+    -------
+    moments : :obj:`dict`
+        The number of samples, along with the sums of each series, of their squares,
+        and of their products.
+        Moments from different runs can be combined with :func:`combine_moments`.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    return {
+        'n': int(x.size),
+        'sum_x': float(x.sum()),
+        'sum_y': float(y.sum()),
+        'sum_xx': float(np.dot(x, x)),
+        'sum_yy': float(np.dot(y, y)),
+        'sum_xy': float(np.dot(x, y)),
+    }
+
+
+def combine_moments(moments):
+    """Add up the moments from :func:`compute_moments` across runs."""
+    return {key: sum(run_moments[key] for run_moments in moments) for key in moments[0]}
+
+
+def correlation_from_moments(moments):
+    """Calculate the Pearson correlation between two series from their moments.
+
+    Parameters
+    ----------
+    moments : :obj:`dict`
+        Output from :func:`compute_moments` or :func:`combine_moments`.
+
+    Returns
+    -------
+    r : :obj:`float`
+        The correlation coefficient, or NaN if either series is constant.
+    """
+    n = moments['n']
+    covariance = n * moments['sum_xy'] - moments['sum_x'] * moments['sum_y']
+    variance_x = n * moments['sum_xx'] - moments['sum_x'] ** 2
+    variance_y = n * moments['sum_yy'] - moments['sum_y'] ** 2
+    if variance_x <= 0 or variance_y <= 0:
+        return np.nan
+
+    return float(np.clip(covariance / np.sqrt(variance_x * variance_y), -1, 1))
+
+
+def compute_abcc_qc_table(fd, TR):
+    """Compute ABCC QC metrics for FD thresholds from 0 to 1 mm, in 0.01 mm steps.
+
+    Parameters
+    ----------
+    fd : :obj:`numpy.ndarray` of shape (n_frames,)
+        Framewise displacement time series.
+    TR : :obj:`float`
+        Repetition time, in seconds.
+
+    Returns
+    -------
+    thresholds : :obj:`numpy.ndarray` of shape (n_thresholds,)
+        FD thresholds.
+    binary_masks : :obj:`numpy.ndarray` of shape (n_thresholds, n_frames)
+        Binary masks indicating which frames exceed each threshold.
+    summary : :obj:`pandas.DataFrame` of shape (n_thresholds, 5)
+        Summary statistics for each threshold.
+    """
+    thresholds = np.around(np.linspace(0, 1, 101), 2)
+    fd = np.asarray(fd, dtype=float)
+
+    binary_masks = fd[None, :] > thresholds[:, None]
+    retained = ~binary_masks
+    n_retained = retained.sum(axis=1)
+    fd_sum = np.where(retained, fd[None, :], 0).sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_fd = np.where(n_retained > 0, fd_sum / n_retained, np.nan)
+
+    summary = pd.DataFrame(
+        {
+            'threshold': thresholds,
+            'total_frame_count': np.full(thresholds.size, fd.size, dtype=float),
+            'remaining_total_frame_count': n_retained.astype(float),
+            'remaining_seconds': n_retained * TR,
+            'remaining_frame_mean_FD': mean_fd,
+        }
+    )
+    return thresholds, binary_masks.astype(np.uint8), summary
@@ -0,0 +1,306 @@
+"""Estimate the peak memory used by XCP-D's nodes.
+
+Memory use is predicted separately for each heavy task as
+``intercept_gb + data_factor * data_gb + thread_gb * n_threads``,
+where ``data_gb`` is the size of the BOLD data, as determined from the image header.
+The thread term only applies to tasks that run with more than one thread
+(:data:`MULTITHREADED_TASKS`),
+and predictions are never lower than the fixed estimates XCP-D used before the model
+(see :func:`get_minimum_mem_gb`).
+The default coefficients are stored in ``xcp_d/data/resource_model.json``,
+and can be recalibrated from the node results of a run with the resource monitor enabled
+(see :func:`collect_resource_profiles` and :func:`calibrate_resource_model`).
+"""
+
+import json
+import os
+import re
+
+import numpy as np
+import pandas as pd
+from nipype import logging
+
+from xcp_d.data import load as load_data
+
+LOGGER = logging.getLogger('nipype.utils')
+
+RESOURCE_TASKS = (
+    'derivative',
+    'resampled',
+    'timeseries',
+    'despike',
+    'denoise',
+    'alff',
+    'parcellation',
+    'qc_plot',
+)
+# Tasks whose nodes are run with n_procs set to the number of threads.
+MULTITHREADED_TASKS = ('despike', 'alff', 'parcellation')
+# Nodes whose recorded peak memory is used to calibrate each task,
+# with the inputs that may hold the BOLD data they operate on.
+PROFILED_NODES = {
+    'downcast_data': ('timeseries', ('bold_file',)),
+    'despike3d': ('despike', ('in_file',)),
+    'regress_and_filter_bold': ('denoise', ('preprocessed_bold',)),
+    'alff_compt': ('alff', ('in_file',)),
+    'parcellate_data': ('parcellation', ('in_file', 'filtered_file')),
+    'make_linc_qc': ('qc_plot', ('bold_file',)),
+    'make_qc_plots_nipreps': ('qc_plot', ('bold_file',)),
+    'make_qc_plots_es': ('qc_plot', ('preprocessed_bold',)),
+}
+
+
+def load_resource_model(model_file=None):
+    """Load the coefficients of the resource model.
+
+    Parameters
+    ----------
+    model_file : None or :obj:`str`
+        JSON file with calibrated coefficients, as written by :func:`calibrate_resource_model`.
+        Tasks that are missing from the file use the default coefficients.
+        If None, the default coefficients are used.
+
+    Returns
+    -------
+    model : :obj:`dict`
+        Dictionary mapping each task to its ``intercept_gb``, ``data_factor``,
+        and ``thread_gb`` coefficients.
+    """
+    with open(load_data('resource_model.json')) as fo:
+        model = json.load(fo)
+
+    if model_file is not None:
+        with open(model_file) as fo:
+            model.update(json.load(fo))
+
+    return model
+
+
+def get_data_gb(in_file):
+    """Get the size in GB of an image's data, from its header.
+
+    The size is scaled by the number of bytes per voxel of the data type,
+    or of float32 for scaled data, since XCP-D works with float32 data after downcasting.
+
+    Parameters
+    ----------
+    in_file : :obj:`str`
+        Path to a NIfTI or CIFTI file.
+
+    Returns
+    -------
+    data_gb : :obj:`float`
+    """
+    import nibabel as nb
+
+    img = nb.load(in_file)
+    dtype = img.get_data_dtype()
+    if getattr(img.dataobj, 'slope', 1) != 1 or getattr(img.dataobj, 'inter', 0) != 0:
+        dtype = np.promote_types(dtype, np.float32)
+
+    n_voxels = float(np.prod(img.shape, dtype=np.float64))
+    return n_voxels * dtype.itemsize / (1024**3)
+
+
+def get_minimum_mem_gb(bold_file):
+    """Get the fixed memory estimates that XCP-D used before the resource model.
+
+    These are used as lower bounds for the model's predictions,
+    since the default coefficients have not been calibrated on every kind of data.
+
+    Parameters
+    ----------
+    bold_file : :obj:`str`
+        Path to the BOLD file.
+
+    Returns
+    -------
+    mem_gb : :obj:`dict`
+        Dictionary mapping each of :data:`RESOURCE_TASKS` to its minimum memory, in GB.
+    """
+    import nibabel as nb
+
+    bold_size_gb = os.path.getsize(bold_file) / (1024**3)
+    bold_tlen = nb.load(bold_file).shape[-1]
+    mem_gbz = {
+        'derivative': bold_size_gb,
+        'resampled': bold_size_gb * 4,
+        'timeseries': bold_size_gb * (max(bold_tlen / 100, 1.0) + 4),
+    }
+
+    if mem_gbz['timeseries'] < 4.0:
+        mem_gbz['timeseries'] = 6.0
+        mem_gbz['resampled'] = 2
+    elif mem_gbz['timeseries'] > 8.0:
+        mem_gbz['timeseries'] = 8.0
+        mem_gbz['resampled'] = 3
+
+    # The other tasks used one of these buckets or a fixed size
+    mem_gbz.update(
+        {
+            'despike': 4,
+            'denoise': mem_gbz['timeseries'],
+            'alff': mem_gbz['resampled'],
+            'parcellation': mem_gbz['timeseries'],
+            'qc_plot': 2,
+        }
+    )
+    return mem_gbz
+
+
+def predict_mem_gb(task, data_gb, n_threads=1, model=None):
+    """Predict the peak memory of a task.
+
+    Parameters
+    ----------
+    task : :obj:`str`
+        One of :data:`RESOURCE_TASKS`.
+    data_gb : :obj:`float`
+        Output from :func:`get_data_gb`.
+    n_threads : :obj:`int`
+        Number of threads available to the task.
+        Ignored for tasks that are not in :data:`MULTITHREADED_TASKS`.
+    model : None or :obj:`dict`
+        Output from :func:`load_resource_model`. If None, the default model is used.
+
+    Returns
+    -------
+    mem_gb : :obj:`float`
+    """
+    model = model or load_resource_model()
+    coefs = model[task]
+    mem_gb = coefs['intercept_gb'] + coefs['data_factor'] * data_gb
+    if task in MULTITHREADED_TASKS:
+        mem_gb += coefs['thread_gb'] * n_threads
+
+    return float(mem_gb)
+
+
+def estimate_mem_gb(bold_file, n_threads=1, model_file=None):
+    """Estimate the memory required by each task when processing a BOLD file.
+
+    Parameters
+    ----------
+    bold_file : :obj:`str`
+        Path to the BOLD file.
+    n_threads : :obj:`int`
+        Number of threads available to multithreaded tasks.
+    model_file : None or :obj:`str`
+        Calibrated resource model. If None, the default model is used.
+
+    Returns
+    -------
+    mem_gb : :obj:`dict`
+        Dictionary mapping each of :data:`RESOURCE_TASKS` to its estimated peak memory, in GB.
+        Estimates are never lower than those from :func:`get_minimum_mem_gb`.
+    """
+    model = load_resource_model(model_file)
+    data_gb = get_data_gb(bold_file)
+    min_mem_gb = get_minimum_mem_gb(bold_file)
+    return {
+        task: max(predict_mem_gb(task, data_gb, n_threads, model), min_mem_gb[task])
+        for task in RESOURCE_TASKS
+    }
+
+
+def collect_resource_profiles(work_dir):
+    """Collect the peak memory of profiled nodes from a working directory.
+
+    The run must have been performed with ``--resource-monitor``,
+    so that each node's result file records its peak memory.
+
+    Parameters
+    ----------
+    work_dir : :obj:`str`
+        XCP-D working directory.
+
+    Returns
+    -------
+    profiles : :obj:`pandas.DataFrame`
+        Table with one row per profiled node and the columns ``task``, ``data_gb``,
+        ``n_threads``, and ``mem_peak_gb``.
+    """
+    from nipype.utils.filemanip import loadpkl
+
+    rows = []
+    for dirpath, _, filenames in os.walk(work_dir):
+        dir_name = os.path.basename(dirpath)
+        node_name = dir_name
+        if os.path.basename(os.path.dirname(dirpath)) == 'mapflow':
+            # Map nodes record each sub-node's resources in mapflow/_<node name><index>
+            node_name = re.sub(r'^_(.+?)\d+$', r'\1', dir_name)
+
+        if node_name not in PROFILED_NODES or f'result_{dir_name}.pklz' not in filenames:
+            continue
+
+        task, input_names = PROFILED_NODES[node_name]
+        result = loadpkl(os.path.join(dirpath, f'result_{dir_name}.pklz'))
+        mem_peak_gb = getattr(result.runtime, 'mem_peak_gb', None)
+        inputs = result.inputs or {}
+        in_files = [inputs.get(name) for name in input_names]
+        in_files = [f for f in in_files if isinstance(f, str) and os.path.isfile(f)]
+        if mem_peak_gb is None or not in_files:
+            continue
+
+        rows.append(
+            {
+                'task': task,
+                'data_gb': get_data_gb(in_files[0]),
+                'n_threads': getattr(result.runtime, 'nthreads_max', None) or 1,
+                'mem_peak_gb': mem_peak_gb,
+            }
+        )
+
+    return pd.DataFrame(rows, columns=['task', 'data_gb', 'n_threads', 'mem_peak_gb'])
+
+
+def calibrate_resource_model(profiles, out_file=None, min_samples=3):
+    """Fit the resource model to recorded peak memory.
+
+    Each task's coefficients are fit with non-negative least squares,
+    with the thread term only for :data:`MULTITHREADED_TASKS`,
+    then the intercept is raised so that the model bounds every recorded peak,
+    since underestimating memory is worse than overestimating it.
+
+    Parameters
+    ----------
+    profiles : :obj:`pandas.DataFrame`
+        Output from :func:`collect_resource_profiles`.
+    out_file : None or :obj:`str`
+        If provided, the calibrated model is written to this JSON file,
+        which can be passed to ``--resource-model``.
+    min_samples : :obj:`int`
+        Tasks with fewer profiled nodes than this keep their default coefficients.
+
+    Returns
+    -------
+    model : :obj:`dict`
+        The calibrated model.
+    """
+    from scipy.optimize import nnls
+
+    model = load_resource_model()
+    for task, task_df in profiles.groupby('task'):
+        if task not in model or task_df.shape[0] < min_samples:
+            LOGGER.warning(f'Not enough profiles to calibrate {task}. Using default coefficients.')
+            continue
+
+        columns = [np.ones(task_df.shape[0]), task_df['data_gb'].to_numpy()]
+        if task in MULTITHREADED_TASKS:
+            columns.append(task_df['n_threads'].to_numpy())
+
+        design = np.column_stack(columns)
+        peaks = task_df['mem_peak_gb'].to_numpy()
+        coefs, _ = nnls(design, peaks)
+        coefs[0] += max(np.max(peaks - design @ coefs), 0)
+        model[task] = {
+            'intercept_gb': float(coefs[0]),
+            'data_factor': float(coefs[1]),
+            'thread_gb': float(coefs[2]) if task in MULTITHREADED_TASKS else 0.0,
+        }
+
+    if out_file is not None:
+        with open(out_file, 'w') as fo:
+            json.dump(model, fo, indent=4, sort_keys=True)
+
+    return model
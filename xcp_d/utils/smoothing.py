@@ -0,0 +1,294 @@
+# emacs: -*- mode: python; py-indent-offset: 4; indent-tabs-mode: nil -*-
+# vi: set ft=python sts=4 ts=4 sw=4 et:
+"""Sparse Gaussian smoothing kernels for CIFTI data.
+
+Smoothing a CIFTI file with a Gaussian kernel is a linear operation on its grayordinates,
+so the kernel can be built once (for a given set of surfaces, grayordinates, and kernel widths)
+as a sparse grayordinates-by-grayordinates matrix,
+and then applied to any number of dtseries or dscalar files with one matrix multiplication.
+"""
+
+import hashlib
+import json
+import os
+
+import nibabel as nb
+import numpy as np
+from nibabel.affines import apply_affine
+from nipype import logging
+from scipy import sparse
+from scipy.sparse import csgraph
+from scipy.spatial import cKDTree
+
+LOGGER = logging.getLogger('nipype.utils')
+
+# Kernels are truncated at this many sigmas
+_KERNEL_CUTOFF = 3.0
+# Number of vertices for which geodesic distances are computed at once
+_DIJKSTRA_CHUNK_SIZE = 256
+# Number of kernels to keep in memory
+_KERNEL_CACHE_SIZE = 2
+_KERNEL_CACHE = {}
+
+# Surface files to use for each CIFTI surface structure
+_SURFACE_STRUCTURES = {
+    'CIFTI_STRUCTURE_CORTEX_LEFT': 'left_surf',
+    'CIFTI_STRUCTURE_CORTEX_RIGHT': 'right_surf',
+}
+
+
+def _load_surface(surf_file):
+    """Load the vertex coordinates and triangles of a GIFTI surface."""
+    coords, faces = nb.load(surf_file).agg_data(('pointset', 'triangle'))
+    return np.asarray(coords, dtype=np.float64), np.asarray(faces, dtype=np.int64)
+
+
+def get_vertex_areas(coords, faces):
+    """Compute the area associated with each vertex of a triangular mesh.
+
+    Each vertex is assigned one third of the area of each triangle it belongs to.
+
+    Parameters
+    ----------
+    coords : numpy.ndarray of shape (V, 3)
+        Vertex coordinates.
+    faces : numpy.ndarray of shape (F, 3)
+        Vertex indices of each triangle.
+
+    Returns
+    -------
+    areas : numpy.ndarray of shape (V,)
+        Vertex areas.
+    """
+    edge1 = coords[faces[:, 1]] - coords[faces[:, 0]]
+    edge2 = coords[faces[:, 2]] - coords[faces[:, 0]]
+    face_areas = np.linalg.norm(np.cross(edge1, edge2), axis=1) / 2
+    return np.bincount(faces.ravel(), weights=np.repeat(face_areas / 3, 3), minlength=len(coords))
+
+
+def _get_edge_graph(coords, faces):
+    """Build a sparse graph of the mesh's edges, weighted by their lengths."""
+    edges = np.vstack((faces[:, [0, 1]], faces[:, [1, 2]], faces[:, [2, 0]]))
+    edges = np.unique(np.sort(edges, axis=1), axis=0)
+    lengths = np.linalg.norm(coords[edges[:, 0]] - coords[edges[:, 1]], axis=1)
+    n_vertices = len(coords)
+    graph = sparse.coo_matrix(
+        (lengths, (edges[:, 0], edges[:, 1])),
+        shape=(n_vertices, n_vertices),
+    )
+    return (graph + graph.T).tocsr()
+
+
+def get_surface_kernel(surf_file, vertices, sigma):
+    """Build a geodesic Gaussian smoothing kernel for data on a surface.
+
+    The kernel follows the ``GEO_GAUSS_AREA`` method of ``wb_command -cifti-smoothing``:
+    each vertex's smoothed value is a Gaussian-weighted average of its neighbors' values,
+    with each neighbor's weight scaled by its vertex area.
+    Geodesic distances are approximated by the shortest paths along the mesh's edges.
+
+    Parameters
+    ----------
+    surf_file : :obj:`str`
+        GIFTI surface file.
+    vertices : numpy.ndarray of shape (N,)
+        Indices of the surface vertices that have data (e.g., excluding the medial wall).
+        Only these vertices contribute to the smoothed values.
+    sigma : :obj:`float`
+        Standard deviation of the Gaussian kernel, in mm.
+
+    Returns
+    -------
+    kernel : :obj:`scipy.sparse.csr_matrix` of shape (N, N)
+        Smoothing kernel. Each row sums to one.
+    """
+    coords, faces = _load_surface(surf_file)
+    vertices = np.asarray(vertices)
+    if vertices.size and vertices.max() >= len(coords):
+        raise ValueError(
+            f'CIFTI file references vertex {vertices.max()}, '
+            f'but {surf_file} only has {len(coords)} vertices.'
+        )
+
+    areas = get_vertex_areas(coords, faces)
+    graph = _get_edge_graph(coords, faces)
+
+    cutoff = _KERNEL_CUTOFF * sigma
+    rows, columns, weights = [], [], []
+    for start in range(0, vertices.size, _DIJKSTRA_CHUNK_SIZE):
+        chunk = vertices[start : start + _DIJKSTRA_CHUNK_SIZE]
+        distances = csgraph.dijkstra(graph, directed=False, indices=chunk, limit=cutoff)
+        # Only vertices with data contribute to the smoothed values
+        distances = distances[:, vertices]
+        chunk_rows, neighbors = np.nonzero(np.isfinite(distances))
+        chunk_distances = distances[chunk_rows, neighbors]
+        rows.append(chunk_rows + start)
+        columns.append(neighbors)
+        weights.append(np.exp(-(chunk_distances**2) / (2 * sigma**2)) * areas[vertices[neighbors]])
+
+    kernel = sparse.csr_matrix(
+        (np.concatenate(weights), (np.concatenate(rows), np.concatenate(columns))),
+        shape=(vertices.size, vertices.size),
+    )
+    return _normalize_rows(kernel)
+
+
+def get_volume_kernel(voxels, affine, sigma):
+    """Build a Gaussian smoothing kernel for a set of voxels.
+
+    Parameters
+    ----------
+    voxels : numpy.ndarray of shape (N, 3)
+        Voxel indices.
+    affine : numpy.ndarray of shape (4, 4)
+        Affine mapping voxel indices to mm coordinates.
+    sigma : :obj:`float`
+        Standard deviation of the Gaussian kernel, in mm.
+
+    Returns
+    -------
+    kernel : :obj:`scipy.sparse.csr_matrix` of shape (N, N)
+        Smoothing kernel. Each row sums to one.
+    """
+    n_voxels = len(voxels)
+    coords = apply_affine(affine, voxels)
+    tree = cKDTree(coords)
+    pairs = tree.sparse_distance_matrix(tree, _KERNEL_CUTOFF * sigma, output_type='ndarray')
+    # Self-pairs have a distance of zero, which some SciPy versions drop, so add them back here
+    pairs = pairs[pairs['i'] != pairs['j']]
+    rows = np.concatenate((pairs['i'], np.arange(n_voxels)))
+    columns = np.concatenate((pairs['j'], np.arange(n_voxels)))
+    weights = np.concatenate((np.exp(-(pairs['v'] ** 2) / (2 * sigma**2)), np.ones(n_voxels)))
+    kernel = sparse.csr_matrix((weights, (rows, columns)), shape=(n_voxels, n_voxels))
+    return _normalize_rows(kernel)
+
+
+def _normalize_rows(kernel):
+    """Scale each row of a sparse kernel to sum to one."""
+    row_sums = np.asarray(kernel.sum(axis=1)).ravel()
+    row_sums[row_sums == 0] = 1
+    return sparse.diags(1 / row_sums) @ kernel
+
+
+def get_cifti_kernel(brain_models, left_surf, right_surf, sigma_surf, sigma_vol):
+    """Build a smoothing kernel for all grayordinates of a CIFTI file.
+
+    Like ``wb_command -cifti-smoothing``, each structure is smoothed independently,
+    so data are not smoothed across the boundaries of subcortical structures.
+
+    Parameters
+    ----------
+    brain_models : :obj:`nibabel.cifti2.BrainModelAxis`
+        The CIFTI file's grayordinates.
+    left_surf, right_surf : :obj:`str`
+        GIFTI surface files for the left and right hemispheres.
+    sigma_surf, sigma_vol : :obj:`float`
+        Standard deviations of the surface and volume Gaussian kernels, in mm.
+
+    Returns
+    -------
+    kernel : :obj:`scipy.sparse.csr_matrix` of shape (G, G)
+        Block-diagonal smoothing kernel, with one block per structure.
+    """
+    surfaces = {'left_surf': left_surf, 'right_surf': right_surf}
+    blocks = []
+    for structure, _, structure_models in brain_models.iter_structures():
+        if structure_models.surface_mask.all():
+            if structure not in _SURFACE_STRUCTURES:
+                raise ValueError(f'No surface available to smooth {structure}.')
+
+            blocks.append(
+                get_surface_kernel(
+                    surfaces[_SURFACE_STRUCTURES[structure]],
+                    structure_models.vertex,
+                    sigma_surf,
+                )
+            )
+        else:
+            blocks.append(
+                get_volume_kernel(structure_models.voxel, structure_models.affine, sigma_vol)
+            )
+
+    return sparse.block_diag(blocks, format='csr', dtype=np.float32)
+
+
+def _get_kernel_key(brain_models, left_surf, right_surf, sigma_surf, sigma_vol, kernel_dir):
+    """Identify a CIFTI smoothing kernel by its surfaces' contents and its grayordinates."""
+    from xcp_d import __version__
+    from xcp_d.interfaces.caching import get_file_hash
+
+    grayordinates = hashlib.sha256()
+    for structure, _, structure_models in brain_models.iter_structures():
+        grayordinates.update(structure.encode())
+        grayordinates.update(np.ascontiguousarray(structure_models.vertex).tobytes())
+        grayordinates.update(np.ascontiguousarray(structure_models.voxel).tobytes())
+
+    if brain_models.affine is not None:
+        grayordinates.update(np.asarray(brain_models.affine, dtype=np.float64).tobytes())
+
+    description = {
+        'version': __version__,
+        'left_surf': get_file_hash(left_surf, kernel_dir),
+        'right_surf': get_file_hash(right_surf, kernel_dir),
+        'sigma_surf': sigma_surf,
+        'sigma_vol': sigma_vol,
+        'grayordinates': grayordinates.hexdigest(),
+    }
+    return hashlib.sha256(json.dumps(description, sort_keys=True).encode()).hexdigest()
+
+
+def load_cifti_kernel(
+    brain_models,
+    left_surf,
+    right_surf,
+    sigma_surf,
+    sigma_vol,
+    kernel_dir=None,
+):
+    """Load a CIFTI smoothing kernel from the cache, building it if necessary.
+
+    Kernels are kept in memory for the rest of the process, and,
+    if ``kernel_dir`` is provided, written to disk so that other processes and later runs
+    can reuse them.
+
+    Parameters
+    ----------
+    brain_models : :obj:`nibabel.cifti2.BrainModelAxis`
+        The CIFTI file's grayordinates.
+    left_surf, right_surf : :obj:`str`
+        GIFTI surface files for the left and right hemispheres.
+    sigma_surf, sigma_vol : :obj:`float`
+        Standard deviations of the surface and volume Gaussian kernels, in mm.
+    kernel_dir : :obj:`str` or None
+        Directory in which to store kernels.
+
+    Returns
+    -------
+    kernel : :obj:`scipy.sparse.csr_matrix` of shape (G, G)
+        Smoothing kernel.
+    """
+    key = _get_kernel_key(brain_models, left_surf, right_surf, sigma_surf, sigma_vol, kernel_dir)
+    if key in _KERNEL_CACHE:
+        return _KERNEL_CACHE[key]
+
+    kernel = None
+    kernel_file = None
+    if kernel_dir:
+        kernel_file = os.path.join(kernel_dir, 'kernels', f'{key}.npz')
+        if os.path.isfile(kernel_file):
+            LOGGER.info(f'Loading smoothing kernel from {kernel_file}')
+            kernel = sparse.load_npz(kernel_file).tocsr()
+
+    if kernel is None:
+        kernel = get_cifti_kernel(brain_models, left_surf, right_surf, sigma_surf, sigma_vol)
+        if kernel_file:
+            os.makedirs(os.path.dirname(kernel_file), exist_ok=True)
+            temp_file = f'{kernel_file[:-4]}.{os.getpid()}.tmp.npz'
+            sparse.save_npz(temp_file, kernel)
+            os.replace(temp_file, kernel_file)
+
+    if len(_KERNEL_CACHE) >= _KERNEL_CACHE_SIZE:
+        _KERNEL_CACHE.pop(next(iter(_KERNEL_CACHE)))
+
+    _KERNEL_CACHE[key] = kernel
+    return kernel
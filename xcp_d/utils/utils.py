@@ -559,6 +559,129 @@ def _interpolate(*, arr, sample_mask, TR):
     return interpolated_arr
 
 
+def _get_despike_regressors(n_volumes, corder):
+    """Build the curve that 3dDespike fits to each time series.
+
+    The curve is a quadratic trend plus ``corder`` pairs of sines and cosines,
+    with periods that are integer fractions of the duration of the time series.
+    The trend is built on a rescaled time axis, which spans the same space as 3dDespike's
+    ``a + b*t + c*t*t``, but is better conditioned.
+    """
+    time = np.arange(n_volumes)
+    scaled_time = 2 * time / max(n_volumes - 1, 1) - 1
+    regressors = [np.ones(n_volumes), scaled_time, scaled_time**2]
+    for k in range(1, corder + 1):
+        regressors.append(np.sin(2 * np.pi * k * time / n_volumes))
+        regressors.append(np.cos(2 * np.pi * k * time / n_volumes))
+
+    return np.column_stack(regressors)
+
+
+def _running_median(arr, window):
+    """Compute the running median of each row of an array, repeating the values at the edges."""
+    from numpy.lib.stride_tricks import sliding_window_view
+
+    half = window // 2
+    padded = np.pad(arr, ((0, 0), (half, half)), mode='edge')
+    return np.median(sliding_window_view(padded, window, axis=1), axis=-1)
+
+
+def _despike_block(block, regressors, pinv_regressors, cut):
+    """Despike one block of time series in place. See :func:`despike_data`."""
+    c1, c2 = cut
+
+    # Replace obvious spikes with a 9-point running median, so they do not pull on the fit.
+    median = _running_median(block, 9)
+    deviation = np.abs(block - median)
+    local_mad = _running_median(deviation, 9)
+    cleaned = np.where(deviation > 4 * 1.4826 * local_mad, median, block)
+    del median, deviation, local_mad
+
+    fitted = (cleaned @ pinv_regressors.T) @ regressors.T
+    del cleaned
+
+    residuals = block - fitted
+    sigma = np.sqrt(np.pi / 2) * np.median(np.abs(residuals), axis=1, keepdims=True)
+    # Time series that match the curve exactly (e.g., constant ones) have nothing to despike
+    perfect_fit = sigma[:, 0] <= 0
+    sigma[perfect_fit] = 1
+    scores = residuals / sigma
+    scores[perfect_fit] = 0
+    del residuals
+
+    spikes = np.abs(scores) > c1
+    abs_scores = np.abs(scores[spikes])
+    squashed = c1 + (c2 - c1) * np.tanh((abs_scores - c1) / (c2 - c1))
+    scores[spikes] = np.sign(scores[spikes]) * squashed
+    np.copyto(block, fitted + scores * sigma, where=spikes)
+
+    return int(spikes.sum())
+
+
+def despike_data(data, corder=None, cut=(2.5, 4.0), n_threads=1, block_size=None):
+    """Remove spikes from time series, following AFNI's ``3dDespike -NEW`` algorithm.
+
+    For each time series, this function:
+
+    1.  Fits a smooth curve (a quadratic trend plus ``corder`` sines and cosines)
+        with least squares, after replacing obvious spikes with a 9-point running median,
+        as in 3dDespike's ``-NEW`` method.
+    2.  Estimates the standard deviation of the residuals (``sigma``) from their median
+        absolute deviation.
+    3.  Squashes values whose standardized residual ``s`` is larger than ``c1`` to
+        ``c1 + (c2 - c1) * tanh((s - c1) / (c2 - c1))``, so that ``[c1, inf)`` maps to
+        ``[c1, c2)``.
+
+    The results are similar, but not identical, to 3dDespike's.
+
+    Parameters
+    ----------
+    data : :obj:`numpy.ndarray` of shape (S, T)
+        Time series to despike. Floating-point arrays are despiked in place.
+    corder : :obj:`int` or None
+        Number of sine/cosine pairs in the fitted curve.
+        If None, ``T // 30`` is used, as in 3dDespike.
+    cut : :obj:`tuple` of :obj:`float`
+        The ``c1`` and ``c2`` thresholds. Default is (2.5, 4.0), as in 3dDespike.
+    n_threads : :obj:`int`
+        Number of threads to use. Blocks of time series are despiked in parallel.
+    block_size : :obj:`int` or None
+        Number of time series per block.
+        If None, blocks are sized to keep the running median's temporary arrays small.
+
+    Returns
+    -------
+    data : :obj:`numpy.ndarray` of shape (S, T)
+        Despiked time series.
+    n_spikes : :obj:`int`
+        Number of values that were squashed.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    if not np.issubdtype(data.dtype, np.floating):
+        data = data.astype(np.float32)
+
+    n_series, n_volumes = data.shape
+    corder = n_volumes // 30 if corder is None else corder
+    regressors = _get_despike_regressors(n_volumes, corder)
+    pinv_regressors = np.linalg.pinv(regressors).astype(data.dtype)
+    regressors = regressors.astype(data.dtype)
+
+    if block_size is None:
+        # The running median builds a (block_size, T, 9) array
+        block_size = max(1, (64 * 1024**2) // (9 * n_volumes * data.itemsize))
+
+    blocks = [data[start : start + block_size] for start in range(0, n_series, block_size)]
+    with ThreadPoolExecutor(max_workers=n_threads) as executor:
+        n_spikes = executor.map(
+            lambda block: _despike_block(block, regressors, pinv_regressors, cut),
+            blocks,
+        )
+        n_spikes = sum(n_spikes)
+
+    return data, n_spikes
+
+
 def _select_first(lst):
     """Select the first element in a list."""
     return lst[0]
@@ -584,24 +707,10 @@ def _transpose_lol(lol):
 
 
 def _create_mem_gb(bold_fname):
-    import os
-
-    bold_size_gb = os.path.getsize(bold_fname) / (1024**3)
-    bold_tlen = nb.load(bold_fname).shape[-1]
-    mem_gbz = {
-        'derivative': bold_size_gb,
-        'resampled': bold_size_gb * 4,
-        'timeseries': bold_size_gb * (max(bold_tlen / 100, 1.0) + 4),
-    }
-
-    if mem_gbz['timeseries'] < 4.0:
-        mem_gbz['timeseries'] = 6.0
-        mem_gbz['resampled'] = 2
-    elif mem_gbz['timeseries'] > 8.0:
-        mem_gbz['timeseries'] = 8.0
-        mem_gbz['resampled'] = 3
-
-    return mem_gbz
+    """Estimate the memory required by each task, with the default resource model."""
+    from xcp_d.utils.resources import estimate_mem_gb
+
+    return estimate_mem_gb(bold_fname)
 
 
 def is_number(s):
@@ -6,7 +6,6 @@ import os
 
 import nibabel as nb
 import numpy as np
-from nilearn import masking
 from nipype import logging
 from templateflow.api import get as get_template
 
@@ -32,6 +31,8 @@ def read_ndata(datafile, maskfile=None):
     data : (TxS) :obj:`numpy.ndarray`
         Vertices or voxels by timepoints.
     """
+    from nilearn import masking
+
     # read cifti series
     cifti_extensions = ['.dtseries.nii', '.dlabel.nii', '.ptseries.nii', '.dscalar.nii']
     if any(datafile.endswith(ext) for ext in cifti_extensions):
@@ -103,6 +104,8 @@ def write_ndata(data_matrix, template, filename, mask=None, TR=1):
     -----
     This function currently only works for NIfTIs and .dtseries.nii and .dscalar.nii CIFTIs.
     """
+    from nilearn import masking
+
     assert data_matrix.ndim in (1, 2), f'Input data must be a 1-2D array, not {data_matrix.ndim}.'
     assert os.path.isfile(template)
 
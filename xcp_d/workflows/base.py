@@ -5,17 +5,10 @@
 import os
 import sys
 from copy import deepcopy
+from importlib.metadata import version
 from pathlib import Path
 
-import bids
-import matplotlib as mpl
-import nibabel as nb
-import nilearn
-import numpy as np
-import scipy
-import templateflow
 import yaml
-from nipype import __version__ as nipype_ver
 from nipype import logging
 from nipype.interfaces import utility as niu
 from nipype.pipeline import engine as pe
@@ -26,7 +19,9 @@ from xcp_d.__about__ import __version__
 from xcp_d.interfaces.ants import ApplyTransforms
 from xcp_d.interfaces.bids import DerivativesDataSink
 from xcp_d.interfaces.report import AboutSummary, SubjectSummary
+from xcp_d.interfaces.utils import WriteCheckpoint
 from xcp_d.utils.bids import (
+    SubjectFileIndex,
     _get_tr,
     collect_confounds,
     collect_data,
@@ -37,8 +32,14 @@ from xcp_d.utils.bids import (
     get_preproc_pipeline_info,
     group_across_runs,
 )
+from xcp_d.utils.checkpoints import (
+    get_checkpoint_file,
+    get_run_signature,
+    list_datasinks,
+    load_checkpoint,
+)
 from xcp_d.utils.doc import fill_doc
-from xcp_d.utils.modified_data import calculate_exact_scans, flag_bad_run
+from xcp_d.utils.modified_data import calculate_exact_scans, flag_bad_run, precompute_motion
 from xcp_d.utils.utils import estimate_brain_radius, is_number
 from xcp_d.workflows.anatomical.parcellation import init_parcellate_surfaces_wf
 from xcp_d.workflows.anatomical.surface import init_postprocess_surfaces_wf
@@ -77,9 +78,9 @@ def init_xcpd_wf():
     xcpd_wf = Workflow(name=f'xcp_d_{ver.major}_{ver.minor}_wf')
     xcpd_wf.base_dir = config.execution.work_dir
 
-    for subject_id in config.execution.participant_label:
-        single_subject_wf = init_single_subject_wf(subject_id)
-
+    subject_ids = config.execution.participant_label
+    single_subject_wfs = _build_single_subject_wfs(subject_ids)
+    for subject_id, single_subject_wf in zip(subject_ids, single_subject_wfs, strict=True):
         single_subject_wf.config['execution']['crashdump_dir'] = str(
             config.execution.output_dir / f'sub-{subject_id}' / 'log' / config.execution.run_uuid
         )
@@ -98,6 +99,51 @@ def init_xcpd_wf():
     return xcpd_wf
 
 
+def _build_single_subject_wfs(subject_ids):
+    """Build the single-subject workflows, in parallel when multiple processes are available.
+
+    Each worker process is started fresh (rather than forked, which would share the parent's
+    open database connections), loads the current configuration from a file,
+    builds one subject's workflow, and returns it (pickled) to the parent process.
+    The layout and atlas databases are built in the parent process first,
+    so that the workers only read them.
+    """
+    import multiprocessing as mp
+    from concurrent.futures import ProcessPoolExecutor
+    from itertools import repeat
+
+    from xcp_d.utils.atlas import collect_atlases
+
+    n_workers = min(config.nipype.nprocs or 1, len(subject_ids))
+    if n_workers <= 1:
+        return [init_single_subject_wf(subject_id) for subject_id in subject_ids]
+
+    LOGGER.info(f'Building workflows for {len(subject_ids)} subjects in {n_workers} processes.')
+    config.execution.init()
+    if config.execution.atlases:
+        collect_atlases(
+            datasets=config.execution.datasets,
+            atlases=config.execution.atlases,
+            file_format=config.workflow.file_format,
+            bids_filters=config.execution.bids_filters,
+            database_dir=config.execution.work_dir / 'atlas_db',
+        )
+
+    config_file = config.execution.work_dir / config.execution.run_uuid / 'build_config.toml'
+    config_file.parent.mkdir(exist_ok=True, parents=True)
+    config.to_filename(config_file)
+    with ProcessPoolExecutor(
+        max_workers=n_workers, mp_context=mp.get_context('spawn')
+    ) as executor:
+        return list(executor.map(_init_single_subject_wf, repeat(str(config_file)), subject_ids))
+
+
+def _init_single_subject_wf(config_file, subject_id):
+    """Load the configuration and build a single subject's workflow in a worker process."""
+    config.load(config_file)
+    return init_single_subject_wf(subject_id)
+
+
 @fill_doc
 def init_single_subject_wf(subject_id: str):
     """Organize the postprocessing pipeline for a single subject.
@@ -124,8 +170,11 @@ def init_single_subject_wf(subject_id: str):
     """
     from niworkflows.engine.workflows import LiterateWorkflow as Workflow
 
+    # Load all of the subject's files once, instead of querying the layout for each file.
+    subject_layout = SubjectFileIndex(config.execution.layout, subject_id)
+
     subj_data = collect_data(
-        layout=config.execution.layout,
+        layout=subject_layout,
         participant_label=subject_id,
         bids_filters=config.execution.bids_filters,
         input_type=config.workflow.input_type,
@@ -136,12 +185,12 @@ def init_single_subject_wf(subject_id: str):
     anat_mod = 't1w' if t1w_available else 't2w'
 
     mesh_available, standard_space_mesh, software, mesh_files = collect_mesh_data(
-        layout=config.execution.layout,
+        layout=subject_layout,
         participant_label=subject_id,
         bids_filters=config.execution.bids_filters,
     )
     morph_file_types, morphometry_files = collect_morphometry_data(
-        layout=config.execution.layout,
+        layout=subject_layout,
         participant_label=subject_id,
         bids_filters=config.execution.bids_filters,
     )
@@ -216,7 +265,7 @@ The eXtensible Connectivity Pipeline- DCAN (XCP-D)
 [@mehta2024xcp;@mitigating_2018;@satterthwaite_2013]
 was used to post-process the outputs of *{info_dict['name']}* version {info_dict['version']}
 {info_dict['references']}.
-XCP-D was built with *Nipype* version {nipype_ver} [@nipype1, RRID:SCR_002502].
+XCP-D was built with *Nipype* version {version('nipype')} [@nipype1, RRID:SCR_002502].
 """
 
     cw_str = (
@@ -229,13 +278,13 @@ XCP-D was built with *Nipype* version {nipype_ver} [@nipype1, RRID:SCR_002502].
 Many internal operations of *XCP-D* use
 *AFNI* [@cox1996afni;@cox1997software],{cw_str}
 *ANTS* [@avants2009advanced],
-*TemplateFlow* version {templateflow.__version__} [@ciric2022templateflow],
-*matplotlib* version {mpl.__version__} [@hunter2007matplotlib],
-*Nibabel* version {nb.__version__} [@brett_matthew_2022_6658382],
-*Nilearn* version {nilearn.__version__} [@abraham2014machine],
-*numpy* version {np.__version__} [@harris2020array],
-*pybids* version {bids.__version__} [@yarkoni2019pybids],
-and *scipy* version {scipy.__version__} [@2020SciPy-NMeth].
+*TemplateFlow* version {version('templateflow')} [@ciric2022templateflow],
+*matplotlib* version {version('matplotlib')} [@hunter2007matplotlib],
+*Nibabel* version {version('nibabel')} [@brett_matthew_2022_6658382],
+*Nilearn* version {version('nilearn')} [@abraham2014machine],
+*numpy* version {version('numpy')} [@harris2020array],
+*pybids* version {version('pybids')} [@yarkoni2019pybids],
+and *scipy* version {version('scipy')} [@2020SciPy-NMeth].
 For more details, see the *XCP-D* website (https://xcp-d.readthedocs.io).
 
 
@@ -384,29 +433,62 @@ It is released under the [CC0](https://creativecommons.org/publicdomain/zero/1.0
     )
 
     n_runs = len(preproc_files)
+    all_run_data = {
+        bold_file: collect_run_data(
+            layout=subject_layout,
+            bold_file=bold_file,
+            file_format=config.workflow.file_format,
+            target_space=target_space,
+        )
+        for bold_file in preproc_files
+    }
+
+    # Filter motion parameters and calculate FD for all runs at once.
+    # The results are cached in the working directory, so process_motion can reuse them.
+    # Without scrubbing, flag_bad_run doesn't need FD, so there's nothing to precompute.
+    motion_dfs = dict.fromkeys(all_run_data)
+    if config.workflow.fd_thresh > 0:
+        motion_dfs = precompute_motion(
+            motion_files=[run_data['motion_file'] for run_data in all_run_data.values()],
+            TRs=[
+                run_data['bold_metadata']['RepetitionTime'] for run_data in all_run_data.values()
+            ],
+            motion_filter_type=config.workflow.motion_filter_type,
+            motion_filter_order=config.workflow.motion_filter_order,
+            band_stop_min=config.workflow.band_stop_min,
+            band_stop_max=config.workflow.band_stop_max,
+            head_radius=head_radius,
+            cache_dir=config.execution.work_dir / 'motion_cache',
+        )
+        motion_dfs = dict(zip(all_run_data.keys(), motion_dfs, strict=True))
+
+    # Outputs of each run's workflow that are used for concatenation
+    merge_elements = [
+        'name_source',
+        'preprocessed_bold',
+        'motion_file',
+        'temporal_mask',
+        'denoised_bold',
+        'denoised_interpolated_bold',
+        'censored_denoised_bold',
+        'smoothed_denoised_bold',
+        'bold_mask',
+        'boldref',
+        'timeseries',
+        'timeseries_ciftis',
+        'qc_file',
+        'qc_stats',
+    ]
+
     # group files across runs and directions, to facilitate concatenation
     preproc_files = group_across_runs(preproc_files)
     run_counter = 0
     for ent_set, task_files in enumerate(preproc_files):
         # Assuming TR is constant across runs for a given combination of entities.
-        TR = _get_tr(nb.load(task_files[0]))
+        TR = _get_tr(task_files[0])
 
         n_task_runs = len(task_files)
         if config.workflow.combine_runs and (n_task_runs > 1):
-            merge_elements = [
-                'name_source',
-                'preprocessed_bold',
-                'motion_file',
-                'temporal_mask',
-                'denoised_bold',
-                'denoised_interpolated_bold',
-                'censored_denoised_bold',
-                'smoothed_denoised_bold',
-                'bold_mask',
-                'boldref',
-                'timeseries',
-                'timeseries_ciftis',
-            ]
             merge_dict = {
                 io_name: pe.Node(
                     niu.Merge(n_task_runs, no_flatten=True),
@@ -416,12 +498,7 @@ It is released under the [CC0](https://creativecommons.org/publicdomain/zero/1.0
             }
 
         for j_run, bold_file in enumerate(task_files):
-            run_data = collect_run_data(
-                layout=config.execution.layout,
-                bold_file=bold_file,
-                file_format=config.workflow.file_format,
-                target_space=target_space,
-            )
+            run_data = all_run_data[bold_file]
             if isinstance(config.execution.confounds_config, Path):
                 confounds_dict = collect_confounds(
                     bold_file=bold_file,
@@ -443,6 +520,7 @@ It is released under the [CC0](https://creativecommons.org/publicdomain/zero/1.0
                 band_stop_max=config.workflow.band_stop_max,
                 head_radius=head_radius,
                 fd_thresh=config.workflow.fd_thresh,
+                motion_df=motion_dfs[bold_file],
             )
 
             if (config.workflow.min_time >= 0) and (
@@ -466,6 +544,30 @@ It is released under the [CC0](https://creativecommons.org/publicdomain/zero/1.0
                     bold_file=bold_file,
                 )
 
+            # Skip runs that were completed by a previous call to XCP-D.
+            # The run index is still incremented, so the other runs' workflows keep their names
+            # (and their cached results in the working directory).
+            run_index = run_counter
+            run_counter += 1
+            signature = get_run_signature(bold_file, run_data, exact_scans)
+            checkpoint_file = get_checkpoint_file(bold_file, config.execution.output_dir)
+            run_outputs = load_checkpoint(
+                checkpoint_file,
+                signature,
+                require_outputs=config.workflow.combine_runs and (n_task_runs > 1),
+            )
+            if run_outputs is not None:
+                LOGGER.info(
+                    f'{os.path.basename(bold_file)} was already postprocessed '
+                    f'(see {checkpoint_file}). This run will not be processed again.'
+                )
+                if config.workflow.combine_runs and (n_task_runs > 1):
+                    for io_name, node in merge_dict.items():
+                        if run_outputs.get(io_name) is not None:
+                            setattr(node.inputs, f'in{j_run + 1}', run_outputs[io_name])
+
+                continue
+
             postprocess_bold_wf = init_postprocess_bold_wf(
                 bold_file=bold_file,
                 head_radius=head_radius,
@@ -474,9 +576,39 @@ It is released under the [CC0](https://creativecommons.org/publicdomain/zero/1.0
                 t2w_available=t2w_available,
                 n_runs=n_runs,
                 exact_scans=exact_scans,
-                name=f'postprocess_{run_counter}_wf',
+                name=f'postprocess_{run_index}_wf',
             )
-            run_counter += 1
+
+            # Mark the run as complete once all of its derivatives have been written out.
+            datasinks = list_datasinks(postprocess_bold_wf)
+            collect_derivatives = pe.Node(
+                niu.Merge(len(datasinks)),
+                name=f'collect_derivatives_{run_index}',
+                run_without_submitting=True,
+            )
+            for i_sink, datasink in enumerate(datasinks):
+                workflow.connect([
+                    (postprocess_bold_wf, collect_derivatives, [
+                        (f'{datasink}.out_file', f'in{i_sink + 1}'),
+                    ]),
+                ])  # fmt:skip
+
+            write_checkpoint = pe.Node(
+                WriteCheckpoint(
+                    output_names=merge_elements,
+                    checkpoint_file=checkpoint_file,
+                    signature=signature,
+                ),
+                name=f'write_checkpoint_{run_index}',
+                run_without_submitting=True,
+            )
+            workflow.connect([(collect_derivatives, write_checkpoint, [('out', 'derivatives')])])
+            for io_name in merge_elements:
+                workflow.connect([
+                    (postprocess_bold_wf, write_checkpoint, [
+                        (f'outputnode.{io_name}', io_name),
+                    ]),
+                ])  # fmt:skip
 
             workflow.connect([
                 (postprocess_anat_wf, postprocess_bold_wf, [
@@ -11,7 +11,7 @@ from num2words import num2words
 from xcp_d import config
 from xcp_d.interfaces.utils import ConvertTo32
 from xcp_d.utils.doc import fill_doc
-from xcp_d.utils.utils import _create_mem_gb
+from xcp_d.utils.resources import estimate_mem_gb
 from xcp_d.workflows.bold.connectivity import init_functional_connectivity_cifti_wf
 from xcp_d.workflows.bold.metrics import init_alff_wf, init_reho_cifti_wf
 from xcp_d.workflows.bold.outputs import init_postproc_derivatives_wf
@@ -191,12 +191,19 @@ the following post-processing was performed.
                 # if parcellation is performed
                 'timeseries',
                 'timeseries_ciftis',
+                # if LINC QC is enabled
+                'qc_file',
+                'qc_stats',
             ],
         ),
         name='outputnode',
     )
 
-    mem_gbx = _create_mem_gb(bold_file)
+    mem_gbx = estimate_mem_gb(
+        bold_file,
+        n_threads=config.nipype.omp_nthreads,
+        model_file=config.nipype.resource_model,
+    )
 
     downcast_data = pe.Node(
         ConvertTo32(),
@@ -246,7 +253,7 @@ the following post-processing was performed.
     ])  # fmt:skip
 
     if despike:
-        despike_wf = init_despike_wf(TR=TR)
+        despike_wf = init_despike_wf(mem_gb=mem_gbx)
 
         workflow.connect([
             (prepare_confounds_wf, despike_wf, [
@@ -295,6 +302,7 @@ the following post-processing was performed.
     qc_report_wf = init_qc_report_wf(
         TR=TR,
         head_radius=head_radius,
+        mem_gb=mem_gbx,
         name='qc_report_wf',
     )
 
@@ -329,6 +337,10 @@ the following post-processing was performed.
             ('outputnode.smoothed_denoised_bold', 'inputnode.smoothed_denoised_bold'),
         ]),
         (qc_report_wf, postproc_derivatives_wf, [('outputnode.qc_file', 'inputnode.qc_file')]),
+        (qc_report_wf, outputnode, [
+            ('outputnode.qc_file', 'qc_file'),
+            ('outputnode.qc_stats', 'qc_stats'),
+        ]),
         (prepare_confounds_wf, postproc_derivatives_wf, [
             ('outputnode.confounds_tsv', 'inputnode.confounds_tsv'),
             ('outputnode.confounds_metadata', 'inputnode.confounds_metadata'),
@@ -5,13 +5,14 @@ from nipype.pipeline import engine as pe
 from niworkflows.engine.workflows import LiterateWorkflow as Workflow
 
 from xcp_d import config
-from xcp_d.interfaces.bids import BIDSURI, DerivativesDataSink
+from xcp_d.interfaces.bids import BIDSURI, BatchDerivativesDataSink, DerivativesDataSink
 from xcp_d.interfaces.concatenation import (
     CleanNameSource,
     ConcatenateInputs,
+    ConcatenateQC,
     FilterOutFailedRuns,
 )
-from xcp_d.interfaces.connectivity import TSVConnect
+from xcp_d.interfaces.connectivity import TSVConnect, TSVConnectRuns
 from xcp_d.utils.doc import fill_doc
 from xcp_d.utils.utils import _select_first, _transpose_lol
 from xcp_d.workflows.bold.plotting import init_qc_report_wf
@@ -70,6 +71,18 @@ def init_concatenate_data_wf(TR, head_radius, name='concatenate_data_wf'):
         This will be a list of lists, with one sublist for each run.
     %(timeseries_ciftis)s
         This will be a list of lists, with one sublist for each run.
+    qc_file : :obj:`list` of :obj:`str`
+        LINC QC TSV files for each of the runs. Only used for light concatenation.
+    qc_stats : :obj:`list` of :obj:`str`
+        JSON files with the statistics needed to combine the runs' QC metrics.
+        Only used for light concatenation.
+
+    Notes
+    -----
+    If ``--combine-runs-mode`` is ``light``, only the parcellated time series,
+    motion parameters, and temporal masks are concatenated.
+    QC metrics and correlation matrices are then combined from statistics calculated for each
+    run, so the dense BOLD data are neither reloaded nor concatenated.
     """
     workflow = Workflow(name=name)
 
@@ -78,8 +91,17 @@ def init_concatenate_data_wf(TR, head_radius, name='concatenate_data_wf'):
     file_format = config.workflow.file_format
     fd_thresh = config.workflow.fd_thresh
     atlases = config.execution.atlases
-
-    workflow.__desc__ = """
+    light = config.workflow.combine_runs_mode == 'light'
+
+    if light:
+        workflow.__desc__ = """
+Parcellated time series, motion parameters, and temporal masks from multi-run tasks were then
+concatenated across runs and directions.
+Quality control metrics and correlation matrices for the concatenated runs were calculated from
+statistics summarizing each run.
+"""
+    else:
+        workflow.__desc__ = """
 Postprocessing derivatives from multi-run tasks were then concatenated across runs and directions.
 """
 
@@ -101,6 +123,8 @@ Postprocessing derivatives from multi-run tasks were then concatenated across ru
                 'template_to_anat_xfm',  # only for niftis, from data collection
                 'timeseries',
                 'timeseries_ciftis',  # only for ciftis, from postproc workflows
+                'qc_file',  # only used for light concatenation
+                'qc_stats',  # only used for light concatenation
             ],
         ),
         name='inputnode',
@@ -130,6 +154,8 @@ Postprocessing derivatives from multi-run tasks were then concatenated across ru
             ('boldref', 'boldref'),
             ('timeseries', 'timeseries'),
             ('timeseries_ciftis', 'timeseries_ciftis'),
+            ('qc_file', 'qc_file'),
+            ('qc_stats', 'qc_stats'),
         ])
     ])  # fmt:skip
 
@@ -140,47 +166,86 @@ Postprocessing derivatives from multi-run tasks were then concatenated across ru
 
     workflow.connect([
         (filter_runs, concatenate_inputs, [
-            ('preprocessed_bold', 'preprocessed_bold'),
             ('motion_file', 'motion_file'),
             ('temporal_mask', 'temporal_mask'),
-            ('denoised_bold', 'denoised_bold'),
-            ('denoised_interpolated_bold', 'denoised_interpolated_bold'),
-            ('censored_denoised_bold', 'censored_denoised_bold'),
-            ('smoothed_denoised_bold', 'smoothed_denoised_bold'),
             ('timeseries', 'timeseries'),
             ('timeseries_ciftis', 'timeseries_ciftis'),
         ]),
     ])  # fmt:skip
+    if not light:
+        workflow.connect([
+            (filter_runs, concatenate_inputs, [
+                ('preprocessed_bold', 'preprocessed_bold'),
+                ('denoised_bold', 'denoised_bold'),
+                ('denoised_interpolated_bold', 'denoised_interpolated_bold'),
+                ('censored_denoised_bold', 'censored_denoised_bold'),
+                ('smoothed_denoised_bold', 'smoothed_denoised_bold'),
+            ]),
+        ])  # fmt:skip
 
-    # Now, run the QC report workflow on the concatenated BOLD file.
-    qc_report_wf = init_qc_report_wf(
-        TR=TR,
-        head_radius=head_radius,
-        name='concat_qc_report_wf',
-    )
-    qc_report_wf.inputs.inputnode.dummy_scans = 0
+    if not light:
+        # Now, run the QC report workflow on the concatenated BOLD file.
+        qc_report_wf = init_qc_report_wf(
+            TR=TR,
+            head_radius=head_radius,
+            name='concat_qc_report_wf',
+        )
+        qc_report_wf.inputs.inputnode.dummy_scans = 0
 
-    workflow.connect([
-        (inputnode, qc_report_wf, [
-            ('template_to_anat_xfm', 'inputnode.template_to_anat_xfm'),
-            ('anat_native', 'inputnode.anat'),
-            ('anat_brainmask', 'inputnode.anat_brainmask'),
-        ]),
-        (clean_name_source, qc_report_wf, [('name_source', 'inputnode.name_source')]),
-        (filter_runs, qc_report_wf, [
-            # nifti-only inputs
-            (('bold_mask', _select_first), 'inputnode.bold_mask'),
-            (('boldref', _select_first), 'inputnode.boldref'),
-        ]),
-        (concatenate_inputs, qc_report_wf, [
-            ('preprocessed_bold', 'inputnode.preprocessed_bold'),
-            ('denoised_interpolated_bold', 'inputnode.denoised_interpolated_bold'),
-            ('censored_denoised_bold', 'inputnode.censored_denoised_bold'),
-            ('motion_file', 'inputnode.motion_file'),
-            ('temporal_mask', 'inputnode.temporal_mask'),
-            ('run_index', 'inputnode.run_index'),
-        ]),
-    ])  # fmt:skip
+        workflow.connect([
+            (inputnode, qc_report_wf, [
+                ('template_to_anat_xfm', 'inputnode.template_to_anat_xfm'),
+                ('anat_native', 'inputnode.anat'),
+                ('anat_brainmask', 'inputnode.anat_brainmask'),
+            ]),
+            (clean_name_source, qc_report_wf, [('name_source', 'inputnode.name_source')]),
+            (filter_runs, qc_report_wf, [
+                # nifti-only inputs
+                (('bold_mask', _select_first), 'inputnode.bold_mask'),
+                (('boldref', _select_first), 'inputnode.boldref'),
+            ]),
+            (concatenate_inputs, qc_report_wf, [
+                ('preprocessed_bold', 'inputnode.preprocessed_bold'),
+                ('denoised_interpolated_bold', 'inputnode.denoised_interpolated_bold'),
+                ('censored_denoised_bold', 'inputnode.censored_denoised_bold'),
+                ('motion_file', 'inputnode.motion_file'),
+                ('temporal_mask', 'inputnode.temporal_mask'),
+                ('run_index', 'inputnode.run_index'),
+            ]),
+        ])  # fmt:skip
+
+    elif config.workflow.linc_qc:
+        # Combine the runs' QC metrics without the concatenated BOLD file.
+        concatenate_qc = pe.Node(
+            ConcatenateQC(),
+            name='concatenate_qc',
+            run_without_submitting=True,
+            mem_gb=1,
+        )
+        workflow.connect([
+            (clean_name_source, concatenate_qc, [('name_source', 'name_source')]),
+            (filter_runs, concatenate_qc, [
+                ('qc_file', 'qc_file'),
+                ('qc_stats', 'qc_stats'),
+            ]),
+        ])  # fmt:skip
+
+        ds_qc_file = pe.Node(
+            DerivativesDataSink(
+                dismiss_entities=['desc', 'den', 'res'],
+                den='91k' if file_format == 'cifti' else None,
+                desc='linc',
+                suffix='qc',
+                extension='.tsv',
+            ),
+            name='ds_qc_file',
+            run_without_submitting=True,
+            mem_gb=1,
+        )
+        workflow.connect([
+            (clean_name_source, ds_qc_file, [('name_source', 'source_file')]),
+            (concatenate_qc, ds_qc_file, [('qc_file', 'in_file')]),
+        ])  # fmt:skip
 
     motion_src = pe.Node(
         BIDSURI(
@@ -237,92 +302,94 @@ Postprocessing derivatives from multi-run tasks were then concatenated across ru
             (temporal_mask_src, ds_temporal_mask, [('out', 'Sources')]),
         ])  # fmt:skip
 
-    if file_format == 'cifti':
-        ds_denoised_bold = pe.Node(
-            DerivativesDataSink(
-                dismiss_entities=['den'],
-                desc='denoised',
-                den='91k',
-                extension='.dtseries.nii',
-            ),
-            name='ds_denoised_bold',
-            run_without_submitting=True,
-            mem_gb=2,
-        )
-
-        if smoothing:
-            ds_smoothed_denoised_bold = pe.Node(
+    # Dense outputs are not concatenated in light mode.
+    if not light:
+        if file_format == 'cifti':
+            ds_denoised_bold = pe.Node(
                 DerivativesDataSink(
                     dismiss_entities=['den'],
-                    desc='denoisedSmoothed',
+                    desc='denoised',
                     den='91k',
                     extension='.dtseries.nii',
                 ),
-                name='ds_smoothed_denoised_bold',
+                name='ds_denoised_bold',
                 run_without_submitting=True,
                 mem_gb=2,
             )
 
-    else:
-        ds_denoised_bold = pe.Node(
-            DerivativesDataSink(
-                desc='denoised',
-                extension='.nii.gz',
-                compression=True,
-            ),
-            name='ds_denoised_bold',
-            run_without_submitting=True,
-            mem_gb=2,
-        )
+            if smoothing:
+                ds_smoothed_denoised_bold = pe.Node(
+                    DerivativesDataSink(
+                        dismiss_entities=['den'],
+                        desc='denoisedSmoothed',
+                        den='91k',
+                        extension='.dtseries.nii',
+                    ),
+                    name='ds_smoothed_denoised_bold',
+                    run_without_submitting=True,
+                    mem_gb=2,
+                )
 
-        if smoothing:
-            ds_smoothed_denoised_bold = pe.Node(
+        else:
+            ds_denoised_bold = pe.Node(
                 DerivativesDataSink(
-                    desc='denoisedSmoothed',
+                    desc='denoised',
                     extension='.nii.gz',
                     compression=True,
                 ),
-                name='ds_smoothed_denoised_bold',
+                name='ds_denoised_bold',
                 run_without_submitting=True,
                 mem_gb=2,
             )
 
-    denoised_bold_src = pe.Node(
-        BIDSURI(
-            numinputs=1,
-            dataset_links=config.execution.dataset_links,
-            out_dir=str(output_dir),
-        ),
-        name='denoised_bold_src',
-        run_without_submitting=True,
-    )
-    workflow.connect([(filter_runs, denoised_bold_src, [('denoised_bold', 'in1')])])
-
-    workflow.connect([
-        (clean_name_source, ds_denoised_bold, [('name_source', 'source_file')]),
-        (concatenate_inputs, ds_denoised_bold, [('denoised_bold', 'in_file')]),
-        (denoised_bold_src, ds_denoised_bold, [('out', 'Sources')]),
-    ])  # fmt:skip
+            if smoothing:
+                ds_smoothed_denoised_bold = pe.Node(
+                    DerivativesDataSink(
+                        desc='denoisedSmoothed',
+                        extension='.nii.gz',
+                        compression=True,
+                    ),
+                    name='ds_smoothed_denoised_bold',
+                    run_without_submitting=True,
+                    mem_gb=2,
+                )
 
-    if smoothing:
-        smoothed_src = pe.Node(
+        denoised_bold_src = pe.Node(
             BIDSURI(
                 numinputs=1,
                 dataset_links=config.execution.dataset_links,
                 out_dir=str(output_dir),
             ),
-            name='smoothed_src',
+            name='denoised_bold_src',
             run_without_submitting=True,
         )
+        workflow.connect([(filter_runs, denoised_bold_src, [('denoised_bold', 'in1')])])
+
         workflow.connect([
-            (filter_runs, smoothed_src, [('smoothed_denoised_bold', 'in1')]),
-            (clean_name_source, ds_smoothed_denoised_bold, [('name_source', 'source_file')]),
-            (concatenate_inputs, ds_smoothed_denoised_bold, [
-                ('smoothed_denoised_bold', 'in_file'),
-            ]),
-            (smoothed_src, ds_smoothed_denoised_bold, [('out', 'Sources')]),
+            (clean_name_source, ds_denoised_bold, [('name_source', 'source_file')]),
+            (concatenate_inputs, ds_denoised_bold, [('denoised_bold', 'in_file')]),
+            (denoised_bold_src, ds_denoised_bold, [('out', 'Sources')]),
         ])  # fmt:skip
 
+        if smoothing:
+            smoothed_src = pe.Node(
+                BIDSURI(
+                    numinputs=1,
+                    dataset_links=config.execution.dataset_links,
+                    out_dir=str(output_dir),
+                ),
+                name='smoothed_src',
+                run_without_submitting=True,
+            )
+            workflow.connect([
+                (filter_runs, smoothed_src, [('smoothed_denoised_bold', 'in1')]),
+                (clean_name_source, ds_smoothed_denoised_bold, [('name_source', 'source_file')]),
+                (concatenate_inputs, ds_smoothed_denoised_bold, [
+                    ('smoothed_denoised_bold', 'in_file'),
+                ]),
+                (smoothed_src, ds_smoothed_denoised_bold, [('out', 'Sources')]),
+            ])  # fmt:skip
+
     # Functional connectivity outputs
     if atlases:
         make_timeseries_dict = pe.MapNode(
@@ -340,8 +407,9 @@ Postprocessing derivatives from multi-run tasks were then concatenated across ru
             (filter_runs, make_timeseries_dict, [(('timeseries', _transpose_lol), 'in1')]),
         ])  # fmt:skip
 
-        ds_timeseries = pe.MapNode(
-            DerivativesDataSink(
+        ds_timeseries = pe.Node(
+            BatchDerivativesDataSink(
+                iterfield=['segmentation', 'in_file', 'meta_dict'],
                 dismiss_entities=['desc', 'den', 'res'],
                 statistic='mean',
                 suffix='timeseries',
@@ -352,7 +420,6 @@ Postprocessing derivatives from multi-run tasks were then concatenated across ru
             name='ds_timeseries',
             run_without_submitting=True,
             mem_gb=1,
-            iterfield=['segmentation', 'in_file', 'meta_dict'],
         )
         ds_timeseries.inputs.segmentation = atlases
 
@@ -363,19 +430,36 @@ Postprocessing derivatives from multi-run tasks were then concatenated across ru
         ])  # fmt:skip
 
         if 'all' in config.workflow.correlation_lengths:
-            correlate_timeseries = pe.MapNode(
-                TSVConnect(),
-                run_without_submitting=True,
-                mem_gb=1,
-                name='correlate_timeseries',
-                iterfield=['timeseries'],
-            )
-            workflow.connect([
-                (concatenate_inputs, correlate_timeseries, [
-                    ('timeseries', 'timeseries'),
-                    ('temporal_mask', 'temporal_mask'),
-                ]),
-            ])  # fmt:skip
+            if light:
+                # Pool each run's sums instead of correlating the concatenated time series.
+                correlate_timeseries = pe.MapNode(
+                    TSVConnectRuns(),
+                    run_without_submitting=True,
+                    mem_gb=1,
+                    name='correlate_timeseries',
+                    iterfield=['timeseries'],
+                )
+                workflow.connect([
+                    (filter_runs, correlate_timeseries, [
+                        (('timeseries', _transpose_lol), 'timeseries'),
+                        ('temporal_mask', 'temporal_mask'),
+                    ]),
+                ])  # fmt:skip
+
+            else:
+                correlate_timeseries = pe.MapNode(
+                    TSVConnect(cache_dir=config.execution.result_cache_dir),
+                    run_without_submitting=True,
+                    mem_gb=1,
+                    name='correlate_timeseries',
+                    iterfield=['timeseries'],
+                )
+                workflow.connect([
+                    (concatenate_inputs, correlate_timeseries, [
+                        ('timeseries', 'timeseries'),
+                        ('temporal_mask', 'temporal_mask'),
+                    ]),
+                ])  # fmt:skip
 
             make_correlations_dict = pe.MapNode(
                 BIDSURI(
@@ -390,8 +474,9 @@ Postprocessing derivatives from multi-run tasks were then concatenated across ru
             )
             workflow.connect([(ds_timeseries, make_correlations_dict, [('out_file', 'in1')])])
 
-            ds_correlations = pe.MapNode(
-                DerivativesDataSink(
+            ds_correlations = pe.Node(
+                BatchDerivativesDataSink(
+                    iterfield=['segmentation', 'in_file', 'meta_dict'],
                     dismiss_entities=['desc'],
                     statistic='pearsoncorrelation',
                     suffix='relmat',
@@ -400,7 +485,6 @@ Postprocessing derivatives from multi-run tasks were then concatenated across ru
                 name='ds_correlations',
                 run_without_submitting=True,
                 mem_gb=1,
-                iterfield=['segmentation', 'in_file', 'meta_dict'],
             )
             ds_correlations.inputs.segmentation = atlases
 
@@ -426,8 +510,9 @@ Postprocessing derivatives from multi-run tasks were then concatenated across ru
                 (filter_runs, cifti_ts_src, [(('timeseries_ciftis', _transpose_lol), 'in1')]),
             ])  # fmt:skip
 
-            ds_cifti_ts = pe.MapNode(
-                DerivativesDataSink(
+            ds_cifti_ts = pe.Node(
+                BatchDerivativesDataSink(
+                    iterfield=['segmentation', 'in_file', 'meta_dict'],
                     check_hdr=False,
                     dismiss_entities=['desc', 'den'],
                     den='91k',
@@ -438,7 +523,6 @@ Postprocessing derivatives from multi-run tasks were then concatenated across ru
                 name='ds_cifti_ts',
                 run_without_submitting=True,
                 mem_gb=1,
-                iterfield=['segmentation', 'in_file', 'meta_dict'],
             )
             ds_cifti_ts.inputs.segmentation = atlases
 
@@ -33,7 +33,7 @@ def init_functional_connectivity_nifti_wf(mem_gb, name='connectivity_wf'):
                 config.execution.atlases = ["Glasser", "Gordon"]
 
                 wf = init_functional_connectivity_nifti_wf(
-                    mem_gb={"resampled": 0.1, "timeseries": 1.0},
+                    mem_gb={"resampled": 0.1, "timeseries": 1.0, "parcellation": 1.0},
                 )
 
     Parameters
@@ -112,10 +112,13 @@ or were set to zero (when the parcel had <{min_coverage * 100}% coverage).
     )
 
     parcellate_data = pe.MapNode(
-        NiftiParcellate(min_coverage=min_coverage),
+        NiftiParcellate(
+            min_coverage=min_coverage,
+            cache_dir=config.execution.result_cache_dir,
+        ),
         name='parcellate_data',
         iterfield=['atlas', 'atlas_labels'],
-        mem_gb=mem_gb['timeseries'],
+        mem_gb=mem_gb['parcellation'],
     )
     workflow.connect([
         (inputnode, parcellate_data, [
@@ -132,7 +135,7 @@ or were set to zero (when the parcel had <{min_coverage * 100}% coverage).
 
     if 'all' in config.workflow.correlation_lengths:
         functional_connectivity = pe.MapNode(
-            TSVConnect(),
+            TSVConnect(cache_dir=config.execution.result_cache_dir),
             name='functional_connectivity',
             iterfield=['timeseries'],
             mem_gb=mem_gb['timeseries'],
@@ -172,7 +175,10 @@ or were set to zero (when the parcel had <{min_coverage * 100}% coverage).
         ])  # fmt:skip
 
     parcellate_reho = pe.MapNode(
-        NiftiParcellate(min_coverage=min_coverage),
+        NiftiParcellate(
+            min_coverage=min_coverage,
+            cache_dir=config.execution.result_cache_dir,
+        ),
         name='parcellate_reho',
         iterfield=['atlas', 'atlas_labels'],
         mem_gb=mem_gb['resampled'],
@@ -189,7 +195,10 @@ or were set to zero (when the parcel had <{min_coverage * 100}% coverage).
 
     if bandpass_filter:
         parcellate_alff = pe.MapNode(
-            NiftiParcellate(min_coverage=min_coverage),
+            NiftiParcellate(
+                min_coverage=min_coverage,
+                cache_dir=config.execution.result_cache_dir,
+            ),
             name='parcellate_alff',
             iterfield=['atlas', 'atlas_labels'],
             mem_gb=mem_gb['resampled'],
@@ -228,7 +237,7 @@ def init_functional_connectivity_cifti_wf(mem_gb, exact_scans, name='connectivit
                 config.execution.atlases = ["Glasser", "Gordon"]
 
                 wf = init_functional_connectivity_cifti_wf(
-                    mem_gb={"resampled": 0.1, "timeseries": 1.0},
+                    mem_gb={"resampled": 0.1, "timeseries": 1.0, "parcellation": 1.0},
                     exact_scans=[30, 40],
                 )
 
@@ -279,8 +288,8 @@ def init_functional_connectivity_cifti_wf(mem_gb, exact_scans, name='connectivit
     min_coverage = config.workflow.min_coverage
 
     workflow.__desc__ = f"""
-Processed functional timeseries were extracted from residual BOLD using
-Connectome Workbench [@marcus2011informatics] for the atlases.
+Processed functional timeseries were extracted from residual BOLD for the atlases,
+as the mean of the covered vertices in each parcel.
 Corresponding pair-wise functional connectivity between all regions was computed for each atlas,
 which was operationalized as the Pearson's correlation of each parcel's unsmoothed timeseries with
 the Connectome Workbench.
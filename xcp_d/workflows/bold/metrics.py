@@ -16,8 +16,7 @@ from xcp_d.interfaces.workbench import (
     CiftiCreateDenseFromTemplate,
     CiftiSeparateMetric,
     CiftiSeparateVolumeAll,
-    CiftiSmooth,
-    FixCiftiIntent,
+    SmoothCifti,
 )
 from xcp_d.utils.doc import fill_doc
 from xcp_d.utils.utils import fwhm2sigma
@@ -45,7 +44,7 @@ def init_alff_wf(
                 wf = init_alff_wf(
                     name_source="/path/to/file.nii.gz",
                     TR=2.,
-                    mem_gb={"resampled": 0.1},
+                    mem_gb={"resampled": 0.1, "alff": 0.1},
                     name="alff_wf",
                 )
 
@@ -145,8 +144,9 @@ series to retain the original scaling.
             low_pass=low_pass,
             high_pass=high_pass,
             n_threads=config.nipype.omp_nthreads,
+            cache_dir=config.execution.result_cache_dir,
         ),
-        mem_gb=mem_gb['resampled'],
+        mem_gb=mem_gb['alff'],
         name='alff_compt',
         n_procs=config.nipype.omp_nthreads,
     )
@@ -210,11 +210,12 @@ series to retain the original scaling.
 
         else:  # If cifti
             workflow.__desc__ = workflow.__desc__ + (
-                ' The ALFF maps were smoothed with the Connectome Workbench using a Gaussian '
-                f'kernel (FWHM={str(smoothing)} mm).'
+                ' The ALFF maps were smoothed with a Gaussian kernel '
+                f'(FWHM={str(smoothing)} mm), using geodesic distances along the cortical '
+                'surface and Euclidean distances within each subcortical structure.'
             )
 
-            # Smooth via Connectome Workbench
+            # Smooth with a sparse kernel, shared with the denoised BOLD's smoothing
             sigma_lx = fwhm2sigma(smoothing)  # Convert fwhm to standard deviation
             # Get templates for each hemisphere
             lh_midthickness = str(
@@ -224,29 +225,20 @@ series to retain the original scaling.
                 get_template('fsLR', hemi='R', suffix='sphere', density='32k')[0]
             )
             smooth_data = pe.Node(
-                CiftiSmooth(
+                SmoothCifti(
                     sigma_surf=sigma_lx,
                     sigma_vol=sigma_lx,
-                    direction='COLUMN',
                     right_surf=rh_midthickness,
                     left_surf=lh_midthickness,
-                    num_threads=config.nipype.omp_nthreads,
+                    kernel_dir=str(config.execution.result_cache_dir or config.execution.work_dir),
+                    cache_dir=config.execution.result_cache_dir,
                 ),
                 name='ciftismoothing',
                 mem_gb=mem_gb['resampled'],
-                n_procs=config.nipype.omp_nthreads,
-            )
-
-            # Always check the intent code in CiftiSmooth's output file
-            fix_cifti_intent = pe.Node(
-                FixCiftiIntent(),
-                name='fix_cifti_intent',
-                mem_gb=mem_gb['resampled'],
             )
             workflow.connect([
                 (alff_compt, smooth_data, [('alff', 'in_file')]),
-                (smooth_data, fix_cifti_intent, [('out_file', 'in_file')]),
-                (fix_cifti_intent, outputnode, [('out_file', 'smoothed_alff')]),
+                (smooth_data, outputnode, [('out_file', 'smoothed_alff')]),
             ])  # fmt:skip
 
     return workflow
@@ -355,17 +347,20 @@ For the subcortical, volumetric data, ReHo was computed with neighborhood voxels
 
     # Calculate the reho by hemisphere
     lh_reho = pe.Node(
-        SurfaceReHo(surf_hemi='L'),
+        SurfaceReHo(surf_hemi='L', cache_dir=config.execution.result_cache_dir),
         name='reho_lh',
         mem_gb=mem_gb['resampled'],
     )
     rh_reho = pe.Node(
-        SurfaceReHo(surf_hemi='R'),
+        SurfaceReHo(surf_hemi='R', cache_dir=config.execution.result_cache_dir),
         name='reho_rh',
         mem_gb=mem_gb['resampled'],
     )
     subcortical_reho = pe.Node(
-        ReHoNamePatch(neighborhood='vertices'),
+        ReHoNamePatch(
+            neighborhood='vertices',
+            cache_dir=config.execution.result_cache_dir,
+        ),
         name='reho_subcortical',
         mem_gb=mem_gb['resampled'],
     )
@@ -479,7 +474,10 @@ Regional homogeneity (ReHo) [@jiang2016regional] was computed with neighborhood
 
     # Run AFNI'S 3DReHo on the data
     compute_reho = pe.Node(
-        ReHoNamePatch(neighborhood='vertices'),
+        ReHoNamePatch(
+            neighborhood='vertices',
+            cache_dir=config.execution.result_cache_dir,
+        ),
         name='reho_3d',
         mem_gb=mem_gb['resampled'],
         n_procs=1,
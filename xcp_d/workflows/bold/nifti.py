@@ -11,7 +11,7 @@ from num2words import num2words
 from xcp_d import config
 from xcp_d.interfaces.utils import ConvertTo32
 from xcp_d.utils.doc import fill_doc
-from xcp_d.utils.utils import _create_mem_gb
+from xcp_d.utils.resources import estimate_mem_gb
 from xcp_d.workflows.bold.connectivity import init_functional_connectivity_nifti_wf
 from xcp_d.workflows.bold.metrics import init_alff_wf, init_reho_nifti_wf
 from xcp_d.workflows.bold.outputs import init_postproc_derivatives_wf
@@ -204,12 +204,19 @@ the following post-processing was performed.
                 # if parcellation is performed
                 'timeseries',
                 'timeseries_ciftis',  # will not be defined
+                # if LINC QC is enabled
+                'qc_file',
+                'qc_stats',
             ],
         ),
         name='outputnode',
     )
 
-    mem_gbx = _create_mem_gb(bold_file)
+    mem_gbx = estimate_mem_gb(
+        bold_file,
+        n_threads=config.nipype.omp_nthreads,
+        model_file=config.nipype.resource_model,
+    )
 
     downcast_data = pe.Node(
         ConvertTo32(),
@@ -265,9 +272,10 @@ the following post-processing was performed.
     ])  # fmt:skip
 
     if despike:
-        despike_wf = init_despike_wf(TR=TR)
+        despike_wf = init_despike_wf(mem_gb=mem_gbx)
 
         workflow.connect([
+            (downcast_data, despike_wf, [('bold_mask', 'inputnode.bold_mask')]),
             (prepare_confounds_wf, despike_wf, [
                 ('outputnode.preprocessed_bold', 'inputnode.bold_file'),
             ]),
@@ -308,6 +316,7 @@ the following post-processing was performed.
     qc_report_wf = init_qc_report_wf(
         TR=TR,
         head_radius=head_radius,
+        mem_gb=mem_gbx,
         name='qc_report_wf',
     )
 
@@ -357,6 +366,10 @@ the following post-processing was performed.
             ('outputnode.smoothed_denoised_bold', 'inputnode.smoothed_denoised_bold'),
         ]),
         (qc_report_wf, postproc_derivatives_wf, [('outputnode.qc_file', 'inputnode.qc_file')]),
+        (qc_report_wf, outputnode, [
+            ('outputnode.qc_file', 'qc_file'),
+            ('outputnode.qc_stats', 'qc_stats'),
+        ]),
         (reho_wf, postproc_derivatives_wf, [('outputnode.reho', 'inputnode.reho')]),
         (postproc_derivatives_wf, outputnode, [
             ('outputnode.motion_file', 'motion_file'),
@@ -7,7 +7,7 @@ from nipype.pipeline import engine as pe
 from niworkflows.engine.workflows import LiterateWorkflow as Workflow
 
 from xcp_d import config
-from xcp_d.interfaces.bids import BIDSURI, DerivativesDataSink
+from xcp_d.interfaces.bids import BIDSURI, BatchDerivativesDataSink, DerivativesDataSink
 from xcp_d.utils.bids import get_entity
 from xcp_d.utils.doc import fill_doc
 
@@ -402,8 +402,9 @@ def init_postproc_derivatives_wf(
         ])  # fmt:skip
 
         # TODO: Add brain mask to Sources (for NIfTIs).
-        ds_coverage = pe.MapNode(
-            DerivativesDataSink(
+        ds_coverage = pe.Node(
+            BatchDerivativesDataSink(
+                iterfield=['segmentation', 'in_file', 'meta_dict'],
                 source_file=name_source,
                 dismiss_entities=['desc', 'den', 'res'],
                 cohort=cohort,
@@ -414,7 +415,6 @@ def init_postproc_derivatives_wf(
             name='ds_coverage',
             run_without_submitting=True,
             mem_gb=1,
-            iterfield=['segmentation', 'in_file', 'meta_dict'],
         )
         workflow.connect([
             (inputnode, ds_coverage, [
@@ -440,8 +440,9 @@ def init_postproc_derivatives_wf(
             (ds_coverage, add_coverage_to_src, [('out_file', 'in1')]),
         ])  # fmt:skip
 
-        ds_timeseries = pe.MapNode(
-            DerivativesDataSink(
+        ds_timeseries = pe.Node(
+            BatchDerivativesDataSink(
+                iterfield=['segmentation', 'in_file', 'meta_dict'],
                 source_file=name_source,
                 dismiss_entities=['desc', 'den', 'res'],
                 cohort=cohort,
@@ -454,7 +455,6 @@ def init_postproc_derivatives_wf(
             name='ds_timeseries',
             run_without_submitting=True,
             mem_gb=1,
-            iterfield=['segmentation', 'in_file', 'meta_dict'],
         )
         workflow.connect([
             (inputnode, ds_timeseries, [
@@ -496,8 +496,9 @@ def init_postproc_derivatives_wf(
                 (make_corrs_meta_dict1, make_corrs_meta_dict2, [('metadata', 'metadata')]),
             ])  # fmt:skip
 
-            ds_correlations = pe.MapNode(
-                DerivativesDataSink(
+            ds_correlations = pe.Node(
+                BatchDerivativesDataSink(
+                    iterfield=['segmentation', 'in_file', 'meta_dict'],
                     source_file=name_source,
                     dismiss_entities=['desc', 'den', 'res'],
                     cohort=cohort,
@@ -514,7 +515,6 @@ def init_postproc_derivatives_wf(
                 name='ds_correlations',
                 run_without_submitting=True,
                 mem_gb=1,
-                iterfield=['segmentation', 'in_file', 'meta_dict'],
             )
             workflow.connect([
                 (inputnode, ds_correlations, [
@@ -525,8 +525,9 @@ def init_postproc_derivatives_wf(
             ])  # fmt:skip
 
         if file_format == 'cifti':
-            ds_coverage_ciftis = pe.MapNode(
-                DerivativesDataSink(
+            ds_coverage_ciftis = pe.Node(
+                BatchDerivativesDataSink(
+                    iterfield=['segmentation', 'in_file', 'meta_dict'],
                     source_file=name_source,
                     check_hdr=False,
                     dismiss_entities=['desc'],
@@ -538,7 +539,6 @@ def init_postproc_derivatives_wf(
                 name='ds_coverage_ciftis',
                 run_without_submitting=True,
                 mem_gb=1,
-                iterfield=['segmentation', 'in_file', 'meta_dict'],
             )
             workflow.connect([
                 (inputnode, ds_coverage_ciftis, [
@@ -564,8 +564,9 @@ def init_postproc_derivatives_wf(
                 (ds_coverage_ciftis, add_ccoverage_to_src, [('out_file', 'in1')]),
             ])  # fmt:skip
 
-            ds_timeseries_ciftis = pe.MapNode(
-                DerivativesDataSink(
+            ds_timeseries_ciftis = pe.Node(
+                BatchDerivativesDataSink(
+                    iterfield=['segmentation', 'in_file', 'meta_dict'],
                     source_file=name_source,
                     check_hdr=False,
                     dismiss_entities=['desc', 'den'],
@@ -578,7 +579,6 @@ def init_postproc_derivatives_wf(
                 name='ds_timeseries_ciftis',
                 run_without_submitting=True,
                 mem_gb=1,
-                iterfield=['segmentation', 'in_file', 'meta_dict'],
             )
             workflow.connect([
                 (inputnode, ds_timeseries_ciftis, [
@@ -622,8 +622,9 @@ def init_postproc_derivatives_wf(
                     (make_ccorrs_meta_dict1, make_ccorrs_meta_dict2, [('metadata', 'metadata')]),
                 ])  # fmt:skip
 
-                ds_correlation_ciftis = pe.MapNode(
-                    DerivativesDataSink(
+                ds_correlation_ciftis = pe.Node(
+                    BatchDerivativesDataSink(
+                        iterfield=['segmentation', 'in_file', 'meta_dict'],
                         source_file=name_source,
                         check_hdr=False,
                         dismiss_entities=['desc', 'den'],
@@ -642,7 +643,6 @@ def init_postproc_derivatives_wf(
                     name='ds_correlation_ciftis',
                     run_without_submitting=True,
                     mem_gb=1,
-                    iterfield=['segmentation', 'in_file', 'meta_dict'],
                 )
                 workflow.connect([
                     (inputnode, ds_correlation_ciftis, [
@@ -662,8 +662,9 @@ def init_postproc_derivatives_wf(
                 (inputnode, select_exact_scan_files, [('correlations_exact', 'inlist')]),
             ])  # fmt:skip
 
-            ds_correlations_exact = pe.MapNode(
-                DerivativesDataSink(
+            ds_correlations_exact = pe.Node(
+                BatchDerivativesDataSink(
+                    iterfield=['segmentation', 'in_file'],
                     source_file=name_source,
                     dismiss_entities=['desc', 'den', 'res'],
                     cohort=cohort,
@@ -675,7 +676,6 @@ def init_postproc_derivatives_wf(
                 name=f'ds_correlations_exact_{i_exact_scan}',
                 run_without_submitting=True,
                 mem_gb=1,
-                iterfield=['segmentation', 'in_file'],
             )
             workflow.connect([
                 (inputnode, ds_correlations_exact, [('atlas_names', 'segmentation')]),
@@ -735,8 +735,9 @@ def init_postproc_derivatives_wf(
             (ds_reho, add_reho_to_src, [('out_file', 'in1')]),
         ])  # fmt:skip
 
-        ds_parcellated_reho = pe.MapNode(
-            DerivativesDataSink(
+        ds_parcellated_reho = pe.Node(
+            BatchDerivativesDataSink(
+                iterfield=['segmentation', 'in_file', 'meta_dict'],
                 source_file=name_source,
                 dismiss_entities=['desc', 'den', 'res'],
                 cohort=cohort,
@@ -750,7 +751,6 @@ def init_postproc_derivatives_wf(
             name='ds_parcellated_reho',
             run_without_submitting=True,
             mem_gb=1,
-            iterfield=['segmentation', 'in_file', 'meta_dict'],
         )
         workflow.connect([
             (inputnode, ds_parcellated_reho, [
@@ -837,8 +837,9 @@ def init_postproc_derivatives_wf(
                 (ds_alff, add_alff_to_src, [('out_file', 'in1')]),
             ])  # fmt:skip
 
-            ds_parcellated_alff = pe.MapNode(
-                DerivativesDataSink(
+            ds_parcellated_alff = pe.Node(
+                BatchDerivativesDataSink(
+                    iterfield=['segmentation', 'in_file', 'meta_dict'],
                     source_file=name_source,
                     dismiss_entities=['desc', 'den', 'res'],
                     cohort=cohort,
@@ -849,7 +850,6 @@ def init_postproc_derivatives_wf(
                 name='ds_parcellated_alff',
                 run_without_submitting=True,
                 mem_gb=1,
-                iterfield=['segmentation', 'in_file', 'meta_dict'],
             )
             workflow.connect([
                 (inputnode, ds_parcellated_alff, [
@@ -27,6 +27,7 @@ LOGGER = logging.getLogger('nipype.workflow')
 def init_qc_report_wf(
     TR,
     head_radius,
+    mem_gb=None,
     name='qc_report_wf',
 ):
     """Generate quality control figures and a QC file.
@@ -51,6 +52,9 @@ def init_qc_report_wf(
     ----------
     %(TR)s
     %(head_radius)s
+    mem_gb : :obj:`dict` or None
+        Memory size in GB to use for each of the nodes.
+        Only the "qc_plot" key is used. If None, 2 GB is used.
     %(name)s
         Default is "qc_report_wf".
 
@@ -85,6 +89,8 @@ def init_qc_report_wf(
     """
     workflow = Workflow(name=name)
 
+    qc_mem_gb = mem_gb['qc_plot'] if mem_gb else 2
+
     inputnode = pe.Node(
         niu.IdentityInterface(
             fields=[
@@ -111,6 +117,7 @@ def init_qc_report_wf(
         niu.IdentityInterface(
             fields=[
                 'qc_file',
+                'qc_stats',
             ],
         ),
         name='outputnode',
@@ -262,7 +269,7 @@ def init_qc_report_wf(
                 template_mask=nlin2009casym_brain_mask,
             ),
             name='make_linc_qc',
-            mem_gb=2,
+            mem_gb=qc_mem_gb,
         )
         workflow.connect([
             (inputnode, make_linc_qc, [
@@ -273,7 +280,10 @@ def init_qc_report_wf(
                 ('temporal_mask', 'temporal_mask'),
                 ('dummy_scans', 'dummy_scans'),
             ]),
-            (make_linc_qc, outputnode, [('qc_file', 'qc_file')]),
+            (make_linc_qc, outputnode, [
+                ('qc_file', 'qc_file'),
+                ('qc_stats', 'qc_stats'),
+            ]),
         ])  # fmt:skip
 
         if config.workflow.file_format == 'nifti':
@@ -305,7 +315,7 @@ def init_qc_report_wf(
         make_qc_plots_nipreps = pe.Node(
             QCPlots(TR=TR, head_radius=head_radius),
             name='make_qc_plots_nipreps',
-            mem_gb=2,
+            mem_gb=qc_mem_gb,
         )
         workflow.connect([
             (inputnode, make_qc_plots_nipreps, [
@@ -348,7 +358,7 @@ def init_qc_report_wf(
             FunctionalSummary(TR=TR),
             name='qcsummary',
             run_without_submitting=False,
-            mem_gb=2,
+            mem_gb=qc_mem_gb,
         )
         workflow.connect([
             (inputnode, functional_qc, [('name_source', 'bold_file')]),
@@ -370,9 +380,9 @@ def init_qc_report_wf(
 
     if config.workflow.abcc_qc:
         make_abcc_qc = pe.Node(
-            ABCCQC(TR=TR),
+            ABCCQC(TR=TR, layout=config.workflow.abcc_qc_layout),
             name='make_abcc_qc',
-            mem_gb=2,
+            mem_gb=qc_mem_gb,
         )
         workflow.connect([(inputnode, make_abcc_qc, [('motion_file', 'motion_file')])])
 
@@ -395,7 +405,7 @@ def init_qc_report_wf(
         make_qc_plots_es = pe.Node(
             QCPlotsES(TR=TR, standardize=config.execution.confounds_config is None),
             name='make_qc_plots_es',
-            mem_gb=2,
+            mem_gb=qc_mem_gb,
         )
         workflow.connect([
             (inputnode, make_qc_plots_es, [
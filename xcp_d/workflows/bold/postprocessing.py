@@ -20,8 +20,8 @@ from xcp_d.interfaces.censoring import (
 )
 from xcp_d.interfaces.nilearn import DenoiseCifti, DenoiseNifti, Smooth
 from xcp_d.interfaces.plotting import CensoringPlot
-from xcp_d.interfaces.restingstate import DespikePatch
-from xcp_d.interfaces.workbench import CiftiConvert, CiftiSmooth, FixCiftiIntent
+from xcp_d.interfaces.restingstate import DespikeImage
+from xcp_d.interfaces.workbench import SmoothCifti
 from xcp_d.utils.boilerplate import (
     describe_censoring,
     describe_motion_parameters,
@@ -202,6 +202,7 @@ def init_prepare_confounds_wf(
             motion_filter_order=motion_filter_order,
             fd_thresh=fd_thresh,
             head_radius=head_radius,
+            motion_cache_dir=str(config.execution.work_dir / 'motion_cache'),
         ),
         name='process_motion',
         mem_gb=1,
@@ -415,8 +416,8 @@ def init_prepare_confounds_wf(
 
 
 @fill_doc
-def init_despike_wf(TR, name='despike_wf'):
-    """Despike BOLD data with AFNI's 3dDespike.
+def init_despike_wf(mem_gb, name='despike_wf'):
+    """Despike BOLD data.
 
     Despiking truncates large spikes in the BOLD times series.
     Despiking reduces/limits the amplitude or magnitude of large spikes,
@@ -436,13 +437,14 @@ def init_despike_wf(TR, name='despike_wf'):
 
             with mock_config():
                 wf = init_despike_wf(
-                    TR=0.8,
+                    mem_gb={"despike": 4},
                     name="despike_wf",
                 )
 
     Parameters
     ----------
-    %(TR)s
+    mem_gb : :obj:`dict`
+        Memory size in GB to use for each of the nodes.
     %(name)s
         Default is "despike_wf".
 
@@ -450,65 +452,51 @@ def init_despike_wf(TR, name='despike_wf'):
     ------
     bold_file : :obj:`str`
         A NIFTI or CIFTI BOLD file to despike.
+    bold_mask : :obj:`str`
+        Brain mask for NIfTI files. Unused for CIFTI files.
 
     Outputs
     -------
     bold_file : :obj:`str`
         The despiked NIFTI or CIFTI BOLD file.
+
+    Notes
+    -----
+    Despiking is done with :class:`~xcp_d.interfaces.restingstate.DespikeImage`,
+    a Python implementation of *AFNI*'s ``3dDespike -NEW``,
+    which works on CIFTI files directly, rather than converting them to NIfTI and back.
     """
     workflow = Workflow(name=name)
     file_format = config.workflow.file_format
     omp_nthreads = config.nipype.omp_nthreads
 
-    inputnode = pe.Node(niu.IdentityInterface(fields=['bold_file']), name='inputnode')
+    workflow.__desc__ = """
+The BOLD data were despiked with a Python implementation of *AFNI*'s *3dDespike* algorithm
+(using the `-NEW` fitting method).
+"""
+
+    inputnode = pe.Node(
+        niu.IdentityInterface(fields=['bold_file', 'bold_mask']),
+        name='inputnode',
+    )
     outputnode = pe.Node(niu.IdentityInterface(fields=['bold_file']), name='outputnode')
 
     despike3d = pe.Node(
-        DespikePatch(outputtype='NIFTI_GZ', args='-nomask -NEW'),
+        DespikeImage(
+            n_threads=omp_nthreads,
+            cache_dir=config.execution.result_cache_dir,
+        ),
         name='despike3d',
-        mem_gb=4,
+        mem_gb=mem_gb['despike'],
         n_procs=omp_nthreads,
     )
+    workflow.connect([
+        (inputnode, despike3d, [('bold_file', 'in_file')]),
+        (despike3d, outputnode, [('out_file', 'bold_file')]),
+    ])  # fmt:skip
 
-    if file_format == 'cifti':
-        workflow.__desc__ = """
-The BOLD data were converted to NIfTI format, despiked with *AFNI*'s *3dDespike*,
-and converted back to CIFTI format.
-"""
-
-        # first, convert the cifti to a nifti
-        convert_to_nifti = pe.Node(
-            CiftiConvert(target='to', num_threads=config.nipype.omp_nthreads),
-            name='convert_to_nifti',
-            mem_gb=4,
-            n_procs=config.nipype.omp_nthreads,
-        )
-        workflow.connect([
-            (inputnode, convert_to_nifti, [('bold_file', 'in_file')]),
-            (convert_to_nifti, despike3d, [('out_file', 'in_file')]),
-        ])  # fmt:skip
-
-        # finally, convert the despiked nifti back to cifti
-        convert_to_cifti = pe.Node(
-            CiftiConvert(target='from', TR=TR, num_threads=config.nipype.omp_nthreads),
-            name='convert_to_cifti',
-            mem_gb=4,
-            n_procs=config.nipype.omp_nthreads,
-        )
-        workflow.connect([
-            (inputnode, convert_to_cifti, [('bold_file', 'cifti_template')]),
-            (despike3d, convert_to_cifti, [('out_file', 'in_file')]),
-            (convert_to_cifti, outputnode, [('out_file', 'bold_file')]),
-        ])  # fmt:skip
-
-    else:
-        workflow.__desc__ = """
-The BOLD data were despiked with *AFNI*'s *3dDespike*.
-"""
-        workflow.connect([
-            (inputnode, despike3d, [('bold_file', 'in_file')]),
-            (despike3d, outputnode, [('out_file', 'bold_file')]),
-        ])  # fmt:skip
+    if file_format == 'nifti':
+        workflow.connect([(inputnode, despike3d, [('bold_mask', 'mask')])])  # fmt:skip
 
     return workflow
 
@@ -645,9 +633,10 @@ approach.
             high_pass=high_pass,
             filter_order=bpf_order,
             bandpass_filter=bandpass_filter,
+            cache_dir=config.execution.result_cache_dir,
         ),
         name='regress_and_filter_bold',
-        mem_gb=mem_gb['timeseries'],
+        mem_gb=mem_gb['denoise'],
     )
 
     workflow.connect([
@@ -750,16 +739,16 @@ def init_resd_smoothing_wf(mem_gb, name='resd_smoothing_wf'):
     sigma_lx = fwhm2sigma(smoothing)
     if file_format == 'cifti':
         workflow.__desc__ = f""" \
-The denoised BOLD was then smoothed using *Connectome Workbench* with a Gaussian kernel
-(FWHM={str(smoothing)} mm).
+The denoised BOLD was then smoothed with a Gaussian kernel (FWHM={str(smoothing)} mm),
+using geodesic distances along the cortical surface and Euclidean distances within each
+subcortical structure.
 """
 
-        # Call connectome workbench to smooth for each hemisphere
+        # Smooth each hemisphere's surface and each subcortical structure with a sparse kernel
         smooth_data = pe.Node(
-            CiftiSmooth(
+            SmoothCifti(
                 sigma_surf=sigma_lx,  # the size of the surface kernel
                 sigma_vol=sigma_lx,  # the volume of the surface kernel
-                direction='COLUMN',  # which direction to smooth along@
                 # pull out atlases for each hemisphere
                 right_surf=str(
                     get_template(
@@ -781,23 +770,13 @@ The denoised BOLD was then smoothed using *Connectome Workbench* with a Gaussian
                         suffix='sphere',
                     )
                 ),
-                num_threads=config.nipype.omp_nthreads,
+                kernel_dir=str(config.execution.result_cache_dir or config.execution.work_dir),
+                cache_dir=config.execution.result_cache_dir,
             ),
             name='cifti_smoothing',
             mem_gb=mem_gb['timeseries'],
-            n_procs=config.nipype.omp_nthreads,
         )
-
-        # Always check the intent code in CiftiSmooth's output file
-        fix_cifti_intent = pe.Node(
-            FixCiftiIntent(),
-            name='fix_cifti_intent',
-            mem_gb=1,
-        )
-        workflow.connect([
-            (smooth_data, fix_cifti_intent, [('out_file', 'in_file')]),
-            (fix_cifti_intent, outputnode, [('out_file', 'smoothed_bold')]),
-        ])  # fmt:skip
+        workflow.connect([(smooth_data, outputnode, [('out_file', 'smoothed_bold')])])
 
     else:
         workflow.__desc__ = f""" \
@@ -60,6 +60,7 @@ def init_load_atlases_wf(name='load_atlases_wf'):
         atlases=config.execution.atlases,
         file_format=config.workflow.file_format,
         bids_filters=config.execution.bids_filters,
+        database_dir=config.execution.work_dir / 'atlas_db',
     )
 
     # Reorganize the atlas file information
@@ -227,6 +228,8 @@ def init_parcellate_cifti_wf(
     """Parcellate a CIFTI file using a set of atlases.
 
     Part of the parcellation includes applying vertex-wise and node-wise masks.
+    All of the steps are done for all of the atlases in a single
+    :class:`~xcp_d.interfaces.connectivity.CiftiParcellate` node.
 
     Vertex-wise masks are typically calculated from the full BOLD run,
     wherein any vertex that has a time series of all zeros or NaNs is excluded.
@@ -248,7 +251,7 @@ def init_parcellate_cifti_wf(
             from xcp_d.workflows.connectivity import init_parcellate_cifti_wf
 
             with mock_config():
-                wf = init_parcellate_cifti_wf(mem_gb={"resampled": 2})
+                wf = init_parcellate_cifti_wf(mem_gb={"resampled": 2, "parcellation": 2})
 
     Parameters
     ----------
@@ -258,7 +261,7 @@ def init_parcellate_cifti_wf(
         Whether to compute a vertex-wise mask for the CIFTI file.
         When processing full BOLD runs, this should be True.
         When processing truncated BOLD runs or scalar maps, this should be False,
-        and the vertex-wise mask should be provided via the inputnode..
+        and the vertex-wise mask should be provided via the inputnode.
         Default is True.
     name : :obj:`str`
         Workflow name.
@@ -293,8 +296,7 @@ def init_parcellate_cifti_wf(
         Coverage TSV files. One for each atlas. Only output if `compute_mask` is True.
     """
     from xcp_d import config
-    from xcp_d.interfaces.connectivity import CiftiMask, CiftiToTSV, CiftiVertexMask
-    from xcp_d.interfaces.workbench import CiftiMath, CiftiParcellateWorkbench
+    from xcp_d.interfaces.connectivity import CiftiParcellate
 
     workflow = Workflow(name=name)
 
@@ -324,116 +326,42 @@ def init_parcellate_cifti_wf(
         name='outputnode',
     )
 
-    # Replace vertices with all zeros with NaNs using Python.
-    coverage_buffer = pe.Node(
-        niu.IdentityInterface(fields=['vertexwise_coverage', 'coverage_cifti']),
-        name='coverage_buffer',
+    # Compute the coverage, parcellate the data, and mask low-coverage parcels for all atlases
+    # in one node, using Python.
+    parcellate_data = pe.Node(
+        CiftiParcellate(
+            min_coverage=config.workflow.min_coverage,
+            cache_dir=config.execution.result_cache_dir,
+        ),
+        name='parcellate_data',
+        mem_gb=mem_gb['parcellation'],
     )
-    if compute_mask:
-        # Write out a vertex-wise binary coverage map using Python.
-        vertexwise_coverage = pe.Node(
-            CiftiVertexMask(),
-            name='vertexwise_coverage',
-        )
-        workflow.connect([
-            (inputnode, vertexwise_coverage, [('in_file', 'in_file')]),
-            (vertexwise_coverage, coverage_buffer, [('mask_file', 'vertexwise_coverage')]),
-            (vertexwise_coverage, outputnode, [('mask_file', 'vertexwise_coverage')]),
-        ])  # fmt:skip
-
-        parcellate_coverage = pe.MapNode(
-            CiftiParcellateWorkbench(
-                direction='COLUMN',
-                only_numeric=True,
-                out_file='parcellated_atlas.pscalar.nii',
-                num_threads=config.nipype.omp_nthreads,
-            ),
-            name='parcellate_coverage',
-            iterfield=['atlas_label'],
-            n_procs=config.nipype.omp_nthreads,
-        )
-        workflow.connect([
-            (inputnode, parcellate_coverage, [('atlas_files', 'atlas_label')]),
-            (vertexwise_coverage, parcellate_coverage, [('mask_file', 'in_file')]),
-            (parcellate_coverage, coverage_buffer, [('out_file', 'coverage_cifti')]),
-            (parcellate_coverage, outputnode, [('out_file', 'coverage_cifti')]),
-        ])  # fmt:skip
+    workflow.connect([
+        (inputnode, parcellate_data, [
+            ('in_file', 'in_file'),
+            ('atlas_files', 'atlas_files'),
+            ('atlas_labels_files', 'atlas_labels_files'),
+        ]),
+        (parcellate_data, outputnode, [
+            ('parcellated_cifti', 'parcellated_cifti'),
+            ('parcellated_tsv', 'parcellated_tsv'),
+        ]),
+    ])  # fmt:skip
 
-        coverage_to_tsv = pe.MapNode(
-            CiftiToTSV(),
-            name='coverage_to_tsv',
-            iterfield=['in_file', 'atlas_labels'],
-        )
+    if compute_mask:
         workflow.connect([
-            (inputnode, coverage_to_tsv, [('atlas_labels_files', 'atlas_labels')]),
-            (parcellate_coverage, coverage_to_tsv, [('out_file', 'in_file')]),
-            (coverage_to_tsv, outputnode, [('out_file', 'coverage_tsv')]),
+            (parcellate_data, outputnode, [
+                ('vertexwise_coverage', 'vertexwise_coverage'),
+                ('coverage_cifti', 'coverage_cifti'),
+                ('coverage_tsv', 'coverage_tsv'),
+            ]),
         ])  # fmt:skip
     else:
         workflow.connect([
-            (inputnode, coverage_buffer, [
+            (inputnode, parcellate_data, [
                 ('vertexwise_coverage', 'vertexwise_coverage'),
                 ('coverage_cifti', 'coverage_cifti'),
             ]),
         ])  # fmt:skip
 
-    # Parcellate the data file using the vertex-wise coverage.
-    parcellate_data = pe.MapNode(
-        CiftiParcellateWorkbench(
-            direction='COLUMN',
-            only_numeric=True,
-            out_file=f'parcellated_data.{"ptseries" if compute_mask else "pscalar"}.nii',
-            num_threads=config.nipype.omp_nthreads,
-        ),
-        name='parcellate_data',
-        iterfield=['atlas_label'],
-        mem_gb=mem_gb['resampled'],
-        n_procs=config.nipype.omp_nthreads,
-    )
-    workflow.connect([
-        (inputnode, parcellate_data, [
-            ('in_file', 'in_file'),
-            ('atlas_files', 'atlas_label'),
-        ]),
-        (coverage_buffer, parcellate_data, [('vertexwise_coverage', 'cifti_weights')]),
-    ])  # fmt:skip
-
-    # Threshold node coverage values based on coverage threshold.
-    threshold_coverage = pe.MapNode(
-        CiftiMath(
-            expression=f'data > {config.workflow.min_coverage}',
-            num_threads=config.nipype.omp_nthreads,
-        ),
-        name='threshold_coverage',
-        iterfield=['data'],
-        mem_gb=mem_gb['resampled'],
-        n_procs=config.nipype.omp_nthreads,
-    )
-    workflow.connect([(coverage_buffer, threshold_coverage, [('coverage_cifti', 'data')])])
-
-    # Mask out uncovered nodes from parcellated denoised data
-    mask_parcellated_data = pe.MapNode(
-        CiftiMask(),
-        name='mask_parcellated_data',
-        iterfield=['in_file', 'mask'],
-        mem_gb=mem_gb['resampled'],
-    )
-    workflow.connect([
-        (parcellate_data, mask_parcellated_data, [('out_file', 'in_file')]),
-        (threshold_coverage, mask_parcellated_data, [('out_file', 'mask')]),
-        (mask_parcellated_data, outputnode, [('out_file', 'parcellated_cifti')]),
-    ])  # fmt:skip
-
-    # Convert the parcellated CIFTI to a TSV file
-    cifti_to_tsv = pe.MapNode(
-        CiftiToTSV(),
-        name='cifti_to_tsv',
-        iterfield=['in_file', 'atlas_labels'],
-    )
-    workflow.connect([
-        (inputnode, cifti_to_tsv, [('atlas_labels_files', 'atlas_labels')]),
-        (mask_parcellated_data, cifti_to_tsv, [('out_file', 'in_file')]),
-        (cifti_to_tsv, outputnode, [('out_file', 'parcellated_tsv')]),
-    ])  # fmt:skip
-
     return workflow